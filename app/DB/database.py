@@ -1,24 +1,111 @@
 from pymongo import MongoClient
+from pymongo.collection import Collection
 import os
+import threading
 from dotenv import load_dotenv
 
 # Cargar variables de entorno desde un archivo .env si existe
 load_dotenv()
 
+# Después de load_dotenv: prometheus_client lee PROMETHEUS_MULTIPROC_DIR al importarse
+from app.DB import monitoring
+
 # Configuración de la conexión a MongoDB
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "ravencode_achievements_db")
+# Conexiones por proceso: con varios workers el total es workers x este valor
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+# Conexiones que el pool mantiene abiertas aunque estén inactivas (las abre
+# el calentamiento al arrancar, ver app/core/warmup.py)
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "5"))
+
+# Métricas de comandos y del pool de conexiones (antes de crear cualquier cliente)
+if os.getenv("MONGO_METRICS_ENABLED", "true").lower() == "true":
+    monitoring.registrar(tasa_bytes=(
+        float(os.getenv("MONGO_METRICS_REPLY_BYTES_SAMPLE_RATE", "0.01"))
+        if os.getenv("MONGO_METRICS_REPLY_BYTES", "false").lower() == "true" else 0.0
+    ))
+
+# Un MongoClient por proceso. Los servicios se importan antes de que el
+# servidor cree los workers (gunicorn hace fork del proceso maestro) y un
+# MongoClient no debe usarse a través de un fork: tras el fork el hijo
+# descarta la referencia y crea el suyo en el primer uso.
+_cliente = None
+_cliente_lock = threading.Lock()
+_generacion = 0
+
+def _despues_de_fork():
+    global _cliente, _cliente_lock, _generacion
+    _cliente = None
+    _cliente_lock = threading.Lock()
+    _generacion += 1
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_despues_de_fork)
+
+def get_client() -> MongoClient:
+    """MongoClient compartido por todo el proceso actual (se crea al primer uso)"""
+    global _cliente
+    if _cliente is None:
+        with _cliente_lock:
+            if _cliente is None:
+                _cliente = MongoClient(
+                    MONGODB_URL, maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=min(MONGO_MIN_POOL_SIZE, MONGO_MAX_POOL_SIZE)
+                )
+    return _cliente
+
+def cerrar_cliente():
+    """Cerrar el cliente del proceso (al apagar el worker)"""
+    global _cliente
+    with _cliente_lock:
+        cliente, _cliente = _cliente, None
+    if cliente is not None:
+        cliente.close()
+
+class ColeccionDelProceso:
+    """
+    Colección resuelta sobre el cliente del proceso que la usa.
+
+    Los servicios la guardan a nivel de módulo como antes guardaban la
+    Collection; tras un fork se vuelve a resolver con el cliente del hijo.
+    No es una Collection: delega los atributos en la del proceso. Los módulos
+    la anotan `Optional[ColeccionDelProceso]` (None si no había conexión al
+    importarlos, lo que comprueban warmup y admin).
+    """
+
+    __slots__ = ("nombre", "_coleccion", "_generacion")
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self._coleccion = None
+        self._generacion = -1
+
+    def _actual(self) -> Collection:
+        if self._generacion != _generacion:
+            self._coleccion = get_client()[DATABASE_NAME][self.nombre]
+            self._generacion = _generacion
+        return self._coleccion
+
+    def __getattr__(self, atributo):
+        return getattr(self._actual(), atributo)
+
+    def __repr__(self):
+        return f"ColeccionDelProceso({self.nombre!r})"
+
+def coleccion(nombre: str) -> ColeccionDelProceso:
+    return ColeccionDelProceso(nombre)
 
 def get_database():
     """
-    Crea y retorna una conexión a la base de datos MongoDB.
+    Retorna la base de datos MongoDB sobre el cliente del proceso.
     Conecta a la base de datos especificada por DATABASE_NAME usando MONGODB_URL.
     Devuelve:
         db (Database): El objeto de base de datos de MongoDB si la conexión es exitosa, None en caso contrario.
     También imprime un mensaje indicando el estado de la conexión.
     """
     try:
-        client = MongoClient(MONGODB_URL)
+        client = get_client()
         db = client[DATABASE_NAME]
         # Probar la conexión
         client.admin.command('ping')
@@ -0,0 +1,288 @@
+"""
+Índices de MongoDB declarados por colección.
+
+`INDICES` es la especificación completa: lo que no está aquí sobra. Sobre la
+base de datos real se puede:
+
+- `comparar(db)`: diferencias entre la especificación y los índices
+  existentes: faltantes, distintos (mismo nombre con otra clave u opciones),
+  con otro nombre (misma definición) y sobrantes.
+- `aplicar(db)`: crear los faltantes y, si se pide, recrear los distintos y
+  eliminar los sobrantes.
+- `uso(db)`: accesos por índice desde el último reinicio de mongod
+  (`$indexStats`), para detectar índices que no usa ninguna consulta.
+
+Uso desde la línea de comandos (CI, despliegues):
+
+    python -m app.DB.indexes                 # informe; código 1 si hay diferencias
+    python -m app.DB.indexes --aplicar       # crear los que faltan
+    python -m app.DB.indexes --aplicar --recrear --eliminar-sobrantes
+"""
+
+import argparse
+import json
+import logging
+import sys
+from typing import Any, Dict, List, Optional
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Opciones de índice que forman parte de la definición
+OPCIONES = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+# Códigos de error del servidor al crear un índice que choca con uno existente
+INDEX_OPTIONS_CONFLICT = 85
+INDEX_KEY_SPECS_CONFLICT = 86
+
+INDICES: Dict[str, List[Dict[str, Any]]] = {
+    "students": [
+        # Búsqueda por email en todas las operaciones; garantiza un documento por estudiante.
+        # Cubre también las consultas por email + logro (email ya identifica el documento)
+        {"keys": [("email", 1)], "unique": True, "name": "email_unique"},
+        # Logros por curso (get_course_achievements)
+        {"keys": [("achievements.course_id", 1)], "name": "achievements_course_id"},
+        {"keys": [("achievements.status", 1)], "name": "achievements_status"},
+        # Logros recientes
+        {"keys": [("achievements.date_earned", -1)], "name": "achievements_date_earned_desc"},
+        {"keys": [("achievements.achieved", 1)], "name": "achievements_achieved"},
+        {"keys": [("updated_at", -1)], "name": "updated_at_desc"},
+    ],
+    "achievements_master": [
+        # Un logro por nombre y curso (create_achievement_template lo comprueba antes de insertar)
+        {"keys": [("course_id", 1), ("achievement_name", 1)], "unique": True, "name": "master_curso_logro_unique"},
+        # Plantillas activas de un curso: search_achievement_templates con course_id.
+        # Parcial: las desactivadas no ocupan el índice. La carga del catálogo en
+        # memoria (find active: true, sin course_id) lee casi toda la colección una
+        # vez por ACHIEVEMENTS_CATALOG_MAX_AGE_SECONDS y no lo usa: recorrido completo
+        {"keys": [("course_id", 1)], "partialFilterExpression": {"active": True}, "name": "master_activos_por_curso"},
+    ],
+    "diplomas": [
+        # Un diploma por estudiante, curso y tipo; su prefijo cubre las consultas por email
+        {"keys": [("email", 1), ("id_curso", 1), ("tipo_diploma", 1)], "unique": True, "name": "diploma_unique"},
+        {"keys": [("codigo_verificacion", 1)], "unique": True, "name": "codigo_verificacion_unique"},
+        {"keys": [("id_curso", 1)], "name": "diploma_course_id"},
+        {"keys": [("tipo_diploma", 1)], "name": "diploma_type"},
+        # Diplomas recientes (caché de verificación, estadísticas)
+        {"keys": [("fecha_obtencion", -1)], "name": "diploma_fecha_obtencion_desc"},
+        # Barrido incremental de vencimientos
+        {"keys": [("fecha_vencimiento", 1)], "name": "diploma_fecha_vencimiento"},
+        {"keys": [("nota_final", 1)], "name": "diploma_nota_final"},
+    ],
+    "diplomas_revocados": [
+        # Revocaciones recientes (sincronización de la caché de verificación). Solo
+        # tienen que sobrevivir a DIPLOMAS_VERIFICATION_CACHE_TTL_SECONDS: se borran a la semana
+        {"keys": [("fecha_revocacion", 1)], "expireAfterSeconds": 7 * 24 * 3600, "name": "revocacion_fecha_ttl"},
+    ],
+    "plantillas_diplomas": [
+        # Una plantilla por curso y tipo; su prefijo cubre las consultas por curso
+        {"keys": [("id_curso", 1), ("tipo_diploma", 1)], "unique": True, "name": "plantilla_unique"},
+        {"keys": [("tipo_diploma", 1)], "name": "plantilla_tipo_diploma"},
+    ],
+    "elegibilidad_diplomas": [
+        # Un estado guardado por estudiante, curso y tipo de diploma
+        {"keys": [("email", 1), ("id_curso", 1), ("tipo_diploma", 1)], "unique": True, "name": "elegibilidad_unique"},
+        # Descartar los estados de una plantilla cuando cambia
+        {"keys": [("id_curso", 1), ("tipo_diploma", 1)], "name": "elegibilidad_plantilla"},
+    ],
+}
+
+
+def _normalizar_clave(keys) -> List[List[Any]]:
+    # El servidor devuelve la clave como documento y puede dar las direcciones como float (1.0)
+    if hasattr(keys, "items"):
+        keys = keys.items()
+    return [[campo, direccion if isinstance(direccion, str) else int(direccion)] for campo, direccion in keys]
+
+
+def _definicion(indice: Dict[str, Any]) -> Dict[str, Any]:
+    """Clave y opciones que identifican un índice, sin su nombre"""
+    definicion = {"key": _normalizar_clave(indice.get("keys") or indice.get("key"))}
+    for opcion in OPCIONES:
+        valor = indice.get(opcion)
+        if valor not in (None, False):
+            definicion[opcion] = valor
+    return definicion
+
+
+def _existentes(coleccion) -> Dict[str, Dict[str, Any]]:
+    """Índices de la colección por nombre (sin el de _id)"""
+    return {
+        indice["name"]: indice
+        for indice in coleccion.list_indexes()
+        if indice["name"] != "_id_"
+    }
+
+
+def comparar(db, especificacion: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Dict[str, Dict[str, List[Any]]]:
+    """Diferencias por colección entre la especificación y los índices de la base de datos"""
+    especificacion = especificacion or INDICES
+    informe = {}
+    for nombre_coleccion, declarados in especificacion.items():
+        existentes = _existentes(db[nombre_coleccion])
+        por_definicion = {json.dumps(_definicion(i), sort_keys=True, default=str): nombre for nombre, i in existentes.items()}
+        resultado = {"correctos": [], "faltantes": [], "distintos": [], "con_otro_nombre": [], "sobrantes": []}
+        reconocidos = set()
+
+        for indice in declarados:
+            nombre = indice["name"]
+            definicion = _definicion(indice)
+            if nombre in existentes:
+                reconocidos.add(nombre)
+                actual = _definicion(existentes[nombre])
+                if actual == definicion:
+                    resultado["correctos"].append(nombre)
+                else:
+                    resultado["distintos"].append({"nombre": nombre, "esperado": definicion, "actual": actual})
+                continue
+            otro = por_definicion.get(json.dumps(definicion, sort_keys=True, default=str))
+            if otro is not None:
+                reconocidos.add(otro)
+                resultado["con_otro_nombre"].append({"nombre": nombre, "actual": otro})
+            else:
+                resultado["faltantes"].append(nombre)
+
+        resultado["sobrantes"] = sorted(set(existentes) - reconocidos)
+        informe[nombre_coleccion] = resultado
+    return informe
+
+
+def hay_diferencias(informe: Dict[str, Dict[str, List[Any]]]) -> bool:
+    return any(
+        resultado[clave]
+        for resultado in informe.values()
+        for clave in ("faltantes", "distintos", "con_otro_nombre", "sobrantes")
+    )
+
+
+def _crear(coleccion, indice: Dict[str, Any]):
+    opciones = {opcion: indice[opcion] for opcion in OPCIONES if opcion in indice}
+    coleccion.create_index(indice["keys"], name=indice["name"], **opciones)
+
+
+def aplicar(
+    db,
+    especificacion: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    recrear: bool = False,
+    eliminar_sobrantes: bool = False
+) -> Dict[str, Dict[str, List[Any]]]:
+    """
+    Crear los índices que faltan. Con `recrear`, los que tienen otra
+    definición o nombre se eliminan y se crean de nuevo; con
+    `eliminar_sobrantes`, se eliminan los que no están en la especificación.
+    Devuelve el informe de `comparar` tras los cambios, con los errores.
+    """
+    especificacion = especificacion or INDICES
+    antes = comparar(db, especificacion)
+    errores: Dict[str, List[Dict[str, str]]] = {}
+
+    for nombre_coleccion, declarados in especificacion.items():
+        coleccion = db[nombre_coleccion]
+        por_nombre = {indice["name"]: indice for indice in declarados}
+        diferencias = antes[nombre_coleccion]
+
+        a_crear = list(diferencias["faltantes"])
+        a_eliminar = []
+        if recrear:
+            for distinto in diferencias["distintos"]:
+                a_eliminar.append(distinto["nombre"])
+                a_crear.append(distinto["nombre"])
+            for renombrado in diferencias["con_otro_nombre"]:
+                a_eliminar.append(renombrado["actual"])
+                a_crear.append(renombrado["nombre"])
+        if eliminar_sobrantes:
+            a_eliminar.extend(diferencias["sobrantes"])
+
+        for nombre in a_eliminar:
+            coleccion.drop_index(nombre)
+            logger.info(f"Dropped index {nombre_coleccion}.{nombre}")
+
+        for nombre in a_crear:
+            try:
+                _crear(coleccion, por_nombre[nombre])
+                logger.info(f"Created index {nombre_coleccion}.{nombre}")
+            except OperationFailure as e:
+                if e.code in (INDEX_OPTIONS_CONFLICT, INDEX_KEY_SPECS_CONFLICT):
+                    mensaje = f"conflicts with an existing index: {e.details.get('errmsg', e) if e.details else e}"
+                else:
+                    # Por ejemplo, duplicados que impiden un índice único
+                    mensaje = str(e)
+                logger.error(f"Error creating index {nombre_coleccion}.{nombre}: {mensaje}")
+                errores.setdefault(nombre_coleccion, []).append({"nombre": nombre, "error": mensaje})
+
+    despues = comparar(db, especificacion)
+    for nombre_coleccion, lista in errores.items():
+        despues[nombre_coleccion]["errores"] = lista
+    return despues
+
+
+def uso(db, especificacion: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Accesos por índice (`$indexStats`) desde el último reinicio de mongod, menos usados primero"""
+    especificacion = especificacion or INDICES
+    resultado = {}
+    for nombre_coleccion in especificacion:
+        try:
+            estadisticas = list(db[nombre_coleccion].aggregate([{"$indexStats": {}}]))
+        except OperationFailure as e:
+            logger.warning(f"$indexStats not available for {nombre_coleccion}: {e}")
+            continue
+        indices = [
+            {
+                "nombre": e["name"],
+                "accesos": int(e.get("accesses", {}).get("ops", 0)),
+                "desde": e.get("accesses", {}).get("since"),
+                "servidor": e.get("host"),
+            }
+            for e in estadisticas
+            if e["name"] != "_id_"
+        ]
+        resultado[nombre_coleccion] = sorted(indices, key=lambda i: i["accesos"])
+    return resultado
+
+
+def sin_uso(informe_uso: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[str]]:
+    return {
+        coleccion: [i["nombre"] for i in indices if i["accesos"] == 0]
+        for coleccion, indices in informe_uso.items()
+        if any(i["accesos"] == 0 for i in indices)
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Comparar y aplicar los índices declarados en app/DB/indexes.py")
+    parser.add_argument("--aplicar", action="store_true", help="Crear los índices que faltan")
+    parser.add_argument("--recrear", action="store_true", help="Con --aplicar: recrear los que tienen otra definición o nombre")
+    parser.add_argument("--eliminar-sobrantes", action="store_true", help="Con --aplicar: eliminar los no declarados")
+    parser.add_argument("--uso", action="store_true", help="Mostrar accesos por índice ($indexStats)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from app.DB.database import get_database
+    db = get_database()
+    if db is None:
+        logger.error("Could not connect to database")
+        return 2
+
+    if args.aplicar:
+        informe = aplicar(db, recrear=args.recrear, eliminar_sobrantes=args.eliminar_sobrantes)
+    else:
+        informe = comparar(db)
+
+    for coleccion, resultado in informe.items():
+        print(f"{coleccion}: {len(resultado['correctos'])} correctos")
+        for clave in ("faltantes", "distintos", "con_otro_nombre", "sobrantes", "errores"):
+            for elemento in resultado.get(clave, []):
+                print(f"   {clave}: {json.dumps(elemento, default=str, ensure_ascii=False)}")
+
+    if args.uso:
+        for coleccion, indices in uso(db).items():
+            for indice in indices:
+                print(f"{coleccion}.{indice['nombre']}: {indice['accesos']} accesos desde {indice['desde']}")
+
+    errores = any(resultado.get("errores") for resultado in informe.values())
+    return 1 if errores or hay_diferencias(informe) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
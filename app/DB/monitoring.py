@@ -0,0 +1,228 @@
+"""
+Listeners de monitorización de pymongo que alimentan las métricas de
+MongoDB de `app/core/metrics.py`.
+
+`database.py` los registra globalmente al importarse, antes de crear ningún
+MongoClient, así que todos los clientes de los servicios quedan medidos.
+"""
+
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import bson
+from pymongo import monitoring
+
+from app.DB import slow_operations
+from app.core import tracing
+from app.core.metrics import (
+    MONGO_COMMAND_DURATION, MONGO_COMMAND_FAILURES, MONGO_DOCUMENTS_RETURNED,
+    MONGO_REPLY_BYTES, MONGO_POOL_CHECKOUT_WAIT, MONGO_POOL_CONNECTIONS,
+    MONGO_POOL_CONNECTIONS_IN_USE, MONGO_POOL_CHECKOUT_FAILURES
+)
+
+# Comandos de autenticación y de handshake: su contenido se oculta en los
+# eventos y no aportan a la latencia de la aplicación
+_COMANDOS_IGNORADOS = frozenset({
+    "hello", "ismaster", "isMaster", "saslStart", "saslContinue", "authenticate",
+    "getnonce", "speculativeAuthenticate", "copydbgetnonce", "copydbsaslstart", "copydb",
+})
+
+SIN_COLECCION = "none"
+
+
+def _direccion(address: Tuple[str, int]) -> str:
+    host, port = address
+    return f"{host}:{port}"
+
+
+def _coleccion(event: monitoring.CommandStartedEvent) -> str:
+    """Colección del comando: el valor de la primera clave, o `collection` en getMore"""
+    if event.command_name == "getMore":
+        valor = event.command.get("collection")
+    else:
+        valor = event.command.get(event.command_name)
+    return valor if isinstance(valor, str) else SIN_COLECCION
+
+
+def _documentos_devueltos(reply: Dict[str, Any]) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        lote = cursor.get("firstBatch", cursor.get("nextBatch"))
+        return len(lote) if lote is not None else 0
+    if reply.get("value") is not None:
+        return 1
+    return 0
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """
+    Latencia, documentos y bytes devueltos y fallos por colección y comando.
+
+    Los eventos de éxito y fallo no traen la colección, así que se guarda al
+    empezar cada comando, indexada por (conexión, request_id).
+
+    Los bytes se miden volviendo a codificar la respuesta en BSON en el hilo
+    de la solicitud (unos 27 ms para una respuesta de 2.6 MB), así que solo se
+    mide una fracción `tasa_bytes` de las respuestas y el contador suma el
+    tamaño escalado (una estimación); con 0 no se miden.
+    """
+
+    def __init__(self, tasa_bytes: float = 0.0):
+        self.tasa_bytes = min(max(tasa_bytes, 0.0), 1.0)
+        self._colecciones: Dict[Tuple[Any, int], str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name in _COMANDOS_IGNORADOS:
+            return
+        self._colecciones[(event.connection_id, event.request_id)] = _coleccion(event)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        coleccion = self._colecciones.pop((event.connection_id, event.request_id), None)
+        if coleccion is None:
+            return
+        comando = event.command_name
+        MONGO_COMMAND_DURATION.labels(collection=coleccion, command=comando).observe(event.duration_micros / 1e6)
+
+        # Los errores de escritura (p. ej. clave duplicada) llegan con ok: 1
+        if event.reply.get("writeErrors"):
+            MONGO_COMMAND_FAILURES.labels(collection=coleccion, command=comando, error="WriteError").inc()
+
+        documentos = _documentos_devueltos(event.reply)
+        if documentos:
+            MONGO_DOCUMENTS_RETURNED.labels(collection=coleccion, command=comando).inc(documentos)
+        if self.tasa_bytes and random.random() < self.tasa_bytes:
+            MONGO_REPLY_BYTES.labels(collection=coleccion, command=comando).inc(
+                len(bson.encode(event.reply)) / self.tasa_bytes
+            )
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        coleccion = self._colecciones.pop((event.connection_id, event.request_id), None)
+        if coleccion is None:
+            return
+        comando = event.command_name
+        MONGO_COMMAND_DURATION.labels(collection=coleccion, command=comando).observe(event.duration_micros / 1e6)
+        failure = event.failure if isinstance(event.failure, dict) else {}
+        error = failure.get("codeName") or "unknown"
+        MONGO_COMMAND_FAILURES.labels(collection=coleccion, command=comando, error=error).inc()
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Tamaño del pool, conexiones en uso, espera de checkout y fallos de checkout.
+
+    El checkout ocurre en el hilo que lo pide, así que el inicio de la espera
+    se guarda por hilo y servidor. `abiertas` y `en_uso` llevan las conexiones
+    por servidor para el calentamiento (`app/core/warmup.py`) y la comprobación
+    de saturación de `app/core/health.py`.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.abiertas: Dict[Any, int] = {}
+        self.en_uso: Dict[Any, int] = {}
+
+    def _inicios(self) -> Dict[Any, float]:
+        inicios = getattr(self._local, "inicios", None)
+        if inicios is None:
+            inicios = self._local.inicios = {}
+        return inicios
+
+    def _observar_espera(self, address) -> None:
+        inicio = self._inicios().pop(address, None)
+        if inicio is not None:
+            MONGO_POOL_CHECKOUT_WAIT.labels(address=_direccion(address)).observe(time.perf_counter() - inicio)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels(address=_direccion(event.address)).inc()
+        with self._lock:
+            self.abiertas[event.address] = self.abiertas.get(event.address, 0) + 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels(address=_direccion(event.address)).dec()
+        with self._lock:
+            self.abiertas[event.address] = max(0, self.abiertas.get(event.address, 0) - 1)
+
+    def connection_check_out_started(self, event):
+        self._inicios()[event.address] = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._observar_espera(event.address)
+        MONGO_POOL_CHECKOUT_FAILURES.labels(address=_direccion(event.address), reason=str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        self._observar_espera(event.address)
+        MONGO_POOL_CONNECTIONS_IN_USE.labels(address=_direccion(event.address)).inc()
+        with self._lock:
+            self.en_uso[event.address] = self.en_uso.get(event.address, 0) + 1
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CONNECTIONS_IN_USE.labels(address=_direccion(event.address)).dec()
+        with self._lock:
+            self.en_uso[event.address] = max(0, self.en_uso.get(event.address, 0) - 1)
+
+
+class TracingCommandListener(monitoring.CommandListener):
+    """
+    Un span por comando dentro de la traza de la solicitud. pymongo emite los
+    eventos en el hilo que ejecuta el comando, así que el span en curso de
+    la solicitud está disponible al empezar.
+    """
+
+    def __init__(self):
+        self._spans: Dict[Tuple[Any, int], tracing.Span] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name in _COMANDOS_IGNORADOS:
+            return
+        span = tracing.iniciar_span(
+            f"mongodb {event.command_name}",
+            **{"db.name": event.database_name, "db.collection": _coleccion(event), "db.operation": event.command_name}
+        )
+        if span is not None:
+            self._spans[(event.connection_id, event.request_id)] = span
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        span = self._spans.pop((event.connection_id, event.request_id), None)
+        if span is not None:
+            span.terminar(event.duration_micros / 1000)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        span = self._spans.pop((event.connection_id, event.request_id), None)
+        if span is not None:
+            failure = event.failure if isinstance(event.failure, dict) else {}
+            span.error = failure.get("codeName") or failure.get("errmsg") or "unknown"
+            span.terminar(event.duration_micros / 1000)
+
+
+# Listener del pool registrado, para consultar las conexiones en uso
+pool_listener: Optional[PoolMetricsListener] = None
+
+
+def registrar(tasa_bytes: float = 0.0):
+    """Registrar los listeners para todos los MongoClient que se creen a partir de ahora"""
+    global pool_listener
+    monitoring.register(CommandMetricsListener(tasa_bytes=tasa_bytes))
+    pool_listener = PoolMetricsListener()
+    monitoring.register(pool_listener)
+    if slow_operations.UMBRAL_MS > 0:
+        monitoring.register(slow_operations.SlowOperationListener())
+    if tracing.TRACING_HABILITADO:
+        monitoring.register(TracingCommandListener())
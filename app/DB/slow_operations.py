@@ -0,0 +1,254 @@
+"""
+Registro de operaciones lentas de MongoDB con captura del plan de ejecución.
+
+`SlowOperationListener` (registrado por `monitoring.registrar`) detecta los
+comandos que superan MONGO_SLOW_OP_THRESHOLD_MS. Para los comandos que admiten
+`explain` (find, aggregate, count, distinct, findAndModify, update, delete),
+un hilo en segundo plano ejecuta `explain` con `executionStats` y resume el
+plan: etapas (COLLSCAN / IXSCAN), índices usados y documentos examinados
+frente a devueltos. Las entradas se guardan en un buffer circular acotado que
+expone `/admin/slow-operations`.
+
+El explain nunca corre en el hilo de la solicitud, y una misma forma de
+consulta se explica como mucho una vez por MONGO_SLOW_OP_EXPLAIN_INTERVAL_SECONDS.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from app.core.metrics import MONGO_SLOW_OPERATIONS
+
+logger = logging.getLogger(__name__)
+
+UMBRAL_MS = float(os.getenv("MONGO_SLOW_OP_THRESHOLD_MS", "100"))
+CAPACIDAD = int(os.getenv("MONGO_SLOW_OP_BUFFER_SIZE", "200"))
+EXPLAIN_INTERVALO_SEGUNDOS = float(os.getenv("MONGO_SLOW_OP_EXPLAIN_INTERVAL_SECONDS", "60"))
+EXPLAIN_HABILITADO = os.getenv("MONGO_SLOW_OP_EXPLAIN", "true").lower() == "true"
+
+COMANDOS_EXPLICABLES = frozenset({"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"})
+
+# Handshake, autenticación y los propios explain de este módulo
+_COMANDOS_NO_REGISTRADOS = frozenset({
+    "hello", "ismaster", "isMaster", "saslStart", "saslContinue", "authenticate",
+    "getnonce", "speculativeAuthenticate", "explain",
+})
+
+# Campos de sesión/transporte que `explain` no acepta dentro del comando
+_CAMPOS_TRANSPORTE = frozenset({
+    "lsid", "$clusterTime", "$db", "txnNumber", "autocommit", "startTransaction",
+    "$readPreference", "readConcern", "writeConcern", "$audit", "apiVersion",
+})
+
+_MAX_COMANDO_CARACTERES = 2000
+_MAX_EXPLAIN_PENDIENTES = 100
+
+
+def _forma(coleccion: str, comando: Dict[str, Any], nombre: str) -> str:
+    """Forma de la consulta (campos del filtro o etapas del pipeline) para limitar los explain"""
+    if nombre == "aggregate":
+        partes = [next(iter(etapa), "") for etapa in comando.get("pipeline", []) if isinstance(etapa, dict)]
+    else:
+        filtro = comando.get("filter") or comando.get("query") or {}
+        partes = sorted(filtro) if isinstance(filtro, dict) else []
+    return f"{coleccion}.{nombre}:{','.join(partes)}"
+
+
+def _comando_resumido(comando: Dict[str, Any]) -> str:
+    visible = {k: v for k, v in comando.items() if k not in _CAMPOS_TRANSPORTE}
+    texto = json.dumps(visible, default=str, ensure_ascii=False)
+    if len(texto) > _MAX_COMANDO_CARACTERES:
+        texto = texto[:_MAX_COMANDO_CARACTERES] + "..."
+    return texto
+
+
+def _buscar(documento: Any, clave: str) -> List[Any]:
+    """Todas las apariciones de `clave` en un explain (anidado en etapas de aggregate o shards)"""
+    encontrados = []
+    if isinstance(documento, dict):
+        for k, v in documento.items():
+            if k == clave:
+                encontrados.append(v)
+            else:
+                encontrados.extend(_buscar(v, clave))
+    elif isinstance(documento, list):
+        for elemento in documento:
+            encontrados.extend(_buscar(elemento, clave))
+    return encontrados
+
+
+def _etapas(plan: Any, etapas: List[str], indices: List[str]):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            etapas.append(plan["stage"])
+        if plan.get("indexName"):
+            indices.append(plan["indexName"])
+        for k in ("inputStage", "queryPlan"):
+            _etapas(plan.get(k), etapas, indices)
+        for hijo in plan.get("inputStages", []):
+            _etapas(hijo, etapas, indices)
+
+
+def resumir_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Resumen del plan ganador y de las estadísticas de ejecución"""
+    etapas: List[str] = []
+    indices: List[str] = []
+    for plan in _buscar(explain, "winningPlan"):
+        _etapas(plan, etapas, indices)
+
+    examinados = devueltos = claves = 0
+    for estadisticas in _buscar(explain, "executionStats"):
+        if isinstance(estadisticas, dict):
+            examinados += estadisticas.get("totalDocsExamined", 0)
+            claves += estadisticas.get("totalKeysExamined", 0)
+            devueltos += estadisticas.get("nReturned", 0)
+
+    if "COLLSCAN" in etapas:
+        plan = "COLLSCAN"
+    elif "IXSCAN" in etapas or "IDHACK" in etapas or "EXPRESS_IXSCAN" in etapas:
+        plan = "IXSCAN"
+    else:
+        plan = etapas[0] if etapas else "desconocido"
+
+    return {
+        "plan": plan,
+        "etapas": etapas,
+        "indices": sorted(set(indices)),
+        "documentos_examinados": examinados,
+        "claves_examinadas": claves,
+        "documentos_devueltos": devueltos,
+        "ratio_examinados_devueltos": round(examinados / devueltos, 2) if devueltos else None,
+    }
+
+
+class SlowOperationRecorder:
+    """Buffer circular de operaciones lentas y cola de explain en segundo plano"""
+
+    def __init__(self, capacidad: int = CAPACIDAD, explain: bool = EXPLAIN_HABILITADO):
+        self._entradas: Deque[Dict[str, Any]] = deque(maxlen=capacidad)
+        self._lock = threading.Lock()
+        self._explain = explain
+        self._pendientes: "queue.Queue[Tuple[Dict[str, Any], str, Dict[str, Any]]]" = queue.Queue(_MAX_EXPLAIN_PENDIENTES)
+        self._ultimo_explain: Dict[str, float] = {}
+        self._hilo: Optional[threading.Thread] = None
+        self._db_cache: Dict[str, Any] = {}
+
+    def registrar(self, base_datos: str, coleccion: str, nombre: str, comando: Dict[str, Any], duracion_ms: float):
+        entrada = {
+            "fecha": datetime.now(),
+            "base_datos": base_datos,
+            "coleccion": coleccion,
+            "comando": nombre,
+            "duracion_ms": round(duracion_ms, 3),
+            "detalle": _comando_resumido(comando),
+            "explain": None,
+        }
+        with self._lock:
+            self._entradas.append(entrada)
+
+        if not (self._explain and nombre in COMANDOS_EXPLICABLES):
+            MONGO_SLOW_OPERATIONS.labels(collection=coleccion, command=nombre, plan="sin_explain").inc()
+            return
+
+        forma = _forma(coleccion, comando, nombre)
+        ahora = time.monotonic()
+        if ahora - self._ultimo_explain.get(forma, float("-inf")) < EXPLAIN_INTERVALO_SEGUNDOS:
+            MONGO_SLOW_OPERATIONS.labels(collection=coleccion, command=nombre, plan="sin_explain").inc()
+            return
+        self._ultimo_explain[forma] = ahora
+
+        try:
+            self._pendientes.put_nowait((entrada, base_datos, comando))
+        except queue.Full:
+            MONGO_SLOW_OPERATIONS.labels(collection=coleccion, command=nombre, plan="sin_explain").inc()
+            return
+        self._asegurar_hilo()
+
+    def entradas(self, limite: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Entradas más recientes primero"""
+        with self._lock:
+            entradas = list(reversed(self._entradas))
+        return entradas[:limite] if limite else entradas
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+        self._ultimo_explain.clear()
+
+    def _asegurar_hilo(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            with self._lock:
+                if self._hilo is None or not self._hilo.is_alive():
+                    self._hilo = threading.Thread(target=self._procesar, name="slow-op-explain", daemon=True)
+                    self._hilo.start()
+
+    def _base_datos(self, nombre: str):
+        if nombre not in self._db_cache:
+            from app.DB.database import get_database
+            db = get_database()
+            self._db_cache[nombre] = db.client[nombre] if db is not None else None
+        return self._db_cache[nombre]
+
+    def _procesar(self):
+        while True:
+            entrada, base_datos, comando = self._pendientes.get()
+            nombre = entrada["comando"]
+            try:
+                db = self._base_datos(base_datos)
+                if db is None:
+                    raise RuntimeError("Sin conexión a la base de datos")
+                limpio = {k: v for k, v in comando.items() if k not in _CAMPOS_TRANSPORTE}
+                resumen = resumir_explain(db.command({"explain": limpio, "verbosity": "executionStats"}))
+                entrada["explain"] = resumen
+                plan = resumen["plan"]
+            except Exception as e:
+                entrada["explain"] = {"error": str(e)}
+                plan = "error"
+                logger.warning(f"No se pudo explicar la operación lenta {entrada['coleccion']}.{nombre}: {e}")
+            MONGO_SLOW_OPERATIONS.labels(collection=entrada["coleccion"], command=nombre, plan=plan).inc()
+            if plan == "COLLSCAN":
+                logger.warning(
+                    f"Operación lenta con COLLSCAN en {entrada['coleccion']}.{nombre} "
+                    f"({entrada['duracion_ms']} ms): {entrada['detalle'][:200]}"
+                )
+
+
+recorder = SlowOperationRecorder()
+
+
+class SlowOperationListener(monitoring.CommandListener):
+    """Envía al registro los comandos que superan el umbral (excepto los propios explain)"""
+
+    def __init__(self, recorder: SlowOperationRecorder = recorder, umbral_ms: float = UMBRAL_MS):
+        self.recorder = recorder
+        self.umbral_ms = umbral_ms
+        self._comandos: Dict[Tuple[Any, int], Tuple[str, Dict[str, Any]]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name in _COMANDOS_NO_REGISTRADOS:
+            return
+        self._comandos[(event.connection_id, event.request_id)] = (event.database_name, event.command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._terminar(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._terminar(event)
+
+    def _terminar(self, event):
+        iniciado = self._comandos.pop((event.connection_id, event.request_id), None)
+        duracion_ms = event.duration_micros / 1000
+        if iniciado is None or duracion_ms < self.umbral_ms:
+            return
+        base_datos, comando = iniciado
+        valor = comando.get("collection") if event.command_name == "getMore" else comando.get(event.command_name)
+        coleccion = valor if isinstance(valor, str) else "none"
+        self.recorder.registrar(base_datos, coleccion, event.command_name, comando, duracion_ms)
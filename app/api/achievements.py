@@ -106,10 +106,8 @@ async def get_achievement_statistics(email: EmailStr):
 async def get_available_achievements(course_id: str):
     try:
         # Use the master achievement service to get properly structured data
-        available_achievements = get_available_achievements_for_course(course_id)
-        
-        # Convert to dict format for response
-        achievements_data = [achievement.dict() for achievement in available_achievements]
+        # Already dumped by the catalog; the list is this request's own copy
+        achievements_data = get_available_achievements_for_course(course_id)
         
         return StandardResponse.success_response(
             data=achievements_data,
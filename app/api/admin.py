@@ -0,0 +1,273 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+import hmac
+import os
+from app.DB import slow_operations, indexes
+from app.DB.database import get_database
+from app.core import profiling, memory_profiling
+from app.models import StandardResponse
+
+# Token de los endpoints de diagnóstico; sin ADMIN_TOKEN quedan deshabilitados
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+def token_admin_valido(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+def verificar_token_admin(x_admin_token: Optional[str] = Header(None, description="Token de administración (ADMIN_TOKEN)")):
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403,
+            detail=StandardResponse.error_response(message="Endpoints de diagnóstico deshabilitados: configure ADMIN_TOKEN").dict()
+        )
+    if not token_admin_valido(x_admin_token):
+        raise HTTPException(
+            status_code=401,
+            detail=StandardResponse.error_response(message="Token de administración inválido").dict()
+        )
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin - Diagnostics"],
+    dependencies=[Depends(verificar_token_admin)]
+)
+
+@router.get(
+    "/slow-operations",
+    summary="Operaciones lentas de MongoDB",
+    description="Últimas operaciones que superaron MONGO_SLOW_OP_THRESHOLD_MS, con el resumen de su plan de ejecución (COLLSCAN / IXSCAN, documentos examinados frente a devueltos)",
+    response_model=StandardResponse
+)
+async def obtener_operaciones_lentas(
+    limite: Optional[int] = Query(None, ge=1, le=1000, description="Número máximo de entradas, más recientes primero"),
+    plan: Optional[str] = Query(None, description="Filtrar por plan (p. ej. COLLSCAN)")
+):
+    entradas = slow_operations.recorder.entradas()
+    if plan:
+        entradas = [e for e in entradas if (e.get("explain") or {}).get("plan") == plan]
+    if limite:
+        entradas = entradas[:limite]
+
+    return StandardResponse.success_response(
+        data={
+            "umbral_ms": slow_operations.UMBRAL_MS,
+            "capacidad": slow_operations.CAPACIDAD,
+            "total": len(entradas),
+            "operaciones": entradas
+        },
+        message="Operaciones lentas recuperadas"
+    )
+
+@router.delete(
+    "/slow-operations",
+    summary="Vaciar el registro de operaciones lentas",
+    response_model=StandardResponse
+)
+async def limpiar_operaciones_lentas():
+    slow_operations.recorder.limpiar()
+    return StandardResponse.success_response(data={"limpiado": True}, message="Registro de operaciones lentas vaciado")
+
+def _informe_indices():
+    db = get_database()
+    if db is None:
+        return None
+    diferencias = indexes.comparar(db)
+    uso = indexes.uso(db)
+    return {
+        "sincronizados": not indexes.hay_diferencias(diferencias),
+        "diferencias": diferencias,
+        "sin_uso": indexes.sin_uso(uso),
+        "uso": uso,
+    }
+
+@router.get(
+    "/indexes",
+    summary="Índices de MongoDB frente a la especificación",
+    description=(
+        "Compara los índices de cada colección con los declarados en app/DB/indexes.py (faltantes, distintos, "
+        "con otro nombre, sobrantes) y muestra los accesos por índice de `$indexStats` desde el último "
+        "reinicio de mongod, con los que no se han usado"
+    ),
+    response_model=StandardResponse
+)
+async def informe_indices():
+    informe = await run_in_threadpool(_informe_indices)
+    if informe is None:
+        raise HTTPException(
+            status_code=503,
+            detail=StandardResponse.error_response(message="Sin conexión a la base de datos").dict()
+        )
+    return StandardResponse.success_response(data=informe, message="Informe de índices generado")
+
+def _perfilado_habilitado():
+    if not profiling.PROFILING_HABILITADO:
+        raise HTTPException(
+            status_code=403,
+            detail=StandardResponse.error_response(message="Perfilado deshabilitado: configure PROFILING_ENABLED=true").dict()
+        )
+
+@router.get(
+    "/profile",
+    summary="Perfilar el worker con muestreo",
+    description=(
+        "Muestrea las pilas de todos los hilos de este worker durante `segundos` y devuelve las pilas "
+        "colapsadas (`formato=collapsed`, listas para flamegraph.pl o speedscope) o las funciones con más "
+        "muestras (`formato=json`). Requiere PROFILING_ENABLED=true"
+    ),
+    responses={200: {"content": {"text/plain": {}}}}
+)
+async def perfilar_worker(
+    segundos: float = Query(10, gt=0, le=profiling.MAX_SEGUNDOS, description="Duración del muestreo"),
+    intervalo_ms: float = Query(profiling.INTERVALO_MS, ge=1, le=1000, description="Intervalo entre muestras"),
+    formato: str = Query("collapsed", pattern="^(collapsed|json)$", description="collapsed o json"),
+    incluir_inactivos: bool = Query(False, description="Incluir hilos en espera (selector, colas, pool sin trabajo)"),
+    limite: int = Query(25, ge=1, le=500, description="Funciones en el formato json")
+):
+    _perfilado_habilitado()
+    try:
+        # El muestreo duerme entre muestras; no puede ocupar el event loop
+        resultado = await run_in_threadpool(profiling.muestrear, segundos, intervalo_ms / 1000, incluir_inactivos)
+    except profiling.PerfiladoOcupado as e:
+        raise HTTPException(status_code=409, detail=StandardResponse.error_response(message=str(e)).dict())
+
+    if formato == "collapsed":
+        return PlainTextResponse(
+            profiling.colapsar(resultado["pilas"]),
+            headers={
+                "Content-Disposition": f'attachment; filename="profile-{os.getpid()}.folded"',
+                "X-Profile-Samples": str(resultado["muestras"]),
+            }
+        )
+
+    return StandardResponse.success_response(
+        data={
+            "pid": os.getpid(),
+            "segundos": resultado["segundos"],
+            "intervalo_ms": resultado["intervalo_ms"],
+            "muestras": resultado["muestras"],
+            "pilas_distintas": len(resultado["pilas"]),
+            "funciones": profiling.funciones_principales(resultado["pilas"], limite)
+        },
+        message="Perfil del worker obtenido"
+    )
+
+# --- Memoria (tracemalloc) ---
+
+def _trazado_activo():
+    _perfilado_habilitado()
+    if not memory_profiling.activo():
+        raise HTTPException(
+            status_code=409,
+            detail=StandardResponse.error_response(message="El trazado de memoria no está activo: POST /admin/memory/start").dict()
+        )
+
+def _instantanea_no_encontrada(id_instantanea):
+    return HTTPException(
+        status_code=404,
+        detail=StandardResponse.error_response(message=f"Instantánea {id_instantanea} no encontrada").dict()
+    )
+
+@router.get(
+    "/memory",
+    summary="Estado del trazado de memoria",
+    description="Memoria trazada por tracemalloc, pico, RSS del worker e instantáneas guardadas",
+    response_model=StandardResponse
+)
+async def estado_memoria():
+    _perfilado_habilitado()
+    return StandardResponse.success_response(data=memory_profiling.estado(), message="Estado de memoria del worker")
+
+@router.post(
+    "/memory/start",
+    summary="Activar el trazado de memoria",
+    description=(
+        "Activa tracemalloc en este worker. Con `muestreo_rutas` = N, 1 de cada N solicitudes de cada ruta "
+        "compara instantáneas antes y después para acumular las líneas que retienen memoria"
+    ),
+    response_model=StandardResponse
+)
+async def iniciar_trazado_memoria(
+    marcos: int = Query(memory_profiling.MARCOS, ge=1, le=100, description="Marcos guardados por asignación"),
+    muestreo_rutas: int = Query(0, ge=0, le=10000, description="Comparar 1 de cada N solicitudes por ruta (0: no)")
+):
+    _perfilado_habilitado()
+    memory_profiling.iniciar(marcos, muestreo_rutas)
+    return StandardResponse.success_response(data=memory_profiling.estado(), message="Trazado de memoria activo")
+
+@router.post(
+    "/memory/stop",
+    summary="Detener el trazado de memoria",
+    response_model=StandardResponse
+)
+async def detener_trazado_memoria():
+    _perfilado_habilitado()
+    memory_profiling.detener()
+    return StandardResponse.success_response(data=memory_profiling.estado(), message="Trazado de memoria detenido")
+
+@router.post(
+    "/memory/snapshots",
+    summary="Guardar una instantánea de memoria",
+    response_model=StandardResponse
+)
+async def tomar_instantanea_memoria(
+    agrupar: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limite: int = Query(25, ge=1, le=500)
+):
+    _trazado_activo()
+    id_instantanea = await run_in_threadpool(memory_profiling.tomar_instantanea)
+    principales = await run_in_threadpool(memory_profiling.principales, id_instantanea, agrupar, limite)
+    return StandardResponse.success_response(
+        data={"id": id_instantanea, "principales": principales},
+        message="Instantánea de memoria guardada"
+    )
+
+@router.get(
+    "/memory/diff",
+    summary="Diferencia entre instantáneas de memoria",
+    description="Crecimiento por archivo o línea desde la instantánea `base` hasta `actual` (o hasta ahora si se omite)",
+    response_model=StandardResponse
+)
+async def diferencia_memoria(
+    base: int = Query(..., description="Id de la instantánea base"),
+    actual: Optional[int] = Query(None, description="Id de la instantánea final; por defecto, el estado actual"),
+    agrupar: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limite: int = Query(25, ge=1, le=500)
+):
+    _perfilado_habilitado()
+    if actual is None:
+        _trazado_activo()
+    try:
+        cambios = await run_in_threadpool(memory_profiling.diferencia, base, actual, agrupar, limite)
+    except KeyError as e:
+        raise _instantanea_no_encontrada(e.args[0])
+    return StandardResponse.success_response(
+        data={"base": base, "actual": actual, "agrupar": agrupar, "cambios": cambios},
+        message="Diferencia de memoria calculada"
+    )
+
+@router.delete(
+    "/memory/snapshots",
+    summary="Borrar las instantáneas de memoria",
+    response_model=StandardResponse
+)
+async def limpiar_instantaneas_memoria():
+    _perfilado_habilitado()
+    memory_profiling.limpiar_instantaneas()
+    return StandardResponse.success_response(data={"limpiado": True}, message="Instantáneas de memoria borradas")
+
+@router.get(
+    "/memory/routes",
+    summary="Asignaciones retenidas por ruta",
+    description="Líneas que más memoria dejan retenida por solicitud en cada ruta (requiere `muestreo_rutas` al activar el trazado)",
+    response_model=StandardResponse
+)
+async def asignaciones_por_ruta(
+    limite: int = Query(10, ge=1, le=100),
+    limpiar: bool = Query(False, description="Vaciar lo acumulado después de leerlo")
+):
+    _perfilado_habilitado()
+    rutas = memory_profiling.asignaciones_por_ruta(limite)
+    if limpiar:
+        memory_profiling.limpiar_rutas()
+    return StandardResponse.success_response(data={"rutas": rutas}, message="Asignaciones por ruta recuperadas")
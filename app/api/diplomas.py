@@ -1,15 +1,19 @@
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
 from pydantic import EmailStr
 from typing import Optional, List, Dict, Any
 from app.services.diploma_service import (
     verificar_elegibilidad_diploma, generar_diploma, obtener_diplomas_estudiante,
     verificar_diploma, crear_plantilla_diploma, obtener_estadisticas_diplomas,
-    eliminar_diploma
+    eliminar_diploma, convertir_porcentajes_a_notas_colombianas,
+    obtener_clave_publica_verificacion
 )
 from app.models.diploma import (
     SolicitudDiploma, PlantillaDiploma, VerificacionElegibilidadDiploma,
-    ConfiguracionDiplomasColombia
+    ConfiguracionDiplomasColombia, SolicitudConversionNotas
 )
+from app.services.certificate_service import ruta_certificado
+from app.core.grading import evaluar_porcentaje
 from app.models import StandardResponse
 from app.models.exceptions import (
     AchievementError, StudentNotFound, DatabaseConnectionError
@@ -36,12 +40,10 @@ async def obtener_configuracion_colombia():
             "modalidades": ConfiguracionDiplomasColombia.MODALIDADES,
             "calificaciones_cualitativas": ConfiguracionDiplomasColombia.CALIFICACIONES_CUALITATIVAS,
             "ejemplos_conversion": {
-                "100%": "5.0 (Excelente)",
-                "95%": "4.6 (Excelente)", 
-                "85%": "4.0 (Sobresaliente)",
-                "75%": "3.5 (Bueno)",
-                "65%": "3.0 (Aceptable)",
-                "55%": "2.0 (Insuficiente)"
+                f"{porcentaje}%": f"{conversion['nota_colombiana']} ({conversion['calificacion_cualitativa']})"
+                for porcentaje, conversion in (
+                    (porcentaje, evaluar_porcentaje(porcentaje)) for porcentaje in (100, 95, 85, 75, 65, 55)
+                )
             }
         }
         
@@ -165,6 +167,48 @@ async def verificar_diploma_endpoint(codigo_verificacion: str):
             detail=StandardResponse.error_response(message=f"Error verificando diploma: {str(e)}").dict()
         )
 
+@router.get(
+    "/clave-publica",
+    summary="Obtener clave pública de verificación",
+    description="Clave pública Ed25519 para validar códigos de verificación firmados (RC2-...) sin consultar la API",
+    response_description="Clave pública y formato de los códigos"
+)
+async def obtener_clave_publica_endpoint():
+    clave = obtener_clave_publica_verificacion()
+    
+    if clave is None:
+        raise HTTPException(
+            status_code=404,
+            detail=StandardResponse.error_response(message="No hay clave pública de verificación configurada").dict()
+        )
+    
+    return StandardResponse.success_response(
+        data=clave,
+        message="Clave pública de verificación"
+    )
+
+@router.get(
+    "/certificados/{clave}.pdf",
+    summary="Descargar certificado de diploma",
+    description="Descarga el certificado PDF de un diploma; la URL se publica en `url_certificado` cuando termina el renderizado",
+    response_class=FileResponse
+)
+async def descargar_certificado_endpoint(clave: str):
+    ruta = ruta_certificado(clave)
+    
+    if ruta is None:
+        raise HTTPException(
+            status_code=404,
+            detail=StandardResponse.error_response(message="Certificado no encontrado").dict()
+        )
+    
+    # El nombre es el hash del contenido: la respuesta nunca cambia
+    return FileResponse(
+        ruta,
+        media_type="application/pdf",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
 @router.post(
     "/plantillas",
     summary="Crear plantilla de diploma",
@@ -188,12 +232,14 @@ async def crear_plantilla_endpoint(plantilla: PlantillaDiploma):
 @router.get(
     "/estadisticas",
     summary="Obtener estadísticas de diplomas",
-    description="Recupera estadísticas generales del sistema de diplomas",
+    description="Recupera estadísticas generales del sistema de diplomas, con desglose por tipo, curso y mes, desde una instantánea periódica",
     response_description="Estadísticas del sistema de diplomas"
 )
-async def obtener_estadisticas_endpoint():
+async def obtener_estadisticas_endpoint(
+    refrescar: bool = Query(False, description="Recalcular en lugar de usar la instantánea en caché")
+):
     try:
-        estadisticas = obtener_estadisticas_diplomas()
+        estadisticas = obtener_estadisticas_diplomas(refrescar=refrescar)
         
         return StandardResponse.success_response(
             data=estadisticas,
@@ -239,32 +285,7 @@ async def eliminar_diploma_endpoint(email: EmailStr, diploma_id: str):
 )
 async def convertir_nota_endpoint(porcentaje: float = Query(..., ge=0, le=100, description="Porcentaje a convertir")):
     try:
-        from app.services.diploma_service import convertir_porcentaje_a_nota_colombiana
-        
-        nota_colombiana = convertir_porcentaje_a_nota_colombiana(porcentaje)
-        calificacion_cualitativa = ConfiguracionDiplomasColombia.obtener_calificacion_cualitativa(nota_colombiana)
-        
-        # Calcular equivalencia internacional
-        if nota_colombiana >= 4.6:
-            equivalencia = "A+ (95-100%)"
-        elif nota_colombiana >= 4.0:
-            equivalencia = "A (85-94%)"
-        elif nota_colombiana >= 3.5:
-            equivalencia = "B+ (75-84%)"
-        elif nota_colombiana >= 3.0:
-            equivalencia = "B (65-74%)"
-        elif nota_colombiana >= 2.0:
-            equivalencia = "C (55-64%)"
-        else:
-            equivalencia = "F (<55%)"
-        
-        resultado = {
-            "porcentaje_original": porcentaje,
-            "nota_colombiana": nota_colombiana,
-            "calificacion_cualitativa": calificacion_cualitativa,
-            "equivalencia_internacional": equivalencia,
-            "aprobado": nota_colombiana >= ConfiguracionDiplomasColombia.NOTA_MINIMA_APROBACION
-        }
+        resultado = evaluar_porcentaje(porcentaje)
         
         return StandardResponse.success_response(
             data=resultado,
@@ -274,4 +295,30 @@ async def convertir_nota_endpoint(porcentaje: float = Query(..., ge=0, le=100, d
         raise HTTPException(
             status_code=500,
             detail=StandardResponse.error_response(message=f"Error convirtiendo nota: {str(e)}").dict()
-        ) 
\ No newline at end of file
+        ) 
+
+@router.post(
+    "/convertir-notas",
+    summary="Convertir un lote de porcentajes a notas colombianas",
+    description="Convierte hasta 10.000 porcentajes (0-100) a la escala colombiana (1.0-5.0) en una sola llamada",
+    response_description="Conversión de notas por lote"
+)
+async def convertir_notas_lote_endpoint(solicitud: SolicitudConversionNotas):
+    try:
+        resultados = convertir_porcentajes_a_notas_colombianas(solicitud.porcentajes)
+        aprobados = sum(1 for r in resultados if r["aprobado"])
+        
+        return StandardResponse.success_response(
+            data={
+                "total": len(resultados),
+                "aprobados": aprobados,
+                "reprobados": len(resultados) - aprobados,
+                "resultados": resultados
+            },
+            message="Conversión de notas por lote completada"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=StandardResponse.error_response(message=f"Error convirtiendo notas: {str(e)}").dict()
+        )
\ No newline at end of file
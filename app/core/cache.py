@@ -0,0 +1,154 @@
+"""
+Estructuras de caché en memoria compartidas por los servicios.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Generic, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class Snapshot(Generic[T]):
+    """
+    Valor calculado con `loader` que se sirve desde memoria mientras su
+    antigüedad no supere `max_age` segundos.
+
+    Una tarea periódica puede llamar a `refresh()` para mantenerlo caliente;
+    si nadie lo refresca, la primera lectura con el valor caducado lo recalcula.
+    Solo un hilo recalcula a la vez; los demás esperan y reutilizan el resultado.
+    """
+
+    def __init__(self, loader: Callable[[], T], max_age: float):
+        self._loader = loader
+        self.max_age = max_age
+        self._value: Optional[T] = None
+        self._loaded_at: Optional[float] = None
+        self.generated_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    @property
+    def age(self) -> Optional[float]:
+        """Segundos desde el último cálculo (None si nunca se ha calculado)"""
+        if self._loaded_at is None:
+            return None
+        return time.monotonic() - self._loaded_at
+
+    def _fresh(self) -> bool:
+        age = self.age
+        return age is not None and age <= self.max_age
+
+    def get(self, force: bool = False) -> T:
+        """Devolver el valor vigente, recalculándolo si caducó o si `force`"""
+        if not force and self._fresh():
+            return self._value
+        started = time.monotonic()
+        with self._lock:
+            # Otro hilo pudo recalcularlo mientras esperábamos el lock
+            if self._loaded_at is not None and self._loaded_at >= started:
+                return self._value
+            if not force and self._fresh():
+                return self._value
+            return self._reload()
+
+    def refresh(self) -> T:
+        """Recalcular el valor sin importar su antigüedad"""
+        with self._lock:
+            return self._reload()
+
+    def invalidate(self):
+        """Marcar el valor como caducado; la próxima lectura lo recalcula"""
+        self._loaded_at = None
+
+    def _reload(self) -> T:
+        value = self._loader()
+        self._value = value
+        self._loaded_at = time.monotonic()
+        self.generated_at = datetime.now()
+        return value
+
+
+class LRUCache(Generic[T]):
+    """
+    Caché LRU acotada a `maxsize` entradas, con caducidad opcional (`ttl`
+    en segundos) para acotar cuánto tiempo puede servirse un dato que otro
+    proceso ya modificó.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, T]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[T]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: T):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: str) -> Optional[T]:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom para pertenencia aproximada: `item in filtro` nunca da
+    falso negativo para un elemento añadido y da falso positivo con una
+    probabilidad cercana a `error_rate` mientras no se supere `capacity`.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str):
+        positions = self._positions(item)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
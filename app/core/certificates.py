@@ -0,0 +1,166 @@
+"""
+Renderizado de certificados PDF de diplomas.
+
+Funciones puras y solo con la biblioteca estándar, para que puedan ejecutarse
+en procesos hijos (`certificate_service` usa un ProcessPoolExecutor con
+contexto "spawn") sin importar la aplicación ni abrir conexiones a MongoDB.
+
+Cada certificado se guarda por contenido: la clave es el SHA-256 de los datos
+del diploma que aparecen en el PDF, la versión de la plantilla y la versión
+del renderizador. El PDF no incluye marcas de tiempo, así que los mismos datos
+producen siempre los mismos bytes y la misma ruta.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Subir al cambiar el diseño: invalida todos los certificados guardados
+VERSION_RENDERIZADOR = 1
+EXTENSION = ".pdf"
+
+# Campos del diploma que aparecen en el certificado
+CAMPOS_CERTIFICADO = (
+    "id", "email", "nombre_diploma", "titulo_diploma", "institucion_emisora",
+    "tipo_diploma", "id_curso", "fecha_expedicion", "fecha_vencimiento",
+    "codigo_verificacion", "nota_final", "calificacion_cualitativa",
+    "horas_academicas", "creditos_academicos", "modalidad", "nivel_educativo",
+    "codigo_snies",
+)
+
+# A4 horizontal, en puntos
+_ANCHO, _ALTO = 842, 595
+
+
+def _serializar(valor: Any) -> Any:
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+def datos_certificado(diploma: Dict[str, Any]) -> Dict[str, Any]:
+    """Extraer del documento del diploma los datos que se imprimen"""
+    return {campo: _serializar(diploma.get(campo)) for campo in CAMPOS_CERTIFICADO}
+
+
+def version_plantilla(plantilla: Optional[Dict[str, Any]]) -> str:
+    """Huella de la plantilla: cualquier cambio (incluido `url_plantilla`) produce otra versión"""
+    if not plantilla:
+        return "sin-plantilla"
+    contenido = json.dumps(plantilla, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()[:16]
+
+
+def clave_contenido(datos: Dict[str, Any], version: str) -> str:
+    """Clave de almacenamiento del certificado"""
+    contenido = json.dumps(
+        {"renderizador": VERSION_RENDERIZADOR, "plantilla": version, "datos": datos},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def es_clave_valida(clave: str) -> bool:
+    return len(clave) == 64 and all(c in "0123456789abcdef" for c in clave)
+
+
+def ruta_en_almacen(directorio: str, clave: str) -> str:
+    """Ruta del certificado, repartida en subdirectorios por los dos primeros caracteres"""
+    return os.path.join(directorio, clave[:2], clave + EXTENSION)
+
+
+def _texto_pdf(texto: str) -> bytes:
+    """Cadena literal PDF en WinAnsiEncoding (admite tildes y eñes)"""
+    crudo = texto.encode("cp1252", errors="replace")
+    return b"(" + crudo.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _linea_centrada(texto: str, y: int, fuente: str, tamano: int) -> bytes:
+    # Ancho medio aproximado de Helvetica: ~0.5 em por carácter
+    x = max(40, (_ANCHO - len(texto) * tamano * 0.5) / 2)
+    return b"BT /%s %d Tf %.1f %d Td %s Tj ET\n" % (fuente.encode(), tamano, x, y, _texto_pdf(texto))
+
+
+def _fecha(valor: Optional[str]) -> str:
+    return valor[:10] if valor else "-"
+
+
+def _contenido_pagina(datos: Dict[str, Any]) -> bytes:
+    lineas: List[bytes] = [
+        b"0.2 0.3 0.5 RG 4 w 30 30 %d %d re S\n" % (_ANCHO - 60, _ALTO - 60),
+        b"1 w 40 40 %d %d re S\n" % (_ANCHO - 80, _ALTO - 80),
+        b"0 0 0 rg\n",
+        _linea_centrada(datos.get("institucion_emisora") or "RavenCode Colombia", 500, "F2", 22),
+        _linea_centrada(datos.get("titulo_diploma") or "", 450, "F2", 28),
+        _linea_centrada("Otorgado a", 400, "F1", 14),
+        _linea_centrada(datos.get("email") or "", 370, "F2", 20),
+        _linea_centrada(datos.get("nombre_diploma") or "", 325, "F1", 16),
+    ]
+    if datos.get("nota_final") is not None:
+        lineas.append(_linea_centrada(
+            f"Nota final: {datos['nota_final']:.1f} - {datos.get('calificacion_cualitativa') or ''}", 290, "F1", 14
+        ))
+    detalle = [datos.get("modalidad") or "", datos.get("nivel_educativo") or ""]
+    if datos.get("horas_academicas"):
+        detalle.append(f"{datos['horas_academicas']} horas")
+    lineas.append(_linea_centrada(" | ".join(d for d in detalle if d), 260, "F1", 12))
+    lineas.append(_linea_centrada(
+        f"Expedido: {_fecha(datos.get('fecha_expedicion'))}    Vence: {_fecha(datos.get('fecha_vencimiento'))}", 150, "F1", 11
+    ))
+    lineas.append(_linea_centrada(f"Código de verificación: {datos.get('codigo_verificacion') or '-'}", 120, "F1", 10))
+    if datos.get("codigo_snies"):
+        lineas.append(_linea_centrada(f"SNIES: {datos['codigo_snies']}", 100, "F1", 10))
+    return b"".join(lineas)
+
+
+def renderizar_pdf(datos: Dict[str, Any]) -> bytes:
+    """PDF de una página, determinista para unos mismos datos"""
+    contenido = _contenido_pagina(datos)
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R /F2 6 0 R >> >> >>" % (_ANCHO, _ALTO),
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(contenido), contenido),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+
+    salida = bytearray(b"%PDF-1.4\n")
+    desplazamientos = []
+    for numero, objeto in enumerate(objetos, start=1):
+        desplazamientos.append(len(salida))
+        salida += b"%d 0 obj\n%s\nendobj\n" % (numero, objeto)
+
+    inicio_xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for desplazamiento in desplazamientos:
+        salida += b"%010d 00000 n \n" % desplazamiento
+    salida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, inicio_xref)
+    return bytes(salida)
+
+
+def renderizar_y_guardar(datos: Dict[str, Any], ruta: str) -> str:
+    """
+    Renderizar y escribir el certificado de forma atómica (archivo temporal +
+    `os.replace`), así que un lector nunca ve un PDF a medio escribir aunque
+    dos procesos rendericen el mismo contenido a la vez. Devuelve la ruta.
+    """
+    if os.path.exists(ruta):
+        return ruta
+    pdf = renderizar_pdf(datos)
+    directorio = os.path.dirname(ruta)
+    os.makedirs(directorio, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as archivo:
+            archivo.write(pdf)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+    return ruta
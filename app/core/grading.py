@@ -0,0 +1,112 @@
+"""
+Tabla de calificación colombiana precomputada.
+
+Única fuente para convertir porcentajes (0-100) a la escala colombiana
+(1.0-5.0) y para derivar la calificación cualitativa y la equivalencia
+internacional de una nota. La usan `diploma_service`, el modelo `Diploma`,
+`ConfiguracionDiplomasColombia` y los endpoints de conversión.
+"""
+
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+ESCALA_NUMERICA_MIN = 1.0
+ESCALA_NUMERICA_MAX = 5.0
+NOTA_MINIMA_APROBACION = 3.0
+
+# Tramos de conversión porcentaje -> nota: (porcentaje_inicio, nota_base, pendiente)
+TRAMOS_PORCENTAJE: Tuple[Tuple[float, float, float], ...] = (
+    (0.0, 1.0, 0.018),   # <55%   -> 1.0-1.9 (Deficiente)
+    (55.0, 2.0, 0.09),   # 55-64% -> 2.0-2.9 (Insuficiente)
+    (65.0, 3.0, 0.04),   # 65-74% -> 3.0-3.4 (Aceptable)
+    (75.0, 3.5, 0.04),   # 75-84% -> 3.5-3.9 (Bueno)
+    (85.0, 4.0, 0.05),   # 85-94% -> 4.0-4.5 (Sobresaliente)
+    (95.0, 4.6, 0.08),   # 95-100% -> 4.6-5.0 (Excelente)
+)
+
+# Escalera de la nota: cada umbral abre el siguiente nivel (nota >= umbral).
+# Al ser contigua no deja huecos (3.45 es Aceptable, 4.55 Sobresaliente).
+UMBRALES_NOTA: Tuple[float, ...] = (2.0, 3.0, 3.5, 4.0, 4.6)
+CALIFICACIONES: Tuple[str, ...] = (
+    "Deficiente",
+    "Insuficiente",
+    "Aceptable",
+    "Bueno",
+    "Sobresaliente",
+    "Excelente",
+)
+EQUIVALENCIAS: Tuple[str, ...] = (
+    "F (<55%)",
+    "C (55-64%)",
+    "B (65-74%)",
+    "B+ (75-84%)",
+    "A (85-94%)",
+    "A+ (95-100%)",
+)
+
+# Rango de notas de cada calificación, derivado de la escalera:
+# (desde, hasta, calificación) con desde <= nota < hasta; el último incluye 5.0
+RANGOS_CALIFICACION: Tuple[Tuple[float, float, str], ...] = tuple(
+    zip((ESCALA_NUMERICA_MIN,) + UMBRALES_NOTA, UMBRALES_NOTA + (ESCALA_NUMERICA_MAX,), CALIFICACIONES)
+)
+
+_INICIOS_TRAMO: Tuple[float, ...] = tuple(inicio for inicio, _, _ in TRAMOS_PORCENTAJE)
+
+
+def convertir_porcentaje(porcentaje: float) -> float:
+    """Convertir porcentaje (0-100) a nota colombiana (1.0-5.0)"""
+    indice = bisect_right(_INICIOS_TRAMO, porcentaje) - 1
+    inicio, base, pendiente = TRAMOS_PORCENTAJE[indice if indice > 0 else 0]
+    return round(base + (porcentaje - inicio) * pendiente, 1)
+
+
+def nivel_nota(nota: float) -> int:
+    """Índice del nivel de la escalera (0 = Deficiente, 5 = Excelente)"""
+    return bisect_right(UMBRALES_NOTA, nota)
+
+
+def calificacion_cualitativa(nota: Optional[float]) -> str:
+    """Calificación cualitativa de una nota; "No Aplica" fuera de la escala"""
+    if nota is None or not ESCALA_NUMERICA_MIN <= nota <= ESCALA_NUMERICA_MAX:
+        return "No Aplica"
+    return CALIFICACIONES[nivel_nota(nota)]
+
+
+def equivalencia_internacional(nota: Optional[float]) -> str:
+    """Equivalencia internacional de una nota colombiana"""
+    if nota is None:
+        return "N/A"
+    return EQUIVALENCIAS[nivel_nota(nota)]
+
+
+def evaluar_porcentaje(porcentaje: float) -> Dict[str, Any]:
+    """Conversión completa de un porcentaje: nota, calificación, equivalencia y aprobación"""
+    nota = convertir_porcentaje(porcentaje)
+    nivel = nivel_nota(nota)
+    return {
+        "porcentaje_original": porcentaje,
+        "nota_colombiana": nota,
+        "calificacion_cualitativa": CALIFICACIONES[nivel] if ESCALA_NUMERICA_MIN <= nota <= ESCALA_NUMERICA_MAX else "No Aplica",
+        "equivalencia_internacional": EQUIVALENCIAS[nivel],
+        "aprobado": nota >= NOTA_MINIMA_APROBACION,
+    }
+
+
+def evaluar_lote(porcentajes: Iterable[float]) -> List[Dict[str, Any]]:
+    """
+    Convertir un lote de porcentajes en una sola pasada.
+
+    Los puntajes reales se repiten mucho (85.0, 100.0, ...), así que cada
+    porcentaje distinto se evalúa una sola vez y el resto del lote reutiliza
+    el resultado. Cada elemento devuelto es una copia independiente.
+    """
+    calculados: Dict[float, Dict[str, Any]] = {}
+    resultados = []
+    for porcentaje in porcentajes:
+        calculado = calculados.get(porcentaje)
+        if calculado is None:
+            calculado = calculados[porcentaje] = evaluar_porcentaje(porcentaje)
+        resultado = dict(calculado)
+        resultado["porcentaje_original"] = porcentaje
+        resultados.append(resultado)
+    return resultados
@@ -0,0 +1,147 @@
+"""
+Estado de salud del worker para las sondas de liveness y readiness.
+
+Las comprobaciones corren en una tarea periódica (HEALTH_CHECK_INTERVAL_SECONDS)
+y el resultado queda en memoria: las sondas solo leen ese resultado, así que
+ninguna sonda genera carga en MongoDB por mucho que se consulte.
+
+El worker está listo cuando:
+- terminó el calentamiento de app/core/warmup.py (o se agotó su plazo),
+- el ping a MongoDB responde dentro de HEALTH_DB_PING_TIMEOUT_MS,
+- los servicios se importaron con conexión (si no, sus colecciones quedan
+  sin inicializar y cada solicitud falla con 503 hasta reiniciar el worker),
+- el pool de conexiones no supera HEALTH_MAX_POOL_SATURATION de su tamaño,
+- el event loop no está bloqueado más de HEALTH_MAX_EVENT_LOOP_LAG_MS,
+- la última comprobación no es más antigua que tres intervalos,
+- y el worker no se está apagando.
+
+Con HEALTH_CHECK_INTERVAL_SECONDS=0 no se comprueba nada y el worker
+siempre se declara listo.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import pymongo
+
+from app.core import shutdown, tasks, warmup
+from app.core.tasks import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_SEGUNDOS = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "5"))
+PING_TIMEOUT_SEGUNDOS = float(os.getenv("HEALTH_DB_PING_TIMEOUT_MS", "2000")) / 1000
+MAX_SATURACION_POOL = float(os.getenv("HEALTH_MAX_POOL_SATURATION", "0.9"))
+MAX_LAG_SEGUNDOS = float(os.getenv("HEALTH_MAX_EVENT_LOOP_LAG_MS", "1000")) / 1000
+
+_INICIO = time.monotonic()
+
+_lock = threading.Lock()
+_estado: Optional[Dict[str, Any]] = None
+_comprobado: Optional[float] = None
+
+
+def _comprobar_base_datos() -> Dict[str, Any]:
+    from app.DB.database import get_client
+    inicio = time.perf_counter()
+    try:
+        # Acota también la selección de servidor, que sin límite espera 30 s
+        with pymongo.timeout(PING_TIMEOUT_SEGUNDOS):
+            get_client().admin.command("ping")
+    except Exception as e:
+        return {"ok": False, "error": str(e)[:200]}
+    return {"ok": True, "latencia_ms": round((time.perf_counter() - inicio) * 1000, 2)}
+
+
+def _comprobar_servicios() -> Dict[str, Any]:
+    from app.services import achievement_service, diploma_service
+    ok = achievement_service.students_collection is not None and diploma_service.diplomas_collection is not None
+    resultado = {"ok": ok}
+    if not ok:
+        resultado["error"] = "Los servicios arrancaron sin conexión a MongoDB; reiniciar el worker"
+    return resultado
+
+
+def _comprobar_pool() -> Dict[str, Any]:
+    from app.DB import monitoring
+    from app.DB.database import MONGO_MAX_POOL_SIZE
+    if monitoring.pool_listener is None or not MONGO_MAX_POOL_SIZE:
+        return {"ok": True, "disponible": False}
+    en_uso = max(monitoring.pool_listener.en_uso.values(), default=0)
+    saturacion = en_uso / MONGO_MAX_POOL_SIZE
+    return {
+        "ok": saturacion <= MAX_SATURACION_POOL,
+        "en_uso": en_uso,
+        "tamano": MONGO_MAX_POOL_SIZE,
+        "saturacion": round(saturacion, 3),
+    }
+
+
+def _comprobar_event_loop() -> Dict[str, Any]:
+    from app.core.runtime_monitor import monitor
+    lag = monitor.current_lag()
+    if lag is None:
+        return {"ok": True, "disponible": False}
+    return {"ok": lag <= MAX_LAG_SEGUNDOS, "lag_ms": round(lag * 1000, 1)}
+
+
+COMPROBACIONES = {
+    "base_datos": _comprobar_base_datos,
+    "servicios": _comprobar_servicios,
+    "pool_conexiones": _comprobar_pool,
+    "event_loop": _comprobar_event_loop,
+}
+
+
+def comprobar() -> Dict[str, Any]:
+    """Ejecutar todas las comprobaciones y guardar el resultado"""
+    global _estado, _comprobado
+    resultados = {}
+    for nombre, comprobacion in COMPROBACIONES.items():
+        try:
+            resultados[nombre] = comprobacion()
+        except Exception as e:
+            resultados[nombre] = {"ok": False, "error": str(e)[:200]}
+    listo = all(r["ok"] for r in resultados.values())
+
+    with _lock:
+        anterior = _estado["listo"] if _estado else None
+        _estado = {"listo": listo, "fecha": datetime.now(timezone.utc), "comprobaciones": resultados}
+        _comprobado = time.monotonic()
+    if anterior is not None and anterior != listo:
+        fallidas = [n for n, r in resultados.items() if not r["ok"]]
+        if listo:
+            logger.info("Worker ready again")
+        else:
+            logger.warning(f"Worker not ready: {', '.join(fallidas)}")
+    return _estado
+
+
+def listo() -> Dict[str, Any]:
+    """Último resultado, sin comprobar nada (lo que devuelven las sondas)"""
+    if shutdown.drenando():
+        return {"listo": False, "fecha": None, "comprobaciones": {}, "motivo": "Servicio apagándose"}
+    if not warmup.completado():
+        return {"listo": False, "fecha": None, "comprobaciones": {}, "motivo": "Calentamiento en curso"}
+    if INTERVALO_SEGUNDOS <= 0:
+        return {"listo": True, "fecha": None, "comprobaciones": {}, "motivo": "Comprobaciones desactivadas"}
+    with _lock:
+        estado, comprobado = _estado, _comprobado
+    if estado is None:
+        return {"listo": False, "fecha": None, "comprobaciones": {}, "motivo": "Comprobaciones pendientes"}
+    antiguedad = time.monotonic() - comprobado
+    # Un ping lento puede alargar el intervalo hasta su timeout
+    if antiguedad > INTERVALO_SEGUNDOS * 3 + PING_TIMEOUT_SEGUNDOS:
+        return {**estado, "listo": False, "motivo": f"Última comprobación hace {antiguedad:.0f} s"}
+    return estado
+
+
+def vivo() -> Dict[str, Any]:
+    return {"pid": os.getpid(), "uptime_segundos": round(time.monotonic() - _INICIO, 1)}
+
+
+tasks.register(PeriodicTask("salud", INTERVALO_SEGUNDOS, comprobar, run_on_start=True))
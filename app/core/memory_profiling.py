@@ -0,0 +1,274 @@
+"""
+Diagnóstico de memoria con tracemalloc.
+
+- `iniciar()` / `detener()`: activar el trazado de asignaciones en el worker.
+  Mientras está activo, cada asignación de Python guarda su traza
+  (`frames` marcos), con un coste de CPU y memoria apreciable; se activa para
+  diagnosticar y se detiene después.
+- Instantáneas con id (`tomar_instantanea`) y diferencias entre ellas o
+  contra el estado actual, agrupadas por archivo o por línea.
+- Por solicitud (`iniciar_medicion` / `terminar_medicion`, desde el
+  middleware de métricas): el pico de memoria durante la solicitud va al
+  histograma `http_request_peak_memory_bytes`, y 1 de cada `muestreo_rutas`
+  solicitudes de cada ruta compara instantáneas antes y después para
+  acumular qué líneas dejan memoria retenida en esa ruta.
+
+El pico de tracemalloc es global del proceso: las solicitudes que se solapan
+con otras no se miden, para no atribuirles memoria ajena.
+"""
+
+import asyncio
+import linecache
+import logging
+import os
+import threading
+import tracemalloc
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.metrics import REQUEST_PEAK_MEMORY
+
+logger = logging.getLogger(__name__)
+
+MARCOS = int(os.getenv("MEMORY_TRACE_FRAMES", "10"))
+TRAZAR_AL_ARRANCAR = os.getenv("MEMORY_TRACE_ON_START", "false").lower() == "true"
+MAX_INSTANTANEAS = int(os.getenv("MEMORY_MAX_SNAPSHOTS", "10"))
+
+# Asignaciones del propio trazado, de la importación de módulos y de la
+# caché de código fuente que llena este módulo al mostrar las líneas
+_FILTROS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+_lock = threading.Lock()
+_instantaneas: "OrderedDict[int, Tuple[datetime, tracemalloc.Snapshot]]" = OrderedDict()
+_siguiente_id = 1
+
+# Muestreo por ruta: {ruta: {"solicitudes", "muestras", "lineas": Counter}}
+_muestreo_rutas = 0
+_rutas: Dict[str, Dict[str, Any]] = {}
+
+# Mediciones de solicitudes en curso en el event loop
+_activas: set = set()
+
+# Las propias rutas de diagnóstico de memoria no se miden
+_PREFIJO_EXCLUIDO = "/admin/memory"
+
+
+def activo() -> bool:
+    return tracemalloc.is_tracing()
+
+
+def iniciar(marcos: int = MARCOS, muestreo_rutas: int = 0):
+    """Activar el trazado; `muestreo_rutas` > 0 compara 1 de cada N solicitudes por ruta"""
+    global _muestreo_rutas
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(marcos)
+    _muestreo_rutas = muestreo_rutas
+    logger.info(f"tracemalloc activo ({tracemalloc.get_traceback_limit()} marcos, muestreo por ruta: {muestreo_rutas or 'no'})")
+
+
+def detener():
+    """Detener el trazado; libera las trazas pero conserva las instantáneas y lo acumulado por ruta"""
+    global _muestreo_rutas
+    _muestreo_rutas = 0
+    tracemalloc.stop()
+
+
+def estado() -> Dict[str, Any]:
+    actual, pico = tracemalloc.get_traced_memory()
+    with _lock:
+        instantaneas = [{"id": i, "fecha": fecha} for i, (fecha, _) in _instantaneas.items()]
+    return {
+        "activo": tracemalloc.is_tracing(),
+        "marcos": tracemalloc.get_traceback_limit(),
+        "memoria_trazada_bytes": actual,
+        "pico_trazado_bytes": pico,
+        "sobrecarga_tracemalloc_bytes": tracemalloc.get_tracemalloc_memory(),
+        "rss_bytes": _rss(),
+        "muestreo_rutas": _muestreo_rutas,
+        "instantaneas": instantaneas,
+    }
+
+
+def _rss() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# --- instantáneas ---
+
+def _instantanea(filtrar: bool = True) -> tracemalloc.Snapshot:
+    """El filtrado recorre todas las trazas en Python; la captura sin filtrar es rápida"""
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc no está activo")
+    instantanea = tracemalloc.take_snapshot()
+    return instantanea.filter_traces(_FILTROS) if filtrar else instantanea
+
+
+def tomar_instantanea() -> int:
+    """Guardar una instantánea (se conservan las MEMORY_MAX_SNAPSHOTS más recientes)"""
+    global _siguiente_id
+    instantanea = _instantanea()
+    with _lock:
+        id_instantanea = _siguiente_id
+        _siguiente_id += 1
+        _instantaneas[id_instantanea] = (datetime.now(), instantanea)
+        while len(_instantaneas) > MAX_INSTANTANEAS:
+            _instantaneas.popitem(last=False)
+    return id_instantanea
+
+
+def obtener_instantanea(id_instantanea: int) -> Optional[tracemalloc.Snapshot]:
+    with _lock:
+        guardada = _instantaneas.get(id_instantanea)
+    return guardada[1] if guardada else None
+
+
+def limpiar_instantaneas():
+    with _lock:
+        _instantaneas.clear()
+
+
+def _ubicacion(traceback: tracemalloc.Traceback, agrupar: str) -> Dict[str, Any]:
+    marco = traceback[0]
+    if agrupar == "filename":
+        return {"archivo": marco.filename}
+    ubicacion = {
+        "archivo": marco.filename,
+        "linea": marco.lineno,
+        "codigo": linecache.getline(marco.filename, marco.lineno).strip(),
+    }
+    if agrupar == "traceback":
+        ubicacion["traza"] = [f"{m.filename}:{m.lineno}" for m in traceback]
+    return ubicacion
+
+
+def principales(id_instantanea: Optional[int] = None, agrupar: str = "lineno", limite: int = 25) -> List[Dict[str, Any]]:
+    """Mayores asignaciones vivas de una instantánea guardada o del estado actual"""
+    instantanea = obtener_instantanea(id_instantanea) if id_instantanea else _instantanea()
+    if instantanea is None:
+        raise KeyError(id_instantanea)
+    return [
+        {**_ubicacion(estadistica.traceback, agrupar), "bytes": estadistica.size, "bloques": estadistica.count}
+        for estadistica in instantanea.statistics(agrupar)[:limite]
+    ]
+
+
+def diferencia(base: int, actual: Optional[int] = None, agrupar: str = "lineno", limite: int = 25) -> List[Dict[str, Any]]:
+    """Crecimiento entre la instantánea `base` y `actual` (o el estado actual), mayores primero"""
+    anterior = obtener_instantanea(base)
+    if anterior is None:
+        raise KeyError(base)
+    posterior = obtener_instantanea(actual) if actual else _instantanea()
+    if posterior is None:
+        raise KeyError(actual)
+    return [
+        {
+            **_ubicacion(estadistica.traceback, agrupar),
+            "bytes": estadistica.size,
+            "diferencia_bytes": estadistica.size_diff,
+            "bloques": estadistica.count,
+            "diferencia_bloques": estadistica.count_diff,
+        }
+        for estadistica in posterior.compare_to(anterior, agrupar)[:limite]
+        if estadistica.size_diff or estadistica.count_diff
+    ]
+
+
+# --- por solicitud ---
+
+class _Medicion:
+    __slots__ = ("inicial", "solapada", "antes")
+
+    def __init__(self, inicial: int):
+        self.inicial = inicial
+        self.solapada = False
+        self.antes: Optional[tracemalloc.Snapshot] = None
+
+
+def iniciar_medicion(endpoint: str) -> Optional[_Medicion]:
+    """Llamar desde el event loop al empezar una solicitud; None si no hay trazado"""
+    if not tracemalloc.is_tracing() or endpoint.startswith(_PREFIJO_EXCLUIDO):
+        return None
+    if _activas:
+        for otra in _activas:
+            otra.solapada = True
+        medicion = _Medicion(0)
+        medicion.solapada = True
+    else:
+        tracemalloc.reset_peak()
+        medicion = _Medicion(tracemalloc.get_traced_memory()[0])
+        if _muestreo_rutas:
+            with _lock:
+                ruta = _rutas.setdefault(endpoint, {"solicitudes": 0, "muestras": 0, "lineas": Counter()})
+                ruta["solicitudes"] += 1
+                muestrear = (ruta["solicitudes"] - 1) % _muestreo_rutas == 0
+            if muestrear:
+                medicion.antes = _instantanea(filtrar=False)
+    _activas.add(medicion)
+    return medicion
+
+
+def terminar_medicion(medicion: Optional[_Medicion], method: str, endpoint: str):
+    if medicion is None:
+        return
+    _activas.discard(medicion)
+    if medicion.solapada or not tracemalloc.is_tracing():
+        return
+    pico = tracemalloc.get_traced_memory()[1]
+    REQUEST_PEAK_MEMORY.labels(method=method, endpoint=endpoint).observe(max(0, pico - medicion.inicial))
+    if medicion.antes is not None:
+        despues = _instantanea(filtrar=False)
+        # El filtrado y la comparación recorren todas las trazas: fuera del event loop
+        asyncio.get_running_loop().run_in_executor(None, _acumular_ruta, endpoint, medicion.antes, despues)
+
+
+def _acumular_ruta(endpoint: str, antes: tracemalloc.Snapshot, despues: tracemalloc.Snapshot):
+    lineas = Counter()
+    antes, despues = antes.filter_traces(_FILTROS), despues.filter_traces(_FILTROS)
+    for estadistica in despues.compare_to(antes, "lineno"):
+        if estadistica.size_diff > 0:
+            marco = estadistica.traceback[0]
+            lineas[(marco.filename, marco.lineno)] += estadistica.size_diff
+    with _lock:
+        ruta = _rutas.setdefault(endpoint, {"solicitudes": 1, "muestras": 0, "lineas": Counter()})
+        ruta["muestras"] += 1
+        ruta["lineas"].update(lineas)
+
+
+def asignaciones_por_ruta(limite: int = 10) -> Dict[str, Any]:
+    """Líneas que más memoria retienen por ruta, en bytes medios por solicitud muestreada"""
+    resultado = {}
+    with _lock:
+        rutas = {endpoint: (datos["solicitudes"], datos["muestras"], Counter(datos["lineas"])) for endpoint, datos in _rutas.items()}
+    for endpoint, (solicitudes, muestras, lineas) in rutas.items():
+        if not muestras:
+            continue
+        resultado[endpoint] = {
+            "solicitudes": solicitudes,
+            "muestras": muestras,
+            "lineas": [
+                {
+                    "archivo": archivo,
+                    "linea": linea,
+                    "codigo": linecache.getline(archivo, linea).strip(),
+                    "bytes_retenidos_por_solicitud": round(total / muestras),
+                }
+                for (archivo, linea), total in lineas.most_common(limite)
+            ],
+        }
+    return resultado
+
+
+def limpiar_rutas():
+    with _lock:
+        _rutas.clear()
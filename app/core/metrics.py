@@ -1,22 +1,293 @@
-from prometheus_client import Counter, Histogram
+import glob
+import os
+import re
+from contextlib import contextmanager
+from typing import List
+
+from prometheus_client import (
+    REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from prometheus_client.mmap_dict import MmapedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos no se archivan los workers terminados
+    fcntl = None
+
+# Modo multiproceso: con varios workers cada proceso escribe sus métricas en
+# archivos mmap de este directorio y /metrics agrega todos los procesos.
+# Debe definirse antes de arrancar los workers y vaciarse entre ejecuciones
+# (startup.py lo hace con reset_multiprocess_dir()).
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir")
+
+_PID_FILE_RE = re.compile(r"_(\d+)\.db$")
+
+# Los contadores, histogramas y resúmenes de los workers terminados se suman en
+# un archivo por tipo (counter_archive.db, ...) y se borran los del worker, así
+# el directorio no crece con cada reciclado
+ARCHIVED_TYPES = ("counter", "histogram", "summary")
+ARCHIVE_NAME = "archive"
+_LOCK_FILE = ".lock"
+
+# Etiqueta de endpoint para solicitudes que no coinciden con ninguna ruta
+# (404 con rutas arbitrarias); así no crean una serie por URL
+UNMATCHED_ENDPOINT = "<unmatched>"
+
+
+def _latency_buckets():
+    """Buckets del histograma de latencia: METRICS_LATENCY_BUCKETS="0.005,0.01,..." o los de prometheus_client"""
+    raw = os.getenv("METRICS_LATENCY_BUCKETS", "").strip()
+    if not raw:
+        return Histogram.DEFAULT_BUCKETS
+    return tuple(sorted(float(b) for b in raw.split(",") if b.strip())) + (float("inf"),)
+
+
+def status_class(status_code: int) -> str:
+    """Clase del código de estado (2xx, 4xx, ...) para acotar la cardinalidad"""
+    return f"{status_code // 100}xx"
+
+
+# Las etiquetas usan la plantilla de la ruta (/achievements/{email}/stats),
+# nunca la URL concreta, para que el número de series sea acotado
 
 # Contador de peticiones HTTP
 REQUEST_COUNT = Counter(
     "http_requests_total", 
     "Total HTTP requests", 
-    ["method", "endpoint"]
+    ["method", "endpoint", "status"]
 )
 
 # Histograma para medir la latencia (tiempos de respuesta)
 RESPONSE_TIME = Histogram(
     "http_request_duration_seconds", 
     "HTTP request duration in seconds", 
-    ["method", "endpoint"]
+    ["method", "endpoint", "status"],
+    buckets=_latency_buckets()
 )
 
 # Contador de errores por endpoint
 ERROR_COUNT = Counter(
     "http_errors_total", 
     "Total HTTP errors", 
-    ["method", "endpoint"]
+    ["method", "endpoint", "status"]
+)
+
+
+# Verificaciones públicas de diplomas por camino de resolución
+# (cache, rechazo_bloom, bd, no_encontrado)
+DIPLOMA_VERIFICATIONS = Counter(
+    "diploma_verifications_total",
+    "Diploma verification lookups by resolution path",
+    ["resultado"]
+)
+
+
+# --- MongoDB (registradas por app/DB/monitoring.py) ---
+
+MONGO_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float("inf"))
+
+# Latencia de cada comando según el servidor (incluye red y espera del cursor)
+MONGO_COMMAND_DURATION = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command latency in seconds",
+    ["collection", "command"],
+    buckets=MONGO_LATENCY_BUCKETS
+)
+
+MONGO_COMMAND_FAILURES = Counter(
+    "mongodb_command_failures_total",
+    "MongoDB commands that returned an error",
+    ["collection", "command", "error"]
+)
+
+# Documentos devueltos en lotes de cursor (find, aggregate, getMore) y findAndModify
+MONGO_DOCUMENTS_RETURNED = Counter(
+    "mongodb_documents_returned_total",
+    "Documents returned by MongoDB commands",
+    ["collection", "command"]
+)
+
+MONGO_REPLY_BYTES = Counter(
+    "mongodb_reply_bytes_total",
+    "BSON size of MongoDB command replies in bytes",
+    ["collection", "command"]
+)
+
+# Pool de conexiones, por servidor (host:puerto)
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "mongodb_pool_checkout_wait_seconds",
+    "Time spent waiting to check out a pooled MongoDB connection",
+    ["address"],
+    buckets=MONGO_LATENCY_BUCKETS
+)
+
+MONGO_POOL_CONNECTIONS = Gauge(
+    "mongodb_pool_connections",
+    "Open MongoDB connections in the pool",
+    ["address"],
+    multiprocess_mode="livesum"
+)
+
+MONGO_POOL_CONNECTIONS_IN_USE = Gauge(
+    "mongodb_pool_connections_in_use",
+    "MongoDB connections currently checked out",
+    ["address"],
+    multiprocess_mode="livesum"
+)
+
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongodb_pool_checkout_failures_total",
+    "Failed MongoDB connection checkouts",
+    ["address", "reason"]
 )
+
+# Operaciones que superan MONGO_SLOW_OP_THRESHOLD_MS, por plan de ejecución
+# (COLLSCAN, IXSCAN, ...; sin_explain si no se explicó)
+MONGO_SLOW_OPERATIONS = Counter(
+    "mongodb_slow_operations_total",
+    "MongoDB operations slower than the configured threshold, by execution plan",
+    ["collection", "command", "plan"]
+)
+
+
+# --- Runtime del proceso (registradas por app/core/runtime_monitor.py) ---
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between a scheduled event-loop wake-up and when it actually ran",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float("inf"))
+)
+
+EVENT_LOOP_LAG_LAST = Gauge(
+    "event_loop_lag_last_seconds",
+    "Most recent event-loop lag sample",
+    multiprocess_mode="livemax"
+)
+
+THREADPOOL_ACTIVE = Gauge(
+    "threadpool_active_tasks",
+    "Tasks running in the default AnyIO worker thread pool (sync routes and run_in_threadpool)",
+    multiprocess_mode="livesum"
+)
+
+THREADPOOL_QUEUED = Gauge(
+    "threadpool_queued_tasks",
+    "Tasks waiting for a free worker thread",
+    multiprocess_mode="livesum"
+)
+
+THREADPOOL_SIZE = Gauge(
+    "threadpool_size",
+    "Capacity of the default AnyIO worker thread pool",
+    multiprocess_mode="livesum"
+)
+
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ["method", "endpoint"],
+    multiprocess_mode="livesum"
+)
+
+GC_PAUSE = Histogram(
+    "python_gc_pause_seconds",
+    "Duration of garbage collector runs (they stop every thread)",
+    ["generation"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, float("inf"))
+)
+
+REQUEST_PEAK_MEMORY = Histogram(
+    "http_request_peak_memory_bytes",
+    "Peak Python heap growth while handling a request (tracemalloc; only while memory tracing is on)",
+    ["method", "endpoint"],
+    buckets=tuple(2 ** n for n in range(16, 30, 2)) + (float("inf"),)
+)
+
+# --- Exposición ---
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextmanager
+def _directory_lock(exclusive: bool):
+    """Bloqueo del directorio entre procesos: compartido al leer, exclusivo al archivar"""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(MULTIPROCESS_DIR, _LOCK_FILE), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _archive_worker_files(pid: int) -> None:
+    """Sumar los valores de un worker terminado al archivo de cada tipo y borrar sus archivos"""
+    for typ in ARCHIVED_TYPES:
+        path = os.path.join(MULTIPROCESS_DIR, f"{typ}_{pid}.db")
+        if not os.path.exists(path):
+            continue
+        archive = MmapedDict(os.path.join(MULTIPROCESS_DIR, f"{typ}_{ARCHIVE_NAME}.db"))
+        try:
+            for key, value, timestamp, _ in MmapedDict.read_all_values_from_file(path):
+                total, last = archive.read_value(key)
+                archive.write_value(key, total + value, max(last, timestamp))
+        finally:
+            archive.close()
+        os.remove(path)
+
+
+def retire_worker(pid: int) -> None:
+    """
+    Retirar un worker terminado: sus gauges "live" dejan de contar y sus
+    contadores e histogramas pasan al archivo, donde siguen sumando en los
+    totales igual que en un proceso único que no se reinicia.
+    """
+    with _directory_lock(exclusive=True):
+        multiprocess.mark_process_dead(pid, MULTIPROCESS_DIR)
+        if fcntl is not None:
+            _archive_worker_files(pid)
+
+
+def cleanup_dead_workers() -> List[int]:
+    """Retirar (ver `retire_worker`) los workers con archivos de métricas que ya no existen"""
+    if not MULTIPROCESS_DIR:
+        return []
+    pids = set()
+    for path in glob.glob(os.path.join(MULTIPROCESS_DIR, "*.db")):
+        match = _PID_FILE_RE.search(path)
+        if match:
+            pids.add(int(match.group(1)))
+    dead = sorted(pid for pid in pids if pid != os.getpid() and not _pid_alive(pid))
+    for pid in dead:
+        retire_worker(pid)
+    return dead
+
+
+def reset_multiprocess_dir():
+    """Vaciar el directorio multiproceso antes de arrancar los workers"""
+    if not MULTIPROCESS_DIR:
+        return
+    os.makedirs(MULTIPROCESS_DIR, exist_ok=True)
+    for path in glob.glob(os.path.join(MULTIPROCESS_DIR, "*.db")):
+        os.remove(path)
+
+
+def render_latest() -> bytes:
+    """Métricas en formato de texto de Prometheus: las de este proceso o las agregadas de todos los workers"""
+    if not MULTIPROCESS_DIR:
+        return generate_latest(REGISTRY)
+    cleanup_dead_workers()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    # Sin archivar a la vez: un worker a medio archivar contaría dos veces
+    with _directory_lock(exclusive=False):
+        return generate_latest(registry)
@@ -0,0 +1,173 @@
+"""
+Perfilado bajo demanda en workers en producción.
+
+- `muestrear()`: perfilador estadístico. Un hilo toma la pila de todos los
+  hilos del proceso cada `intervalo` segundos (`sys._current_frames`) y cuenta
+  las pilas colapsadas (`raiz;...;hoja N`), el formato que aceptan
+  flamegraph.pl, speedscope e inferno. No instrumenta el código, así que su
+  coste es el de cada muestra y no depende de la carga.
+- `PerfilSolicitud`: perfilado determinista (cProfile) de una sola solicitud
+  con `?profile=1`. cProfile mide el hilo del event loop, así que incluye las
+  demás solicitudes que se intercalen en él; en un worker con carga conviene
+  el muestreador.
+
+Ambos están deshabilitados salvo con PROFILING_ENABLED=true, y solo puede
+haber una sesión de perfilado a la vez por proceso.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+PROFILING_HABILITADO = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+MAX_SEGUNDOS = float(os.getenv("PROFILING_MAX_SECONDS", "60"))
+INTERVALO_MS = float(os.getenv("PROFILING_SAMPLE_INTERVAL_MS", "5"))
+
+# Hojas de pila de hilos que esperan sin consumir CPU (selector del loop,
+# hilos de tareas periódicas, workers del pool sin trabajo)
+_HOJAS_INACTIVAS = frozenset({
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("_thread.py", "run"),
+})
+
+_RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_sesion = threading.Lock()
+
+
+class PerfiladoOcupado(Exception):
+    """Ya hay una sesión de perfilado en curso en este proceso"""
+
+
+def _archivo(ruta: str) -> str:
+    """Ruta relativa al proyecto o, fuera de él, solo el nombre del módulo"""
+    if ruta.startswith(_RAIZ_PROYECTO):
+        return os.path.relpath(ruta, _RAIZ_PROYECTO)
+    return os.path.basename(ruta)
+
+
+def _marco(code) -> str:
+    # `;` separa marcos en el formato colapsado
+    return f"{code.co_qualname} ({_archivo(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+def _pila(frame) -> Tuple[str, ...]:
+    marcos = []
+    while frame is not None:
+        marcos.append(frame.f_code)
+        frame = frame.f_back
+    return tuple(_marco(code) for code in reversed(marcos))
+
+
+def _inactiva(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _HOJAS_INACTIVAS
+
+
+def muestrear(segundos: float, intervalo: float = INTERVALO_MS / 1000, incluir_inactivos: bool = False) -> Dict[str, Any]:
+    """
+    Muestrear las pilas de todos los hilos durante `segundos`.
+
+    Bloquea el hilo que la llama: desde el event loop hay que ejecutarla en
+    el pool de hilos.
+    """
+    if not _sesion.acquire(blocking=False):
+        raise PerfiladoOcupado("Ya hay una sesión de perfilado en curso")
+    try:
+        propio = threading.get_ident()
+        nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+        pilas: Counter = Counter()
+        muestras = 0
+        inicio = time.perf_counter()
+        fin = inicio + segundos
+        while True:
+            ahora = time.perf_counter()
+            if ahora >= fin:
+                break
+            for ident, frame in sys._current_frames().items():
+                if ident == propio or (not incluir_inactivos and _inactiva(frame)):
+                    continue
+                if ident not in nombres:
+                    nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+                hilo = nombres.get(ident, str(ident)).replace(";", ",")
+                pilas[(hilo,) + _pila(frame)] += 1
+            muestras += 1
+            time.sleep(max(0.0, min(intervalo, fin - time.perf_counter())))
+        duracion = time.perf_counter() - inicio
+    finally:
+        _sesion.release()
+
+    return {
+        "segundos": round(duracion, 3),
+        "intervalo_ms": intervalo * 1000,
+        "muestras": muestras,
+        "pilas": pilas,
+    }
+
+
+def colapsar(pilas: Counter) -> str:
+    """Formato de pilas colapsadas: una línea `marco;marco;... cuenta` por pila"""
+    return "".join(f"{';'.join(pila)} {cuenta}\n" for pila, cuenta in pilas.most_common())
+
+
+def funciones_principales(pilas: Counter, limite: int = 25) -> List[Dict[str, Any]]:
+    """
+    Funciones con más muestras propias (en la hoja de la pila, las que gastan
+    la CPU), con sus muestras acumuladas (en cualquier punto de la pila)
+    """
+    propias: Counter = Counter()
+    acumuladas: Counter = Counter()
+    total = sum(pilas.values()) or 1
+    for pila, cuenta in pilas.items():
+        marcos = pila[1:]  # sin el nombre del hilo
+        if marcos:
+            propias[marcos[-1]] += cuenta
+        for marco in set(marcos):
+            acumuladas[marco] += cuenta
+    return [
+        {
+            "funcion": marco,
+            "muestras_propias": cuenta,
+            "muestras_acumuladas": acumuladas[marco],
+            "porcentaje_propio": round(100 * cuenta / total, 2),
+            "porcentaje_acumulado": round(100 * acumuladas[marco] / total, 2),
+        }
+        for marco, cuenta in propias.most_common(limite)
+    ]
+
+
+class PerfilSolicitud:
+    """cProfile de una solicitud; `reporte()` devuelve el informe de pstats en texto"""
+
+    def __init__(self):
+        self._perfil: Optional[cProfile.Profile] = None
+
+    def __enter__(self):
+        if not _sesion.acquire(blocking=False):
+            raise PerfiladoOcupado("Ya hay una sesión de perfilado en curso")
+        self._perfil = cProfile.Profile()
+        self._perfil.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self._perfil.disable()
+        _sesion.release()
+        return False
+
+    def reporte(self, orden: str = "cumulative", limite: int = 50) -> str:
+        if orden not in pstats.Stats.sort_arg_dict_default:
+            orden = "cumulative"
+        salida = io.StringIO()
+        estadisticas = pstats.Stats(self._perfil, stream=salida)
+        estadisticas.strip_dirs().sort_stats(orden).print_stats(limite)
+        return salida.getvalue()
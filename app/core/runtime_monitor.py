@@ -0,0 +1,160 @@
+"""
+Monitor del runtime del worker: lag del event loop, saturación del pool de
+hilos y pausas del recolector de basura.
+
+Los servicios acceden a MongoDB de forma síncrona dentro de rutas `async def`,
+así que una consulta lenta bloquea el event loop entero. El monitor tiene dos
+partes:
+
+- Una corrutina en el loop que duerme `interval` segundos y mide cuánto tarda
+  de más en despertar (lag) y muestrea el pool de hilos de AnyIO.
+- Un hilo vigilante que, si el loop no late durante más de
+  EVENT_LOOP_LAG_WARN_MS, mira la pila del hilo del loop en ese momento y
+  registra un aviso con la ruta que lo tiene bloqueado y la línea de código.
+"""
+
+import asyncio
+import gc
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional
+
+from anyio import to_thread
+
+from app.core.metrics import (
+    EVENT_LOOP_LAG, EVENT_LOOP_LAG_LAST, GC_PAUSE,
+    THREADPOOL_ACTIVE, THREADPOOL_QUEUED, THREADPOOL_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+MONITOR_INTERVAL_SECONDS = float(os.getenv("RUNTIME_MONITOR_INTERVAL_SECONDS", "0.25"))
+LAG_WARN_SECONDS = float(os.getenv("EVENT_LOOP_LAG_WARN_MS", "200")) / 1000
+
+
+class RuntimeMonitor:
+    """Se arranca y detiene con la aplicación (`start(app)` / `stop()`)"""
+
+    def __init__(self, interval: float = MONITOR_INTERVAL_SECONDS, warn_after: float = LAG_WARN_SECONDS):
+        self.interval = interval
+        self.warn_after = warn_after
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.perf_counter()
+        self._reported_beat: Optional[float] = None
+        self._routes: Dict[object, str] = {}
+        self._gc_started: Optional[float] = None
+        self._last_lag = 0.0
+
+    # --- ciclo de vida ---
+
+    def start(self, app):
+        """Llamar desde el loop (evento de arranque de la aplicación)"""
+        if self._task is not None or self.interval <= 0:
+            return
+        self._routes = {
+            route.endpoint.__code__: f"{','.join(sorted(getattr(route, 'methods', None) or []))} {route.path}"
+            for route in app.routes
+            if hasattr(getattr(route, "endpoint", None), "__code__")
+        }
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._beat())
+        if self.warn_after > 0:
+            self._watchdog = threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+            self._watchdog.start()
+        if self._on_gc not in gc.callbacks:
+            gc.callbacks.append(self._on_gc)
+
+    async def stop(self):
+        self._stop.set()
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.interval * 4)
+            self._watchdog = None
+
+    # --- event loop y pool de hilos ---
+
+    async def _beat(self):
+        limiter = to_thread.current_default_thread_limiter()
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._last_beat = now
+            lag = max(0.0, now - start - self.interval)
+            EVENT_LOOP_LAG.observe(lag)
+            EVENT_LOOP_LAG_LAST.set(lag)
+            self._last_lag = lag
+
+            stats = limiter.statistics()
+            THREADPOOL_ACTIVE.set(stats.borrowed_tokens)
+            THREADPOOL_QUEUED.set(stats.tasks_waiting)
+            THREADPOOL_SIZE.set(stats.total_tokens)
+
+    def current_lag(self) -> Optional[float]:
+        """
+        Lag en segundos: el del último latido o, si el loop lleva más tiempo
+        sin latir, lo que lleva bloqueado. None si el monitor no está en marcha.
+        """
+        if self._task is None:
+            return None
+        blocked = time.perf_counter() - self._last_beat - self.interval
+        return max(self._last_lag, blocked, 0.0)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            beat = self._last_beat
+            blocked = time.perf_counter() - beat - self.interval
+            # Un aviso por bloqueo, mientras el loop sigue sin latir
+            if blocked < self.warn_after or self._reported_beat == beat:
+                continue
+            self._reported_beat = beat
+            route, location = self._blocking_site()
+            logger.warning(
+                f"Event loop blocked for over {blocked * 1000:.0f} ms "
+                f"(route: {route or 'unknown'}, at {location or 'unknown'})"
+            )
+
+    def _blocking_site(self):
+        """Ruta y línea de código que ejecuta el hilo del loop en este momento"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None, None
+        stack = traceback.extract_stack(frame)
+        location = f"{stack[-1].filename}:{stack[-1].lineno} in {stack[-1].name}" if stack else None
+        route = None
+        while frame is not None:
+            route = self._routes.get(frame.f_code)
+            if route:
+                break
+            frame = frame.f_back
+        return route, location
+
+    # --- recolector de basura ---
+
+    def _on_gc(self, phase: str, info: Dict[str, int]):
+        # El GC corre con el GIL tomado: inicio y fin llegan seguidos
+        if phase == "start":
+            self._gc_started = time.perf_counter()
+        elif self._gc_started is not None:
+            GC_PAUSE.labels(generation=str(info.get("generation", ""))).observe(time.perf_counter() - self._gc_started)
+            self._gc_started = None
+
+
+monitor = RuntimeMonitor()
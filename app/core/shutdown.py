@@ -0,0 +1,94 @@
+"""
+Apagado ordenado del worker.
+
+El servidor (uvicorn, o gunicorn con UvicornWorker) deja de aceptar
+conexiones al recibir SIGTERM, cierra las keep-alive inactivas y espera a
+las solicitudes en curso hasta su timeout de apagado; después la aplicación
+ejecuta su lifespan de apagado, que con este módulo:
+
+1. marca el worker como drenando: readiness responde 503 y las solicitudes
+   que aún lleguen reciben 503 con `Connection: close`,
+2. espera a las solicitudes en curso que el servidor no haya esperado y a
+   los hilos del pool de AnyIO (una solicitud cancelada deja su hilo
+   escribiendo en MongoDB) hasta SHUTDOWN_TIMEOUT_SECONDS, y cancela las
+   solicitudes que sigan en curso,
+3. y deja el resto del plazo para vaciar colas y cerrar el pool de MongoDB.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from anyio import to_thread
+
+logger = logging.getLogger(__name__)
+
+PLAZO_SEGUNDOS = float(os.getenv("SHUTDOWN_TIMEOUT_SECONDS", "10"))
+
+_drenando = threading.Event()
+_en_curso: Set[asyncio.Task] = set()
+
+
+def drenando() -> bool:
+    return _drenando.is_set()
+
+
+def iniciar_drenaje():
+    if not _drenando.is_set():
+        _drenando.set()
+        logger.info("Draining worker: new requests are rejected")
+
+
+def registrar_solicitud() -> Optional[asyncio.Task]:
+    """Anotar la solicitud que se atiende en la tarea actual"""
+    tarea = asyncio.current_task()
+    if tarea is not None:
+        _en_curso.add(tarea)
+    return tarea
+
+
+def terminar_solicitud(tarea: Optional[asyncio.Task]):
+    _en_curso.discard(tarea)
+
+
+def solicitudes_en_curso() -> int:
+    return len(_en_curso)
+
+
+def hilos_ocupados() -> int:
+    return to_thread.current_default_thread_limiter().borrowed_tokens
+
+
+async def _esperar(condicion, limite: float) -> bool:
+    while not condicion():
+        if time.monotonic() >= limite:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+async def drenar(plazo: float = PLAZO_SEGUNDOS) -> Dict[str, int]:
+    """
+    Rechazar solicitudes nuevas y esperar a las que están en curso y a sus
+    hilos durante `plazo` segundos como mucho. Devuelve lo que quedó sin
+    terminar (solicitudes canceladas e hilos aún ocupados).
+    """
+    iniciar_drenaje()
+    limite = time.monotonic() + plazo
+
+    canceladas = 0
+    if not await _esperar(lambda: not _en_curso, limite):
+        canceladas = len(_en_curso)
+        logger.warning(f"Shutdown deadline reached: cancelling {canceladas} in-flight request(s)")
+        for tarea in list(_en_curso):
+            tarea.cancel()
+        await asyncio.sleep(0)
+
+    hilos = 0
+    if not await _esperar(lambda: hilos_ocupados() == 0, limite):
+        hilos = hilos_ocupados()
+        logger.warning(f"Shutdown deadline reached with {hilos} thread pool job(s) still running")
+    return {"canceladas": canceladas, "hilos": hilos}
@@ -0,0 +1,78 @@
+"""
+Tareas periódicas en segundo plano.
+
+Los servicios registran sus tareas al importarse con `register()` y la
+aplicación las arranca y detiene junto con el ciclo de vida del proceso
+(`start_all()` / `stop_all()`). Cada tarea corre en su propio hilo daemon,
+ya que el acceso a MongoDB en los servicios es síncrono.
+"""
+
+import logging
+import threading
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Ejecuta `func` cada `interval` segundos en un hilo propio"""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], None], run_on_start: bool = False):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.run_on_start = run_on_start
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Arrancar la tarea (idempotente)"""
+        if self.running or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"task-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Pedir la parada y esperar a que termine la ejecución en curso"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self):
+        """Ejecutar la tarea una vez; los errores se registran y no detienen el ciclo"""
+        try:
+            self.func()
+        except Exception as e:
+            logger.error(f"Error in periodic task {self.name}: {e}")
+
+    def _run(self):
+        if self.run_on_start:
+            self.run_once()
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+
+_tasks: List[PeriodicTask] = []
+
+
+def register(task: PeriodicTask) -> PeriodicTask:
+    """Registrar una tarea para que arranque con la aplicación"""
+    _tasks.append(task)
+    return task
+
+
+def start_all():
+    for task in _tasks:
+        task.start()
+        logger.info(f"Started periodic task {task.name} (every {task.interval}s)")
+
+
+def stop_all(timeout: Optional[float] = None):
+    for task in _tasks:
+        task.stop(timeout)
@@ -0,0 +1,358 @@
+"""
+Trazas de solicitudes con desglose por spans.
+
+Cada solicitud muestreada es una traza: un span raíz por la solicitud HTTP y
+spans hijos para la validación de la entrada, el handler de la ruta, cada
+función de servicio (`@trazar`), cada comando de MongoDB (listener de
+pymongo) y la serialización de la respuesta. El span en curso viaja en una
+ContextVar, así que los hijos se enlazan solos, también en el pool de hilos.
+
+- Propagación W3C: si la solicitud trae `traceparent`, la traza continúa con
+  ese trace id; la respuesta devuelve `traceparent` con el span raíz.
+- Muestreo: TRACING_SAMPLE_RATE (0-1) para todas las solicitudes, también las
+  que llegan con `traceparent`: un cliente no puede forzar trazas con la
+  bandera de muestreo. Solo se respeta la decisión de la cabecera si la
+  solicitud viene de TRACING_TRUSTED_PARENTS (IPs o redes, p. ej. el gateway).
+  Fuera de una traza muestreada, `span()` y `@trazar` no hacen nada más que
+  leer la ContextVar.
+- Exportadores: al terminar el span raíz la traza completa pasa al
+  exportador (`Exportador`). TRACING_EXPORTER=jsonl escribe un span por línea
+  en TRACING_JSONL_PATH desde un hilo propio; `paquete.modulo:Clase` carga un
+  exportador propio.
+"""
+
+import asyncio
+import contextvars
+import functools
+import importlib
+import ipaddress
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRACING_HABILITADO = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TASA_MUESTREO = float(os.getenv("TRACING_SAMPLE_RATE", "0.01"))
+EXPORTADOR = os.getenv("TRACING_EXPORTER", "jsonl")
+RUTA_JSONL = os.getenv("TRACING_JSONL_PATH", "traces.jsonl")
+# Orígenes cuya decisión de muestreo en `traceparent` se respeta: "10.0.0.0/8,127.0.0.1"
+ORIGENES_CONFIABLES = tuple(
+    ipaddress.ip_network(red.strip(), strict=False)
+    for red in os.getenv("TRACING_TRUSTED_PARENTS", "").split(",") if red.strip()
+)
+
+_MAX_SPANS_POR_TRAZA = 1000
+_MAX_TRAZAS_PENDIENTES = 1000
+
+
+class Span:
+    __slots__ = ("traza", "span_id", "padre_id", "nombre", "inicio_ns", "_inicio", "duracion_ms", "atributos", "error")
+
+    def __init__(self, traza: "Traza", nombre: str, padre_id: Optional[str], atributos: Optional[Dict[str, Any]] = None):
+        self.traza = traza
+        self.span_id = os.urandom(8).hex()
+        self.padre_id = padre_id
+        self.nombre = nombre
+        self.inicio_ns = time.time_ns()
+        self._inicio = time.perf_counter()
+        self.duracion_ms: Optional[float] = None
+        self.atributos = atributos or {}
+        self.error: Optional[str] = None
+
+    def terminar(self, duracion_ms: Optional[float] = None):
+        self.duracion_ms = duracion_ms if duracion_ms is not None else (time.perf_counter() - self._inicio) * 1000
+        self.traza.agregar(self)
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.traza.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.padre_id,
+            "name": self.nombre,
+            "start_time": datetime.fromtimestamp(self.inicio_ns / 1e9, tz=timezone.utc).isoformat(),
+            "duration_ms": round(self.duracion_ms, 3),
+            "attributes": self.atributos,
+            "error": self.error,
+        }
+
+
+class Traza:
+    """Spans terminados de una traza; se exporta al terminar su span raíz"""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List[Span] = []
+        self.descartados = 0
+        self._lock = threading.Lock()
+
+    def agregar(self, span: Span):
+        with self._lock:
+            if len(self.spans) < _MAX_SPANS_POR_TRAZA:
+                self.spans.append(span)
+            else:
+                self.descartados += 1
+
+
+_span_actual: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("span_actual", default=None)
+
+
+class _SpanNulo:
+    """Lo que devuelve `span()` fuera de una traza muestreada"""
+    atributos: Dict[str, Any] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_SPAN_NULO = _SpanNulo()
+
+
+class _SpanActivo:
+    __slots__ = ("span", "_token")
+
+    def __init__(self, span: Span):
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self._token = _span_actual.set(self.span)
+        return self.span
+
+    def __exit__(self, tipo, valor, tb):
+        if valor is not None:
+            self.span.error = f"{tipo.__name__}: {valor}"
+        _span_actual.reset(self._token)
+        self.span.terminar()
+        return False
+
+
+def span_actual() -> Optional[Span]:
+    return _span_actual.get()
+
+
+def span(nombre: str, **atributos):
+    """Span hijo del span en curso; no hace nada si la solicitud no se está trazando"""
+    padre = _span_actual.get()
+    if padre is None:
+        return _SPAN_NULO
+    return _SpanActivo(Span(padre.traza, nombre, padre.span_id, atributos))
+
+
+def iniciar_span(nombre: str, **atributos) -> Optional[Span]:
+    """Span hijo que se termina a mano (`span.terminar()`), para callbacks como los de pymongo"""
+    padre = _span_actual.get()
+    if padre is None:
+        return None
+    return Span(padre.traza, nombre, padre.span_id, atributos)
+
+
+def trazar(func: Optional[Callable] = None, *, nombre: Optional[str] = None):
+    """Decorador: un span por llamada, con el nombre `modulo.funcion`"""
+    def decorar(f):
+        etiqueta = nombre or f"{f.__module__.rsplit('.', 1)[-1]}.{f.__qualname__}"
+
+        if asyncio.iscoroutinefunction(f):
+            @functools.wraps(f)
+            async def envoltura_async(*args, **kwargs):
+                if _span_actual.get() is None:
+                    return await f(*args, **kwargs)
+                with span(etiqueta):
+                    return await f(*args, **kwargs)
+            return envoltura_async
+
+        @functools.wraps(f)
+        def envoltura(*args, **kwargs):
+            if _span_actual.get() is None:
+                return f(*args, **kwargs)
+            with span(etiqueta):
+                return f(*args, **kwargs)
+        return envoltura
+
+    return decorar(func) if func is not None else decorar
+
+
+# --- propagación y muestreo ---
+
+def _leer_traceparent(cabecera: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, parent_id, muestreado) de una cabecera W3C `traceparent` válida"""
+    if not cabecera:
+        return None
+    partes = cabecera.strip().split("-")
+    if len(partes) < 4 or len(partes[0]) != 2 or partes[0] == "ff":
+        return None
+    _, trace_id, padre_id, banderas = partes[:4]
+    try:
+        if len(trace_id) != 32 or len(padre_id) != 16 or int(trace_id, 16) == 0 or int(padre_id, 16) == 0:
+            return None
+        muestreado = bool(int(banderas[:2], 16) & 0x01)
+    except ValueError:
+        return None
+    return trace_id.lower(), padre_id.lower(), muestreado
+
+
+def traceparent(span: Span) -> str:
+    return f"00-{span.traza.trace_id}-{span.span_id}-01"
+
+
+def _origen_confiable(origen: Optional[str]) -> bool:
+    """Indica si la IP de origen está en TRACING_TRUSTED_PARENTS"""
+    if not origen or not ORIGENES_CONFIABLES:
+        return False
+    try:
+        direccion = ipaddress.ip_address(origen)
+    except ValueError:
+        return False
+    return any(direccion in red for red in ORIGENES_CONFIABLES)
+
+
+def iniciar_traza(
+    nombre: str, cabecera_traceparent: Optional[str] = None, origen: Optional[str] = None, **atributos
+) -> Optional[_SpanActivo]:
+    """
+    Span raíz de una solicitud, o None si no se muestrea. Con `traceparent` la
+    traza conserva el trace id entrante; la bandera de muestreo solo decide si
+    `origen` (IP del cliente) es de confianza, si no se aplica TASA_MUESTREO.
+    """
+    if not TRACING_HABILITADO:
+        return None
+    entrante = _leer_traceparent(cabecera_traceparent)
+    if entrante is not None:
+        trace_id, padre_id, muestreado = entrante
+        if not _origen_confiable(origen):
+            muestreado = random.random() < TASA_MUESTREO
+    else:
+        trace_id, padre_id = os.urandom(16).hex(), None
+        muestreado = random.random() < TASA_MUESTREO
+    if not muestreado:
+        return None
+    raiz = Span(Traza(trace_id), nombre, padre_id, atributos)
+    return _SpanRaiz(raiz)
+
+
+class _SpanRaiz(_SpanActivo):
+    def __exit__(self, tipo, valor, tb):
+        super().__exit__(tipo, valor, tb)
+        _exportar(self.span.traza)
+        return False
+
+
+# --- exportadores ---
+
+class Exportador:
+    """Recibe cada traza terminada; `exportar` no debe bloquear al llamador"""
+
+    def exportar(self, spans: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def cerrar(self):
+        pass
+
+
+class ExportadorJSONL(Exportador):
+    """Un span por línea en un archivo, escrito desde un hilo en segundo plano"""
+
+    def __init__(self, ruta: str = RUTA_JSONL):
+        self.ruta = ruta
+        self._pendientes: "queue.Queue[Optional[List[Dict[str, Any]]]]" = queue.Queue(_MAX_TRAZAS_PENDIENTES)
+        self._hilo = threading.Thread(target=self._escribir, name="trace-exporter", daemon=True)
+        self._hilo.start()
+
+    def exportar(self, spans: List[Dict[str, Any]]):
+        try:
+            self._pendientes.put_nowait(spans)
+        except queue.Full:
+            logger.warning("Cola del exportador de trazas llena: traza descartada")
+
+    def _escribir(self):
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        with open(self.ruta, "a", encoding="utf-8") as archivo:
+            while True:
+                spans = self._pendientes.get()
+                if spans is None:
+                    break
+                # Una sola escritura por traza: las líneas de varios workers no se mezclan
+                archivo.write("".join(json.dumps(s, default=str, ensure_ascii=False) + "\n" for s in spans))
+                archivo.flush()
+
+    def cerrar(self):
+        self._pendientes.put(None)
+        self._hilo.join(timeout=5)
+
+
+_exportador: Optional[Exportador] = None
+
+
+def _crear_exportador(nombre: str) -> Optional[Exportador]:
+    if nombre in ("", "none"):
+        return None
+    if nombre == "jsonl":
+        return ExportadorJSONL(RUTA_JSONL)
+    modulo, _, clase = nombre.partition(":")
+    return getattr(importlib.import_module(modulo), clase)()
+
+
+def configurar_exportador(exportador: Optional[Exportador]):
+    """Sustituir el exportador (cierra el anterior)"""
+    global _exportador
+    anterior, _exportador = _exportador, exportador
+    if anterior is not None:
+        anterior.cerrar()
+
+
+def _exportar(traza: Traza):
+    global _exportador
+    if _exportador is None:
+        if not EXPORTADOR or EXPORTADOR == "none":
+            return
+        configurar_exportador(_crear_exportador(EXPORTADOR))
+    if traza.descartados:
+        logger.warning(f"Traza {traza.trace_id}: {traza.descartados} spans descartados (máximo {_MAX_SPANS_POR_TRAZA})")
+    _exportador.exportar([s.como_dict() for s in traza.spans])
+
+
+def cerrar():
+    configurar_exportador(None)
+
+
+# --- FastAPI ---
+
+def instrumentar_fastapi():
+    """
+    Spans para la validación de la entrada, el handler y la serialización de
+    la respuesta, envolviendo las funciones que usa el request handler de
+    FastAPI para cada ruta
+    """
+    from fastapi import routing
+
+    if getattr(routing, "_trazado", False):
+        return
+
+    resolver, ejecutar, serializar = routing.solve_dependencies, routing.run_endpoint_function, routing.serialize_response
+
+    async def solve_dependencies(*args, **kwargs):
+        with span("validate request"):
+            return await resolver(*args, **kwargs)
+
+    async def run_endpoint_function(*, dependant, values, is_coroutine):
+        with span(f"handler {dependant.call.__name__}"):
+            return await ejecutar(dependant=dependant, values=values, is_coroutine=is_coroutine)
+
+    async def serialize_response(*args, **kwargs):
+        with span("serialize response"):
+            return await serializar(*args, **kwargs)
+
+    routing.solve_dependencies = solve_dependencies
+    routing.run_endpoint_function = run_endpoint_function
+    routing.serialize_response = serialize_response
+    routing._trazado = True
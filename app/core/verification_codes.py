@@ -0,0 +1,203 @@
+"""
+Códigos de verificación firmados para diplomas.
+
+Un código firmado lleva dentro el id del diploma y su fecha de vencimiento,
+firmados con HMAC-SHA256 o Ed25519, así que su autenticidad y vigencia se
+comprueban solo con CPU. La base de datos solo hace falta para saber si el
+diploma fue revocado (eliminado).
+
+Formato: ``RC2-`` + Base32 sin relleno de::
+
+    kid (1 byte) | uuid del diploma (16 bytes) | vencimiento epoch UTC (4 bytes, 0 = no vence) | firma
+
+El vencimiento sin signo de 4 bytes llega hasta 2106-02-07; una fecha
+posterior se emite como ese máximo, que en la práctica equivale a no vencer.
+
+La firma cubre los 21 bytes anteriores: HMAC-SHA256 truncado a 12 bytes o
+una firma Ed25519 de 64 bytes. Con Ed25519 la clave pública se publica en
+``GET /diplomas/clave-publica`` y un tercero puede validar códigos sin
+acceso a la API::
+
+    claves = {kid: ClaveFirma.ed25519_publica(kid, clave_publica_base64)}
+    verificado = verificar_codigo(codigo, claves)
+
+Este módulo solo depende de la biblioteca estándar; Ed25519 requiere el
+paquete opcional ``cryptography``. Los códigos antiguos (``RC-XXXXXXXX``)
+no llevan firma y se siguen verificando contra la base de datos.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import struct
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+PREFIJO = "RC2-"
+ALGORITMO_HMAC = "hmac"
+ALGORITMO_ED25519 = "ed25519"
+
+_CABECERA = struct.Struct(">B16sI")
+VENCIMIENTO_MAXIMO_EPOCH = 2 ** 32 - 1
+_LONGITUD_FIRMA = {ALGORITMO_HMAC: 12, ALGORITMO_ED25519: 64}
+
+
+@dataclass(frozen=True)
+class ClaveFirma:
+    """Clave identificada por `kid`; `privada` es None en claves solo de verificación"""
+    kid: int
+    algoritmo: str
+    privada: Any = None
+    publica: Any = None
+
+    @property
+    def puede_firmar(self) -> bool:
+        return self.privada is not None
+
+    @classmethod
+    def hmac(cls, kid: int, secreto: str) -> "ClaveFirma":
+        clave = secreto.encode("utf-8")
+        return cls(kid=kid, algoritmo=ALGORITMO_HMAC, privada=clave, publica=clave)
+
+    @classmethod
+    def ed25519_privada(cls, kid: int, semilla_base64: str) -> "ClaveFirma":
+        ed25519 = _importar_ed25519()
+        privada = ed25519.Ed25519PrivateKey.from_private_bytes(base64.b64decode(semilla_base64))
+        return cls(kid=kid, algoritmo=ALGORITMO_ED25519, privada=privada, publica=privada.public_key())
+
+    @classmethod
+    def ed25519_publica(cls, kid: int, publica_base64: str) -> "ClaveFirma":
+        ed25519 = _importar_ed25519()
+        publica = ed25519.Ed25519PublicKey.from_public_bytes(base64.b64decode(publica_base64))
+        return cls(kid=kid, algoritmo=ALGORITMO_ED25519, publica=publica)
+
+    def publica_base64(self) -> Optional[str]:
+        """Clave pública publicable (solo Ed25519; un secreto HMAC nunca se publica)"""
+        if self.algoritmo != ALGORITMO_ED25519:
+            return None
+        from cryptography.hazmat.primitives import serialization
+        raw = self.publica.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        return base64.b64encode(raw).decode("ascii")
+
+
+@dataclass(frozen=True)
+class CodigoVerificado:
+    """Contenido de un código cuya firma es válida"""
+    diploma_id: str
+    kid: int
+    vencimiento_epoch: int
+
+    @property
+    def fecha_vencimiento(self) -> Optional[datetime]:
+        return datetime.fromtimestamp(self.vencimiento_epoch) if self.vencimiento_epoch else None
+
+    @property
+    def esta_vencido(self) -> bool:
+        return bool(self.vencimiento_epoch) and time.time() > self.vencimiento_epoch
+
+
+def _importar_ed25519():
+    try:
+        from cryptography.hazmat.primitives.asymmetric import ed25519
+    except ImportError as e:
+        raise RuntimeError("Ed25519 requiere el paquete 'cryptography' (pip install cryptography)") from e
+    return ed25519
+
+
+def _firmar(clave: ClaveFirma, mensaje: bytes) -> bytes:
+    if clave.algoritmo == ALGORITMO_HMAC:
+        return hmac.new(clave.privada, mensaje, hashlib.sha256).digest()[:_LONGITUD_FIRMA[ALGORITMO_HMAC]]
+    return clave.privada.sign(mensaje)
+
+
+def _firma_valida(clave: ClaveFirma, mensaje: bytes, firma: bytes) -> bool:
+    if clave.algoritmo == ALGORITMO_HMAC:
+        esperada = hmac.new(clave.publica, mensaje, hashlib.sha256).digest()[:_LONGITUD_FIRMA[ALGORITMO_HMAC]]
+        return hmac.compare_digest(esperada, firma)
+    try:
+        clave.publica.verify(firma, mensaje)
+        return True
+    except Exception:
+        return False
+
+
+def es_codigo_firmado(codigo: str) -> bool:
+    return codigo.startswith(PREFIJO)
+
+
+def emitir_codigo(diploma_id: str, fecha_vencimiento: Optional[datetime], clave: ClaveFirma) -> str:
+    """Emitir el código firmado de un diploma"""
+    vencimiento = 0
+    if fecha_vencimiento is not None:
+        vencimiento = int(fecha_vencimiento.timestamp())
+        if vencimiento <= 0:
+            raise ValueError(f"Fecha de vencimiento fuera del rango del código: {fecha_vencimiento}")
+        vencimiento = min(vencimiento, VENCIMIENTO_MAXIMO_EPOCH)
+    mensaje = _CABECERA.pack(clave.kid, uuid.UUID(diploma_id).bytes, vencimiento)
+    contenido = mensaje + _firmar(clave, mensaje)
+    return PREFIJO + base64.b32encode(contenido).decode("ascii").rstrip("=")
+
+
+def verificar_codigo(codigo: str, claves: Dict[int, ClaveFirma]) -> Optional[CodigoVerificado]:
+    """Comprobar la firma de un código; None si no es auténtico o está mal formado"""
+    if not es_codigo_firmado(codigo):
+        return None
+    cuerpo = codigo[len(PREFIJO):].upper()
+    if len(cuerpo) > 160:
+        return None
+    try:
+        contenido = base64.b32decode(cuerpo + "=" * (-len(cuerpo) % 8))
+    except (ValueError, TypeError):
+        return None
+    if len(contenido) <= _CABECERA.size:
+        return None
+
+    mensaje, firma = contenido[:_CABECERA.size], contenido[_CABECERA.size:]
+    kid, diploma_uuid, vencimiento = _CABECERA.unpack(mensaje)
+    clave = claves.get(kid)
+    if clave is None or len(firma) != _LONGITUD_FIRMA[clave.algoritmo]:
+        return None
+    if not _firma_valida(clave, mensaje, firma):
+        return None
+
+    return CodigoVerificado(diploma_id=str(uuid.UUID(bytes=diploma_uuid)), kid=kid, vencimiento_epoch=vencimiento)
+
+
+def _cargar_clave(kid: int, algoritmo: str, valor: str, privada: bool) -> ClaveFirma:
+    if algoritmo == ALGORITMO_HMAC:
+        return ClaveFirma.hmac(kid, valor)
+    if algoritmo == ALGORITMO_ED25519:
+        return ClaveFirma.ed25519_privada(kid, valor) if privada else ClaveFirma.ed25519_publica(kid, valor)
+    raise ValueError(f"Algoritmo de firma no soportado: {algoritmo}")
+
+
+def cargar_claves_desde_entorno() -> Tuple[Optional[ClaveFirma], Dict[int, ClaveFirma]]:
+    """
+    Leer la clave de firma activa y las claves de verificación del entorno:
+
+    - DIPLOMA_SIGNING_ALGORITHM: hmac (por defecto) o ed25519
+    - DIPLOMA_SIGNING_KEY: secreto HMAC o semilla Ed25519 de 32 bytes en Base64
+    - DIPLOMA_SIGNING_KEY_ID: identificador (0-255) incluido en cada código
+    - DIPLOMA_VERIFICATION_KEYS: claves anteriores solo para verificar,
+      "kid:algoritmo:clave" separadas por comas (clave pública en Ed25519)
+
+    Sin DIPLOMA_SIGNING_KEY no hay clave activa y se emiten códigos sin firma.
+    """
+    claves: Dict[int, ClaveFirma] = {}
+    for entrada in filter(None, (e.strip() for e in os.getenv("DIPLOMA_VERIFICATION_KEYS", "").split(","))):
+        kid, algoritmo, valor = entrada.split(":", 2)
+        clave = _cargar_clave(int(kid), algoritmo.strip().lower(), valor.strip(), privada=False)
+        claves[clave.kid] = clave
+
+    activa = None
+    secreto = os.getenv("DIPLOMA_SIGNING_KEY")
+    if secreto:
+        algoritmo = os.getenv("DIPLOMA_SIGNING_ALGORITHM", ALGORITMO_HMAC).strip().lower()
+        activa = _cargar_clave(int(os.getenv("DIPLOMA_SIGNING_KEY_ID", "1")), algoritmo, secreto, privada=True)
+        claves[activa.kid] = activa
+
+    return activa, claves
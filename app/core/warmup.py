@@ -0,0 +1,167 @@
+"""
+Calentamiento del worker al arrancar.
+
+Tras un despliegue, las primeras solicitudes pagaban la apertura de
+conexiones, la carga de cachés vacías y el esquema OpenAPI. El calentamiento
+lo hace antes de recibir tráfico, en un hilo para no retrasar el arranque del
+servidor ni la sonda de liveness:
+
+1. `esquemas`: genera el esquema OpenAPI y valida y serializa los modelos
+   principales una vez.
+2. `catalogo_logros`: carga el catálogo de plantillas de `achievements_master`.
+3. `plantillas_diplomas`: carga el índice de `plantillas_diplomas`.
+4. `estadisticas_diplomas`: calcula los acumulados por curso, tipo y mes.
+5. `conexiones`: espera a que el pool tenga MONGO_MIN_POOL_SIZE conexiones
+   abiertas (pymongo las abre en segundo plano mientras corren los pasos
+   anteriores).
+
+`/health/ready` no se pone en verde hasta que termina o se cumple
+WARMUP_TIMEOUT_SECONDS; un paso que falla se registra y no bloquea los demás.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pymongo
+
+logger = logging.getLogger(__name__)
+
+HABILITADO = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+PLAZO_SEGUNDOS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "30"))
+
+_lock = threading.Lock()
+_inicio: Optional[float] = None
+_plazo = PLAZO_SEGUNDOS
+_terminado = threading.Event()
+_pasos: Dict[str, Dict[str, Any]] = {}
+
+
+def _conexiones(limite: float) -> Dict[str, Any]:
+    from app.DB import monitoring
+    from app.DB.database import MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, get_client
+
+    minimo = min(MONGO_MIN_POOL_SIZE, MONGO_MAX_POOL_SIZE) if MONGO_MAX_POOL_SIZE else MONGO_MIN_POOL_SIZE
+    # Con el pool listo, pymongo abre en segundo plano las conexiones hasta minPoolSize
+    with pymongo.timeout(max(0.1, limite - time.monotonic())):
+        get_client().admin.command("ping")
+    if minimo <= 0 or monitoring.pool_listener is None:
+        return {"minimo": minimo}
+
+    def abiertas() -> int:
+        return max(monitoring.pool_listener.abiertas.values(), default=0)
+
+    while abiertas() < minimo and time.monotonic() < limite:
+        time.sleep(0.05)
+    return {"minimo": minimo, "abiertas": abiertas()}
+
+
+def _esquemas(app) -> Dict[str, Any]:
+    from app.models.achievement import Achievement
+    from app.models.student import Student
+
+    if app is not None:
+        app.openapi()
+    estudiante = Student(
+        email="calentamiento@example.com",
+        achievements=[Achievement(
+            email="calentamiento@example.com", achievement_name="calentamiento",
+            course_id="calentamiento", title="Calentamiento", score=90, total_points=100
+        )]
+    )
+    estudiante.get_achievement_stats().dict()
+    estudiante.dict()
+    return {"rutas": len(app.routes) if app is not None else 0}
+
+
+def _catalogo_logros() -> Dict[str, Any]:
+    from app.services import achievement_master_service
+    if achievement_master_service.achievements_master_collection is None:
+        return {"omitido": "sin conexión a MongoDB"}
+    return {"cursos": achievement_master_service.preload_catalog()}
+
+
+def _plantillas_diplomas() -> Dict[str, Any]:
+    from app.services import eligibility_service
+    return {"plantillas": eligibility_service.precargar_plantillas()}
+
+
+def _estadisticas_diplomas() -> Dict[str, Any]:
+    from app.services import diploma_service
+    if diploma_service.diplomas_collection is None:
+        return {"omitido": "sin conexión a MongoDB"}
+    estadisticas = diploma_service.obtener_estadisticas_diplomas()
+    return {"cursos": len(estadisticas.get("estadisticas_por_curso", []))}
+
+
+def _pasos_calentamiento(app, limite: float) -> List[Tuple[str, Callable[[], Dict[str, Any]]]]:
+    return [
+        ("esquemas", lambda: _esquemas(app)),
+        ("catalogo_logros", _catalogo_logros),
+        ("plantillas_diplomas", _plantillas_diplomas),
+        ("estadisticas_diplomas", _estadisticas_diplomas),
+        ("conexiones", lambda: _conexiones(limite)),
+    ]
+
+
+def calentar(app=None, plazo: float = PLAZO_SEGUNDOS) -> Dict[str, Dict[str, Any]]:
+    """Ejecutar los pasos en orden; los que no empiezan antes del plazo se omiten"""
+    limite = time.monotonic() + plazo
+    for nombre, paso in _pasos_calentamiento(app, limite):
+        if time.monotonic() >= limite:
+            resultado = {"ok": False, "error": "Plazo de calentamiento agotado"}
+        else:
+            inicio = time.perf_counter()
+            try:
+                resultado = {"ok": True, **paso()}
+            except Exception as e:
+                logger.warning(f"Warm-up step {nombre} failed: {e}")
+                resultado = {"ok": False, "error": str(e)[:200]}
+            resultado["duracion_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        with _lock:
+            _pasos[nombre] = resultado
+    return dict(_pasos)
+
+
+def _ejecutar(app, plazo: float):
+    inicio = time.perf_counter()
+    try:
+        calentar(app, plazo)
+    finally:
+        _terminado.set()
+    fallidos = [n for n, r in _pasos.items() if not r["ok"]]
+    logger.info(
+        f"Warm-up finished in {time.perf_counter() - inicio:.2f}s"
+        + (f" (failed: {', '.join(fallidos)})" if fallidos else "")
+    )
+
+
+def iniciar(app=None, plazo: float = PLAZO_SEGUNDOS):
+    """Lanzar el calentamiento en segundo plano (arranque de la aplicación)"""
+    global _inicio, _plazo
+    _inicio, _plazo = time.monotonic(), plazo
+    if not HABILITADO:
+        _terminado.set()
+        return
+    threading.Thread(target=_ejecutar, args=(app, plazo), name="warmup", daemon=True).start()
+
+
+def completado() -> bool:
+    """Terminado, desactivado o con el plazo cumplido (un paso colgado no retiene el tráfico)"""
+    if _terminado.is_set() or not HABILITADO:
+        return True
+    return _inicio is not None and time.monotonic() - _inicio >= _plazo
+
+
+def estado() -> Dict[str, Any]:
+    with _lock:
+        pasos = dict(_pasos)
+    if not HABILITADO:
+        return {"estado": "desactivado", "pasos": pasos}
+    if _terminado.is_set():
+        return {"estado": "completado", "pasos": pasos}
+    if completado():
+        return {"estado": "plazo_agotado", "pasos": pasos}
+    return {"estado": "en_curso" if _inicio is not None else "pendiente", "pasos": pasos}
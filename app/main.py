@@ -1,26 +1,72 @@
-from fastapi import FastAPI, Request, Request
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Match
 import uvicorn
 import time
+from datetime import datetime, timezone
+import logging
+from contextlib import asynccontextmanager, nullcontext
 from app.api.achievements import router as achievements_router, admin_router
 from app.api.diplomas import router as diplomas_router
+from app.api.admin import router as diagnostics_router, token_admin_valido
 from app.models import StandardResponse
 from app.models.exceptions import (
     AchievementError, AchievementNotFound, StudentNotFound,
     InvalidAchievementData, DatabaseConnectionError
 )
 from fastapi.responses import Response
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
-from app.core.metrics import REQUEST_COUNT, RESPONSE_TIME, ERROR_COUNT
+from prometheus_client import CONTENT_TYPE_LATEST
+from app.core.metrics import (
+    REQUEST_COUNT, RESPONSE_TIME, ERROR_COUNT, REQUESTS_IN_PROGRESS, UNMATCHED_ENDPOINT,
+    status_class, render_latest
+)
+from app.core import tasks, profiling, memory_profiling, tracing, health, shutdown, warmup
+from app.DB.database import cerrar_cliente
+from app.core.runtime_monitor import monitor as runtime_monitor
+from app.services import certificate_service
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks.start_all()
+    warmup.iniciar(app)
+    runtime_monitor.start(app)
+    if memory_profiling.TRAZAR_AL_ARRANCAR:
+        memory_profiling.iniciar()
+
+    yield
+
+    # Apagado ordenado (ver app/core/shutdown.py): drenar solicitudes e hilos,
+    # detener las tareas, vaciar las colas pendientes y cerrar el pool de MongoDB
+    inicio = time.monotonic()
+    pendiente = await shutdown.drenar()
+    await runtime_monitor.stop()
+    tasks.stop_all(timeout=5)
+    restante = max(1.0, shutdown.PLAZO_SEGUNDOS - (time.monotonic() - inicio))
+    certificate_service.cerrar(plazo=restante)
+    tracing.cerrar()
+    cerrar_cliente()
+    logger.info(
+        f"Shutdown complete in {time.monotonic() - inicio:.1f}s "
+        f"(cancelled requests: {pendiente['canceladas']}, running thread jobs: {pendiente['hilos']})"
+    )
 
 app = FastAPI(
-    title="RavenCode Achievements API",
-    description="API para gestionar logros de estudiantes en RavenCode",
-    version="1.0.0"
+    lifespan=lifespan,
+    title="RavenCode Achievements & Diplomas API",
+    description="API para gestionar logros y diplomas de estudiantes en RavenCode Colombia",
+    version="2.1.0",
+    docs_url="/docs",
+    redoc_url="/redoc"
 )
 
-# Configurar CORS
+# Spans de validación, handler y serialización (TRACING_ENABLED)
+if tracing.TRACING_HABILITADO:
+    tracing.instrumentar_fastapi()
+
+# Configuración CORS para desarrollo
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # En producción, especificar dominios exactos
@@ -69,36 +115,110 @@ async def database_connection_error_handler(request: Request, exc: DatabaseConne
 app.include_router(achievements_router)
 app.include_router(admin_router)  # Include admin router separately
 app.include_router(diplomas_router)
+app.include_router(diagnostics_router)
+
+# Durante el apagado, las solicitudes que aún lleguen se rechazan con 503 y
+# `Connection: close` para que el cliente reintente contra otro worker
+@app.middleware("http")
+async def drain_requests(request, call_next):
+    if shutdown.drenando():
+        return JSONResponse(
+            status_code=503,
+            content=StandardResponse.error_response(message="Servicio apagándose, reintente").dict(),
+            headers={"Connection": "close", "Retry-After": "1"}
+        )
+    tarea = shutdown.registrar_solicitud()
+    try:
+        return await call_next(request)
+    finally:
+        shutdown.terminar_solicitud(tarea)
+
+# Perfilado determinista de una solicitud con ?profile=1 (PROFILING_ENABLED y
+# X-Admin-Token); la respuesta es el informe de cProfile en lugar del cuerpo
+@app.middleware("http")
+async def profile_request(request, call_next):
+    if (
+        request.query_params.get("profile") != "1"
+        or not profiling.PROFILING_HABILITADO
+        or not token_admin_valido(request.headers.get("x-admin-token"))
+    ):
+        return await call_next(request)
+
+    try:
+        with profiling.PerfilSolicitud() as perfil:
+            response = await call_next(request)
+            # Consumir el cuerpo dentro del perfil: incluye la serialización
+            async for _ in response.body_iterator:
+                pass
+    except profiling.PerfiladoOcupado as e:
+        return JSONResponse(status_code=409, content=StandardResponse.error_response(message=str(e)).dict())
+
+    return PlainTextResponse(
+        perfil.reporte(orden=request.query_params.get("profile_sort", "cumulative")),
+        headers={"X-Profiled-Status": str(response.status_code)}
+    )
+
+def route_template(scope) -> str:
+    """Plantilla de la ruta que atenderá la solicitud (la etiqueta `endpoint`)"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", None) or UNMATCHED_ENDPOINT
+    return UNMATCHED_ENDPOINT
 
 # Middleware para registrar métricas
 @app.middleware("http")
 async def record_metrics(request, call_next):
     method = request.method
-    endpoint = request.url.path
 
-    # Registrar la hora de inicio para medir el tiempo de respuesta
-    start_time = time.time()
+    # La ruta se resuelve antes de atenderla para contar las solicitudes en curso
+    endpoint = route_template(request.scope)
+    in_progress = REQUESTS_IN_PROGRESS.labels(method=method, endpoint=endpoint)
+    in_progress.inc()
+    memory = memory_profiling.iniciar_medicion(endpoint)
+
+    # Reloj monótono: no le afectan los ajustes de la hora del sistema
+    start_time = time.perf_counter()
+
+    # Span raíz de la traza, si la solicitud se muestrea
+    root = tracing.iniciar_traza(
+        f"{method} {endpoint}", request.headers.get("traceparent"),
+        origen=request.client.host if request.client else None,
+        **{"http.method": method, "http.route": endpoint}
+    )
 
     # Continuar con la solicitud
-    response = await call_next(request)
+    try:
+        with root or nullcontext() as span:
+            response = await call_next(request)
+            if span is not None:
+                span.atributos["http.status_code"] = response.status_code
+                response.headers["traceparent"] = tracing.traceparent(span)
+    finally:
+        in_progress.dec()
+        memory_profiling.terminar_medicion(memory, method, endpoint)
 
     # Medir tiempo de respuesta
-    duration = time.time() - start_time
-    RESPONSE_TIME.labels(method=method, endpoint=endpoint).observe(duration)
+    duration = time.perf_counter() - start_time
+
+    status = status_class(response.status_code)
+
+    RESPONSE_TIME.labels(method=method, endpoint=endpoint, status=status).observe(duration)
 
     # Incrementar contador de peticiones
-    REQUEST_COUNT.labels(method=method, endpoint=endpoint).inc()
+    REQUEST_COUNT.labels(method=method, endpoint=endpoint, status=status).inc()
 
     # Si hay un error (código de estado >= 400), aumentar el contador de errores
     if response.status_code >= 400:
-        ERROR_COUNT.labels(method=method, endpoint=endpoint).inc()
+        ERROR_COUNT.labels(method=method, endpoint=endpoint, status=status).inc()
 
     return response
 
 # Ruta para exponer las métricas en formato Prometheus
+# (agregadas de todos los workers si PROMETHEUS_MULTIPROC_DIR está definido)
 @app.get("/metrics")
 async def metrics():
-    data = generate_latest()
+    data = render_latest()
     return Response(content=data, media_type=CONTENT_TYPE_LATEST)
 
 @app.get("/")
@@ -115,7 +235,9 @@ async def root():
                 "achievements": "/achievements",
                 "admin_achievements": "/admin/achievements",
                 "diplomas": "/diplomas",
-                "health": "/health"
+                "health": "/health",
+                "liveness": "/health/live",
+                "readiness": "/health/ready"
             }
         },
         message="Bienvenido a RavenCode Achievements & Diplomas API Colombia"
@@ -123,118 +245,46 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    # Siempre 200, para monitores que solo comprueban que la API responde;
+    # el estado real de las dependencias está en /health/ready
+    estado = health.listo()
     return StandardResponse.success_response(
         data={
-            "status": "healthy",
+            "status": "healthy" if estado["listo"] else "degraded",
             "version": "2.1.0",
             "sistema": "Colombia",
-            "timestamp": "2024-01-01T00:00:00Z"
+            "timestamp": datetime.now(timezone.utc).isoformat()
         },
         message="Servicio funcionando correctamente"
     )
 
-if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8003) from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import uvicorn
-from app.api.achievements import router as achievements_router, admin_router
-from app.api.diplomas import router as diplomas_router
-from app.models import StandardResponse
-from app.models.exceptions import (
-    AchievementError, AchievementNotFound, StudentNotFound,
-    InvalidAchievementData, DatabaseConnectionError
-)
-
-app = FastAPI(
-    title="RavenCode Achievements & Diplomas API",
-    description="API para gestionar logros y diplomas de estudiantes en RavenCode Colombia",
-    version="2.1.0",
-    docs_url="/docs",
-    redoc_url="/redoc"
-)
-
-# Configuración CORS para desarrollo
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # En producción, especificar dominios exactos
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@app.get("/health/live")
+async def liveness():
+    """Liveness: el proceso responde. No consulta ninguna dependencia."""
+    return StandardResponse.success_response(data=health.vivo(), message="Proceso activo")
 
-# Global Exception Handlers
-@app.exception_handler(AchievementError)
-async def achievement_error_handler(request: Request, exc: AchievementError):
-    return JSONResponse(
-        status_code=400,
-        content=StandardResponse.error_response(message=str(exc)).dict()
-    )
-
-@app.exception_handler(AchievementNotFound)
-async def achievement_not_found_handler(request: Request, exc: AchievementNotFound):
-    return JSONResponse(
-        status_code=404,
-        content=StandardResponse.error_response(message=str(exc)).dict()
-    )
-
-@app.exception_handler(StudentNotFound)
-async def student_not_found_handler(request: Request, exc: StudentNotFound):
-    return JSONResponse(
-        status_code=404,
-        content=StandardResponse.error_response(message=str(exc)).dict()
-    )
-
-@app.exception_handler(InvalidAchievementData)
-async def invalid_achievement_data_handler(request: Request, exc: InvalidAchievementData):
-    return JSONResponse(
-        status_code=422,
-        content=StandardResponse.error_response(message=str(exc)).dict()
-    )
-
-@app.exception_handler(DatabaseConnectionError)
-async def database_connection_error_handler(request: Request, exc: DatabaseConnectionError):
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness: último resultado de las comprobaciones periódicas (ping a
+    MongoDB, saturación del pool, lag del event loop). 503 si no está listo.
+    La sonda no consulta MongoDB: solo lee el resultado en memoria.
+    """
+    estado = health.listo()
+    data = {
+        "ready": estado["listo"],
+        "checked_at": estado["fecha"].isoformat() if estado["fecha"] else None,
+        "checks": estado["comprobaciones"],
+        "warmup": warmup.estado(),
+    }
+    if estado["listo"]:
+        return StandardResponse.success_response(data=data, message="Servicio listo")
     return JSONResponse(
         status_code=503,
-        content=StandardResponse.error_response(message=str(exc)).dict()
-    )
-
-# Include routers
-app.include_router(achievements_router)
-app.include_router(admin_router)  # Include admin router separately
-app.include_router(diplomas_router)
-
-@app.get("/")
-async def root():
-    return StandardResponse.success_response(
-        data={
-            "api": "RavenCode Achievements & Diplomas API",
-            "version": "2.1.0",
-            "status": "running",
-            "pais": "Colombia",
-            "sistema_notas": "Escala 1.0-5.0",
-            "docs_url": "/docs",
-            "endpoints": {
-                "achievements": "/achievements",
-                "admin_achievements": "/admin/achievements",
-                "diplomas": "/diplomas",
-                "health": "/health"
-            }
-        },
-        message="Bienvenido a RavenCode Achievements & Diplomas API Colombia"
-    )
-
-@app.get("/health")
-async def health_check():
-    return StandardResponse.success_response(
-        data={
-            "status": "healthy",
-            "version": "2.1.0",
-            "sistema": "Colombia",
-            "timestamp": "2024-01-01T00:00:00Z"
-        },
-        message="Servicio funcionando correctamente"
+        content=StandardResponse.error_response(
+            message=estado.get("motivo") or "Servicio no listo", data=data
+        ).dict()
     )
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8003) 
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8003)
\ No newline at end of file
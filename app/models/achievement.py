@@ -1,7 +1,25 @@
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter, model_validator
+from pydantic.networks import validate_email
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
+from functools import lru_cache
+
+# Validated addresses memoized per process: a student document repeats its
+# email in every achievement and email-validator costs tens of microseconds
+# per call, far more than the rest of the achievement validation
+EMAIL_CACHE_SIZE = 65536
+
+@lru_cache(maxsize=EMAIL_CACHE_SIZE)
+def _normalized_email(value: str) -> str:
+    return validate_email(value)[1]
+
+class CachedEmailStr(EmailStr):
+    """EmailStr with memoized validation: same normalization, errors and JSON schema"""
+    
+    @classmethod
+    def _validate(cls, __input_value: str) -> str:
+        return _normalized_email(__input_value)
 
 class CategoryEnum(str, Enum):
     learning = "learning"
@@ -47,7 +65,7 @@ class AchievementMetadata(BaseModel):
 class Achievement(BaseModel):
     """Achievement record matching frontend ApiAchievementRecord interface"""
     id: Optional[str] = None
-    email: EmailStr = Field(..., description="User email - links achievement to user")
+    email: CachedEmailStr = Field(..., description="User email - links achievement to user")
     achievement_name: str = Field(..., description="Unique identifier for the achievement type")
     course_id: str = Field(..., description="Course this achievement belongs to")
     title: str = Field(..., description="Display title")
@@ -60,47 +78,38 @@ class Achievement(BaseModel):
     achieved: Optional[bool] = Field(False, description="Whether the achievement has been earned")
     metadata: Optional[AchievementMetadata] = Field(None, description="Additional achievement data")
     
-    @validator('percentage', always=True)
-    def calculate_percentage(cls, v, values):
-        """Auto-calculate percentage if score and total_points are provided"""
-        if v is None and 'score' in values and 'total_points' in values:
-            score = values.get('score')
-            total_points = values.get('total_points')
-            if score is not None and total_points is not None and total_points > 0:
-                return round((score / total_points) * 100, 2)
-        return v
-    
-    @validator('achieved', always=True)
-    def determine_achieved(cls, v, values):
-        """Auto-determine achieved status based on percentage"""
-        percentage = values.get('percentage')
-        if percentage is not None and percentage >= 80:
-            return True
-        return v
-    
-    @validator('status', always=True)
-    def set_status_based_on_achieved(cls, v, values):
-        """Set status based on achieved and percentage"""
-        achieved = values.get('achieved', False)
-        percentage = values.get('percentage')
+    @model_validator(mode="after")
+    def derive_progress_fields(self) -> "Achievement":
+        """
+        Derive percentage, achieved, status and date_earned in a single pass.
+        
+        Matches the former per-field validators, which ran in field order:
+        status and date_earned were validated before achieved, so both saw
+        achieved as False (status never becomes completed here and date_earned
+        is always cleared). Values are written to __dict__ so derived fields
+        don't count as explicitly set.
+        """
+        values = self.__dict__
         
-        if achieved and percentage is not None and percentage >= 80:
-            return StatusEnum.completed
-        elif percentage is not None and percentage > 0:
-            return StatusEnum.in_progress
+        # Auto-calculate percentage if not provided
+        percentage = values["percentage"]
+        if percentage is None and self.total_points > 0:
+            percentage = values["percentage"] = round((self.score / self.total_points) * 100, 2)
+        
+        values["date_earned"] = None
+        
+        if percentage is not None and percentage > 0:
+            values["status"] = StatusEnum.in_progress
         elif percentage is not None and percentage == 0:
-            return StatusEnum.failed
-        return v or StatusEnum.pending
-    
-    @validator('date_earned', always=True)
-    def set_date_earned(cls, v, values):
-        """Set date_earned when achievement is achieved"""
-        achieved = values.get('achieved', False)
-        if achieved and v is None:
-            return datetime.now()
-        elif not achieved:
-            return None
-        return v
+            values["status"] = StatusEnum.failed
+        else:
+            values["status"] = values["status"] or StatusEnum.pending
+        
+        # Auto-determine achieved status based on percentage
+        if percentage is not None and percentage >= 80:
+            values["achieved"] = True
+        
+        return self
 
 class AchievementStats(BaseModel):
     """Achievement statistics matching frontend interface"""
@@ -123,7 +132,7 @@ class AchievementInput(BaseModel):
 
 class AchievementUpdateRequest(BaseModel):
     """Request to create/update an achievement matching frontend interface"""
-    email: EmailStr = Field(..., description="User email")
+    email: CachedEmailStr = Field(..., description="User email")
     achievement: AchievementInput = Field(..., description="Achievement definition")
     score: float = Field(..., description="User's score")
     total_points: float = Field(..., description="Maximum possible points")
@@ -145,24 +154,29 @@ class AvailableAchievement(BaseModel):
 
 class UserAchievementResponse(BaseModel):
     """User achievement data response matching frontend interface"""
-    email: EmailStr = Field(..., description="User email")
+    email: CachedEmailStr = Field(..., description="User email")
     achievements: List[Achievement] = Field(..., description="All achievements for this user")
     stats: Optional[AchievementStats] = Field(None, description="Optional statistics")
 
 class AdminAchievementRecord(Achievement):
     """Admin-specific achievement record with additional fields"""
     user_name: Optional[str] = Field(None, description="User's display name")
-    user_email: EmailStr = Field(..., description="User's email (explicit)")
+    user_email: CachedEmailStr = Field(..., description="User's email (explicit)")
     created_at: Optional[datetime] = Field(None, description="When achievement record was created")
     updated_at: Optional[datetime] = Field(None, description="When achievement was last updated")
 
 class CreateAchievementRequest(BaseModel):
     """Request to create achievement for admin panel"""
-    user_email: EmailStr = Field(..., description="Target user")
+    user_email: CachedEmailStr = Field(..., description="Target user")
     course_id: str = Field(..., description="Course association")
     achievement_name: str = Field(..., description="Achievement identifier")
     title: str = Field(..., description="Display title")
     description: str = Field(..., description="Description")
     score: float = Field(..., description="User's score")
     total_points: float = Field(..., description="Maximum points")
-    metadata: Optional[AchievementMetadata] = Field(None, description="Additional data") 
\ No newline at end of file
+    metadata: Optional[AchievementMetadata] = Field(None, description="Additional data") 
+
+# Cached adapters: a list is validated or serialized in one call instead of
+# one model call per item
+achievement_list_adapter = TypeAdapter(List[Achievement])
+available_achievement_list_adapter = TypeAdapter(List[AvailableAchievement])
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, Field, validator
 from typing import List, Optional, Dict, Any, ClassVar
 from datetime import datetime
 from app.models.student import Achievement
+from app.models.achievement import CachedEmailStr
+from app.core import grading
 
 class RequisitosDiploma(BaseModel):
     """Representa un requisito para obtener un diploma colombiano"""
@@ -42,7 +44,7 @@ class PlantillaDiploma(BaseModel):
 class Diploma(BaseModel):
     """Representa un diploma colombiano obtenido"""
     id: Optional[str] = None
-    email: EmailStr = Field(..., description="Email del estudiante")
+    email: CachedEmailStr = Field(..., description="Email del estudiante")
     tipo_diploma: str = Field(..., description="Tipo de diploma")
     id_curso: str = Field(..., description="ID del curso")
     nombre_diploma: str = Field(..., description="Nombre oficial del diploma")
@@ -75,41 +77,11 @@ class Diploma(BaseModel):
     
     def obtener_calificacion_cualitativa(self) -> str:
         """Calcular calificación cualitativa colombiana desde la nota numérica"""
-        if self.nota_final is None:
-            return "No Aplica"
-        
-        nota = self.nota_final
-        if nota >= 4.6:
-            return "Excelente"
-        elif nota >= 4.0:
-            return "Sobresaliente"
-        elif nota >= 3.5:
-            return "Bueno"
-        elif nota >= 3.0:
-            return "Aceptable"
-        elif nota >= 2.0:
-            return "Insuficiente"
-        else:
-            return "Deficiente"
+        return grading.calificacion_cualitativa(self.nota_final)
     
     def obtener_equivalencia_internacional(self) -> str:
         """Obtener equivalencia internacional de la nota colombiana"""
-        if self.nota_final is None:
-            return "N/A"
-        
-        nota = self.nota_final
-        if nota >= 4.6:
-            return "A+ (95-100%)"
-        elif nota >= 4.0:
-            return "A (85-94%)"
-        elif nota >= 3.5:
-            return "B+ (75-84%)"
-        elif nota >= 3.0:
-            return "B (65-74%)"
-        elif nota >= 2.0:
-            return "C (55-64%)"
-        else:
-            return "F (<55%)"
+        return grading.equivalencia_internacional(self.nota_final)
 
 class VerificacionElegibilidadDiploma(BaseModel):
     """Resultado de verificar si el estudiante es elegible para un diploma"""
@@ -125,7 +97,7 @@ class VerificacionElegibilidadDiploma(BaseModel):
 
 class SolicitudDiploma(BaseModel):
     """Solicitud para generar un diploma colombiano"""
-    email: EmailStr = Field(..., description="Email del estudiante")
+    email: CachedEmailStr = Field(..., description="Email del estudiante")
     id_curso: str = Field(..., description="ID del curso para el diploma")
     tipo_diploma: str = Field("curso", description="Tipo de diploma a generar")
     forzar_generacion: bool = Field(False, description="Forzar generación aunque no se cumplan todos los requisitos")
@@ -147,13 +119,24 @@ class SolicitudDiploma(BaseModel):
             raise ValueError(f'Idioma debe ser uno de: {idiomas_validos}')
         return v
 
+class SolicitudConversionNotas(BaseModel):
+    """Solicitud para convertir un lote de porcentajes a notas colombianas"""
+    porcentajes: List[float] = Field(..., min_length=1, max_length=10000, description="Porcentajes (0-100) a convertir")
+    
+    @validator('porcentajes')
+    def validar_rango_porcentajes(cls, v):
+        for porcentaje in v:
+            if not 0 <= porcentaje <= 100:
+                raise ValueError('Cada porcentaje debe estar entre 0 y 100')
+        return v
+
 class ConfiguracionDiplomasColombia:
     """Configuración específica para diplomas en Colombia"""
     
     # Escalas de calificación
-    ESCALA_NUMERICA_MIN: ClassVar[float] = 1.0
-    ESCALA_NUMERICA_MAX: ClassVar[float] = 5.0
-    NOTA_MINIMA_APROBACION: ClassVar[float] = 3.0
+    ESCALA_NUMERICA_MIN: ClassVar[float] = grading.ESCALA_NUMERICA_MIN
+    ESCALA_NUMERICA_MAX: ClassVar[float] = grading.ESCALA_NUMERICA_MAX
+    NOTA_MINIMA_APROBACION: ClassVar[float] = grading.NOTA_MINIMA_APROBACION
     
     # Tipos de diplomas válidos
     TIPOS_DIPLOMA: ClassVar[List[str]] = [
@@ -184,20 +167,12 @@ class ConfiguracionDiplomasColombia:
         'A Distancia'
     ]
     
-    # Mapeo de calificaciones
+    # Mapeo de calificaciones (desde <= nota < hasta), derivado de la tabla de grading
     CALIFICACIONES_CUALITATIVAS: ClassVar[Dict[tuple, str]] = {
-        (4.6, 5.0): "Excelente",
-        (4.0, 4.5): "Sobresaliente", 
-        (3.5, 3.9): "Bueno",
-        (3.0, 3.4): "Aceptable",
-        (2.0, 2.9): "Insuficiente",
-        (1.0, 1.9): "Deficiente"
+        (desde, hasta): calificacion for desde, hasta, calificacion in reversed(grading.RANGOS_CALIFICACION)
     }
     
     @classmethod
     def obtener_calificacion_cualitativa(cls, nota: float) -> str:
         """Obtener calificación cualitativa basada en la nota numérica"""
-        for (min_nota, max_nota), calificacion in cls.CALIFICACIONES_CUALITATIVAS.items():
-            if min_nota <= nota <= max_nota:
-                return calificacion
-        return "No Aplica" 
\ No newline at end of file
+        return grading.calificacion_cualitativa(nota) 
\ No newline at end of file
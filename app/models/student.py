@@ -1,11 +1,11 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
-from app.models.achievement import Achievement, AchievementStats
+from app.models.achievement import Achievement, AchievementStats, CachedEmailStr
 
 class Student(BaseModel):
     """Student model - represents a user in the system"""
-    email: EmailStr = Field(..., description="Student email")
+    email: CachedEmailStr = Field(..., description="Student email")
     achievements: List[Achievement] = Field(default_factory=list, description="List of student achievements")
     total_xp: Optional[int] = Field(0, ge=0, description="Total experience points")
     created_at: Optional[datetime] = Field(default_factory=datetime.now, description="Account creation date")
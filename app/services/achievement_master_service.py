@@ -4,23 +4,91 @@ This service handles the master list of achievements that can be earned,
 separate from individual student achievement records.
 """
 
-from app.DB.database import get_database
-from app.models.achievement import Achievement, AchievementMetadata, AvailableAchievement
+from app.DB.database import get_database, coleccion, ColeccionDelProceso
+from app.core.tracing import trazar
+from app.core.cache import Snapshot
+from app.models.achievement import (
+    Achievement, AchievementMetadata, AvailableAchievement, available_achievement_list_adapter
+)
 from app.models.exceptions import DatabaseConnectionError, AchievementNotFound
 from typing import Optional, List, Dict, Any
-from pymongo.collection import Collection
 from datetime import datetime
+import copy
+import os
 import uuid
 
 # Get the achievements master collection
 _db = get_database()
-achievements_master_collection: Optional[Collection] = _db["achievements_master"] if _db is not None else None
+achievements_master_collection: Optional[ColeccionDelProceso] = coleccion("achievements_master") if _db is not None else None
+# Change counters shared by every worker (also used for diploma templates)
+versions_collection: Optional[ColeccionDelProceso] = coleccion("versiones") if _db is not None else None
 
 def _check_db_connection():
     """Check if database connection is available"""
     if achievements_master_collection is None:
         raise DatabaseConnectionError("No database connection available")
 
+# Maximum age (seconds) of the in-process catalog of active templates. Template
+# writes also bump a version in `versiones` that every worker checks before
+# serving the catalog, so changes made through another worker show up at once
+CATALOG_MAX_AGE_SECONDS = float(os.getenv("ACHIEVEMENTS_CATALOG_MAX_AGE_SECONDS", "60"))
+
+# `versiones` document counting achievement template changes
+CATALOG_VERSION = "achievements_master"
+
+def _available_achievement(template: Dict[str, Any]) -> AvailableAchievement:
+    metadata = None
+    if template.get("metadata"):
+        metadata = AchievementMetadata(**template["metadata"])
+    
+    return AvailableAchievement(
+        achievement_name=template["achievement_name"],
+        title=template["title"],
+        description=template.get("description"),
+        requirements=template.get("requirements", []),
+        max_points=template.get("max_points", 100.0),
+        category=metadata.category if metadata else None,
+        rarity=metadata.rarity if metadata else None,
+        metadata=metadata
+    )
+
+def _catalog_version() -> int:
+    document = versions_collection.find_one({"_id": CATALOG_VERSION}, {"version": 1})
+    return document["version"] if document else 0
+
+def _load_catalog() -> Dict[str, Any]:
+    """Active templates grouped by course in a single query, stored already dumped"""
+    # Version read before the templates: a write during the load forces another one
+    version = _catalog_version()
+    templates: Dict[str, List[AvailableAchievement]] = {}
+    for template in achievements_master_collection.find({"active": True}, {"_id": 0}):
+        templates.setdefault(template["course_id"], []).append(_available_achievement(template))
+    courses = {
+        course_id: available_achievement_list_adapter.dump_python(achievements)
+        for course_id, achievements in templates.items()
+    }
+    return {"version": version, "courses": courses}
+
+_catalog: Snapshot[Dict[str, Any]] = Snapshot(_load_catalog, CATALOG_MAX_AGE_SECONDS)
+
+def _current_catalog() -> Dict[str, Any]:
+    """Catalog reloaded if another worker changed the templates (one read by _id)"""
+    catalog = _catalog.get()
+    if catalog["version"] != _catalog_version():
+        catalog = _catalog.refresh()
+    return catalog
+
+def _templates_changed():
+    """Bump the shared catalog version after a template write"""
+    versions_collection.update_one({"_id": CATALOG_VERSION}, {"$inc": {"version": 1}}, upsert=True)
+    _catalog.invalidate()
+
+def preload_catalog() -> int:
+    """Load the catalog now (startup warm-up); returns the number of courses"""
+    _check_db_connection()
+    return len(_catalog.refresh()["courses"])
+
+@trazar
 def create_achievement_template(
     achievement_name: str,
     course_id: str,
@@ -60,40 +128,23 @@ def create_achievement_template(
     
     result = achievements_master_collection.insert_one(achievement_template)
     achievement_template["_id"] = str(result.inserted_id)
+    _templates_changed()
     
     return achievement_template
 
-def get_available_achievements_for_course(course_id: str) -> List[AvailableAchievement]:
+@trazar
+def get_available_achievements_for_course(course_id: str) -> List[Dict[str, Any]]:
     """
-    Get all available achievement templates for a specific course
+    Get all available achievement templates for a specific course, as dicts.
+    
+    Served from the in-process catalog, checked against the shared version;
+    each caller gets its own copy.
     """
     _check_db_connection()
     
-    templates = achievements_master_collection.find({
-        "course_id": course_id,
-        "active": True
-    })
-    
-    available_achievements = []
-    for template in templates:
-        metadata = None
-        if template.get("metadata"):
-            metadata = AchievementMetadata(**template["metadata"])
-        
-        available_achievement = AvailableAchievement(
-            achievement_name=template["achievement_name"],
-            title=template["title"],
-            description=template.get("description"),
-            requirements=template.get("requirements", []),
-            max_points=template.get("max_points", 100.0),
-            category=metadata.category if metadata else None,
-            rarity=metadata.rarity if metadata else None,
-            metadata=metadata
-        )
-        available_achievements.append(available_achievement)
-    
-    return available_achievements
+    return copy.deepcopy(_current_catalog()["courses"].get(course_id, []))
 
+@trazar
 def get_achievement_template(achievement_name: str, course_id: str) -> Dict[str, Any]:
     """
     Get a specific achievement template
@@ -111,6 +162,7 @@ def get_achievement_template(achievement_name: str, course_id: str) -> Dict[str,
     
     return template
 
+@trazar
 def update_achievement_template(
     achievement_name: str,
     course_id: str,
@@ -140,9 +192,11 @@ def update_achievement_template(
     
     if result.matched_count == 0:
         raise AchievementNotFound(f"Achievement template {achievement_name} not found for course {course_id}")
+    _templates_changed()
     
     return get_achievement_template(achievement_name, course_id)
 
+@trazar
 def deactivate_achievement_template(achievement_name: str, course_id: str) -> bool:
     """
     Deactivate an achievement template (soft delete)
@@ -162,9 +216,12 @@ def deactivate_achievement_template(achievement_name: str, course_id: str) -> bo
             }
         }
     )
+    if result.modified_count:
+        _templates_changed()
     
     return result.modified_count > 0
 
+@trazar
 def get_all_achievement_templates() -> List[Dict[str, Any]]:
     """
     Get all achievement templates across all courses (admin function)
@@ -179,6 +236,7 @@ def get_all_achievement_templates() -> List[Dict[str, Any]]:
     
     return templates
 
+@trazar
 def get_achievement_templates_by_course() -> Dict[str, List[Dict[str, Any]]]:
     """
     Get achievement templates grouped by course
@@ -209,6 +267,7 @@ def get_achievement_templates_by_course() -> Dict[str, List[Dict[str, Any]]]:
     
     return grouped_achievements
 
+@trazar
 def search_achievement_templates(
     query: str,
     course_id: Optional[str] = None
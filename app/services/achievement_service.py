@@ -1,24 +1,88 @@
-from app.DB.database import get_database
+from app.DB.database import get_database, coleccion, ColeccionDelProceso
+from app.core.tracing import trazar
+from app.services.eligibility_service import recalcular_elegibilidad_por_logro
 from app.models.student import Student
-from app.models.achievement import Achievement, AchievementMetadata
+from app.models.achievement import Achievement, AchievementMetadata, achievement_list_adapter
 from app.models.exceptions import (
     DatabaseConnectionError, StudentNotFound, AchievementNotFound,
     InvalidAchievementData, DuplicateAchievementError
 )
 from typing import Optional, List, Dict, Any
-from pymongo.collection import Collection
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
+import logging
 import uuid
 
+logger = logging.getLogger(__name__)
+
 # Obtener la colección de estudiantes
 _db = get_database()
-students_collection: Optional[Collection] = _db["students"] if _db is not None else None
+students_collection: Optional[ColeccionDelProceso] = coleccion("students") if _db is not None else None
 
 def _check_db_connection():
     """Check if database connection is available"""
     if students_collection is None:
         raise DatabaseConnectionError("No database connection available")
 
+def _refresh_eligibility(student_doc: dict, course_id: str, achievement_name: str):
+    """
+    Recompute stored diploma eligibility for the templates requiring this achievement.
+    `student_doc` must be the document returned by the write itself (with its
+    `revision`), never one read before it; failures never fail the write itself.
+    """
+    try:
+        recalcular_elegibilidad_por_logro(student_doc, course_id, achievement_name)
+    except Exception as e:
+        logger.error(f"Error refreshing diploma eligibility for {student_doc.get('email')}: {e}")
+
+def _write_achievement(email: str, achievement: dict, now: datetime) -> dict:
+    """
+    Replace or append the achievement and return the resulting student document.
+    Every write increments `revision` and only applies if nobody else wrote the
+    student since it was read, so concurrent writes are ordered by the data they
+    produced.
+    """
+    name = achievement["achievement_name"]
+    while True:
+        student = students_collection.find_one(
+            {"email": email}, {"achievements.achievement_name": 1, "revision": 1}
+        )
+        if student is None:
+            # Create the student with this achievement
+            try:
+                return students_collection.find_one_and_update(
+                    {"email": email, "achievements.achievement_name": {"$ne": name}},
+                    {
+                        "$push": {"achievements": achievement},
+                        "$set": {"updated_at": now},
+                        "$inc": {"revision": 1},
+                        "$setOnInsert": {"total_xp": 0, "created_at": now}
+                    },
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                # A concurrent write created the student first
+                continue
+        
+        names = [a.get("achievement_name") for a in student.get("achievements", [])]
+        if name in names:
+            update = {"$set": {f"achievements.{names.index(name)}": achievement, "updated_at": now}}
+        else:
+            update = {"$push": {"achievements": achievement}, "$set": {"updated_at": now}}
+        update["$inc"] = {"revision": 1}
+        
+        updated_doc = students_collection.find_one_and_update(
+            {"email": email, "revision": student.get("revision")},
+            update,
+            return_document=ReturnDocument.AFTER
+        )
+        if updated_doc is not None:
+            return updated_doc
+        # Another write changed the student in between: read it again
+
+@trazar
 def update_achievement(email: str, achievement_data: dict, score: float, total_points: float) -> dict:
     """
     Creates or updates an achievement for a student based on score obtained.
@@ -56,47 +120,8 @@ def update_achievement(email: str, achievement_data: dict, score: float, total_p
         achievement_data["metadata"] = metadata.dict()
 
     achievement = Achievement(**achievement_data)
-
-    # Find if student already exists
-    student_doc = students_collection.find_one({"email": email})
-
-    if student_doc:
-        # Check if already has this achievement
-        existing_achievement_index = None
-        for i, a in enumerate(student_doc.get("achievements", [])):
-            if a["achievement_name"] == achievement.achievement_name:
-                existing_achievement_index = i
-                break
-
-        if existing_achievement_index is not None:
-            # Update existing achievement
-            students_collection.update_one(
-                {"email": email},
-                {
-                    "$set": {
-                        f"achievements.{existing_achievement_index}": achievement.dict(),
-                        "updated_at": datetime.now()
-                    }
-                }
-            )
-        else:
-            # Add new achievement
-            students_collection.update_one(
-                {"email": email},
-                {
-                    "$push": {"achievements": achievement.dict()},
-                    "$set": {"updated_at": datetime.now()}
-                }
-            )
-    else:
-        # Create student with achievement
-        new_student = Student(
-            email=email, 
-            achievements=[achievement],
-            created_at=datetime.now(),
-            updated_at=datetime.now()
-        )
-        students_collection.insert_one(new_student.dict())
+    updated_doc = _write_achievement(email, achievement.dict(), datetime.now())
+    _refresh_eligibility(updated_doc, achievement.course_id, achievement.achievement_name)
 
     return {
         "email": email,
@@ -106,6 +131,7 @@ def update_achievement(email: str, achievement_data: dict, score: float, total_p
         "status": achievement.status
     }
 
+@trazar
 def get_student_achievements(email: str) -> dict:
     """
     Returns a student's achievements by email.
@@ -118,6 +144,7 @@ def get_student_achievements(email: str) -> dict:
     
     return student
 
+@trazar
 def get_achievement_stats(email: str) -> Dict[str, Any]:
     """Get user's achievement statistics"""
     _check_db_connection()
@@ -130,6 +157,7 @@ def get_achievement_stats(email: str) -> Dict[str, Any]:
     stats = student.get_achievement_stats()
     return stats.dict()
 
+@trazar
 def get_course_achievements(course_id: str) -> List[Dict[str, Any]]:
     """Get all possible achievements for a course"""
     _check_db_connection()
@@ -152,6 +180,7 @@ def get_course_achievements(course_id: str) -> List[Dict[str, Any]]:
     results = list(students_collection.aggregate(pipeline))
     return results
 
+@trazar
 def bulk_update_achievements(updates: List[dict]) -> List[dict]:
     """Update multiple achievements at once"""
     _check_db_connection()
@@ -171,34 +200,42 @@ def bulk_update_achievements(updates: List[dict]) -> List[dict]:
     
     return results
 
+@trazar
 def delete_achievement(email: str, achievement_name: str) -> bool:
     """Delete a specific achievement for a student"""
     _check_db_connection()
     
-    student = students_collection.find_one({"email": email})
-    if not student:
-        raise StudentNotFound(f"Student with email {email} not found")
-    
-    # Check if achievement exists
-    achievement_exists = any(
-        a["achievement_name"] == achievement_name 
-        for a in student.get("achievements", [])
+    # Remove the achievement; the document before the update is exactly what it removed from
+    now = datetime.now()
+    student = students_collection.find_one_and_update(
+        {"email": email, "achievements.achievement_name": achievement_name},
+        {
+            "$pull": {"achievements": {"achievement_name": achievement_name}},
+            "$set": {"updated_at": now},
+            "$inc": {"revision": 1}
+        },
+        return_document=ReturnDocument.BEFORE
     )
     
-    if not achievement_exists:
+    if student is None:
+        if students_collection.count_documents({"email": email}, limit=1) == 0:
+            raise StudentNotFound(f"Student with email {email} not found")
         raise AchievementNotFound(f"Achievement {achievement_name} not found for student {email}")
     
-    # Remove the achievement
-    result = students_collection.update_one(
-        {"email": email},
-        {
-            "$pull": {"achievements": {"achievement_name": achievement_name}},
-            "$set": {"updated_at": datetime.now()}
-        }
-    )
+    removed = [a for a in student.get("achievements", []) if a["achievement_name"] == achievement_name]
+    remaining = [a for a in student.get("achievements", []) if a["achievement_name"] != achievement_name]
+    updated_doc = {
+        **student,
+        "achievements": remaining,
+        "updated_at": now,
+        "revision": student.get("revision", 0) + 1
+    }
+    for course_id in {a.get("course_id") for a in removed}:
+        _refresh_eligibility(updated_doc, course_id, achievement_name)
     
-    return result.modified_count > 0
+    return True
 
+@trazar
 def get_all_achievements_admin() -> List[Dict[str, Any]]:
     """Get all achievements across all users (admin only)"""
     _check_db_connection()
@@ -231,6 +268,7 @@ def get_all_achievements_admin() -> List[Dict[str, Any]]:
     results = list(students_collection.aggregate(pipeline))
     return results
 
+@trazar
 def count_user_achievements(email: str) -> int:
     """Count total achievements for a user"""
     _check_db_connection()
@@ -241,6 +279,7 @@ def count_user_achievements(email: str) -> int:
     
     return len(student.get("achievements", []))
 
+@trazar
 def calculate_total_xp(email: str) -> int:
     """Calculate total XP for a user"""
     _check_db_connection()
@@ -252,6 +291,7 @@ def calculate_total_xp(email: str) -> int:
     student = Student(**student_doc)
     return student.calculate_total_xp()
 
+@trazar
 def calculate_average_score(email: str) -> float:
     """Calculate average score for a user"""
     _check_db_connection()
@@ -265,6 +305,7 @@ def calculate_average_score(email: str) -> float:
     
     return sum(scores) / len(scores) if scores else 0.0
 
+@trazar
 def get_recent_achievements(email: str, limit: int = 5) -> List[Dict[str, Any]]:
     """Get recent achievements for a user"""
     _check_db_connection()
@@ -275,4 +316,4 @@ def get_recent_achievements(email: str, limit: int = 5) -> List[Dict[str, Any]]:
     
     student = Student(**student_doc)
     recent = student.get_recent_achievements(limit)
-    return [a.dict() for a in recent] 
\ No newline at end of file
+    return achievement_list_adapter.dump_python(recent) 
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Certificate Service - Generación de certificados PDF en segundo plano
+
+El renderizado corre en un pool de procesos (nunca en el worker de la API) y
+los certificados se guardan por contenido en un directorio local (ver
+`app/core/certificates.py`). Al terminar, el diploma recibe su
+`url_certificado`; si el mismo contenido ya estaba guardado no se renderiza.
+"""
+
+from app.DB.database import get_database, coleccion, ColeccionDelProceso
+from app.core import certificates
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from typing import Optional, List, Dict, Any, Tuple
+import logging
+import multiprocessing
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Obtener la colección de diplomas
+_db = get_database()
+diplomas_collection: Optional[ColeccionDelProceso] = coleccion("diplomas") if _db is not None else None
+
+CERTIFICADOS_DIRECTORIO = os.getenv("DIPLOMAS_CERTIFICATES_DIR", "certificados")
+
+def _procesos_por_defecto() -> int:
+    """
+    Núcleos repartidos entre los workers de la API (API_WORKERS, que startup.py
+    fija con --workers), entre 1 y 4: cada worker tiene su propio pool.
+    """
+    workers = int(os.getenv("API_WORKERS") or os.getenv("WEB_CONCURRENCY") or "1")
+    return max(1, min(4, (os.cpu_count() or 1) // max(1, workers)))
+
+CERTIFICADOS_PROCESOS = int(os.getenv("DIPLOMAS_CERTIFICATE_WORKERS", "0")) or _procesos_por_defecto()
+CERTIFICADOS_URL_BASE = "/diplomas/certificados"
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Renderizados en curso por clave, para no lanzar dos veces el mismo contenido
+_en_curso: Dict[str, Future] = {}
+_en_curso_lock = threading.Lock()
+
+def _obtener_executor() -> ProcessPoolExecutor:
+    """Pool creado en el primer uso; "spawn" evita heredar hilos y sockets de MongoDB del worker"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=CERTIFICADOS_PROCESOS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _executor
+
+def url_certificado(clave: str) -> str:
+    return f"{CERTIFICADOS_URL_BASE}/{clave}{certificates.EXTENSION}"
+
+def ruta_certificado(clave: str) -> Optional[str]:
+    """Ruta local de un certificado guardado, o None si la clave no es válida o no existe"""
+    if not certificates.es_clave_valida(clave):
+        return None
+    ruta = certificates.ruta_en_almacen(CERTIFICADOS_DIRECTORIO, clave)
+    return ruta if os.path.exists(ruta) else None
+
+def _preparar(diploma: Dict[str, Any], plantilla: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any], str]:
+    datos = certificates.datos_certificado(diploma)
+    clave = certificates.clave_contenido(datos, certificates.version_plantilla(plantilla))
+    return clave, datos, certificates.ruta_en_almacen(CERTIFICADOS_DIRECTORIO, clave)
+
+def _asignar_url(diploma_id: str, url: str):
+    if diplomas_collection is not None:
+        diplomas_collection.update_one({"id": diploma_id}, {"$set": {"url_certificado": url}})
+
+def _enviar(clave: str, datos: Dict[str, Any], ruta: str) -> Future:
+    executor = _obtener_executor()
+    with _en_curso_lock:
+        futuro = _en_curso.get(clave)
+        if futuro is None:
+            futuro = executor.submit(certificates.renderizar_y_guardar, datos, ruta)
+            _en_curso[clave] = futuro
+            futuro.add_done_callback(lambda _: _en_curso.pop(clave, None))
+    return futuro
+
+def programar_certificado(diploma: Dict[str, Any], plantilla: Optional[Dict[str, Any]] = None) -> Optional[Future]:
+    """
+    Encolar el certificado de un diploma recién guardado y devolver el futuro
+    del renderizado (None si ya estaba en el almacén). `url_certificado` se
+    actualiza cuando el archivo existe.
+    """
+    clave, datos, ruta = _preparar(diploma, plantilla)
+    url = url_certificado(clave)
+
+    if os.path.exists(ruta):
+        _asignar_url(diploma["id"], url)
+        return None
+
+    def _al_terminar(futuro: Future):
+        error = futuro.exception()
+        if error is not None:
+            logger.error(f"Error renderizando certificado del diploma {diploma['id']}: {error}")
+            return
+        try:
+            _asignar_url(diploma["id"], url)
+        except Exception as e:
+            logger.error(f"Error guardando url_certificado del diploma {diploma['id']}: {e}")
+
+    futuro = _enviar(clave, datos, ruta)
+    futuro.add_done_callback(_al_terminar)
+    return futuro
+
+def renderizar_lote(
+    diplomas: List[Dict[str, Any]],
+    plantillas: Optional[Dict[Tuple[str, str], Dict[str, Any]]] = None
+) -> List[str]:
+    """
+    Renderizar un lote de diplomas en el pool y esperar a que terminen.
+    `plantillas` se indexa por (id_curso, tipo_diploma). Devuelve las URLs en
+    el orden de entrada; los certificados ya guardados no se vuelven a renderizar.
+    """
+    plantillas = plantillas or {}
+    pendientes = []
+    urls = []
+    for diploma in diplomas:
+        plantilla = plantillas.get((diploma.get("id_curso"), diploma.get("tipo_diploma")))
+        clave, datos, ruta = _preparar(diploma, plantilla)
+        urls.append(url_certificado(clave))
+        if not os.path.exists(ruta):
+            pendientes.append(_enviar(clave, datos, ruta))
+
+    for futuro in pendientes:
+        futuro.result()
+    return urls
+
+def cerrar(esperar: bool = True, plazo: Optional[float] = None):
+    """
+    Detener el pool de renderizado (al apagar la aplicación). Con `plazo`, los
+    renderizados pendientes tienen ese tiempo para terminar y guardar su
+    `url_certificado`; los que no hayan empezado se cancelan.
+    """
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is None:
+        return
+    if esperar and plazo is not None:
+        with _en_curso_lock:
+            pendientes = list(_en_curso.values())
+        _, sin_terminar = wait(pendientes, timeout=plazo)
+        if sin_terminar:
+            logger.warning(f"{len(sin_terminar)} certificado(s) sin renderizar al apagar")
+            esperar = False
+    executor.shutdown(wait=esperar, cancel_futures=not esperar)
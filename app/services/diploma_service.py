@@ -1,4 +1,4 @@
-from app.DB.database import get_database
+from app.DB.database import get_database, coleccion, ColeccionDelProceso
 from app.models.diploma import (
     Diploma, PlantillaDiploma, RequisitosDiploma, 
     VerificacionElegibilidadDiploma, SolicitudDiploma,
@@ -6,23 +6,87 @@ from app.models.diploma import (
 )
 from app.models.student import Student, Achievement
 from app.models.exceptions import (
-    DatabaseConnectionError, StudentNotFound, AchievementNotFound,
+    AchievementError, DatabaseConnectionError, StudentNotFound, AchievementNotFound,
     InvalidAchievementData
 )
 from app.services.achievement_service import get_student_achievements
+from app.services import certificate_service
+from app.services.eligibility_service import (
+    evaluar_elegibilidad, obtener_elegibilidad_guardada, guardar_elegibilidad,
+    invalidar_plantilla, revision_estudiante
+)
+from app.core.tracing import trazar
+from app.core import grading, tasks, verification_codes
+from app.core.cache import Snapshot, LRUCache, BloomFilter
+from app.core.metrics import DIPLOMA_VERIFICATIONS
+from app.core.tasks import PeriodicTask
 from typing import Optional, List, Dict, Any
-from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime, timedelta
 import uuid
 import logging
+import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
 # Obtener las colecciones
 _db = get_database()
-students_collection: Optional[Collection] = _db["students"] if _db is not None else None
-diplomas_collection: Optional[Collection] = _db["diplomas"] if _db is not None else None
-plantillas_diplomas_collection: Optional[Collection] = _db["plantillas_diplomas"] if _db is not None else None
+students_collection: Optional[ColeccionDelProceso] = coleccion("students") if _db is not None else None
+diplomas_collection: Optional[ColeccionDelProceso] = coleccion("diplomas") if _db is not None else None
+plantillas_diplomas_collection: Optional[ColeccionDelProceso] = coleccion("plantillas_diplomas") if _db is not None else None
+# Diplomas eliminados: cada proceso los retira de su caché de verificación
+diplomas_revocados_collection: Optional[ColeccionDelProceso] = coleccion("diplomas_revocados") if _db is not None else None
+# Marcas de migraciones aplicadas (comparte colección con la versión de plantillas)
+versiones_collection: Optional[ColeccionDelProceso] = coleccion("versiones") if _db is not None else None
+
+# Reintentos ante colisiones del código de verificación aleatorio
+MAX_INTENTOS_CODIGO = 5
+
+# Antigüedad máxima (segundos) de la instantánea de estadísticas de diplomas
+ESTADISTICAS_MAX_ANTIGUEDAD_SEGUNDOS = float(os.getenv("DIPLOMAS_STATS_MAX_STALENESS_SECONDS", "30"))
+
+# Intervalo (segundos) del barrido que marca los diplomas vencidos
+VENCIMIENTO_BARRIDO_SEGUNDOS = float(os.getenv("DIPLOMAS_EXPIRY_SWEEP_SECONDS", "60"))
+# Solape (segundos) de cada barrido con el anterior, por diferencias de reloj entre procesos
+VENCIMIENTO_SOLAPE_SEGUNDOS = 60
+
+# Caché de verificación pública de diplomas
+VERIFICACION_LRU_TAMANO = int(os.getenv("DIPLOMAS_VERIFICATION_CACHE_SIZE", "10000"))
+VERIFICACION_LRU_TTL_SEGUNDOS = float(os.getenv("DIPLOMAS_VERIFICATION_CACHE_TTL_SECONDS", "300"))
+VERIFICACION_SINCRONIZACION_SEGUNDOS = float(os.getenv("DIPLOMAS_VERIFICATION_SYNC_SECONDS", "5"))
+VERIFICACION_RECONSTRUCCION_SEGUNDOS = float(os.getenv("DIPLOMAS_VERIFICATION_REBUILD_SECONDS", "3600"))
+VERIFICACION_MARGEN_RELOJ_SEGUNDOS = 60
+VERIFICACION_CAPACIDAD_MINIMA = 100000
+VERIFICACION_TASA_FALSOS_POSITIVOS = 0.001
+
+# Claves de firma de códigos de verificación (ver app/core/verification_codes.py)
+_clave_firma, _claves_verificacion = verification_codes.cargar_claves_desde_entorno()
+if _clave_firma is None:
+    logger.warning("DIPLOMA_SIGNING_KEY no configurada: se emitirán códigos de verificación sin firma")
+
+# Diplomas verificados recientemente (código -> documento) y filtro de códigos
+# conocidos; el filtro es None hasta la primera reconstrucción
+_diplomas_verificados: LRUCache[Dict[str, Any]] = LRUCache(VERIFICACION_LRU_TAMANO, VERIFICACION_LRU_TTL_SEGUNDOS)
+_codigos_conocidos: Optional[BloomFilter] = None
+_ultima_sincronizacion_codigos = datetime.now()
+_proxima_sincronizacion_codigos = 0.0
+_sincronizacion_lock = threading.Lock()
+_ultima_sincronizacion_revocaciones = datetime.now()
+_proxima_sincronizacion_revocaciones = 0.0
+_revocaciones_lock = threading.Lock()
+
+# Límite superior del último barrido de vencimientos; None hasta el primero,
+# que recorre todo el histórico de fechas de vencimiento
+_ultimo_barrido_vencimientos: Optional[datetime] = None
+
+# Documento de `versiones` que marca la migración de campos derivados como aplicada
+MIGRACION_CAMPOS_DERIVADOS = "migracion_campos_derivados_diplomas"
+_SIN_CAMPOS_DERIVADOS = {"$or": [
+    {"esta_vencido": {"$exists": False}},
+    {"equivalencia_internacional": {"$exists": False}}
+]}
 
 def _verificar_conexion_bd():
     """Verificar si la conexión a la base de datos está disponible"""
@@ -33,7 +97,7 @@ def convertir_porcentaje_a_nota_colombiana(porcentaje: float) -> float:
     """
     Convertir porcentaje (0-100) a nota colombiana (1.0-5.0)
     
-    Mapeo estándar:
+    Mapeo estándar (ver `app.core.grading.TRAMOS_PORCENTAJE`):
     - 95-100% = 4.6-5.0 (Excelente)
     - 85-94% = 4.0-4.5 (Sobresaliente) 
     - 75-84% = 3.5-3.9 (Bueno)
@@ -41,19 +105,14 @@ def convertir_porcentaje_a_nota_colombiana(porcentaje: float) -> float:
     - 55-64% = 2.0-2.9 (Insuficiente)
     - <55% = 1.0-1.9 (Deficiente)
     """
-    if porcentaje >= 95:
-        return round(4.6 + (porcentaje - 95) * 0.08, 1)  # 4.6-5.0
-    elif porcentaje >= 85:
-        return round(4.0 + (porcentaje - 85) * 0.05, 1)  # 4.0-4.5
-    elif porcentaje >= 75:
-        return round(3.5 + (porcentaje - 75) * 0.04, 1)  # 3.5-3.9
-    elif porcentaje >= 65:
-        return round(3.0 + (porcentaje - 65) * 0.04, 1)  # 3.0-3.4
-    elif porcentaje >= 55:
-        return round(2.0 + (porcentaje - 55) * 0.09, 1)  # 2.0-2.9
-    else:
-        return round(1.0 + porcentaje * 0.018, 1)  # 1.0-1.9
+    return grading.convertir_porcentaje(porcentaje)
 
+@trazar
+def convertir_porcentajes_a_notas_colombianas(porcentajes: List[float]) -> List[Dict[str, Any]]:
+    """Convertir un lote de porcentajes con nota, calificación y equivalencia internacional"""
+    return grading.evaluar_lote(porcentajes)
+
+@trazar
 def crear_plantilla_diploma(plantilla_data: dict) -> dict:
     """Crear una nueva plantilla de diploma"""
     _verificar_conexion_bd()
@@ -66,10 +125,12 @@ def crear_plantilla_diploma(plantilla_data: dict) -> dict:
     # Insertar en la base de datos
     result = plantillas_diplomas_collection.insert_one(plantilla_dict)
     plantilla_dict["_id"] = str(result.inserted_id)
+    invalidar_plantilla(plantilla.id_curso, plantilla.tipo_diploma)
     
     logger.info(f"Plantilla de diploma creada: {plantilla.nombre_diploma}")
     return plantilla_dict
 
+@trazar
 def obtener_plantilla_diploma(id_curso: str, tipo_diploma: str) -> Optional[PlantillaDiploma]:
     """Obtener plantilla de diploma por curso y tipo"""
     _verificar_conexion_bd()
@@ -85,91 +146,24 @@ def obtener_plantilla_diploma(id_curso: str, tipo_diploma: str) -> Optional[Plan
     plantilla_doc.pop("_id", None)
     return PlantillaDiploma(**plantilla_doc)
 
-def verificar_elegibilidad_diploma(email: str, id_curso: str, tipo_diploma: str) -> VerificacionElegibilidadDiploma:
-    """Verificar si un estudiante es elegible para un diploma"""
-    _verificar_conexion_bd()
-    
+def _calcular_elegibilidad(email: str, id_curso: str, tipo_diploma: str, guardar: bool = False) -> VerificacionElegibilidadDiploma:
+    """
+    Leer estudiante y plantilla una sola vez y evaluar la elegibilidad.
+    Los errores se devuelven como elegibilidad negativa, igual que en la verificación pública.
+    Con `guardar`, el resultado queda como estado precalculado para las siguientes consultas.
+    """
     try:
         # Obtener logros del estudiante
-        estudiante_data = get_student_achievements(email)
-        estudiante = Student(**estudiante_data)
+        estudiante_doc = get_student_achievements(email)
+        estudiante = Student(**estudiante_doc)
         
         # Obtener plantilla del diploma
         plantilla = obtener_plantilla_diploma(id_curso, tipo_diploma)
-        if not plantilla:
-            return VerificacionElegibilidadDiploma(
-                elegible=False,
-                mensaje=f"No se encontró plantilla para diploma tipo '{tipo_diploma}' del curso '{id_curso}'",
-                observaciones="Contacte al administrador para crear la plantilla de diploma"
-            )
-        
-        # Verificar cada requisito
-        requisitos_completados = []
-        requisitos_faltantes = []
-        notas_requisitos = []
-        horas_completadas = 0
-        
-        logros_estudiante = {logro.achievement_name: logro for logro in estudiante.achievements if logro.course_id == id_curso}
-        
-        for requisito in plantilla.requisitos:
-            logro = logros_estudiante.get(requisito.nombre_logro)
-            
-            if logro and logro.achieved:
-                # Convertir porcentaje a nota colombiana
-                nota_colombiana = convertir_porcentaje_a_nota_colombiana(logro.percentage or 0)
-                
-                requisito_completado = {
-                    "nombre_logro": requisito.nombre_logro,
-                    "nota_obtenida": nota_colombiana,
-                    "nota_minima": requisito.nota_minima,
-                    "cumple_requisito": nota_colombiana >= requisito.nota_minima,
-                    "fecha_completado": logro.date_earned,
-                    "porcentaje_original": logro.percentage
-                }
-                
-                if nota_colombiana >= requisito.nota_minima:
-                    requisitos_completados.append(requisito_completado)
-                    notas_requisitos.append(nota_colombiana)
-                    # Simular horas completadas (esto debería venir de los metadatos del logro)
-                    horas_completadas += logro.metadata.get('horas', 10) if logro.metadata else 10
-                else:
-                    requisitos_faltantes.append(requisito)
-            else:
-                if requisito.es_obligatorio:
-                    requisitos_faltantes.append(requisito)
-        
-        # Calcular estadísticas
-        total_requisitos = len(plantilla.requisitos)
-        requisitos_cumplidos = len(requisitos_completados)
-        porcentaje_completado = (requisitos_cumplidos / total_requisitos) * 100 if total_requisitos > 0 else 0
-        nota_promedio = sum(notas_requisitos) / len(notas_requisitos) if notas_requisitos else 0
-        
-        # Determinar elegibilidad
-        requisitos_obligatorios_faltantes = [r for r in requisitos_faltantes if r.es_obligatorio]
-        elegible = len(requisitos_obligatorios_faltantes) == 0 and nota_promedio >= ConfiguracionDiplomasColombia.NOTA_MINIMA_APROBACION
         
-        # Crear mensaje
-        if elegible:
-            mensaje = f"¡Felicidades! Cumples todos los requisitos para el diploma '{plantilla.nombre_diploma}'"
-            observaciones = f"Nota promedio: {nota_promedio:.1f} - {ConfiguracionDiplomasColombia.obtener_calificacion_cualitativa(nota_promedio)}"
-        else:
-            mensaje = f"Aún no cumples todos los requisitos para el diploma '{plantilla.nombre_diploma}'"
-            if nota_promedio < ConfiguracionDiplomasColombia.NOTA_MINIMA_APROBACION:
-                observaciones = f"Nota promedio insuficiente: {nota_promedio:.1f} (mínimo requerido: {ConfiguracionDiplomasColombia.NOTA_MINIMA_APROBACION})"
-            else:
-                observaciones = f"Faltan {len(requisitos_obligatorios_faltantes)} requisitos obligatorios"
-        
-        return VerificacionElegibilidadDiploma(
-            elegible=elegible,
-            plantilla_diploma=plantilla,
-            requisitos_completados=requisitos_completados,
-            requisitos_faltantes=requisitos_faltantes,
-            nota_promedio=nota_promedio,
-            horas_completadas=horas_completadas,
-            porcentaje_completado=porcentaje_completado,
-            mensaje=mensaje,
-            observaciones=observaciones
-        )
+        elegibilidad = evaluar_elegibilidad(estudiante, plantilla, id_curso, tipo_diploma)
+        if guardar and plantilla is not None:
+            guardar_elegibilidad(email, id_curso, tipo_diploma, elegibilidad, revision_estudiante(estudiante_doc))
+        return elegibilidad
         
     except StudentNotFound:
         return VerificacionElegibilidadDiploma(
@@ -185,12 +179,66 @@ def verificar_elegibilidad_diploma(email: str, id_curso: str, tipo_diploma: str)
             observaciones=f"Error técnico: {str(e)}"
         )
 
+@trazar
+def verificar_elegibilidad_diploma(email: str, id_curso: str, tipo_diploma: str) -> VerificacionElegibilidadDiploma:
+    """
+    Verificar si un estudiante es elegible para un diploma.
+    
+    Sirve el estado precalculado en cada escritura de logros (una sola lectura);
+    si aún no existe, lo calcula por completo y lo guarda para las siguientes.
+    """
+    _verificar_conexion_bd()
+    
+    elegibilidad = obtener_elegibilidad_guardada(email, id_curso, tipo_diploma)
+    if elegibilidad is not None:
+        return elegibilidad
+    
+    return _calcular_elegibilidad(email, id_curso, tipo_diploma, guardar=True)
+
+def _generar_codigo_verificacion(diploma_id: str, fecha_vencimiento: Optional[datetime]) -> str:
+    """
+    Código firmado (RC2-...) con el id y el vencimiento del diploma si hay clave de
+    firma configurada; si no, el código aleatorio antiguo con formato RC-XXXXXXXX.
+    """
+    if _clave_firma is not None:
+        return verification_codes.emitir_codigo(diploma_id, fecha_vencimiento, _clave_firma)
+    return f"RC-{uuid.uuid4().hex[:8].upper()}"
+
+@trazar
+def obtener_clave_publica_verificacion() -> Optional[Dict[str, Any]]:
+    """Clave pública para validar códigos firmados fuera de la API (solo Ed25519)"""
+    if _clave_firma is None or _clave_firma.publica_base64() is None:
+        return None
+    return {
+        "kid": _clave_firma.kid,
+        "algoritmo": _clave_firma.algoritmo,
+        "clave_publica": _clave_firma.publica_base64(),
+        "formato_codigo": "RC2- + Base32(kid[1] | uuid[16] | vencimiento_epoch_utc[4] | firma_ed25519[64])"
+    }
+
+def _es_colision_codigo(error: DuplicateKeyError) -> bool:
+    """Indicar si la clave duplicada es el código de verificación y no el diploma en sí"""
+    detalles = error.details or {}
+    patron = detalles.get("keyPattern")
+    if patron:
+        return "codigo_verificacion" in patron
+    return "codigo_verificacion" in detalles.get("errmsg", str(error))
+
+@trazar
 def generar_diploma(solicitud: SolicitudDiploma) -> dict:
-    """Generar un diploma para un estudiante"""
+    """
+    Generar un diploma para un estudiante.
+    
+    Estudiante y plantilla se leen una sola vez para la verificación de elegibilidad
+    y la construcción del diploma. La inserción es optimista contra el índice único
+    `diploma_unique` (email + id_curso + tipo_diploma): si dos solicitudes concurrentes
+    pasan la verificación, solo una inserta y la otra recibe "ya existe". Una colisión
+    en `codigo_verificacion_unique` se reintenta con un código nuevo.
+    """
     _verificar_conexion_bd()
     
     # Verificar elegibilidad
-    elegibilidad = verificar_elegibilidad_diploma(
+    elegibilidad = _calcular_elegibilidad(
         solicitud.email, 
         solicitud.id_curso, 
         solicitud.tipo_diploma
@@ -203,20 +251,6 @@ def generar_diploma(solicitud: SolicitudDiploma) -> dict:
             "elegibilidad": elegibilidad.dict()
         }
     
-    # Verificar si ya existe un diploma para este estudiante y curso
-    diploma_existente = diplomas_collection.find_one({
-        "email": solicitud.email,
-        "id_curso": solicitud.id_curso,
-        "tipo_diploma": solicitud.tipo_diploma
-    })
-    
-    if diploma_existente:
-        return {
-            "exito": False,
-            "mensaje": "Ya existe un diploma para este estudiante y curso",
-            "diploma_existente": str(diploma_existente.get("id"))
-        }
-    
     # Crear el diploma
     plantilla = elegibilidad.plantilla_diploma
     fecha_actual = datetime.now()
@@ -226,8 +260,9 @@ def generar_diploma(solicitud: SolicitudDiploma) -> dict:
     if plantilla and hasattr(plantilla, 'meses_vencimiento') and plantilla.meses_vencimiento:
         fecha_vencimiento = fecha_actual + timedelta(days=plantilla.meses_vencimiento * 30)
     
+    diploma_id = str(uuid.uuid4())
     diploma_data = {
-        "id": str(uuid.uuid4()),
+        "id": diploma_id,
         "email": solicitud.email,
         "tipo_diploma": solicitud.tipo_diploma,
         "id_curso": solicitud.id_curso,
@@ -237,7 +272,7 @@ def generar_diploma(solicitud: SolicitudDiploma) -> dict:
         "fecha_obtencion": fecha_actual,
         "fecha_expedicion": fecha_actual,
         "fecha_vencimiento": fecha_vencimiento,
-        "codigo_verificacion": f"RC-{uuid.uuid4().hex[:8].upper()}",
+        "codigo_verificacion": _generar_codigo_verificacion(diploma_id, fecha_vencimiento),
         "creditos_academicos": plantilla.creditos_academicos if plantilla else None,
         "horas_academicas": elegibilidad.horas_completadas or (plantilla.horas_academicas if plantilla else None),
         "nota_final": elegibilidad.nota_promedio,
@@ -256,90 +291,416 @@ def generar_diploma(solicitud: SolicitudDiploma) -> dict:
         }
     }
     
-    # Insertar en la base de datos
     diploma = Diploma(**diploma_data)
-    result = diplomas_collection.insert_one(diploma.dict())
+    
+    # Insertar en la base de datos; el índice único resuelve la carrera entre solicitudes
+    for intento in range(1, MAX_INTENTOS_CODIGO + 1):
+        documento = _documento_diploma(diploma)
+        try:
+            diplomas_collection.insert_one(documento)
+            break
+        except DuplicateKeyError as e:
+            if not _es_colision_codigo(e):
+                diploma_existente = diplomas_collection.find_one(
+                    {
+                        "email": solicitud.email,
+                        "id_curso": solicitud.id_curso,
+                        "tipo_diploma": solicitud.tipo_diploma
+                    },
+                    {"id": 1}
+                )
+                return {
+                    "exito": False,
+                    "mensaje": "Ya existe un diploma para este estudiante y curso",
+                    "diploma_existente": str(diploma_existente.get("id")) if diploma_existente else None
+                }
+            logger.warning(f"Colisión de código de verificación {diploma.codigo_verificacion} (intento {intento})")
+            diploma.id = str(uuid.uuid4())
+            diploma.codigo_verificacion = _generar_codigo_verificacion(diploma.id, diploma.fecha_vencimiento)
+    else:
+        raise AchievementError("No se pudo generar un código de verificación único")
+    
+    if _codigos_conocidos is not None:
+        _codigos_conocidos.add(diploma.codigo_verificacion)
+    
+    # El certificado se renderiza fuera del worker; url_certificado se completa al terminar
+    try:
+        certificate_service.programar_certificado(documento, plantilla.dict() if plantilla else None)
+    except Exception as e:
+        logger.error(f"No se pudo programar el certificado del diploma {diploma.id}: {e}")
     
     logger.info(f"Diploma generado para {solicitud.email}: {diploma.nombre_diploma}")
     
     return {
         "exito": True,
         "mensaje": "Diploma generado exitosamente",
-        "diploma": diploma.dict(),
+        "diploma": _documento_diploma(diploma),
         "codigo_verificacion": diploma.codigo_verificacion,
         "elegibilidad": elegibilidad.dict()
     }
 
+@trazar
 def obtener_diplomas_estudiante(email: str) -> List[Dict[str, Any]]:
-    """Obtener todos los diplomas de un estudiante"""
+    """
+    Obtener todos los diplomas de un estudiante.
+    
+    `esta_vencido` y `equivalencia_internacional` vienen guardados en el documento
+    (ver `barrer_vencimientos`), así que la lista es una proyección directa.
+    """
     _verificar_conexion_bd()
     
     diplomas = list(diplomas_collection.find({"email": email}, {"_id": 0}))
     
-    # Agregar información de estado
+    ahora = datetime.now()
     for diploma in diplomas:
-        diploma_obj = Diploma(**diploma)
-        diploma["esta_vencido"] = diploma_obj.esta_vencido()
-        diploma["equivalencia_internacional"] = diploma_obj.obtener_equivalencia_internacional()
+        diploma["esta_vencido"] = _esta_vencido(diploma, ahora)
+        if "equivalencia_internacional" not in diploma:
+            diploma["equivalencia_internacional"] = grading.equivalencia_internacional(diploma.get("nota_final"))
     
     return diplomas
 
-def verificar_diploma(codigo_verificacion: str) -> Optional[Dict[str, Any]]:
-    """Verificar la autenticidad de un diploma por código de verificación"""
+def _documento_diploma(diploma: Diploma) -> Dict[str, Any]:
+    """Documento a guardar: el diploma más los campos derivados que se leen en cada consulta"""
+    documento = diploma.dict()
+    documento["esta_vencido"] = diploma.esta_vencido()
+    documento["equivalencia_internacional"] = diploma.obtener_equivalencia_internacional()
+    return documento
+
+def _esta_vencido(diploma: Dict[str, Any], ahora: datetime) -> bool:
+    """
+    Estado de vencimiento de un documento. El barrido guarda `esta_vencido`; la
+    comparación cubre el intervalo entre el vencimiento y el siguiente barrido.
+    """
+    if diploma.get("esta_vencido"):
+        return True
+    fecha_vencimiento = diploma.get("fecha_vencimiento")
+    return fecha_vencimiento is not None and ahora > fecha_vencimiento
+
+def _expresion_equivalencia(campo: str) -> Dict[str, Any]:
+    """Equivalencia internacional como expresión `$switch` construida desde la tabla de grading"""
+    ramas = [{"case": {"$eq": [{"$ifNull": [campo, None]}, None]}, "then": grading.equivalencia_internacional(None)}]
+    for umbral, equivalencia in reversed(list(zip(grading.UMBRALES_NOTA, grading.EQUIVALENCIAS[1:]))):
+        ramas.append({"case": {"$gte": [campo, umbral]}, "then": equivalencia})
+    return {"$switch": {"branches": ramas, "default": grading.EQUIVALENCIAS[0]}}
+
+def migracion_campos_derivados_aplicada() -> bool:
+    """Indica si `migrar_campos_derivados` ya se aplicó sobre esta base de datos"""
     _verificar_conexion_bd()
+    return versiones_collection.find_one({"_id": MIGRACION_CAMPOS_DERIVADOS}, {"_id": 1}) is not None
+
+def migrar_campos_derivados(forzar: bool = False) -> Optional[int]:
+    """
+    Migración única: calcular en la base de datos los campos derivados de los
+    diplomas emitidos antes de guardarlos.
     
-    diploma = diplomas_collection.find_one({"codigo_verificacion": codigo_verificacion}, {"_id": 0})
-    
-    if not diploma:
+    Recorre la colección completa, así que no forma parte del barrido: se ejecuta
+    al inicializar la base de datos (`python -m app.DB.initialize --migrar`) y
+    deja una marca en `versiones`. Devuelve los diplomas completados, o None si
+    la migración ya estaba aplicada y no se fuerza.
+    """
+    _verificar_conexion_bd()
+    if not forzar and migracion_campos_derivados_aplicada():
         return None
     
-    diploma_obj = Diploma(**diploma)
+    ahora = datetime.now()
+    resultado = diplomas_collection.update_many(
+        _SIN_CAMPOS_DERIVADOS,
+        [{"$set": {
+            "esta_vencido": {"$and": [
+                {"$ne": [{"$ifNull": ["$fecha_vencimiento", None]}, None]},
+                {"$lte": ["$fecha_vencimiento", ahora]}
+            ]},
+            "equivalencia_internacional": _expresion_equivalencia("$nota_final")
+        }}]
+    )
+    _marcar_migracion_campos_derivados(ahora, resultado.modified_count)
+    logger.info(f"Migración de campos derivados: {resultado.modified_count} diplomas completados")
+    return resultado.modified_count
+
+def _marcar_migracion_campos_derivados(ahora: datetime, diplomas: int):
+    versiones_collection.update_one(
+        {"_id": MIGRACION_CAMPOS_DERIVADOS},
+        {"$set": {"aplicada": ahora, "diplomas": diplomas}},
+        upsert=True
+    )
+
+def _comprobar_campos_derivados(ahora: datetime):
+    """
+    Sin la marca de migración, avisar solo si algún diploma necesita la
+    migración; si ninguno (p. ej. una base de datos nueva) se deja la marca y
+    la consulta no se repite en los siguientes arranques.
+    """
+    if migracion_campos_derivados_aplicada():
+        return
+    if diplomas_collection.find_one(_SIN_CAMPOS_DERIVADOS, {"_id": 1}) is None:
+        _marcar_migracion_campos_derivados(ahora, 0)
+    else:
+        logger.warning("Hay diplomas sin campos derivados guardados: ejecute python -m app.DB.initialize --migrar")
+
+@trazar
+def barrer_vencimientos() -> int:
+    """
+    Marcar `esta_vencido` en los diplomas cuya fecha de vencimiento ya pasó.
+    
+    Cada barrido solo recorre el rango de `fecha_vencimiento` transcurrido desde
+    el anterior, sobre el índice `diploma_fecha_vencimiento`. El primero de cada
+    proceso recorre todo el histórico de fechas de vencimiento; los campos
+    derivados de diplomas antiguos los completa `migrar_campos_derivados`.
+    """
+    global _ultimo_barrido_vencimientos
+    _verificar_conexion_bd()
+    
+    ahora = datetime.now()
+    rango = {"$lte": ahora}
+    if _ultimo_barrido_vencimientos is None:
+        _comprobar_campos_derivados(ahora)
+    else:
+        rango["$gt"] = _ultimo_barrido_vencimientos - timedelta(seconds=VENCIMIENTO_SOLAPE_SEGUNDOS)
+    
+    resultado = diplomas_collection.update_many(
+        {"fecha_vencimiento": rango, "esta_vencido": {"$ne": True}},
+        {"$set": {"esta_vencido": True}}
+    )
+    _ultimo_barrido_vencimientos = ahora
+    
+    if resultado.modified_count:
+        logger.info(f"Barrido de vencimientos: {resultado.modified_count} diplomas vencidos")
+    return resultado.modified_count
+
+def _barrer_vencimientos_periodico():
+    if diplomas_collection is not None:
+        barrer_vencimientos()
+
+tasks.register(PeriodicTask("vencimiento_diplomas", VENCIMIENTO_BARRIDO_SEGUNDOS, _barrer_vencimientos_periodico, run_on_start=True))
+
+def _resultado_verificacion(
+    diploma: Dict[str, Any], verificado: Optional[verification_codes.CodigoVerificado] = None
+) -> Dict[str, Any]:
+    """
+    Respuesta de verificación a partir del documento, sin construir el modelo
+    Diploma. El vencimiento de un código firmado es el que lleva firmado; el de
+    un código antiguo, el del documento.
+    """
+    if verificado is not None:
+        vencido = verificado.esta_vencido
+    else:
+        vencido = _esta_vencido(diploma, datetime.now())
     
     return {
         "valido": True,
         "diploma": diploma,
-        "esta_vencido": diploma_obj.esta_vencido(),
-        "mensaje": "Diploma válido" if not diploma_obj.esta_vencido() else "Diploma válido pero vencido"
+        "esta_vencido": vencido,
+        "mensaje": "Diploma válido" if not vencido else "Diploma válido pero vencido"
     }
 
-def obtener_estadisticas_diplomas() -> Dict[str, Any]:
-    """Obtener estadísticas generales de diplomas"""
+def _sincronizar_codigos_recientes():
+    """Añadir al filtro los códigos emitidos por otros procesos desde la última sincronización"""
+    global _ultima_sincronizacion_codigos, _proxima_sincronizacion_codigos
+    
+    codigos = _codigos_conocidos
+    if codigos is None:
+        return
+    
+    inicio = datetime.now()
+    _proxima_sincronizacion_codigos = time.monotonic() + VERIFICACION_SINCRONIZACION_SEGUNDOS
+    desde = _ultima_sincronizacion_codigos - timedelta(seconds=VERIFICACION_MARGEN_RELOJ_SEGUNDOS)
+    for diploma in diplomas_collection.find({"fecha_obtencion": {"$gte": desde}}, {"_id": 0, "codigo_verificacion": 1}):
+        if diploma.get("codigo_verificacion"):
+            codigos.add(diploma["codigo_verificacion"])
+    _ultima_sincronizacion_codigos = inicio
+
+@trazar
+def reconstruir_cache_verificacion():
+    """
+    Reconstruir el filtro de códigos conocidos recorriendo todos los códigos
+    de verificación (solo la proyección del código). Se ejecuta al arrancar
+    y periódicamente para descartar los códigos de diplomas eliminados.
+    """
+    global _codigos_conocidos, _ultima_sincronizacion_codigos, _proxima_sincronizacion_codigos
     _verificar_conexion_bd()
     
+    inicio = datetime.now()
+    codigos = [
+        d["codigo_verificacion"]
+        for d in diplomas_collection.find({}, {"_id": 0, "codigo_verificacion": 1})
+        if d.get("codigo_verificacion")
+    ]
+    
+    # Holgura para los códigos que se emitan hasta la próxima reconstrucción
+    filtro = BloomFilter(max(len(codigos) * 2, VERIFICACION_CAPACIDAD_MINIMA), VERIFICACION_TASA_FALSOS_POSITIVOS)
+    for codigo in codigos:
+        filtro.add(codigo)
+    
+    _codigos_conocidos = filtro
+    _ultima_sincronizacion_codigos = inicio
+    # Los códigos emitidos durante el recorrido se recogen en el primer rechazo
+    _proxima_sincronizacion_codigos = 0.0
+    logger.info(f"Caché de verificación reconstruida con {len(codigos)} códigos")
+
+def _reconstruir_cache_verificacion_periodica():
+    if diplomas_collection is not None:
+        reconstruir_cache_verificacion()
+
+tasks.register(PeriodicTask(
+    "cache_verificacion_diplomas",
+    VERIFICACION_RECONSTRUCCION_SEGUNDOS,
+    _reconstruir_cache_verificacion_periodica,
+    run_on_start=True
+))
+
+def _sincronizar_revocaciones():
+    """Retirar de la LRU los diplomas eliminados por otros procesos desde la última sincronización"""
+    global _ultima_sincronizacion_revocaciones, _proxima_sincronizacion_revocaciones
+    
+    inicio = datetime.now()
+    desde = _ultima_sincronizacion_revocaciones - timedelta(seconds=VERIFICACION_MARGEN_RELOJ_SEGUNDOS)
+    for revocado in diplomas_revocados_collection.find(
+        {"fecha_revocacion": {"$gte": desde}}, {"_id": 0, "codigo_verificacion": 1}
+    ):
+        _diplomas_verificados.pop(revocado["codigo_verificacion"])
+    _ultima_sincronizacion_revocaciones = inicio
+    _proxima_sincronizacion_revocaciones = time.monotonic() + VERIFICACION_SINCRONIZACION_SEGUNDOS
+
+def _revocaciones_al_dia():
+    """
+    Sincronizar las revocaciones antes de servir desde la LRU, como mucho una
+    vez por DIPLOMAS_VERIFICATION_SYNC_SECONDS: un diploma eliminado en otro
+    proceso deja de verificarse en este dentro de ese intervalo. El margen de
+    reloj vuelve a retirar un documento que otra solicitud guardó en la LRU
+    mientras se eliminaba.
+    """
+    if time.monotonic() < _proxima_sincronizacion_revocaciones:
+        return
+    with _revocaciones_lock:
+        if time.monotonic() >= _proxima_sincronizacion_revocaciones:
+            _sincronizar_revocaciones()
+
+def _codigo_posiblemente_conocido(codigo_verificacion: str) -> bool:
+    """
+    Consultar el filtro de códigos conocidos. Un "no" es definitivo salvo que el
+    código lo haya emitido otro proceso después de la última sincronización, así
+    que ante un "no" se sincronizan los códigos recientes como mucho una vez por
+    DIPLOMAS_VERIFICATION_SYNC_SECONDS.
+    """
+    codigos = _codigos_conocidos
+    if codigos is None or codigo_verificacion in codigos:
+        return True
+    if time.monotonic() >= _proxima_sincronizacion_codigos:
+        with _sincronizacion_lock:
+            if time.monotonic() >= _proxima_sincronizacion_codigos:
+                _sincronizar_codigos_recientes()
+        return codigo_verificacion in _codigos_conocidos
+    return False
+
+@trazar
+def verificar_diploma(codigo_verificacion: str) -> Optional[Dict[str, Any]]:
+    """
+    Verificar la autenticidad de un diploma por código de verificación.
+    
+    Los códigos firmados (RC2-...) se autentican primero por su firma, sin tocar
+    la base de datos; la consulta posterior solo confirma que no fue revocado.
+    Para todos los códigos: primero la LRU de diplomas verificados recientemente
+    (sin los eliminados por cualquier proceso, ver `_revocaciones_al_dia`);
+    para los antiguos (RC-...), luego el filtro de códigos conocidos, que rechaza
+    códigos inventados sin consultar la base de datos.
+    """
+    _verificar_conexion_bd()
+    
+    # Un código firmado se autentica y se comprueba su vigencia solo con CPU;
+    # la BD queda para la revocación
+    verificado = None
+    if verification_codes.es_codigo_firmado(codigo_verificacion):
+        verificado = verification_codes.verificar_codigo(codigo_verificacion, _claves_verificacion)
+        if verificado is None:
+            DIPLOMA_VERIFICATIONS.labels(resultado="firma_invalida").inc()
+            return None
+    firmado = verificado is not None
+    
+    _revocaciones_al_dia()
+    diploma = _diplomas_verificados.get(codigo_verificacion)
+    if diploma is not None:
+        DIPLOMA_VERIFICATIONS.labels(resultado="cache").inc()
+        return _resultado_verificacion(diploma, verificado)
+    
+    if not firmado and not _codigo_posiblemente_conocido(codigo_verificacion):
+        DIPLOMA_VERIFICATIONS.labels(resultado="rechazo_bloom").inc()
+        return None
+    
+    diploma = diplomas_collection.find_one({"codigo_verificacion": codigo_verificacion}, {"_id": 0})
+    
+    if not diploma:
+        # Un código firmado auténtico sin diploma corresponde a un diploma revocado
+        DIPLOMA_VERIFICATIONS.labels(resultado="revocado" if firmado else "no_encontrado").inc()
+        return None
+    
+    DIPLOMA_VERIFICATIONS.labels(resultado="bd").inc()
+    _diplomas_verificados.put(codigo_verificacion, diploma)
+    return _resultado_verificacion(diploma, verificado)
+
+def _calcular_estadisticas_diplomas() -> Dict[str, Any]:
+    """Calcular totales y desgloses de diplomas en una sola agregación `$facet`"""
+    ahora = datetime.now()
+    hace_30_dias = ahora - timedelta(days=30)
+    
     pipeline = [
         {
-            "$group": {
-                "_id": "$tipo_diploma",
-                "total": {"$sum": 1},
-                "promedio_notas": {"$avg": "$nota_final"},
-                "diplomas_recientes": {
-                    "$sum": {
-                        "$cond": [
-                            {"$gte": ["$fecha_obtencion", datetime.now() - timedelta(days=30)]},
-                            1,
-                            0
-                        ]
+            "$facet": {
+                "totales": [
+                    {
+                        "$group": {
+                            "_id": None,
+                            "total": {"$sum": 1},
+                            "vencidos": {"$sum": {"$cond": [{"$eq": ["$esta_vencido", True]}, 1, 0]}}
+                        }
                     }
-                }
+                ],
+                "por_tipo": [
+                    {
+                        "$group": {
+                            "_id": "$tipo_diploma",
+                            "total": {"$sum": 1},
+                            "promedio_notas": {"$avg": "$nota_final"},
+                            "diplomas_recientes": {
+                                "$sum": {"$cond": [{"$gte": ["$fecha_obtencion", hace_30_dias]}, 1, 0]}
+                            }
+                        }
+                    }
+                ],
+                "por_curso": [
+                    {
+                        "$group": {
+                            "_id": "$id_curso",
+                            "total": {"$sum": 1},
+                            "promedio_notas": {"$avg": "$nota_final"}
+                        }
+                    },
+                    {"$sort": {"total": -1, "_id": 1}}
+                ],
+                "por_mes": [
+                    {
+                        "$group": {
+                            "_id": {"$dateToString": {"format": "%Y-%m", "date": "$fecha_obtencion"}},
+                            "total": {"$sum": 1}
+                        }
+                    },
+                    {"$sort": {"_id": 1}}
+                ]
             }
         }
     ]
     
-    stats_por_tipo = list(diplomas_collection.aggregate(pipeline))
-    
-    total_diplomas = diplomas_collection.count_documents({})
-    diplomas_vigentes = diplomas_collection.count_documents({
-        "$or": [
-            {"fecha_vencimiento": None},
-            {"fecha_vencimiento": {"$gt": datetime.now()}}
-        ]
-    })
+    resultado = next(diplomas_collection.aggregate(pipeline), {})
+    totales = (resultado.get("totales") or [{}])[0]
+    total_diplomas = totales.get("total", 0)
+    diplomas_vencidos = totales.get("vencidos", 0)
     
     return {
         "total_diplomas": total_diplomas,
-        "diplomas_vigentes": diplomas_vigentes,
-        "diplomas_vencidos": total_diplomas - diplomas_vigentes,
-        "estadisticas_por_tipo": stats_por_tipo,
+        "diplomas_vigentes": total_diplomas - diplomas_vencidos,
+        "diplomas_vencidos": diplomas_vencidos,
+        "estadisticas_por_tipo": resultado.get("por_tipo", []),
+        "estadisticas_por_curso": resultado.get("por_curso", []),
+        "estadisticas_por_mes": resultado.get("por_mes", []),
         "configuracion_colombia": {
             "escala_notas": f"{ConfiguracionDiplomasColombia.ESCALA_NUMERICA_MIN}-{ConfiguracionDiplomasColombia.ESCALA_NUMERICA_MAX}",
             "nota_minima_aprobacion": ConfiguracionDiplomasColombia.NOTA_MINIMA_APROBACION,
@@ -347,17 +708,56 @@ def obtener_estadisticas_diplomas() -> Dict[str, Any]:
         }
     }
 
+# Instantánea de estadísticas: se sirve desde memoria y se refresca en segundo plano
+_estadisticas_snapshot: Snapshot[Dict[str, Any]] = Snapshot(
+    _calcular_estadisticas_diplomas, ESTADISTICAS_MAX_ANTIGUEDAD_SEGUNDOS
+)
+
+def _refrescar_estadisticas():
+    if diplomas_collection is not None:
+        _estadisticas_snapshot.refresh()
+
+tasks.register(PeriodicTask("estadisticas_diplomas", ESTADISTICAS_MAX_ANTIGUEDAD_SEGUNDOS, _refrescar_estadisticas, run_on_start=True))
+
+@trazar
+def obtener_estadisticas_diplomas(refrescar: bool = False) -> Dict[str, Any]:
+    """
+    Obtener estadísticas generales de diplomas.
+    
+    Se sirven desde una instantánea con una antigüedad máxima de
+    DIPLOMAS_STATS_MAX_STALENESS_SECONDS; `refrescar=True` fuerza un recálculo.
+    """
+    _verificar_conexion_bd()
+    
+    estadisticas = dict(_estadisticas_snapshot.get(force=refrescar))
+    estadisticas["generado_en"] = _estadisticas_snapshot.generated_at
+    estadisticas["antiguedad_segundos"] = round(_estadisticas_snapshot.age or 0, 3)
+    return estadisticas
+
+@trazar
 def eliminar_diploma(email: str, diploma_id: str) -> bool:
     """Eliminar un diploma específico"""
     _verificar_conexion_bd()
     
-    result = diplomas_collection.delete_one({
-        "id": diploma_id,
-        "email": email
-    })
+    diploma = diplomas_collection.find_one_and_delete(
+        {
+            "id": diploma_id,
+            "email": email
+        },
+        {"_id": 0, "codigo_verificacion": 1}
+    )
     
-    if result.deleted_count > 0:
+    if diploma is not None:
+        # El filtro no admite borrados; el código pasará a la BD y allí no se encontrará.
+        # Los demás procesos lo retiran de su LRU al sincronizar las revocaciones
+        if diploma.get("codigo_verificacion"):
+            _diplomas_verificados.pop(diploma["codigo_verificacion"])
+            diplomas_revocados_collection.insert_one({
+                "codigo_verificacion": diploma["codigo_verificacion"],
+                "id": diploma_id,
+                "fecha_revocacion": datetime.now()
+            })
         logger.info(f"Diploma eliminado: {diploma_id} para {email}")
         return True
     
-    return False 
\ No newline at end of file
+    return False
\ No newline at end of file
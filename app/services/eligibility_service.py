@@ -0,0 +1,264 @@
+"""
+Eligibility Service - Estado de elegibilidad a diplomas precalculado
+
+Mantiene un índice inverso (id_curso, nombre_logro) -> plantillas de
+`plantillas_diplomas` que lo exigen. Cada escritura de un logro recalcula y
+guarda en `elegibilidad_diplomas` solo el estado de las plantillas afectadas,
+así que la consulta de elegibilidad es una única lectura.
+
+Cada estado guarda la `revision` del documento del estudiante con el que se
+calculó (la escritura la incrementa de forma atómica): un estado calculado con
+datos anteriores nunca pisa a uno más reciente. El índice de plantillas se
+comprueba contra una versión guardada en `versiones` antes de cada uso, así que
+una plantilla creada en cualquier worker se tiene en cuenta en la siguiente
+escritura de todos.
+"""
+
+from app.DB.database import get_database, coleccion, ColeccionDelProceso
+from app.models.diploma import (
+    PlantillaDiploma, VerificacionElegibilidadDiploma, ConfiguracionDiplomasColombia
+)
+from app.models.student import Student
+from app.core.tracing import trazar
+from app.core import grading
+from app.core.cache import Snapshot
+from typing import Optional, List, Dict, Any, Tuple
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Obtener las colecciones
+_db = get_database()
+plantillas_diplomas_collection: Optional[ColeccionDelProceso] = coleccion("plantillas_diplomas") if _db is not None else None
+elegibilidad_collection: Optional[ColeccionDelProceso] = coleccion("elegibilidad_diplomas") if _db is not None else None
+versiones_collection: Optional[ColeccionDelProceso] = coleccion("versiones") if _db is not None else None
+
+# Antigüedad máxima (segundos) del índice de plantillas en este proceso. Los
+# cambios hechos por la API se detectan por su versión; la antigüedad recoge
+# además las plantillas editadas directamente en la base de datos
+INDICE_PLANTILLAS_MAX_ANTIGUEDAD_SEGUNDOS = float(os.getenv("DIPLOMAS_TEMPLATE_INDEX_MAX_AGE_SECONDS", "60"))
+
+# Documento de `versiones` que cuenta los cambios de plantillas de diplomas
+VERSION_PLANTILLAS = "plantillas_diplomas"
+
+ClavePlantilla = Tuple[str, str]
+
+@trazar
+def evaluar_elegibilidad(
+    estudiante: Student,
+    plantilla: Optional[PlantillaDiploma],
+    id_curso: str,
+    tipo_diploma: str
+) -> VerificacionElegibilidadDiploma:
+    """Evaluar los requisitos de una plantilla con los logros ya cargados del estudiante"""
+    if not plantilla:
+        return VerificacionElegibilidadDiploma(
+            elegible=False,
+            mensaje=f"No se encontró plantilla para diploma tipo '{tipo_diploma}' del curso '{id_curso}'",
+            observaciones="Contacte al administrador para crear la plantilla de diploma"
+        )
+    
+    # Verificar cada requisito
+    requisitos_completados = []
+    requisitos_faltantes = []
+    notas_requisitos = []
+    horas_completadas = 0
+    
+    logros_estudiante = {logro.achievement_name: logro for logro in estudiante.achievements if logro.course_id == id_curso}
+    
+    for requisito in plantilla.requisitos:
+        logro = logros_estudiante.get(requisito.nombre_logro)
+        
+        if logro and logro.achieved:
+            # Convertir porcentaje a nota colombiana
+            nota_colombiana = grading.convertir_porcentaje(logro.percentage or 0)
+            
+            requisito_completado = {
+                "nombre_logro": requisito.nombre_logro,
+                "nota_obtenida": nota_colombiana,
+                "nota_minima": requisito.nota_minima,
+                "cumple_requisito": nota_colombiana >= requisito.nota_minima,
+                "fecha_completado": logro.date_earned,
+                "porcentaje_original": logro.percentage
+            }
+            
+            if nota_colombiana >= requisito.nota_minima:
+                requisitos_completados.append(requisito_completado)
+                notas_requisitos.append(nota_colombiana)
+                # Simular horas completadas (esto debería venir de los metadatos del logro)
+                horas_completadas += getattr(logro.metadata, 'horas', 10) if logro.metadata else 10
+            else:
+                requisitos_faltantes.append(requisito)
+        else:
+            if requisito.es_obligatorio:
+                requisitos_faltantes.append(requisito)
+    
+    # Calcular estadísticas
+    total_requisitos = len(plantilla.requisitos)
+    requisitos_cumplidos = len(requisitos_completados)
+    porcentaje_completado = (requisitos_cumplidos / total_requisitos) * 100 if total_requisitos > 0 else 0
+    nota_promedio = sum(notas_requisitos) / len(notas_requisitos) if notas_requisitos else 0
+    
+    # Determinar elegibilidad
+    requisitos_obligatorios_faltantes = [r for r in requisitos_faltantes if r.es_obligatorio]
+    elegible = len(requisitos_obligatorios_faltantes) == 0 and nota_promedio >= ConfiguracionDiplomasColombia.NOTA_MINIMA_APROBACION
+    
+    # Crear mensaje
+    if elegible:
+        mensaje = f"¡Felicidades! Cumples todos los requisitos para el diploma '{plantilla.nombre_diploma}'"
+        observaciones = f"Nota promedio: {nota_promedio:.1f} - {ConfiguracionDiplomasColombia.obtener_calificacion_cualitativa(nota_promedio)}"
+    else:
+        mensaje = f"Aún no cumples todos los requisitos para el diploma '{plantilla.nombre_diploma}'"
+        if nota_promedio < ConfiguracionDiplomasColombia.NOTA_MINIMA_APROBACION:
+            observaciones = f"Nota promedio insuficiente: {nota_promedio:.1f} (mínimo requerido: {ConfiguracionDiplomasColombia.NOTA_MINIMA_APROBACION})"
+        else:
+            observaciones = f"Faltan {len(requisitos_obligatorios_faltantes)} requisitos obligatorios"
+    
+    return VerificacionElegibilidadDiploma(
+        elegible=elegible,
+        plantilla_diploma=plantilla,
+        requisitos_completados=requisitos_completados,
+        requisitos_faltantes=requisitos_faltantes,
+        nota_promedio=nota_promedio,
+        horas_completadas=horas_completadas,
+        porcentaje_completado=porcentaje_completado,
+        mensaje=mensaje,
+        observaciones=observaciones
+    )
+
+def _version_plantillas() -> int:
+    documento = versiones_collection.find_one({"_id": VERSION_PLANTILLAS}, {"version": 1})
+    return documento["version"] if documento else 0
+
+def _cargar_indice_plantillas() -> Dict[str, Any]:
+    """Cargar todas las plantillas y construir el índice inverso por logro requerido"""
+    # Versión leída antes que las plantillas: un cambio durante la carga fuerza otra
+    version = _version_plantillas()
+    plantillas: Dict[ClavePlantilla, PlantillaDiploma] = {}
+    indice: Dict[Tuple[str, str], List[ClavePlantilla]] = {}
+    
+    for plantilla_doc in plantillas_diplomas_collection.find({}, {"_id": 0}):
+        plantilla = PlantillaDiploma(**plantilla_doc)
+        clave = (plantilla.id_curso, plantilla.tipo_diploma)
+        plantillas[clave] = plantilla
+        # La evaluación busca los logros del estudiante dentro del curso de la plantilla
+        for requisito in plantilla.requisitos:
+            indice.setdefault((plantilla.id_curso, requisito.nombre_logro), []).append(clave)
+    
+    return {"plantillas": plantillas, "indice": indice, "version": version}
+
+_indice_plantillas: Snapshot[Dict[str, Any]] = Snapshot(_cargar_indice_plantillas, INDICE_PLANTILLAS_MAX_ANTIGUEDAD_SEGUNDOS)
+
+def _indice_vigente() -> Dict[str, Any]:
+    """Índice de plantillas recargado si otro proceso cambió las plantillas (una lectura por _id)"""
+    indice = _indice_plantillas.get()
+    if indice["version"] != _version_plantillas():
+        indice = _indice_plantillas.refresh()
+    return indice
+
+def precargar_plantillas() -> int:
+    """Cargar el índice de plantillas ya (calentamiento al arrancar); devuelve cuántas hay"""
+    if plantillas_diplomas_collection is None:
+        return 0
+    return len(_indice_plantillas.refresh()["plantillas"])
+
+@trazar
+def plantillas_afectadas(course_id: str, achievement_name: str) -> List[ClavePlantilla]:
+    """Plantillas (id_curso, tipo_diploma) que exigen este logro"""
+    return _indice_vigente()["indice"].get((course_id, achievement_name), [])
+
+def revision_estudiante(student_doc: Dict[str, Any]) -> int:
+    """Revisión del documento del estudiante (0 en documentos anteriores al contador)"""
+    return student_doc.get("revision") or 0
+
+def _guardar_elegibilidad(
+    email: str,
+    clave: ClavePlantilla,
+    elegibilidad: VerificacionElegibilidadDiploma,
+    version: int
+):
+    """
+    Guardar el estado calculado. `version` es la `revision` del documento del
+    estudiante con el que se calculó: un estado calculado con datos más antiguos
+    no pisa a uno más nuevo.
+    """
+    id_curso, tipo_diploma = clave
+    filtro = {
+        "email": email, "id_curso": id_curso, "tipo_diploma": tipo_diploma,
+        # Sin versión o con la fecha que se guardaba antes del contador: se recalcula
+        "$or": [{"version": {"$lte": version}}, {"version": None}, {"version": {"$type": "date"}}]
+    }
+    
+    try:
+        elegibilidad_collection.update_one(
+            filtro,
+            {"$set": {
+                "resultado": elegibilidad.dict(),
+                "version": version,
+                "actualizado_en": datetime.now()
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Ya hay un estado calculado con datos más recientes
+        pass
+
+@trazar
+def recalcular_elegibilidad_por_logro(student_doc: Dict[str, Any], course_id: str, achievement_name: str) -> int:
+    """
+    Recalcular el estado guardado de las plantillas que exigen el logro escrito.
+    `student_doc` es el documento que devolvió la propia escritura (con su
+    `revision`). Devuelve el número de plantillas recalculadas.
+    """
+    if elegibilidad_collection is None:
+        return 0
+    
+    indice = _indice_vigente()
+    claves = indice["indice"].get((course_id, achievement_name), [])
+    if not claves:
+        return 0
+    
+    plantillas = indice["plantillas"]
+    estudiante = Student(**student_doc)
+    revision = revision_estudiante(student_doc)
+    for clave in claves:
+        elegibilidad = evaluar_elegibilidad(estudiante, plantillas.get(clave), *clave)
+        _guardar_elegibilidad(estudiante.email, clave, elegibilidad, revision)
+    
+    return len(claves)
+
+@trazar
+def obtener_elegibilidad_guardada(email: str, id_curso: str, tipo_diploma: str) -> Optional[VerificacionElegibilidadDiploma]:
+    """Estado precalculado de elegibilidad, o None si aún no se ha calculado"""
+    if elegibilidad_collection is None:
+        return None
+    
+    estado = elegibilidad_collection.find_one(
+        {"email": email, "id_curso": id_curso, "tipo_diploma": tipo_diploma},
+        {"_id": 0, "resultado": 1}
+    )
+    if not estado:
+        return None
+    return VerificacionElegibilidadDiploma(**estado["resultado"])
+
+@trazar
+def guardar_elegibilidad(email: str, id_curso: str, tipo_diploma: str, elegibilidad: VerificacionElegibilidadDiploma, version: int):
+    """Guardar un estado calculado por completo (primera consulta de un estudiante)"""
+    if elegibilidad_collection is not None:
+        _guardar_elegibilidad(email, (id_curso, tipo_diploma), elegibilidad, version)
+
+@trazar
+def invalidar_plantilla(id_curso: str, tipo_diploma: str):
+    """
+    Descartar el índice y los estados guardados de una plantilla nueva o modificada.
+    La versión se incrementa antes de borrar los estados: un estado guardado
+    mientras tanto con el índice anterior también se borra.
+    """
+    if versiones_collection is not None:
+        versiones_collection.update_one({"_id": VERSION_PLANTILLAS}, {"$inc": {"version": 1}}, upsert=True)
+    _indice_plantillas.invalidate()
+    if elegibilidad_collection is not None:
+        elegibilidad_collection.delete_many({"id_curso": id_curso, "tipo_diploma": tipo_diploma})
@@ -0,0 +1,690 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de combinaciones de endpoints
+
+Genera carga contra `app.main:app` sin desplegar la API:
+
+- `asgi` (por defecto): llama a la aplicación ASGI en el mismo proceso, sin
+  HTTP ni cliente; mide el coste de la aplicación (middlewares, validación,
+  servicios y MongoDB).
+- `socket`: arranca uvicorn en un hilo sobre un puerto local y la carga por
+  HTTP con conexiones keep-alive (`pip install httpx`).
+- `--url`: carga un servidor ya arrancado (p. ej. `startup.py --workers N`).
+
+La carga se reparte entre escenarios con peso (--mezcla). Un escenario es un
+grupo de solicitudes para el mismo estudiante que se envían a la vez, como
+las que hace el panel del estudiante al abrirse; se mide cada ruta y el
+escenario completo (`[escenario] nombre`, la latencia de la página):
+
+- dashboard   logros + estadísticas + diplomas + elegibilidad de un estudiante
+- mixta       90% dashboard y 10% actualizaciones de logros
+- escritura   actualizaciones de logros y lotes de bulk-update
+- notas       conversión de notas por lotes (no toca MongoDB)
+
+o una lista propia: --mezcla "GET /achievements/{email}:3,GET /diplomas/estadisticas:1"
+(`{email}` y `{curso}` se sustituyen por un estudiante y un curso de los datos;
+las rutas POST de las mezclas anteriores llevan su cuerpo).
+
+Sin --tasa, --concurrencia clientes envían solicitudes una tras otra (bucle
+cerrado). Con --tasa, las solicitudes se programan a ese ritmo y la latencia
+se mide desde el instante programado, de modo que una parada de la API cuenta
+en todas las solicitudes que retrasa (corrección de omisión coordinada).
+
+Informa por ruta del throughput, la tasa de errores y los percentiles
+p50/p95/p99/máximo. Las latencias se registran en histogramas de precisión
+relativa fija (estilo HdrHistogram): --salida los guarda en JSON para
+compararlos entre commits con --comparar, y --hgrm escribe la distribución
+de percentiles de cada ruta en el formato de texto de HdrHistogram.
+
+En los modos `asgi` y `socket` los datos se crean en una base de datos
+temporal (`--backend mongod`, la de MONGODB_URL) o en MongoDB simulado
+(`--backend mongomock`); con --url se crean con el prefijo `carga.` en la
+base de datos del servidor y no se borran.
+
+Uso: python -m benchmarks.bench_carga [--modo asgi|socket] [--url URL] [--mezcla dashboard]
+         [--concurrencia 16] [--duracion 10] [--tasa RPS] [--salida carga.json]
+         [--comparar base.json] [--hgrm DIR]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from benchmarks.bench_servicios import commit_actual, preparar_backend
+
+CURSOS = 3
+CURSO_DIPLOMA = "carga_curso_0"
+REQUISITOS_DIPLOMA = 2
+LOTE_CREACION = 100
+
+
+# --- Histograma ---
+
+class Histograma:
+    """
+    Histograma logarítmico-lineal de latencias en microsegundos, como
+    HdrHistogram: los valores hasta 2^bits se guardan exactos y los mayores en
+    cubos de 2^bits subdivisiones por potencia de dos, con un error relativo
+    máximo de 1/2^(bits-1) (0.8% con bits=8). Ocupa lo mismo con mil que con
+    mil millones de muestras y dos histogramas se suman cubo a cubo.
+    """
+
+    def __init__(self, bits: int = 8):
+        self.bits = bits
+        self.conteos: Dict[int, int] = {}
+        self.total = 0
+        self.suma = 0
+        self.suma_cuadrados = 0
+        self.minimo: Optional[int] = None
+        self.maximo = 0
+
+    def _cubo(self, valor: int) -> int:
+        desplazamiento = valor.bit_length() - self.bits
+        if desplazamiento <= 0:
+            return valor
+        return (valor >> desplazamiento) << desplazamiento
+
+    def _superior(self, cubo: int) -> int:
+        """Mayor valor equivalente al cubo (el que se informa, como HdrHistogram)"""
+        desplazamiento = cubo.bit_length() - self.bits
+        return cubo if desplazamiento <= 0 else cubo + (1 << desplazamiento) - 1
+
+    def registrar(self, segundos: float):
+        valor = max(0, int(segundos * 1_000_000))
+        cubo = self._cubo(valor)
+        self.conteos[cubo] = self.conteos.get(cubo, 0) + 1
+        self.total += 1
+        self.suma += valor
+        self.suma_cuadrados += valor * valor
+        self.minimo = valor if self.minimo is None else min(self.minimo, valor)
+        self.maximo = max(self.maximo, valor)
+
+    def sumar(self, otro: "Histograma"):
+        for cubo, conteo in otro.conteos.items():
+            self.conteos[cubo] = self.conteos.get(cubo, 0) + conteo
+        self.total += otro.total
+        self.suma += otro.suma
+        self.suma_cuadrados += otro.suma_cuadrados
+        if otro.minimo is not None:
+            self.minimo = otro.minimo if self.minimo is None else min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+
+    def percentil(self, p: float) -> int:
+        """Valor (µs) por debajo del cual queda el p% de las muestras"""
+        if not self.total:
+            return 0
+        objetivo = max(1, math.ceil(p / 100 * self.total))
+        acumulado = 0
+        for cubo in sorted(self.conteos):
+            acumulado += self.conteos[cubo]
+            if acumulado >= objetivo:
+                return min(self._superior(cubo), self.maximo)
+        return self.maximo
+
+    def media(self) -> float:
+        return self.suma / self.total if self.total else 0.0
+
+    def desviacion(self) -> float:
+        if not self.total:
+            return 0.0
+        return math.sqrt(max(0.0, self.suma_cuadrados / self.total - self.media() ** 2))
+
+    def resumen_ms(self) -> Dict[str, float]:
+        return {
+            "p50_ms": round(self.percentil(50) / 1000, 3),
+            "p95_ms": round(self.percentil(95) / 1000, 3),
+            "p99_ms": round(self.percentil(99) / 1000, 3),
+            "max_ms": round(self.maximo / 1000, 3),
+            "media_ms": round(self.media() / 1000, 3),
+        }
+
+    def a_dict(self) -> dict:
+        return {
+            "unidad": "us",
+            "bits": self.bits,
+            "total": self.total,
+            "suma": self.suma,
+            "suma_cuadrados": self.suma_cuadrados,
+            "min": self.minimo,
+            "max": self.maximo,
+            "conteos": {str(cubo): conteo for cubo, conteo in sorted(self.conteos.items())},
+        }
+
+    @classmethod
+    def desde_dict(cls, datos: dict) -> "Histograma":
+        histograma = cls(datos.get("bits", 8))
+        histograma.conteos = {int(cubo): conteo for cubo, conteo in datos["conteos"].items()}
+        histograma.total = datos["total"]
+        histograma.suma = datos["suma"]
+        histograma.suma_cuadrados = datos.get("suma_cuadrados", 0)
+        histograma.minimo = datos["min"]
+        histograma.maximo = datos["max"]
+        return histograma
+
+    def hgrm(self, marcas_por_mitad: int = 5) -> str:
+        """
+        Distribución de percentiles en el formato de texto de HdrHistogram
+        (valores en ms), con más puntos cuanto más cerca de la cola, como
+        `outputPercentileDistribution`; se puede dibujar con su plotter.
+        """
+        lineas = [f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}", ""]
+        p = 0.0
+        while True:
+            valor = self.percentil(p) / 1000
+            contadas = sum(c for cubo, c in self.conteos.items() if cubo <= self._cubo(int(valor * 1000)))
+            if p >= 100 or (100 - p) / 100 * self.total < 1:
+                lineas.append(f"{self.maximo / 1000:>12.3f} {1.0:>14.12f} {self.total:>10d}")
+                break
+            lineas.append(f"{valor:>12.3f} {p / 100:>14.12f} {contadas:>10d} {100 / (100 - p):>14.2f}")
+            mitades = int(math.log2(100 / (100 - p))) + 1
+            p += 100 / (marcas_por_mitad * 2 ** mitades)
+        lineas += [
+            f"#[Mean    = {self.media() / 1000:>12.3f}, StdDeviation   = {self.desviacion() / 1000:>12.3f}]",
+            f"#[Max     = {self.maximo / 1000:>12.3f}, Total count    = {self.total:>12d}]",
+            f"#[Buckets = {len(self.conteos):>12d}, SubBuckets     = {2 ** self.bits:>12d}]",
+        ]
+        return "\n".join(lineas) + "\n"
+
+
+# --- Mezclas de carga ---
+
+def _cuerpo_update(contexto, rng):
+    n = rng.randrange(contexto["logros"])
+    return {
+        "email": contexto["email"],
+        "achievement": {"achievement_name": f"logro_{n:04d}", "course_id": f"carga_curso_{n % CURSOS}",
+                        "title": f"Logro {n}"},
+        "score": float(rng.randint(50, 100)),
+        "total_points": 100.0,
+    }
+
+
+def _cuerpo_bulk(contexto, rng):
+    return {"updates": [
+        _cuerpo_update({**contexto, "email": email}, rng)
+        for email in rng.sample(contexto["emails"], min(20, len(contexto["emails"])))
+    ]}
+
+
+def _cuerpo_notas(contexto, rng):
+    return {"porcentajes": [rng.randint(0, 100) for _ in range(200)]}
+
+
+# Cuerpos de las rutas POST que usan las mezclas (también en las mezclas propias)
+CUERPOS = {
+    "/achievements/update": _cuerpo_update,
+    "/achievements/bulk-update": _cuerpo_bulk,
+    "/diplomas/convertir-notas": _cuerpo_notas,
+}
+
+DASHBOARD = [
+    ("GET", "/achievements/{email}", None),
+    ("GET", "/achievements/{email}/stats", None),
+    ("GET", "/diplomas/estudiante/{email}", None),
+    ("GET", "/diplomas/verificar-elegibilidad/{email}?id_curso={curso}", None),
+]
+
+# nombre -> [(escenario, peso, [(método, plantilla, cuerpo)])]
+MEZCLAS = {
+    "dashboard": [("dashboard", 1, DASHBOARD)],
+    "mixta": [
+        ("dashboard", 9, DASHBOARD),
+        ("actualizar", 1, [("POST", "/achievements/update", _cuerpo_update)]),
+    ],
+    "escritura": [
+        ("actualizar", 4, [("POST", "/achievements/update", _cuerpo_update)]),
+        ("bulk", 1, [("POST", "/achievements/bulk-update", _cuerpo_bulk)]),
+    ],
+    "notas": [("notas", 1, [("POST", "/diplomas/convertir-notas", _cuerpo_notas)])],
+}
+
+
+def mezcla_propia(texto: str):
+    """'GET /ruta:peso,...' -> un escenario de una solicitud por entrada"""
+    escenarios = []
+    for entrada in [e.strip() for e in texto.split(",") if e.strip()]:
+        solicitud, peso = entrada, "1"
+        if entrada.rsplit(":", 1)[-1].isdigit():
+            solicitud, peso = entrada.rsplit(":", 1)
+        metodo, _, plantilla = solicitud.strip().partition(" ")
+        if not plantilla.startswith("/"):
+            raise ValueError(f"Entrada de mezcla no válida: {entrada!r} (se espera 'MÉTODO /ruta[:peso]')")
+        cuerpo = CUERPOS.get(plantilla) if metodo.upper() == "POST" else None
+        escenarios.append((f"{metodo.upper()} {plantilla}", int(peso), [(metodo.upper(), plantilla, cuerpo)]))
+    return escenarios
+
+
+def ruta_de(metodo: str, plantilla: str) -> str:
+    """Etiqueta de la ruta en el informe: la plantilla sin la query"""
+    return f"{metodo} {plantilla.split('?')[0]}"
+
+
+# --- Clientes ---
+
+class ClienteASGI:
+    """Llama a la aplicación ASGI directamente, sin servidor ni cliente HTTP"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def solicitar(self, metodo: str, ruta: str, cuerpo: Optional[dict]) -> int:
+        camino, _, query = ruta.partition("?")
+        datos = json.dumps(cuerpo).encode() if cuerpo is not None else b""
+        cabeceras = [(b"host", b"carga"), (b"user-agent", b"bench-carga")]
+        if cuerpo is not None:
+            cabeceras += [(b"content-type", b"application/json"), (b"content-length", str(len(datos)).encode())]
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": metodo, "scheme": "http", "path": camino, "raw_path": camino.encode(),
+            "query_string": query.encode(), "root_path": "", "headers": cabeceras,
+            "client": ("127.0.0.1", 50000), "server": ("carga", 80),
+        }
+        enviado = False
+        terminada = asyncio.Event()
+        estado = {"codigo": 500}
+
+        async def receive():
+            nonlocal enviado
+            if not enviado:
+                enviado = True
+                return {"type": "http.request", "body": datos, "more_body": False}
+            await terminada.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+            elif mensaje["type"] == "http.response.body" and not mensaje.get("more_body", False):
+                terminada.set()
+
+        await self.app(scope, receive, send)
+        terminada.set()
+        return estado["codigo"]
+
+    async def cerrar(self):
+        pass
+
+
+class ClienteHTTP:
+    def __init__(self, base_url: str, conexiones: int):
+        try:
+            import httpx
+        except ImportError:
+            sys.exit("❌ Los modos socket y --url necesitan: pip install httpx")
+        self.cliente = httpx.AsyncClient(
+            base_url=base_url, timeout=60,
+            limits=httpx.Limits(max_connections=conexiones, max_keepalive_connections=conexiones)
+        )
+
+    async def solicitar(self, metodo: str, ruta: str, cuerpo: Optional[dict]) -> int:
+        respuesta = await self.cliente.request(metodo, ruta, json=cuerpo)
+        return respuesta.status_code
+
+    async def cerrar(self):
+        await self.cliente.aclose()
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def arrancar_uvicorn(app, puerto: int):
+    """uvicorn en un hilo con su propio event loop (las señales las gestiona este proceso)"""
+    import uvicorn
+
+    class Servidor(uvicorn.Server):
+        def install_signal_handlers(self):
+            pass
+
+    servidor = Servidor(uvicorn.Config(app, host="127.0.0.1", port=puerto, log_level="warning"))
+    hilo = threading.Thread(target=servidor.run, name="uvicorn-carga", daemon=True)
+    hilo.start()
+    limite = time.time() + 60
+    while not servidor.started:
+        if not hilo.is_alive() or time.time() > limite:
+            sys.exit("❌ uvicorn no arrancó")
+        time.sleep(0.05)
+    return servidor, hilo
+
+
+# --- Datos ---
+
+async def esperar_lista(cliente, plazo: float = 120):
+    """Esperar a que /health/ready responda 200 (calentamiento terminado)"""
+    limite = time.monotonic() + plazo
+    while time.monotonic() < limite:
+        try:
+            if await cliente.solicitar("GET", "/health/ready", None) == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    sys.exit("❌ La API no llegó a estar lista (GET /health/ready)")
+
+
+async def crear_datos(cliente, prefijo: str, estudiantes: int, logros: int, rng: random.Random) -> List[str]:
+    """Estudiantes con logros, una plantilla de diploma y diplomas para un cuarto de ellos"""
+    emails = [f"{prefijo}.{i}@carga.ravencode.co" for i in range(estudiantes)]
+    actualizaciones = [
+        {
+            "email": email,
+            "achievement": {"achievement_name": f"logro_{n:04d}", "course_id": f"carga_curso_{n % CURSOS}",
+                            "title": f"Logro {n}"},
+            # Los logros del curso del diploma aprobados: todos los estudiantes son elegibles
+            "score": 95.0 if n % CURSOS == 0 else float(rng.randint(50, 100)),
+            "total_points": 100.0,
+        }
+        for email in emails for n in range(logros)
+    ]
+    for inicio in range(0, len(actualizaciones), LOTE_CREACION):
+        lote = actualizaciones[inicio:inicio + LOTE_CREACION]
+        if await cliente.solicitar("POST", "/achievements/bulk-update", {"updates": lote}) != 200:
+            sys.exit("❌ No se pudieron crear los estudiantes de la prueba")
+
+    plantilla = {
+        "tipo_diploma": "curso",
+        "id_curso": CURSO_DIPLOMA,
+        "nombre_diploma": "Diploma de prueba de carga",
+        "titulo_diploma": "Certificado de prueba de carga",
+        "requisitos": [
+            {"nombre_logro": f"logro_{i * CURSOS:04d}", "id_curso": CURSO_DIPLOMA, "nota_minima": 3.0}
+            for i in range(min(REQUISITOS_DIPLOMA, (logros + CURSOS - 1) // CURSOS))
+        ],
+        "horas_academicas": 40,
+    }
+    if await cliente.solicitar("POST", "/diplomas/plantillas", plantilla) != 200:
+        sys.exit("❌ No se pudo crear la plantilla de diploma")
+    for email in emails[::4]:
+        await cliente.solicitar(
+            "POST", "/diplomas/generar", {"email": email, "id_curso": CURSO_DIPLOMA, "tipo_diploma": "curso"}
+        )
+    return emails
+
+
+# --- Carga ---
+
+class Resultados:
+    def __init__(self):
+        self.histogramas: Dict[str, Histograma] = {}
+        self.codigos: Dict[str, Dict[str, int]] = {}
+        self.fallos: Dict[str, int] = {}
+
+    def anotar(self, ruta: str, segundos: Optional[float], codigo: Optional[int]):
+        if segundos is not None:
+            self.histogramas.setdefault(ruta, Histograma()).registrar(segundos)
+        codigos = self.codigos.setdefault(ruta, {})
+        clave = str(codigo) if codigo is not None else "excepcion"
+        codigos[clave] = codigos.get(clave, 0) + 1
+
+    def errores(self, ruta: str) -> int:
+        return sum(n for codigo, n in self.codigos.get(ruta, {}).items()
+                   if codigo == "excepcion" or int(codigo) >= 400)
+
+
+async def _ejecutar_solicitud(cliente, resultados, medir, metodo, plantilla, cuerpo, contexto, rng, inicio):
+    ruta = plantilla.format(**contexto)
+    datos = cuerpo(contexto, rng) if cuerpo is not None else None
+    try:
+        codigo = await cliente.solicitar(metodo, ruta, datos)
+    except Exception:
+        codigo = None
+    if medir:
+        resultados.anotar(ruta_de(metodo, plantilla), time.perf_counter() - inicio if codigo else None, codigo)
+    return codigo
+
+
+async def cargar(cliente, escenarios, emails, logros, concurrencia, duracion, tasa, semilla,
+                 resultados: Optional[Resultados]) -> float:
+    """
+    Ejecutar la mezcla durante `duracion` segundos; sin `resultados` es un
+    calentamiento y no se mide nada. Devuelve los segundos transcurridos.
+    """
+    nombres = [e[0] for e in escenarios]
+    pesos = [e[1] for e in escenarios]
+    solicitudes = {e[0]: e[2] for e in escenarios}
+    medir = resultados is not None
+    inicio_carga = time.perf_counter()
+    fin = inicio_carga + duracion
+    siguiente = 0
+
+    async def trabajador(n):
+        nonlocal siguiente
+        rng = random.Random(f"{semilla}-{n}")
+        while True:
+            if tasa:
+                # Bucle abierto: la latencia cuenta desde el instante programado
+                programada = inicio_carga + siguiente / tasa
+                siguiente += 1
+                if programada >= fin:
+                    return
+                espera = programada - time.perf_counter()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+                inicio = programada
+            else:
+                inicio = time.perf_counter()
+                if inicio >= fin:
+                    return
+            escenario = rng.choices(nombres, pesos)[0]
+            contexto = {"email": rng.choice(emails), "curso": CURSO_DIPLOMA, "emails": emails, "logros": logros}
+            codigos = await asyncio.gather(*[
+                _ejecutar_solicitud(cliente, resultados, medir, metodo, plantilla, cuerpo, contexto, rng, inicio)
+                for metodo, plantilla, cuerpo in solicitudes[escenario]
+            ])
+            if medir and len(solicitudes[escenario]) > 1:
+                # El escenario falla si falla alguna de sus solicitudes
+                codigo = max((c or 599) for c in codigos)
+                resultados.anotar(f"[escenario] {escenario}", time.perf_counter() - inicio, codigo)
+
+    await asyncio.gather(*[trabajador(n) for n in range(concurrencia)])
+    return time.perf_counter() - inicio_carga
+
+
+# --- Informe ---
+
+def informe(resultados: Resultados, transcurrido: float) -> Dict[str, dict]:
+    rutas = {}
+    for ruta in sorted(resultados.codigos):
+        histograma = resultados.histogramas.get(ruta, Histograma())
+        total = sum(resultados.codigos[ruta].values())
+        errores = resultados.errores(ruta)
+        rutas[ruta] = {
+            "solicitudes": total,
+            "rps": round(total / transcurrido, 1),
+            "errores": errores,
+            "tasa_errores": round(errores / total, 4) if total else 0.0,
+            "codigos": resultados.codigos[ruta],
+            **histograma.resumen_ms(),
+            "histograma": histograma.a_dict(),
+        }
+    return rutas
+
+
+def imprimir(rutas: Dict[str, dict], transcurrido: float):
+    print(f"{'ruta':<58} {'solic.':>8} {'req/s':>9} {'errores':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'máx':>9}")
+    for ruta, r in rutas.items():
+        print(f"{ruta:<58} {r['solicitudes']:>8} {r['rps']:>9.1f} {r['tasa_errores']:>7.2%} "
+              f"{r['p50_ms']:>7.2f}ms {r['p95_ms']:>7.2f}ms {r['p99_ms']:>7.2f}ms {r['max_ms']:>7.2f}ms")
+    total = sum(r["solicitudes"] for ruta, r in rutas.items() if not ruta.startswith("[escenario]"))
+    print(f"\n⏱️  {total} solicitudes en {transcurrido:.1f}s: {total / transcurrido:.1f} req/s")
+
+
+def comparar(rutas: Dict[str, dict], base: dict, umbral: float) -> List[str]:
+    """Rutas cuyo p95 empeora más de `umbral` respecto a la base (percentiles recalculados del histograma)"""
+    print(f"\nComparación con {base['metadatos'].get('commit') or ''} "
+          f"({base['metadatos'].get('modo')}, mezcla {base['metadatos'].get('mezcla')}, umbral p95 {umbral:.0%})")
+    regresiones = []
+    for ruta, r in rutas.items():
+        anterior = base["rutas"].get(ruta)
+        if anterior is None:
+            continue
+        previo = Histograma.desde_dict(anterior["histograma"]).resumen_ms()
+        cambios = {p: (r[p] / previo[p] - 1 if previo[p] else 0.0) for p in ("p50_ms", "p95_ms", "p99_ms")}
+        regresion = cambios["p95_ms"] > umbral
+        if regresion:
+            regresiones.append(ruta)
+        print(f"   {'❌' if regresion else '✅'} {ruta:<58} " + "  ".join(
+            f"{p[:3]} {previo[p]:.2f}->{r[p]:.2f}ms ({cambios[p]:+.0%})" for p in ("p50_ms", "p95_ms", "p99_ms")
+        ) + f"  req/s {anterior['rps']:.0f}->{r['rps']:.0f}")
+    return regresiones
+
+
+def guardar_hgrm(rutas: Dict[str, dict], directorio: str):
+    os.makedirs(directorio, exist_ok=True)
+    for ruta, r in rutas.items():
+        nombre = "".join(c if c.isalnum() else "_" for c in ruta).strip("_")
+        with open(os.path.join(directorio, f"{nombre}.hgrm"), "w", encoding="utf-8") as archivo:
+            archivo.write(Histograma.desde_dict(r["histograma"]).hgrm())
+
+
+# --- Programa ---
+
+async def ejecutar(args, escenarios, app=None) -> dict:
+    servidor = None
+    if args.url:
+        cliente = ClienteHTTP(args.url.rstrip("/"), args.concurrencia * 4)
+    elif args.modo == "socket":
+        puerto = puerto_libre()
+        servidor, hilo = arrancar_uvicorn(app, puerto)
+        cliente = ClienteHTTP(f"http://127.0.0.1:{puerto}", args.concurrencia * 4)
+    else:
+        cliente = ClienteASGI(app)
+
+    try:
+        await esperar_lista(cliente)
+        rng = random.Random(args.semilla)
+        prefijo = f"carga.{uuid.uuid4().hex[:8]}"
+        print(f"👥 Creando {args.estudiantes} estudiantes con {args.logros} logros ({prefijo})")
+        emails = await crear_datos(cliente, prefijo, args.estudiantes, args.logros, rng)
+
+        if args.calentamiento > 0:
+            await cargar(cliente, escenarios, emails, args.logros, args.concurrencia, args.calentamiento,
+                         args.tasa, args.semilla, None)
+        modo = f"bucle abierto a {args.tasa} req/s" if args.tasa else "bucle cerrado"
+        print(f"🏋️  Mezcla {args.mezcla}: {args.concurrencia} clientes, {args.duracion}s, {modo}\n")
+        resultados = Resultados()
+        transcurrido = await cargar(cliente, escenarios, emails, args.logros, args.concurrencia, args.duracion,
+                                    args.tasa, args.semilla + 1, resultados)
+        return {"rutas": informe(resultados, transcurrido), "transcurrido": transcurrido}
+    finally:
+        await cliente.cerrar()
+        if servidor is not None:
+            servidor.should_exit = True
+            hilo.join(timeout=30)
+
+
+async def ejecutar_en_proceso(args, escenarios) -> dict:
+    """
+    La aplicación con su lifespan (tareas, calentamiento, apagado): en modo
+    asgi en este event loop; en modo socket lo ejecuta uvicorn en el suyo
+    """
+    from app.main import app
+    if args.modo == "socket":
+        return await ejecutar(args, escenarios, app)
+    async with app.router.lifespan_context(app):
+        return await ejecutar(args, escenarios, app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de combinaciones de endpoints")
+    parser.add_argument("--modo", choices=["asgi", "socket"], default="asgi")
+    parser.add_argument("--url", help="Cargar un servidor ya arrancado en esta URL")
+    parser.add_argument("--backend", choices=["mongod", "mongomock"], default="mongod",
+                        help="Base de datos de la aplicación en los modos asgi y socket")
+    parser.add_argument("--mezcla", default="dashboard",
+                        help=f"{', '.join(MEZCLAS)} o 'MÉTODO /ruta[:peso],...'")
+    parser.add_argument("--concurrencia", type=int, default=16, help="Clientes (escenarios simultáneos)")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos de carga medidos")
+    parser.add_argument("--calentamiento", type=float, default=2.0, help="Segundos de carga sin medir")
+    parser.add_argument("--tasa", type=float, help="Escenarios por segundo (bucle abierto)")
+    parser.add_argument("--estudiantes", type=int, default=200)
+    parser.add_argument("--logros", type=int, default=20, help="Logros por estudiante")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", help="Guardar resultados e histogramas en este archivo JSON")
+    parser.add_argument("--hgrm", help="Escribir la distribución de percentiles de cada ruta en este directorio")
+    parser.add_argument("--comparar", help="Resultados JSON anteriores con los que comparar")
+    parser.add_argument("--umbral", type=float, default=0.2, help="Empeoramiento máximo del p95 (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    try:
+        escenarios = MEZCLAS.get(args.mezcla) or mezcla_propia(args.mezcla)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.logros < 1 or args.estudiantes < 1:
+        parser.error("Se necesita al menos un estudiante con un logro")
+
+    base_datos = certificados = db = None
+    if args.url:
+        print(f"🌐 Servidor {args.url} (los datos de la prueba quedan en su base de datos)")
+        resultado = asyncio.run(ejecutar(args, escenarios))
+    else:
+        base_datos = f"ravencode_carga_{uuid.uuid4().hex[:8]}"
+        certificados = tempfile.mkdtemp(prefix="carga_certificados_")
+        if args.backend == "mongomock":
+            # Sin eventos de pool: el calentamiento no debe esperar conexiones
+            os.environ.setdefault("MONGO_MIN_POOL_SIZE", "0")
+        db = preparar_backend(args.backend, base_datos, certificados)
+        print(f"🗄️  Modo {args.modo}, backend {args.backend}, base de datos temporal {base_datos}")
+        try:
+            resultado = asyncio.run(ejecutar_en_proceso(args, escenarios))
+        finally:
+            db.client.drop_database(base_datos)
+            shutil.rmtree(certificados, ignore_errors=True)
+
+    rutas = resultado["rutas"]
+    imprimir(rutas, resultado["transcurrido"])
+
+    datos = {
+        "metadatos": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit_actual(),
+            "modo": "url" if args.url else args.modo,
+            "mezcla": args.mezcla,
+            "concurrencia": args.concurrencia,
+            "duracion": args.duracion,
+            "tasa": args.tasa,
+            "backend": None if args.url else args.backend,
+            "semilla": args.semilla,
+            "python": platform.python_version(),
+            "nucleos": os.cpu_count(),
+            "estudiantes": args.estudiantes,
+            "logros": args.logros,
+        },
+        "transcurrido": round(resultado["transcurrido"], 3),
+        "rutas": rutas,
+    }
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(datos, archivo, indent=2, ensure_ascii=False)
+        print(f"💾 Resultados guardados en {args.salida}")
+    if args.hgrm:
+        guardar_hgrm(rutas, args.hgrm)
+        print(f"📈 Distribuciones de percentiles en {args.hgrm}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            base = json.load(archivo)
+        regresiones = comparar(rutas, base, args.umbral)
+        if regresiones:
+            print(f"❌ {len(regresiones)} ruta(s) empeoran el p95 más de {args.umbral:.0%}")
+            sys.exit(1)
+        print("✅ Sin regresiones respecto a la base")
+
+
+if __name__ == "__main__":
+    main()
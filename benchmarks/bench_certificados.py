@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark de renderizado de certificados por lotes
+
+Mide el throughput de `app.core.certificates` renderizando un lote de
+diplomas sintéticos en serie, en un pool de procesos (como lo hace
+`certificate_service`) y con el almacén ya caliente, donde cada certificado
+se resuelve por su clave de contenido sin volver a renderizar.
+
+Uso: python -m benchmarks.bench_certificados [--tamano 2000] [--procesos 4]
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from app.core import certificates
+
+
+def generar_diplomas(tamano: int) -> list:
+    """Diplomas sintéticos con los campos que aparecen en el certificado"""
+    ahora = datetime(2025, 1, 1)
+    return [
+        {
+            "id": str(uuid.UUID(int=i)),
+            "email": f"estudiante{i}@ravencode.co",
+            "nombre_diploma": "Diploma en Programación Python",
+            "titulo_diploma": "Certificación en Programación Básica",
+            "institucion_emisora": "RavenCode Colombia",
+            "tipo_diploma": "curso",
+            "id_curso": f"curso_{i % 20}",
+            "fecha_expedicion": ahora + timedelta(minutes=i),
+            "fecha_vencimiento": None,
+            "codigo_verificacion": f"RC-{i:08X}",
+            "nota_final": 3.0 + (i % 20) / 10,
+            "calificacion_cualitativa": "Sobresaliente",
+            "horas_academicas": 40,
+            "modalidad": "Virtual",
+            "nivel_educativo": "Educación Continua",
+        }
+        for i in range(tamano)
+    ]
+
+
+def preparar(diplomas: list, directorio: str) -> list:
+    trabajos = []
+    for diploma in diplomas:
+        datos = certificates.datos_certificado(diploma)
+        clave = certificates.clave_contenido(datos, certificates.version_plantilla(None))
+        trabajos.append((datos, certificates.ruta_en_almacen(directorio, clave)))
+    return trabajos
+
+
+def medir(nombre: str, funcion, tamano: int):
+    inicio = time.perf_counter()
+    funcion()
+    duracion = time.perf_counter() - inicio
+    print(f"{nombre:<32} {duracion:>8.3f} s  {tamano / duracion:>10,.0f} certificados/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de renderizado de certificados")
+    parser.add_argument("--tamano", type=int, default=2000, help="Certificados por lote")
+    parser.add_argument("--procesos", type=int, default=min(4, os.cpu_count() or 1), help="Procesos del pool")
+    parser.add_argument("--chunksize", type=int, default=32, help="Certificados por envío al pool")
+    args = parser.parse_args()
+
+    diplomas = generar_diplomas(args.tamano)
+    base = tempfile.mkdtemp(prefix="bench_certificados_")
+    try:
+        print(f"Lote de {args.tamano} certificados, pool de {args.procesos} procesos\n")
+
+        serie = preparar(diplomas, os.path.join(base, "serie"))
+        medir("serie (sin pool)", lambda: [certificates.renderizar_y_guardar(d, r) for d, r in serie], args.tamano)
+
+        pool = preparar(diplomas, os.path.join(base, "pool"))
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=args.procesos, mp_context=contexto) as executor:
+            # Calentar el pool: el arranque de procesos no es parte del throughput
+            list(executor.map(abs, range(args.procesos)))
+            medir(
+                f"pool ({args.procesos} procesos)",
+                lambda: list(executor.map(certificates.renderizar_y_guardar, *zip(*pool), chunksize=args.chunksize)),
+                args.tamano
+            )
+
+        medir(
+            "almacén caliente (claves)",
+            lambda: [certificates.renderizar_y_guardar(d, r) for d, r in preparar(diplomas, os.path.join(base, "pool"))],
+            args.tamano
+        )
+
+        tamanos = [os.path.getsize(r) for _, r in pool[:100]]
+        print(f"\nTamaño medio: {sum(tamanos) / len(tamanos):,.0f} bytes por certificado")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
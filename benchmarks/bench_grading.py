@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark de la tabla de calificación colombiana
+
+Compara la cadena if/elif original con la tabla precomputada de
+`app.core.grading`, tanto nota a nota como por lote, y verifica que ambas
+implementaciones den exactamente el mismo resultado.
+
+Uso: python -m benchmarks.bench_grading [--tamano 10000] [--repeticiones 20]
+"""
+
+import argparse
+import random
+import timeit
+
+from app.core import grading
+
+
+def _convertir_if_elif(porcentaje: float) -> float:
+    """Implementación original de diploma_service (referencia)"""
+    if porcentaje >= 95:
+        return round(4.6 + (porcentaje - 95) * 0.08, 1)
+    elif porcentaje >= 85:
+        return round(4.0 + (porcentaje - 85) * 0.05, 1)
+    elif porcentaje >= 75:
+        return round(3.5 + (porcentaje - 75) * 0.04, 1)
+    elif porcentaje >= 65:
+        return round(3.0 + (porcentaje - 65) * 0.04, 1)
+    elif porcentaje >= 55:
+        return round(2.0 + (porcentaje - 55) * 0.09, 1)
+    else:
+        return round(1.0 + porcentaje * 0.018, 1)
+
+
+def _equivalencia_if_elif(nota: float) -> str:
+    if nota >= 4.6:
+        return "A+ (95-100%)"
+    elif nota >= 4.0:
+        return "A (85-94%)"
+    elif nota >= 3.5:
+        return "B+ (75-84%)"
+    elif nota >= 3.0:
+        return "B (65-74%)"
+    elif nota >= 2.0:
+        return "C (55-64%)"
+    else:
+        return "F (<55%)"
+
+
+def _evaluar_if_elif(porcentaje: float) -> dict:
+    nota = _convertir_if_elif(porcentaje)
+    return {
+        "porcentaje_original": porcentaje,
+        "nota_colombiana": nota,
+        "calificacion_cualitativa": grading.calificacion_cualitativa(nota),
+        "equivalencia_internacional": _equivalencia_if_elif(nota),
+        "aprobado": nota >= grading.NOTA_MINIMA_APROBACION,
+    }
+
+
+def generar_porcentajes(tamano: int, semilla: int = 42) -> list:
+    """Mezcla realista: puntajes redondos repetidos y valores continuos"""
+    rng = random.Random(semilla)
+    redondos = [float(p) for p in range(0, 101, 5)]
+    return [
+        rng.choice(redondos) if rng.random() < 0.6 else round(rng.uniform(0, 100), 2)
+        for _ in range(tamano)
+    ]
+
+
+def verificar_equivalencia():
+    """La tabla debe reproducir la cadena if/elif en toda la escala"""
+    muestras = [i / 100 for i in range(0, 10001)] + generar_porcentajes(10000, semilla=7)
+    for porcentaje in muestras:
+        esperado = _convertir_if_elif(porcentaje)
+        obtenido = grading.convertir_porcentaje(porcentaje)
+        assert esperado == obtenido, f"{porcentaje}%: if/elif={esperado} tabla={obtenido}"
+        assert _equivalencia_if_elif(esperado) == grading.equivalencia_internacional(obtenido)
+    print(f"✅ Tabla equivalente a la cadena if/elif en {len(muestras)} porcentajes")
+
+    # Los rangos publicados en /diplomas/configuracion cubren la escala sin huecos
+    for nota in (n / 100 for n in range(100, 501)):
+        rango = [c for desde, hasta, c in grading.RANGOS_CALIFICACION if desde <= nota < hasta or nota == hasta == 5.0]
+        assert rango == [grading.calificacion_cualitativa(nota)], f"{nota}: rangos={rango}"
+    print("✅ Rangos de calificación publicados coherentes con calificacion_cualitativa")
+
+
+def medir(nombre: str, funcion, repeticiones: int, tamano: int):
+    tiempos = timeit.repeat(funcion, number=1, repeat=repeticiones)
+    mejor = min(tiempos)
+    print(f"{nombre:<40} {mejor * 1000:>9.3f} ms/lote  {tamano / mejor:>12,.0f} notas/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark de conversión de notas colombianas")
+    parser.add_argument("--tamano", type=int, default=10000, help="Porcentajes por lote")
+    parser.add_argument("--repeticiones", type=int, default=20, help="Repeticiones por medición")
+    args = parser.parse_args()
+
+    verificar_equivalencia()
+    porcentajes = generar_porcentajes(args.tamano)
+
+    print(f"\nLote de {args.tamano} porcentajes, mejor de {args.repeticiones} repeticiones")
+    medir("if/elif nota a nota", lambda: [_convertir_if_elif(p) for p in porcentajes], args.repeticiones, args.tamano)
+    medir("tabla nota a nota", lambda: [grading.convertir_porcentaje(p) for p in porcentajes], args.repeticiones, args.tamano)
+    medir("if/elif conversión completa", lambda: [_evaluar_if_elif(p) for p in porcentajes], args.repeticiones, args.tamano)
+    medir("tabla conversión completa", lambda: [grading.evaluar_porcentaje(p) for p in porcentajes], args.repeticiones, args.tamano)
+    medir("tabla por lote (evaluar_lote)", lambda: grading.evaluar_lote(porcentajes), args.repeticiones, args.tamano)
+
+
+if __name__ == "__main__":
+    main()
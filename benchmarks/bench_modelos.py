@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark de construcción y serialización de modelos
+
+Compara los modelos originales (validadores estilo v1 campo a campo y
+`EmailStr` sin caché) con la ruta actual de `app.models`: un único
+`model_validator` para los campos derivados de `Achievement`, validación de
+email memoizada (`CachedEmailStr`) y `TypeAdapter`s de listas cacheados para
+serializar. Antes de medir verifica que ambas rutas produzcan exactamente el
+mismo resultado: volcados, campos explícitos (`model_fields_set`), errores de
+validación, estadísticas del estudiante y serialización de listas.
+
+Mide `Achievement`, `Student` con 10 a 10.000 logros (incluye
+`get_achievement_stats`), `Diploma` y `VerificacionElegibilidadDiploma`.
+
+Uso: python -m benchmarks.bench_modelos [--tamano 2000] [--logros 10,100,1000,10000] [--repeticiones 5]
+"""
+
+import argparse
+import random
+import timeit
+import warnings
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import EmailStr, ValidationError, validator
+
+from app.models.achievement import (
+    Achievement, CategoryEnum, DifficultyEnum, RarityEnum, StatusEnum,
+    _normalized_email, achievement_list_adapter
+)
+from app.models.diploma import Diploma, VerificacionElegibilidadDiploma
+from app.models.student import Student
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+
+    class _AchievementOriginal(Achievement):
+        """Validación original de Achievement (referencia)"""
+        email: EmailStr
+
+        def derive_progress_fields(self):
+            return self
+
+        @validator('percentage', always=True)
+        def calculate_percentage(cls, v, values):
+            if v is None and 'score' in values and 'total_points' in values:
+                score = values.get('score')
+                total_points = values.get('total_points')
+                if score is not None and total_points is not None and total_points > 0:
+                    return round((score / total_points) * 100, 2)
+            return v
+
+        @validator('achieved', always=True)
+        def determine_achieved(cls, v, values):
+            percentage = values.get('percentage')
+            if percentage is not None and percentage >= 80:
+                return True
+            return v
+
+        @validator('status', always=True)
+        def set_status_based_on_achieved(cls, v, values):
+            achieved = values.get('achieved', False)
+            percentage = values.get('percentage')
+
+            if achieved and percentage is not None and percentage >= 80:
+                return StatusEnum.completed
+            elif percentage is not None and percentage > 0:
+                return StatusEnum.in_progress
+            elif percentage is not None and percentage == 0:
+                return StatusEnum.failed
+            return v or StatusEnum.pending
+
+        @validator('date_earned', always=True)
+        def set_date_earned(cls, v, values):
+            achieved = values.get('achieved', False)
+            if achieved and v is None:
+                return datetime.now()
+            elif not achieved:
+                return None
+            return v
+
+    class _StudentOriginal(Student):
+        email: EmailStr
+        achievements: List[_AchievementOriginal] = []
+
+    class _DiplomaOriginal(Diploma):
+        email: EmailStr
+
+
+FECHA = datetime(2024, 3, 1, 12, 0)
+CURSOS = [f"curso_{i:02d}" for i in range(12)]
+EMAILS_INVALIDOS = ["sin-arroba", "a@b", "", "dos@@ejemplo.com", "espacio @ejemplo.com", "x" * 300 + "@ejemplo.com"]
+
+
+def _emails(n: int, rng: random.Random) -> List[str]:
+    variantes = ["{}@ejemplo.com", "{}@Ejemplo.COM", "{}@universidad.edu.co", "Nombre.{}@correo.co"]
+    return [rng.choice(variantes).format(f"estudiante{i}") for i in range(n)]
+
+
+def _logro(rng: random.Random, email: str, i: int, extremos: bool = False) -> dict:
+    total = rng.choice([100.0, 50.0, 10.0, 1.0])
+    logro = {
+        "email": email,
+        "achievement_name": f"logro_{i}",
+        "course_id": rng.choice(CURSOS),
+        "title": f"Logro {i}",
+        "score": round(rng.uniform(0, total), 2),
+        "total_points": total,
+    }
+    if rng.random() < 0.5:
+        logro["metadata"] = {
+            "category": rng.choice(list(CategoryEnum)).value,
+            "rarity": rng.choice(list(RarityEnum)).value,
+            "difficulty": rng.choice(list(DifficultyEnum)).value,
+            "xp_reward": rng.randint(10, 500),
+            "tags": ["sintetico"],
+            "campo_libre": rng.random(),
+        }
+    if rng.random() < 0.3:
+        logro["description"] = "Descripción del logro"
+    if extremos:
+        # Valores explícitos que los validadores deben respetar o recalcular
+        eleccion = rng.random()
+        if eleccion < 0.15:
+            logro["percentage"] = rng.choice([None, 0.0, 79.99, 80.0, 100.0, -5.0, 150.0])
+        elif eleccion < 0.25:
+            logro["total_points"] = rng.choice([0.0, -10.0])
+        elif eleccion < 0.35:
+            logro["score"] = 0.0
+        if rng.random() < 0.3:
+            logro["status"] = rng.choice([None, *[s.value for s in StatusEnum]])
+        if rng.random() < 0.3:
+            logro["achieved"] = rng.choice([None, True, False])
+        if rng.random() < 0.3:
+            logro["date_earned"] = FECHA
+        if rng.random() < 0.1:
+            logro["id"] = f"id-{i}"
+    return logro
+
+
+def generar_logros(tamano: int, semilla: int = 42, extremos: bool = False, emails: int = 200) -> List[dict]:
+    """Logros con un grupo limitado de emails, como en los documentos reales"""
+    rng = random.Random(semilla)
+    direcciones = _emails(emails, rng)
+    return [_logro(rng, rng.choice(direcciones), i, extremos) for i in range(tamano)]
+
+
+def documento_estudiante(n_logros: int, semilla: int = 42) -> dict:
+    rng = random.Random(semilla)
+    email = f"estudiante{n_logros}@ejemplo.com"
+    return {
+        "email": email,
+        "achievements": [_logro(rng, email, i) for i in range(n_logros)],
+        "total_xp": rng.randint(0, 10000),
+        "created_at": FECHA,
+        "updated_at": FECHA,
+    }
+
+
+def documento_diploma(i: int) -> dict:
+    return {
+        "email": f"estudiante{i % 500}@ejemplo.com",
+        "tipo_diploma": "certificacion",
+        "id_curso": CURSOS[i % len(CURSOS)],
+        "nombre_diploma": "Certificación en Programación",
+        "titulo_diploma": "Certificado de Programación",
+        "fecha_obtencion": FECHA,
+        "fecha_expedicion": FECHA,
+        "fecha_vencimiento": FECHA + timedelta(days=730),
+        "codigo_verificacion": f"RC-{i:08X}",
+        "horas_academicas": 40,
+        "nota_final": 4.2,
+        "calificacion_cualitativa": "Sobresaliente",
+        "metadata": {"version_plantilla": 1},
+        "requisitos_completados": [
+            {"nombre_logro": f"logro_{k}", "id_curso": CURSOS[i % len(CURSOS)], "nota_obtenida": 4.2}
+            for k in range(5)
+        ],
+    }
+
+
+def documento_verificacion(i: int) -> dict:
+    requisitos = [
+        {"nombre_logro": f"logro_{k}", "id_curso": CURSOS[i % len(CURSOS)], "nota_minima": 3.0}
+        for k in range(6)
+    ]
+    return {
+        "elegible": i % 2 == 0,
+        "plantilla_diploma": {
+            "tipo_diploma": "Curso",
+            "id_curso": CURSOS[i % len(CURSOS)],
+            "nombre_diploma": "Curso de Programación",
+            "titulo_diploma": "Diploma de Programación",
+            "requisitos": requisitos,
+            "horas_academicas": 40,
+        },
+        "requisitos_completados": [{"nombre_logro": r["nombre_logro"], "nota_obtenida": 4.0} for r in requisitos[:4]],
+        "requisitos_faltantes": requisitos[4:],
+        "nota_promedio": 4.0,
+        "horas_completadas": 40,
+        "porcentaje_completado": 66.67,
+        "mensaje": "Requisitos pendientes",
+    }
+
+
+def _resultado(modelo, datos: dict):
+    """Volcado y campos explícitos, o los errores de validación"""
+    try:
+        instancia = modelo(**datos)
+    except ValidationError as e:
+        return ("error", [(err["type"], err["loc"], err["msg"]) for err in e.errors()])
+    return ("ok", instancia.model_dump(), instancia.model_fields_set)
+
+
+def verificar_equivalencia():
+    """La ruta optimizada debe reproducir exactamente los modelos originales"""
+    casos = generar_logros(5000, semilla=7, extremos=True)
+    casos += [dict(c, email=email) for c, email in zip(generar_logros(len(EMAILS_INVALIDOS), semilla=8), EMAILS_INVALIDOS)]
+    casos += [{k: v for k, v in c.items() if k != "score"} for c in generar_logros(3, semilla=9)]
+    casos += [dict(c, score="no-numero") for c in generar_logros(3, semilla=10)]
+
+    # Dos pasadas: la segunda valida los emails desde la caché
+    for pasada in range(2):
+        for datos in casos:
+            esperado = _resultado(_AchievementOriginal, datos)
+            obtenido = _resultado(Achievement, datos)
+            assert esperado == obtenido, f"Achievement (pasada {pasada + 1}) {datos}: {esperado} != {obtenido}"
+    print(f"✅ Achievement equivalente en {len(casos)} casos (incluye {len(EMAILS_INVALIDOS) + 6} inválidos)")
+
+    for n in (0, 1, 10, 100, 1000):
+        datos = documento_estudiante(n, semilla=n)
+        original, actual = _StudentOriginal(**datos), Student(**datos)
+        assert original.model_dump() == actual.model_dump(), f"Student con {n} logros"
+        assert original.model_fields_set == actual.model_fields_set
+        assert original.calculate_total_xp() == actual.calculate_total_xp()
+        assert original.get_achievement_stats().model_dump() == actual.get_achievement_stats().model_dump()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            por_objeto = [a.dict() for a in actual.achievements]
+        assert achievement_list_adapter.dump_python(actual.achievements) == por_objeto
+        assert achievement_list_adapter.dump_python(actual.achievements, mode="json") == [
+            a.model_dump(mode="json") for a in actual.achievements
+        ]
+    print("✅ Student, estadísticas y serialización por TypeAdapter equivalentes (0 a 1000 logros)")
+
+    for i in range(500):
+        datos = documento_diploma(i)
+        if i % 50 == 0:
+            datos["email"] = EMAILS_INVALIDOS[i // 50 % len(EMAILS_INVALIDOS)]
+        assert _resultado(_DiplomaOriginal, datos) == _resultado(Diploma, datos), f"Diploma {datos}"
+    print("✅ Diploma equivalente en 500 casos (incluye emails inválidos)")
+
+
+def medir(nombre: str, funcion, repeticiones: int, tamano: int, setup="pass"):
+    tiempos = timeit.repeat(funcion, setup=setup, number=1, repeat=repeticiones)
+    mejor = min(tiempos)
+    print(f"{nombre:<46} {mejor * 1000:>10.3f} ms  {mejor / tamano * 1e6:>9.2f} µs/obj")
+    return mejor
+
+
+def comparar(nombre: str, original: float, actual: float):
+    print(f"   ⚡ {nombre}: x{original / actual:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark de construcción y serialización de modelos")
+    parser.add_argument("--tamano", type=int, default=2000, help="Objetos por lote (Achievement, Diploma, verificación)")
+    parser.add_argument("--logros", default="10,100,1000,10000", help="Tamaños de Student separados por coma")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Repeticiones por medición")
+    args = parser.parse_args()
+    rep = args.repeticiones
+
+    verificar_equivalencia()
+
+    logros = generar_logros(args.tamano)
+    print(f"\n🏅 Achievement: lote de {args.tamano}, {len({l['email'] for l in logros})} emails distintos, mejor de {rep}")
+    original = medir("original (validadores v1, EmailStr)", lambda: [_AchievementOriginal(**l) for l in logros], rep, args.tamano)
+    frio = medir("actual, caché de emails vacía", lambda: [Achievement(**l) for l in logros], rep, args.tamano,
+                 setup=_normalized_email.cache_clear)
+    actual = medir("actual", lambda: [Achievement(**l) for l in logros], rep, args.tamano)
+    comparar("construcción (caché vacía)", original, frio)
+    comparar("construcción", original, actual)
+
+    instancias = [Achievement(**l) for l in logros]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        por_objeto = medir(".dict() por objeto", lambda: [a.dict() for a in instancias], rep, args.tamano)
+    por_lista = medir("TypeAdapter(List[Achievement]).dump_python", lambda: achievement_list_adapter.dump_python(instancias), rep, args.tamano)
+    comparar("serialización de la lista", por_objeto, por_lista)
+
+    for n in [int(x) for x in args.logros.split(",") if x]:
+        datos = documento_estudiante(n)
+        rep_n = max(1, rep if n <= 1000 else rep // 2)
+        print(f"\n🎓 Student con {n} logros, mejor de {rep_n}")
+        original = medir("original Student(**doc)", lambda: _StudentOriginal(**datos), rep_n, n)
+        actual = medir("actual Student(**doc)", lambda: Student(**datos), rep_n, n)
+        comparar("construcción", original, actual)
+        estudiante = Student(**datos)
+        medir("get_achievement_stats()", estudiante.get_achievement_stats, rep_n, n)
+        medir("model_dump()", estudiante.model_dump, rep_n, n)
+
+    diplomas = [documento_diploma(i) for i in range(args.tamano)]
+    print(f"\n📜 Diploma: lote de {args.tamano}, mejor de {rep}")
+    original = medir("original Diploma(**doc)", lambda: [_DiplomaOriginal(**d) for d in diplomas], rep, args.tamano)
+    actual = medir("actual Diploma(**doc)", lambda: [Diploma(**d) for d in diplomas], rep, args.tamano)
+    comparar("construcción", original, actual)
+    instancias = [Diploma(**d) for d in diplomas]
+    medir("model_dump()", lambda: [d.model_dump() for d in instancias], rep, args.tamano)
+
+    verificaciones = [documento_verificacion(i) for i in range(args.tamano)]
+    print(f"\n🔎 VerificacionElegibilidadDiploma: lote de {args.tamano}, mejor de {rep} (sin email, sin cambios)")
+    medir("VerificacionElegibilidadDiploma(**doc)", lambda: [VerificacionElegibilidadDiploma(**v) for v in verificaciones], rep, args.tamano)
+    instancias = [VerificacionElegibilidadDiploma(**v) for v in verificaciones]
+    medir("model_dump()", lambda: [v.model_dump() for v in instancias], rep, args.tamano)
+
+
+if __name__ == "__main__":
+    main()
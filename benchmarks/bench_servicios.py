@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la capa de servicios
+
+Mide las operaciones principales de los servicios con estudiantes de
+distintos tamaños (número de logros) sobre una base de datos temporal:
+
+- update_achievement                 actualizar un logro de un estudiante con N logros
+- bulk_update_achievements           lote de N actualizaciones (una por estudiante)
+- get_student_achievements           leer un estudiante con N logros
+- Student.get_achievement_stats      estadísticas en memoria de N logros (sin base de datos)
+- verificar_elegibilidad_diploma     estado precalculado de un estudiante con N logros
+- generar_diploma                    diploma para un estudiante elegible con N logros
+
+Backends:
+- `mongod` (por defecto): el servidor de MONGODB_URL, en una base de datos
+  temporal con los índices declarados que se borra al terminar.
+- `mongomock`: MongoDB simulado en el proceso (`pip install mongomock`); sirve
+  para comparar el coste de Python entre commits, no la latencia de MongoDB.
+
+Los resultados (mediana, p95, mínimo y media por operación) se pueden
+guardar en JSON con --salida y comparar con una línea base anterior con
+--linea-base: si la mediana de algún caso empeora más de --umbral, el
+proceso termina con código 1.
+
+Uso: python -m benchmarks.bench_servicios [--backend mongod|mongomock] [--tamanos 10,100,1000]
+         [--repeticiones 5] [--operaciones 20] [--salida resultados.json]
+         [--linea-base base.json] [--umbral 0.2]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CURSOS = 5
+CURSO_DIPLOMA = "bench_curso_0"
+REQUISITOS_DIPLOMA = 2
+
+
+def preparar_backend(backend: str, base_datos: str, certificados: str):
+    """Configurar la base de datos de los servicios antes de importarlos"""
+    os.environ["DATABASE_NAME"] = base_datos
+    os.environ["DIPLOMAS_CERTIFICATES_DIR"] = certificados
+    os.environ.setdefault("TRACING_ENABLED", "false")
+
+    from app.DB import database
+    if backend == "mongomock":
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("❌ El backend mongomock necesita: pip install mongomock")
+        database.MongoClient = mongomock.MongoClient
+    elif backend != "mongod":
+        sys.exit(f"❌ Backend desconocido: {backend}")
+
+    db = database.get_database()
+    if db is None:
+        sys.exit(f"❌ No se pudo conectar a MongoDB en {database.MONGODB_URL}")
+    if backend == "mongod":
+        from app.DB import indexes
+        indexes.aplicar(db)
+    return db
+
+
+# --- Datos sintéticos ---
+
+def logro(email: str, i: int, rng: random.Random) -> dict:
+    from app.models.achievement import Achievement
+    return Achievement(
+        email=email,
+        achievement_name=f"logro_{i:05d}",
+        course_id=f"bench_curso_{i % CURSOS}",
+        title=f"Logro {i}",
+        description="Logro sintético del benchmark",
+        # Los logros del curso del diploma siempre aprobados: el estudiante es elegible
+        score=95.0 if i % CURSOS == 0 else rng.choice([60.0, 75.0, 85.0, 90.0, 95.0, 100.0]),
+        total_points=100.0,
+        metadata={"xp_reward": 10 * (1 + i % 5), "category": "learning"},
+    ).dict()
+
+
+def documento_estudiante(email: str, logros: int, rng: random.Random) -> dict:
+    ahora = datetime.now()
+    return {
+        "email": email,
+        "achievements": [logro(email, i, rng) for i in range(logros)],
+        "total_xp": 0,
+        "created_at": ahora,
+        "updated_at": ahora,
+    }
+
+
+def crear_estudiantes(db, prefijo: str, cantidad: int, logros: int, rng: random.Random) -> list:
+    emails = [f"{prefijo}.{i}@bench.ravencode.co" for i in range(cantidad)]
+    for inicio in range(0, cantidad, 100):
+        db["students"].insert_many([documento_estudiante(e, logros, rng) for e in emails[inicio:inicio + 100]])
+    return emails
+
+
+def crear_plantilla():
+    """Plantilla del curso de diploma que exige logros presentes en todos los tamaños"""
+    from app.services.diploma_service import crear_plantilla_diploma
+    crear_plantilla_diploma({
+        "tipo_diploma": "curso",
+        "id_curso": CURSO_DIPLOMA,
+        "nombre_diploma": "Diploma de benchmark",
+        "titulo_diploma": "Certificado de benchmark",
+        "requisitos": [
+            {"nombre_logro": f"logro_{i * CURSOS:05d}", "id_curso": CURSO_DIPLOMA, "nota_minima": 3.0}
+            for i in range(REQUISITOS_DIPLOMA)
+        ],
+        "horas_academicas": 40,
+    })
+
+
+# --- Casos ---
+# Cada caso prepara sus datos y devuelve una función que ejecuta la operación
+# número `i` (las operaciones de escritura usan datos distintos en cada una)
+
+def caso_update_achievement(db, tamano, total, rng):
+    from app.services.achievement_service import update_achievement
+    email, = crear_estudiantes(db, f"update.{tamano}", 1, tamano, rng)
+
+    def operacion(i):
+        n = (i * 7919) % tamano
+        update_achievement(
+            email,
+            {"achievement_name": f"logro_{n:05d}", "course_id": f"bench_curso_{n % CURSOS}", "title": f"Logro {n}"},
+            score=float(50 + i % 51), total_points=100.0,
+        )
+    return operacion
+
+
+def caso_bulk_update_achievements(db, tamano, total, rng):
+    from app.services.achievement_service import bulk_update_achievements
+    emails = crear_estudiantes(db, f"bulk.{tamano}", tamano, 20, rng)
+
+    def operacion(i):
+        bulk_update_achievements([
+            {
+                "email": email,
+                "achievement": {"achievement_name": f"logro_{i % 20:05d}", "course_id": f"bench_curso_{i % CURSOS}",
+                                "title": "Logro"},
+                "score": float(50 + (i + j) % 51),
+                "total_points": 100.0,
+            }
+            for j, email in enumerate(emails)
+        ])
+    return operacion
+
+
+def caso_get_student_achievements(db, tamano, total, rng):
+    from app.services.achievement_service import get_student_achievements
+    email, = crear_estudiantes(db, f"lectura.{tamano}", 1, tamano, rng)
+    return lambda i: get_student_achievements(email)
+
+
+def caso_student_get_achievement_stats(db, tamano, total, rng):
+    from app.models.student import Student
+    email = f"stats.{tamano}@bench.ravencode.co"
+    estudiante = Student(**documento_estudiante(email, tamano, rng))
+    return lambda i: estudiante.get_achievement_stats()
+
+
+def caso_verificar_elegibilidad_diploma(db, tamano, total, rng):
+    from app.services.diploma_service import verificar_elegibilidad_diploma
+    email, = crear_estudiantes(db, f"elegibilidad.{tamano}", 1, tamano, rng)
+    return lambda i: verificar_elegibilidad_diploma(email, CURSO_DIPLOMA, "curso")
+
+
+def caso_generar_diploma(db, tamano, total, rng):
+    from app.models.diploma import SolicitudDiploma
+    from app.services.diploma_service import generar_diploma
+    emails = crear_estudiantes(db, f"diploma.{tamano}", total, tamano, rng)
+
+    def operacion(i):
+        resultado = generar_diploma(SolicitudDiploma(email=emails[i], id_curso=CURSO_DIPLOMA, tipo_diploma="curso"))
+        if not resultado["exito"]:
+            raise RuntimeError(f"generar_diploma falló: {resultado['mensaje']}")
+    return operacion
+
+
+CASOS = {
+    "update_achievement": caso_update_achievement,
+    "bulk_update_achievements": caso_bulk_update_achievements,
+    "get_student_achievements": caso_get_student_achievements,
+    "Student.get_achievement_stats": caso_student_get_achievement_stats,
+    "verificar_elegibilidad_diploma": caso_verificar_elegibilidad_diploma,
+    "generar_diploma": caso_generar_diploma,
+}
+
+
+# --- Medición ---
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def medir(db, nombre, tamano, repeticiones, operaciones, rng):
+    """Latencia por operación en ms; la primera operación (calentamiento) no cuenta"""
+    total = repeticiones * operaciones + 1
+    operacion = CASOS[nombre](db, tamano, total, rng)
+    operacion(0)
+    tiempos = []
+    for i in range(1, total):
+        inicio = time.perf_counter()
+        operacion(i)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    media = statistics.fmean(tiempos)
+    return {
+        "caso": nombre,
+        "tamano": tamano,
+        "operaciones": len(tiempos),
+        "mediana_ms": round(statistics.median(tiempos), 4),
+        "p95_ms": round(percentil(tiempos, 95), 4),
+        "min_ms": round(min(tiempos), 4),
+        "media_ms": round(media, 4),
+        "ops_s": round(1000 / media, 1) if media else None,
+    }
+
+
+def commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def metadatos(args):
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_actual(),
+        "backend": args.backend,
+        "semilla": args.semilla,
+        "repeticiones": args.repeticiones,
+        "operaciones": args.operaciones,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "nucleos": os.cpu_count(),
+    }
+
+
+def comparar(resultados, linea_base, umbral):
+    """Casos cuya mediana empeora más de `umbral` respecto a la línea base"""
+    base = {(r["caso"], r["tamano"]): r for r in linea_base["resultados"]}
+    regresiones = []
+    print(f"\nComparación con la línea base {linea_base['metadatos'].get('commit') or ''} "
+          f"({linea_base['metadatos'].get('backend')}, umbral {umbral:.0%})")
+    for r in resultados:
+        anterior = base.get((r["caso"], r["tamano"]))
+        if anterior is None:
+            continue
+        cambio = r["mediana_ms"] / anterior["mediana_ms"] - 1 if anterior["mediana_ms"] else 0.0
+        regresion = cambio > umbral
+        if regresion:
+            regresiones.append(r)
+        print(f"   {'❌' if regresion else '✅'} {r['caso']:<32} {r['tamano']:>6}  "
+              f"{anterior['mediana_ms']:>10.3f} -> {r['mediana_ms']:>10.3f} ms  ({cambio:+.1%})")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la capa de servicios")
+    parser.add_argument("--backend", choices=["mongod", "mongomock"], default="mongod")
+    parser.add_argument("--tamanos", default="10,100,1000", help="Logros por estudiante (o actualizaciones por lote)")
+    parser.add_argument("--casos", default=",".join(CASOS), help="Casos a medir, separados por comas")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--operaciones", type=int, default=20, help="Operaciones medidas por repetición")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", help="Guardar los resultados en este archivo JSON")
+    parser.add_argument("--linea-base", help="Resultados JSON anteriores con los que comparar")
+    parser.add_argument("--umbral", type=float, default=0.2, help="Empeoramiento máximo de la mediana (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    casos = [c.strip() for c in args.casos.split(",") if c.strip()]
+    desconocidos = [c for c in casos if c not in CASOS]
+    if desconocidos:
+        parser.error(f"Casos desconocidos: {', '.join(desconocidos)}")
+    tamanos = [int(t) for t in args.tamanos.split(",") if t.strip()]
+    if min(tamanos) < REQUISITOS_DIPLOMA * CURSOS:
+        parser.error(f"El tamaño mínimo es {REQUISITOS_DIPLOMA * CURSOS} (los logros que exige la plantilla)")
+
+    base_datos = f"ravencode_bench_{uuid.uuid4().hex[:8]}"
+    certificados = tempfile.mkdtemp(prefix="bench_certificados_")
+    db = preparar_backend(args.backend, base_datos, certificados)
+    rng = random.Random(args.semilla)
+
+    print(f"🗄️  Backend {args.backend}, base de datos temporal {base_datos}")
+    print(f"{'caso':<34} {'tamaño':>6} {'mediana':>10} {'p95':>10} {'mín':>10} {'ops/s':>10}")
+    resultados = []
+    try:
+        crear_plantilla()
+        for nombre in casos:
+            for tamano in tamanos:
+                r = medir(db, nombre, tamano, args.repeticiones, args.operaciones, rng)
+                resultados.append(r)
+                print(f"{nombre:<34} {tamano:>6} {r['mediana_ms']:>8.3f}ms {r['p95_ms']:>8.3f}ms "
+                      f"{r['min_ms']:>8.3f}ms {r['ops_s']:>10.1f}")
+    finally:
+        from app.services import certificate_service
+        certificate_service.cerrar(esperar=False)
+        db.client.drop_database(base_datos)
+        shutil.rmtree(certificados, ignore_errors=True)
+
+    informe = {"metadatos": metadatos(args), "resultados": resultados}
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(informe, archivo, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados guardados en {args.salida}")
+
+    if args.linea_base:
+        with open(args.linea_base, encoding="utf-8") as archivo:
+            linea_base = json.load(archivo)
+        if linea_base["metadatos"].get("backend") != args.backend:
+            print("⚠️  La línea base se midió con otro backend; la comparación no es significativa")
+        regresiones = comparar(resultados, linea_base, args.umbral)
+        if regresiones:
+            print(f"❌ {len(regresiones)} caso(s) empeoran más de {args.umbral:.0%}")
+            sys.exit(1)
+        print("✅ Sin regresiones respecto a la línea base")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark de escalado por número de workers
+
+Arranca la API con `startup.py --workers N` para cada N, la carga durante
+unos segundos desde varios procesos cliente con conexiones keep-alive y
+compara el throughput con el de un solo worker. El endpoint por defecto
+(`POST /diplomas/convertir-notas` con un lote de porcentajes) no toca la
+base de datos, así que mide CPU de la aplicación y no de MongoDB.
+
+Los clientes corren en la misma máquina y compiten por los núcleos con los
+workers: para medir el escalado real, reservar núcleos a los clientes o
+lanzar la carga desde otra máquina con --url.
+
+Uso: python -m benchmarks.bench_workers [--workers 1,2,4] [--duracion 10] [--clientes 8]
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import requests
+
+PUERTO = 8023
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINT = "/diplomas/convertir-notas"
+CUERPO = {"porcentajes": [i % 101 for i in range(200)]}
+
+
+def arrancar(workers: int) -> subprocess.Popen:
+    servidor = subprocess.Popen(
+        [sys.executable, "startup.py", "--workers", str(workers), "--port", str(PUERTO),
+         "--host", "127.0.0.1", "--skip-init"],
+        cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    url = f"http://127.0.0.1:{PUERTO}/health"
+    limite = time.time() + 120
+    while time.time() < limite:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                # Dar tiempo a que arranquen todos los workers, no solo el primero
+                time.sleep(2 + workers)
+                return servidor
+        except requests.exceptions.RequestException:
+            pass
+        if servidor.poll() is not None:
+            break
+        time.sleep(0.5)
+    detener(servidor)
+    raise RuntimeError(f"El servidor con {workers} workers no arrancó")
+
+
+def detener(servidor: subprocess.Popen):
+    try:
+        os.killpg(servidor.pid, signal.SIGTERM)
+        servidor.wait(timeout=30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(servidor.pid, signal.SIGKILL)
+
+
+def cliente(args):
+    """Solicitudes completadas por un proceso cliente hasta `fin`"""
+    url, fin = args
+    sesion = requests.Session()
+    completadas = errores = 0
+    while time.time() < fin:
+        try:
+            if sesion.post(url, json=CUERPO, timeout=30).status_code == 200:
+                completadas += 1
+            else:
+                errores += 1
+        except requests.exceptions.RequestException:
+            errores += 1
+    return completadas, errores
+
+
+def medir(base_url: str, duracion: float, clientes: int):
+    url = f"{base_url}{ENDPOINT}"
+    # Calentamiento breve antes de medir
+    with multiprocessing.Pool(clientes) as pool:
+        pool.map(cliente, [(url, time.time() + 1)] * clientes)
+        inicio = time.time()
+        resultados = pool.map(cliente, [(url, inicio + duracion)] * clientes)
+        transcurrido = time.time() - inicio
+    completadas = sum(r[0] for r in resultados)
+    errores = sum(r[1] for r in resultados)
+    return completadas / transcurrido, errores
+
+
+def main():
+    nucleos = os.cpu_count() or 1
+    por_defecto = sorted({1, 2, max(1, nucleos // 2), nucleos})
+    parser = argparse.ArgumentParser(description="Throughput de la API según el número de workers")
+    parser.add_argument("--workers", default=",".join(str(n) for n in por_defecto),
+                        help="Números de workers a medir, separados por comas")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos de carga por medición")
+    parser.add_argument("--clientes", type=int, default=max(4, nucleos * 2), help="Procesos cliente")
+    parser.add_argument("--url", help="Medir un servidor ya arrancado en esta URL (no arranca ni escala workers)")
+    args = parser.parse_args()
+
+    print(f"💻 Núcleos: {nucleos} | Clientes: {args.clientes} | Duración: {args.duracion}s | Endpoint: POST {ENDPOINT}")
+
+    if args.url:
+        rps, errores = medir(args.url.rstrip("/"), args.duracion, args.clientes)
+        print(f"   {rps:>10.1f} req/s  (errores: {errores})")
+        return
+
+    base = None
+    for workers in [int(n) for n in args.workers.split(",") if n.strip()]:
+        servidor = arrancar(workers)
+        try:
+            rps, errores = medir(f"http://127.0.0.1:{PUERTO}", args.duracion, args.clientes)
+        finally:
+            detener(servidor)
+        base = base or rps
+        aceleracion = rps / base
+        print(
+            f"   {workers:>3} workers: {rps:>10.1f} req/s | x{aceleracion:.2f} "
+            f"| eficiencia {100 * aceleracion / workers:5.1f}% | errores: {errores}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+Generador de datos sintéticos a escala de producción
+
+Llena `achievements_master`, `plantillas_diplomas`, `students` y `diplomas`
+con datos coherentes entre sí, para medir cualquier optimización con
+volúmenes reales en lugar de los pocos registros que crea `test_api.py`:
+
+- Cursos (tema x nivel, p. ej. `python-201`) con popularidad de ley de Zipf y
+  entre 8 y 60 plantillas de logros cada uno, en orden de progresión. La
+  categoría, la rareza, la dificultad y el XP de cada logro siguen una
+  distribución ponderada (la rareza determina el XP y la dificultad).
+- Estudiantes con un número de logros de ley de potencias (--alfa, entre
+  --min-logros y --max-logros): la mayoría con pocos logros y una cola larga
+  con cientos.
+  Los logros avanzan por los cursos más populares en orden de progresión, con
+  un porcentaje que depende de la habilidad del estudiante y de la dificultad
+  del logro, y fechas crecientes desde el alta. Los campos derivados
+  (`percentage`, `achieved`, `status`, `date_earned`, `total_xp`) se calculan
+  con las mismas reglas que `update_achievement`.
+- Plantillas de diploma (curso, diplomado, certificación) cuyos requisitos son
+  logros del curso, y diplomas para una parte de los estudiantes que las
+  cumplen según las reglas de `evaluar_elegibilidad`, con la nota en la escala
+  colombiana (`app/core/grading.py`). Los códigos de verificación usan el
+  formato sin firma (`RC-XXXXXXXX`) y son únicos por construcción.
+
+El estado de elegibilidad precalculado (`elegibilidad_diplomas`) no se
+genera: la API lo calcula en la primera consulta de cada estudiante.
+
+Los estudiantes se generan por bloques de --lote en --procesos procesos, cada
+uno con su conexión, y se insertan con `insert_many` sin orden; los índices
+de `app/DB/indexes.py` se crean al final. Cada bloque usa su propia semilla
+derivada de --semilla, así que el resultado es el mismo con cualquier número
+de procesos; las fechas son relativas a --fecha-referencia (hoy por defecto).
+
+Uso: python -m benchmarks.datos_sinteticos --estudiantes 1000000 [--cursos 200]
+         [--procesos N] [--lote 1000] [--semilla 42] [--base-datos nombre] [--limpiar]
+"""
+
+import argparse
+import bisect
+import itertools
+import multiprocessing
+import os
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+COLECCIONES = ("students", "achievements_master", "plantillas_diplomas", "diplomas", "elegibilidad_diplomas")
+
+TEMAS = [
+    ("python", "Python"), ("javascript", "JavaScript"), ("java", "Java"), ("sql", "SQL"),
+    ("react", "React"), ("node", "Node.js"), ("docker", "Docker"), ("git", "Git"),
+    ("algoritmos", "Algoritmos"), ("datos", "Ciencia de Datos"), ("ml", "Machine Learning"),
+    ("web", "Desarrollo Web"), ("kotlin", "Kotlin"), ("go", "Go"), ("rust", "Rust"),
+    ("cloud", "Computación en la Nube"), ("seguridad", "Ciberseguridad"), ("linux", "Linux"),
+    ("typescript", "TypeScript"), ("csharp", "C#"),
+]
+NIVELES = [("101", "Fundamentos"), ("201", "Intermedio"), ("301", "Avanzado"), ("401", "Experto")]
+ACCIONES = [
+    ("leccion", "Lección completada"), ("ejercicio", "Ejercicio resuelto"), ("quiz", "Quiz aprobado"),
+    ("proyecto", "Proyecto entregado"), ("reto", "Reto superado"), ("racha", "Racha de estudio"),
+    ("foro", "Aporte en el foro"), ("examen", "Examen final"),
+]
+
+# Pesos relativos de cada valor
+CATEGORIAS = {"learning": 40, "practice": 25, "achievement": 15, "mastery": 8, "dedication": 7, "community": 5}
+RAREZAS = {"common": 60, "rare": 25, "epic": 11, "legendary": 4}
+XP_POR_RAREZA = {"common": (10, 50), "rare": (50, 150), "epic": (150, 400), "legendary": (400, 1000)}
+DIFICULTADES_POR_RAREZA = {
+    "common": ["beginner", "intermediate"],
+    "rare": ["intermediate", "advanced"],
+    "epic": ["advanced", "expert"],
+    "legendary": ["expert"],
+}
+PENALIZACION_DIFICULTAD = {"beginner": 0.0, "intermediate": 0.05, "advanced": 0.12, "expert": 0.2}
+PUNTOS_MAXIMOS = {100.0: 70, 50.0: 15, 200.0: 10, 10.0: 5}
+
+# tipo -> (probabilidad de que un curso la tenga, requisitos, nota mínima, horas, créditos, nivel educativo)
+TIPOS_DIPLOMA = {
+    "curso": (0.8, (3, 6), 3.0, 40, None, "Educación Continua"),
+    "certificacion": (0.15, (5, 8), 4.0, 60, 2, "Educación Continua"),
+    "diplomado": (0.2, (8, 12), 3.5, 120, 4, "Técnico Profesional"),
+}
+# Meses de vigencia de las certificaciones (el resto de diplomas no vence)
+VIGENCIA_CERTIFICACION_MESES = 24
+
+NOMBRES = [
+    "santiago", "valentina", "sebastian", "mariana", "alejandro", "isabella", "mateo", "daniela",
+    "samuel", "gabriela", "nicolas", "sofia", "juan", "camila", "andres", "laura", "david",
+    "natalia", "felipe", "paula", "carlos", "juliana", "diego", "manuela", "jose", "maria",
+]
+APELLIDOS = [
+    "rodriguez", "gomez", "gonzalez", "martinez", "garcia", "lopez", "hernandez", "sanchez",
+    "ramirez", "perez", "diaz", "munoz", "rojas", "moreno", "jimenez", "vargas", "castro",
+    "ortiz", "romero", "suarez", "torres", "restrepo", "mejia", "osorio", "cardenas", "zapata",
+]
+DOMINIOS = {
+    "gmail.com": 55, "hotmail.com": 20, "outlook.com": 10, "yahoo.com": 4, "unal.edu.co": 4,
+    "udea.edu.co": 3, "javeriana.edu.co": 2, "uniandes.edu.co": 2,
+}
+
+# Diplomas por estudiante como máximo: acota el espacio de códigos de verificación
+MAX_DIPLOMAS_ESTUDIANTE = 256
+
+
+def _pesos(tabla: Dict[Any, int]) -> Tuple[List[Any], List[int]]:
+    valores = list(tabla)
+    return valores, list(itertools.accumulate(tabla[v] for v in valores))
+
+
+def _elegir(rng: random.Random, tabla: Tuple[List[Any], List[int]]):
+    valores, acumulados = tabla
+    return valores[bisect.bisect_right(acumulados, rng.random() * acumulados[-1])]
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def codigo_verificacion(n: int) -> str:
+    """Código RC-XXXXXXXX del diploma n: biyección de 32 bits, nunca se repite"""
+    return f"RC-{(n * 2654435761 + 0x9E3779B9) % 2 ** 32:08X}"
+
+
+# --- Catálogo ---
+
+def generar_catalogo(cursos: int, rng: random.Random, referencia: datetime) -> List[Dict[str, Any]]:
+    """Cursos con su popularidad (Zipf) y sus plantillas de logros en orden de progresión"""
+    from app.models.achievement import AchievementMetadata
+
+    combinaciones = [(tema, nivel) for nivel in NIVELES for tema in TEMAS]
+    categorias, rarezas, puntos = _pesos(CATEGORIAS), _pesos(RAREZAS), _pesos(PUNTOS_MAXIMOS)
+    catalogo = []
+    for c in range(cursos):
+        (tema, nombre_tema), (nivel, nombre_nivel) = combinaciones[c % len(combinaciones)]
+        ronda = c // len(combinaciones)
+        id_curso = f"{tema}-{nivel}" + (f"-{ronda + 1}" if ronda else "")
+        creado = referencia - timedelta(days=rng.uniform(400, 1500))
+        plantillas = []
+        for orden in range(rng.randint(8, 60)):
+            accion, titulo = ACCIONES[orden % len(ACCIONES)]
+            rareza = _elegir(rng, rarezas)
+            # La dificultad crece con la progresión dentro de las de su rareza
+            dificultades = DIFICULTADES_POR_RAREZA[rareza]
+            dificultad = dificultades[min(len(dificultades) - 1, int(orden / 60 * len(dificultades) + rng.random()))]
+            metadata = AchievementMetadata(
+                category=_elegir(rng, categorias),
+                rarity=rareza,
+                xp_reward=rng.randint(*XP_POR_RAREZA[rareza]),
+                difficulty=dificultad,
+                module=f"modulo-{orden // 5 + 1}",
+                requirements=[f"Completar {titulo.lower()} {orden + 1}"],
+                tags=[tema, f"nivel-{nivel}"],
+            ).dict()
+            for clave in ("category", "rarity", "difficulty"):
+                metadata[clave] = metadata[clave].value
+            plantillas.append({
+                "id": _uuid(rng),
+                "achievement_name": f"{tema}_{nivel}_{accion}_{orden + 1:02d}",
+                "course_id": id_curso,
+                "title": f"{titulo} {orden + 1} - {nombre_tema} {nombre_nivel}",
+                "description": f"{titulo} {orden + 1} del curso {nombre_tema} {nombre_nivel}",
+                "max_points": _elegir(rng, puntos),
+                "requirements": metadata["requirements"],
+                "metadata": metadata,
+                "created_at": creado,
+                "updated_at": creado,
+                "active": True,
+            })
+        catalogo.append({
+            "id_curso": id_curso,
+            "nombre": f"{nombre_tema} {nombre_nivel}",
+            "popularidad": 1 / (c + 1) ** 1.1,
+            "plantillas": plantillas,
+        })
+    return catalogo
+
+
+def generar_plantillas_diplomas(catalogo: List[Dict[str, Any]], rng: random.Random,
+                                referencia: datetime) -> List[Dict[str, Any]]:
+    """Plantillas de diploma con requisitos tomados de la primera parte de cada curso"""
+    from app.models.diploma import PlantillaDiploma
+
+    documentos = []
+    for curso in catalogo:
+        logros = [p["achievement_name"] for p in curso["plantillas"]]
+        for tipo, (probabilidad, (minimo, maximo), nota_minima, horas, creditos, nivel) in TIPOS_DIPLOMA.items():
+            if rng.random() >= probabilidad:
+                continue
+            alcance = logros[:max(minimo, int(len(logros) * 0.4))]
+            requisitos = sorted(rng.sample(alcance, min(len(alcance), rng.randint(minimo, maximo))), key=logros.index)
+            plantilla = PlantillaDiploma(
+                tipo_diploma=tipo,
+                id_curso=curso["id_curso"],
+                nombre_diploma=f"{tipo.capitalize()} en {curso['nombre']}",
+                titulo_diploma=f"Certificado de {tipo} - {curso['nombre']}",
+                descripcion=f"Otorgado al completar los requisitos de {curso['nombre']}",
+                requisitos=[
+                    {"nombre_logro": nombre, "id_curso": curso["id_curso"], "nota_minima": nota_minima}
+                    for nombre in requisitos
+                ],
+                creditos_academicos=creditos,
+                horas_academicas=horas,
+                nivel_educativo=nivel,
+            ).dict()
+            plantilla["id"] = _uuid(rng)
+            plantilla["fecha_creacion"] = referencia - timedelta(days=rng.uniform(300, 400))
+            documentos.append(plantilla)
+    return documentos
+
+
+# --- Estudiantes y diplomas ---
+
+def logros_por_estudiante(rng: random.Random, alfa: float, minimo: int, maximo: int) -> int:
+    """Muestra de una ley de potencias (Pareto) P(n) ~ n^-alfa con n >= minimo, truncada en `maximo`"""
+    return min(maximo, int(minimo * (1 - rng.random()) ** (-1 / (alfa - 1))))
+
+
+def _email(i: int, rng: random.Random, dominios) -> str:
+    return f"{rng.choice(NOMBRES)}.{rng.choice(APELLIDOS)}.{i}@{_elegir(rng, dominios)}"
+
+
+def _logro(email: str, plantilla: Dict[str, Any], habilidad: float, fecha: datetime,
+           rng: random.Random) -> Dict[str, Any]:
+    """Logro con los campos derivados calculados como en `update_achievement`"""
+    metadata = plantilla["metadata"]
+    total_points = plantilla["max_points"]
+    if rng.random() < 0.01:
+        score = 0.0
+    else:
+        media = min(0.97, max(0.05, habilidad - PENALIZACION_DIFICULTAD[metadata["difficulty"]]))
+        score = round(rng.betavariate(1 + 20 * media, 1 + 20 * (1 - media)) * total_points, 1)
+    percent = round((score / total_points) * 100, 2)
+    achieved = percent >= 80
+    return {
+        "id": _uuid(rng),
+        "email": email,
+        "achievement_name": plantilla["achievement_name"],
+        "course_id": plantilla["course_id"],
+        "title": plantilla["title"],
+        "description": plantilla["description"],
+        "score": score,
+        "total_points": total_points,
+        "percentage": percent,
+        "date_earned": fecha if achieved else None,
+        "status": "completed" if achieved else ("in_progress" if percent > 0 else "failed"),
+        "achieved": achieved,
+        "metadata": metadata,
+    }
+
+
+def evaluar_plantilla(logros: Dict[str, Dict[str, Any]], plantilla: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Requisitos cumplidos si el estudiante es elegible (reglas de `evaluar_elegibilidad`), o None"""
+    from app.core import grading
+
+    completados = []
+    for requisito in plantilla["requisitos"]:
+        logro = logros.get(requisito["nombre_logro"])
+        if not logro or not logro["achieved"]:
+            return None
+        nota = grading.convertir_porcentaje(logro["percentage"] or 0)
+        if nota < requisito["nota_minima"]:
+            return None
+        completados.append({
+            "nombre_logro": requisito["nombre_logro"],
+            "nota_obtenida": nota,
+            "nota_minima": requisito["nota_minima"],
+            "cumple_requisito": True,
+            "fecha_completado": logro["date_earned"],
+            "porcentaje_original": logro["percentage"],
+        })
+    nota_promedio = sum(r["nota_obtenida"] for r in completados) / len(completados)
+    if nota_promedio < grading.NOTA_MINIMA_APROBACION:
+        return None
+    return {"requisitos_completados": completados, "nota_promedio": nota_promedio}
+
+
+def _diploma(email: str, plantilla: Dict[str, Any], elegibilidad: Dict[str, Any], numero: int,
+             referencia: datetime, rng: random.Random) -> Dict[str, Any]:
+    """Documento como lo guarda `generar_diploma` (con los campos derivados)"""
+    from app.core import grading
+
+    completados = elegibilidad["requisitos_completados"]
+    nota = elegibilidad["nota_promedio"]
+    ultimo = max(r["fecha_completado"] for r in completados)
+    obtencion = min(referencia, ultimo + timedelta(days=rng.expovariate(1 / 7)))
+    vencimiento = None
+    if plantilla["tipo_diploma"] == "certificacion":
+        vencimiento = obtencion + timedelta(days=VIGENCIA_CERTIFICACION_MESES * 30)
+    return {
+        "id": _uuid(rng),
+        "email": email,
+        "tipo_diploma": plantilla["tipo_diploma"],
+        "id_curso": plantilla["id_curso"],
+        "nombre_diploma": plantilla["nombre_diploma"],
+        "titulo_diploma": plantilla["titulo_diploma"],
+        "institucion_emisora": plantilla["institucion_emisora"],
+        "fecha_obtencion": obtencion,
+        "fecha_expedicion": obtencion,
+        "fecha_vencimiento": vencimiento,
+        "url_certificado": None,
+        "codigo_verificacion": codigo_verificacion(numero),
+        "creditos_academicos": plantilla["creditos_academicos"],
+        "horas_academicas": 10 * len(completados),
+        "nota_final": nota,
+        "calificacion_cualitativa": grading.calificacion_cualitativa(nota),
+        "promedio_ponderado": nota,
+        "modalidad": plantilla["modalidad"],
+        "nivel_educativo": plantilla["nivel_educativo"],
+        "registro_calificado": None,
+        "codigo_snies": plantilla["codigo_snies"],
+        "metadata": {
+            "idioma": "es",
+            "formato_entrega": "digital",
+            "incluir_apostilla": False,
+            "porcentaje_completado": 100.0,
+            "forzar_generacion": False,
+        },
+        "requisitos_completados": completados,
+        "esta_vencido": vencimiento is not None and referencia > vencimiento,
+        "equivalencia_internacional": grading.equivalencia_internacional(nota),
+    }
+
+
+def generar_estudiante(i: int, rng: random.Random, contexto: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Documento del estudiante número `i` y sus diplomas"""
+    catalogo = contexto["catalogo"]
+    referencia = contexto["referencia"]
+    email = _email(i, rng, contexto["dominios"])
+    # Más altas recientes que antiguas (crecimiento de la plataforma)
+    alta = referencia - timedelta(days=1095 * rng.random() ** 1.5, seconds=rng.randrange(86400))
+    habilidad = rng.betavariate(12, 2)
+
+    pendientes = logros_por_estudiante(rng, contexto["alfa"], contexto["min_logros"], contexto["max_logros"])
+    logros, fecha, cursos = [], alta, []
+    intentos = 0
+    while pendientes > 0 and intentos < 4 * len(catalogo):
+        intentos += 1
+        curso = catalogo[bisect.bisect_right(contexto["popularidad"], rng.random() * contexto["popularidad"][-1])]
+        if curso["id_curso"] in cursos:
+            continue
+        cursos.append(curso["id_curso"])
+        plantillas = curso["plantillas"]
+        # Avance en el curso: una parte de la progresión, más si quedan muchos logros
+        avance = min(len(plantillas), pendientes, max(1, round(len(plantillas) * rng.betavariate(2, 1.2))))
+        if len(cursos) == 1 or pendientes >= len(plantillas):
+            avance = min(len(plantillas), pendientes)
+        for plantilla in plantillas[:avance]:
+            fecha = min(referencia, fecha + timedelta(hours=rng.expovariate(1 / 60)))
+            logros.append(_logro(email, plantilla, habilidad, fecha, rng))
+        pendientes -= avance
+
+    estudiante = {
+        "email": email,
+        "achievements": logros,
+        "total_xp": sum(l["metadata"]["xp_reward"] for l in logros if l["achieved"]),
+        "created_at": alta,
+        "updated_at": fecha,
+    }
+
+    diplomas = []
+    por_curso: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for logro in logros:
+        por_curso.setdefault(logro["course_id"], {})[logro["achievement_name"]] = logro
+    for id_curso in cursos:
+        for plantilla in contexto["plantillas_por_curso"].get(id_curso, []):
+            elegibilidad = evaluar_plantilla(por_curso.get(id_curso, {}), plantilla)
+            if elegibilidad is None or rng.random() >= contexto["proporcion_diplomas"]:
+                continue
+            if len(diplomas) < MAX_DIPLOMAS_ESTUDIANTE:
+                numero = i * MAX_DIPLOMAS_ESTUDIANTE + len(diplomas)
+                diplomas.append(_diploma(email, plantilla, elegibilidad, numero, referencia, rng))
+    return estudiante, diplomas
+
+
+# --- Inserción en paralelo ---
+
+_contexto: Dict[str, Any] = {}
+
+
+def _inicializar(contexto: Dict[str, Any]):
+    global _contexto
+    _contexto = contexto
+
+
+def _generar_bloque(bloque: Tuple[int, int, int]) -> Dict[str, Any]:
+    """Generar e insertar los estudiantes [inicio, fin) con la semilla del bloque"""
+    from app.DB.database import get_client, DATABASE_NAME
+    from app.models.diploma import Diploma
+    from app.models.student import Student
+
+    numero, inicio, fin = bloque
+    rng = random.Random(f"{_contexto['semilla']}-{numero}")
+    estudiantes, diplomas = [], []
+    for i in range(inicio, fin):
+        estudiante, suyos = generar_estudiante(i, rng, _contexto)
+        estudiantes.append(estudiante)
+        diplomas.extend(suyos)
+
+    # Un documento por bloque pasa por los modelos: el esquema generado es el de la API
+    Student(**estudiantes[0])
+    if diplomas:
+        Diploma(**diplomas[0])
+
+    db = get_client()[DATABASE_NAME]
+    db["students"].insert_many(estudiantes, ordered=False)
+    if diplomas:
+        db["diplomas"].insert_many(diplomas, ordered=False)
+    return {
+        "estudiantes": len(estudiantes),
+        "logros": sum(len(e["achievements"]) for e in estudiantes),
+        "logros_obtenidos": sum(l["achieved"] for e in estudiantes for l in e["achievements"]),
+        "diplomas": len(diplomas),
+        "distribucion": Counter(len(e["achievements"]) for e in estudiantes),
+    }
+
+
+def _percentil(distribucion: Counter, p: float) -> int:
+    objetivo = p / 100 * sum(distribucion.values())
+    acumulado = 0
+    for valor in sorted(distribucion):
+        acumulado += distribucion[valor]
+        if acumulado >= objetivo:
+            return valor
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generar datos sintéticos a escala de producción")
+    parser.add_argument("--estudiantes", type=int, default=100000)
+    parser.add_argument("--cursos", type=int, default=200)
+    parser.add_argument("--alfa", type=float, default=2.1, help="Exponente de la ley de potencias de logros por estudiante")
+    parser.add_argument("--min-logros", type=int, default=3, help="Logros por estudiante como mínimo")
+    parser.add_argument("--max-logros", type=int, default=2000, help="Logros por estudiante como máximo")
+    parser.add_argument("--proporcion-diplomas", type=float, default=0.7,
+                        help="Probabilidad de que un estudiante elegible haya generado su diploma")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--lote", type=int, default=1000, help="Estudiantes por bloque (un insert_many por bloque)")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--fecha-referencia", help="Fecha 'actual' de los datos (AAAA-MM-DD; hoy por defecto)")
+    parser.add_argument("--base-datos", help="Base de datos de destino (DATABASE_NAME por defecto)")
+    parser.add_argument("--limpiar", action="store_true", help="Vaciar antes las colecciones generadas")
+    parser.add_argument("--sin-indices", action="store_true", help="No crear los índices al terminar")
+    args = parser.parse_args()
+
+    if args.alfa <= 1:
+        parser.error("--alfa debe ser mayor que 1")
+    if not 1 <= args.min_logros <= args.max_logros:
+        parser.error("Se requiere 1 <= --min-logros <= --max-logros")
+    if args.estudiantes * MAX_DIPLOMAS_ESTUDIANTE > 2 ** 32:
+        parser.error(f"Como máximo {2 ** 32 // MAX_DIPLOMAS_ESTUDIANTE} estudiantes (códigos de verificación únicos)")
+    if args.base_datos:
+        os.environ["DATABASE_NAME"] = args.base_datos
+    from app.DB.database import get_database, DATABASE_NAME
+
+    db = get_database()
+    if db is None:
+        sys.exit("❌ No se pudo conectar a MongoDB")
+    if args.limpiar:
+        for nombre in COLECCIONES:
+            db[nombre].drop()
+    elif any(db[nombre].estimated_document_count() for nombre in COLECCIONES):
+        sys.exit(f"❌ {DATABASE_NAME} ya tiene datos: use --limpiar o --base-datos")
+
+    referencia = (datetime.strptime(args.fecha_referencia, "%Y-%m-%d") if args.fecha_referencia
+                  else datetime.now().replace(hour=0, minute=0, second=0, microsecond=0))
+    rng = random.Random(args.semilla)
+    catalogo = generar_catalogo(args.cursos, rng, referencia)
+    plantillas = generar_plantillas_diplomas(catalogo, rng, referencia)
+    db["achievements_master"].insert_many([p for curso in catalogo for p in curso["plantillas"]])
+    if plantillas:
+        db["plantillas_diplomas"].insert_many([dict(p) for p in plantillas])
+    print(f"📚 {DATABASE_NAME}: {len(catalogo)} cursos, "
+          f"{sum(len(c['plantillas']) for c in catalogo)} plantillas de logros, {len(plantillas)} plantillas de diploma")
+
+    plantillas_por_curso: Dict[str, List[Dict[str, Any]]] = {}
+    for plantilla in plantillas:
+        plantillas_por_curso.setdefault(plantilla["id_curso"], []).append(plantilla)
+    contexto = {
+        "catalogo": catalogo,
+        "popularidad": list(itertools.accumulate(c["popularidad"] for c in catalogo)),
+        "plantillas_por_curso": plantillas_por_curso,
+        "dominios": _pesos(DOMINIOS),
+        "referencia": referencia,
+        "alfa": args.alfa,
+        "min_logros": args.min_logros,
+        "max_logros": args.max_logros,
+        "proporcion_diplomas": args.proporcion_diplomas,
+        "semilla": args.semilla,
+    }
+    bloques = [
+        (n, inicio, min(args.estudiantes, inicio + args.lote))
+        for n, inicio in enumerate(range(0, args.estudiantes, args.lote))
+    ]
+
+    print(f"👥 {args.estudiantes} estudiantes en {len(bloques)} bloques con {args.procesos} procesos")
+    totales = Counter()
+    distribucion = Counter()
+    inicio = ultimo_aviso = time.time()
+
+    def acumular(resultado):
+        nonlocal ultimo_aviso
+        distribucion.update(resultado.pop("distribucion"))
+        totales.update(resultado)
+        if time.time() - ultimo_aviso >= 5:
+            ultimo_aviso = time.time()
+            print(f"   {totales['estudiantes']}/{args.estudiantes} estudiantes "
+                  f"({totales['estudiantes'] / (ultimo_aviso - inicio):.0f}/s), {totales['diplomas']} diplomas")
+
+    if args.procesos > 1:
+        with multiprocessing.Pool(args.procesos, initializer=_inicializar, initargs=(contexto,)) as pool:
+            for resultado in pool.imap_unordered(_generar_bloque, bloques):
+                acumular(resultado)
+    else:
+        _inicializar(contexto)
+        for bloque in bloques:
+            acumular(_generar_bloque(bloque))
+    transcurrido = time.time() - inicio
+
+    print(f"✅ {totales['estudiantes']} estudiantes, {totales['logros']} logros "
+          f"({totales['logros_obtenidos'] / max(1, totales['logros']):.0%} obtenidos) y "
+          f"{totales['diplomas']} diplomas en {transcurrido:.1f}s")
+    print("   Logros por estudiante: " + ", ".join(
+        f"p{p} {_percentil(distribucion, p)}" for p in (50, 90, 99, 99.9)
+    ) + f", máx {max(distribucion, default=0)}")
+
+    if not args.sin_indices:
+        from app.DB import indexes
+        inicio = time.time()
+        indexes.aplicar(db)
+        print(f"🗂️  Índices creados en {time.time() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,58 +5,206 @@ Startup script for RavenCode Achievements API
 This script:
 1. Tests database connection
 2. Creates necessary indexes
-3. Starts the API server
+3. Starts the API server (one process, or N workers)
 
-Usage: python startup.py
+Con más de un worker usa gunicorn con workers de uvicorn (reciclado por
+número de solicitudes y recarga sin cortes con `kill -HUP <pid maestro>`).
+Si gunicorn no está instalado (p. ej. en Windows) recurre a
+`uvicorn --workers`, que no recicla ni reemplaza workers caídos.
+
+Usage: python startup.py [--workers 4] [--port 8003] [--max-requests 10000]
+       python startup.py --reload          # desarrollo
 """
 
+import argparse
+import os
 import sys
-import time
-from app.DB.database import test_connection
-from app.DB.initialize import optimize_database
-import subprocess
+import tempfile
 import logging
+from dotenv import load_dotenv
+
+# Las opciones del servidor admiten valores del archivo .env
+load_dotenv()
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def main():
-    """Main startup function"""
-    logger.info("🚀 Starting RavenCode Achievements API v2.0.0")
-    
+APP = "app.main:app"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Arrancar RavenCode Achievements API")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8003")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", os.getenv("WEB_CONCURRENCY", "1"))),
+                        help="Procesos worker (uno por núcleo como punto de partida)")
+    parser.add_argument("--max-requests", type=int, default=int(os.getenv("API_MAX_REQUESTS", "0")),
+                        help="Reciclar cada worker tras N solicitudes (0: nunca; requiere gunicorn)")
+    parser.add_argument("--max-requests-jitter", type=int, default=int(os.getenv("API_MAX_REQUESTS_JITTER", "0")),
+                        help="Variación aleatoria de --max-requests para no reciclar todos a la vez")
+    parser.add_argument("--keep-alive", type=int, default=int(os.getenv("API_KEEP_ALIVE", "5")),
+                        help="Segundos que se mantiene abierta una conexión HTTP inactiva")
+    parser.add_argument("--backlog", type=int, default=int(os.getenv("API_BACKLOG", "2048")),
+                        help="Conexiones pendientes de aceptar en el socket")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("API_GRACEFUL_TIMEOUT", "30")),
+                        help="Segundos para apagar un worker al reciclarlo o pararlo: las solicitudes en curso "
+                             "tienen este plazo menos SHUTDOWN_TIMEOUT_SECONDS, que se reserva para el apagado "
+                             "de la aplicación (drenar hilos, vaciar colas, cerrar MongoDB)")
+    parser.add_argument("--timeout", type=int, default=int(os.getenv("API_WORKER_TIMEOUT", "60")),
+                        help="Reiniciar un worker que no responde al maestro durante N segundos")
+    parser.add_argument("--preload", action="store_true", default=os.getenv("API_PRELOAD", "false").lower() == "true",
+                        help="Importar la aplicación en el maestro antes del fork (menos memoria, arranque más "
+                             "rápido; kill -HUP reinicia los workers pero no recarga el código)")
+    parser.add_argument("--reload", action="store_true", help="Recargar al cambiar el código (desarrollo, un proceso)")
+    parser.add_argument("--skip-init", action="store_true",
+                        help="No comprobar la conexión ni crear índices (si ya lo hizo el despliegue)")
+    return parser.parse_args(argv)
+
+
+def preparar_metricas(workers):
+    """Con varios workers las métricas necesitan un directorio compartido; se define antes de importar la app"""
+    if workers > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="ravencode_metrics_")
+
+    # Multi-worker metrics: drop files left by a previous run before workers start
+    from app.core.metrics import MULTIPROCESS_DIR, reset_multiprocess_dir
+    if MULTIPROCESS_DIR:
+        reset_multiprocess_dir()
+        logger.info(f"📊 Multiprocess metrics enabled in {MULTIPROCESS_DIR}")
+
+
+def plazo_conexiones(args) -> int:
+    """Segundos que el servidor espera a las solicitudes en curso antes del apagado de la aplicación"""
+    from app.core.shutdown import PLAZO_SEGUNDOS
+    return max(1, int(args.graceful_timeout - PLAZO_SEGUNDOS))
+
+
+def inicializar_base_datos():
+    from app.DB.database import test_connection
+    from app.DB.initialize import optimize_database
+
     # Test database connection
     logger.info("📡 Testing database connection...")
     if not test_connection():
         logger.error("❌ Database connection failed. Please check your MongoDB configuration.")
         logger.error("Make sure MongoDB is running and MONGODB_URL is correct in your .env file")
         sys.exit(1)
-    
+
     # Initialize database
     logger.info("🗄️  Initializing database indexes...")
     if not optimize_database():
         logger.warning("⚠️  Database optimization failed, but continuing...")
     else:
         logger.info("✅ Database optimization completed")
-    
+
+
+def ejecutar_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+    from uvicorn.workers import UvicornWorker
+
+    class Worker(UvicornWorker):
+        # Sin este plazo uvicorn espera a las conexiones indefinidamente y el
+        # maestro mata el worker con SIGKILL al cumplirse graceful_timeout,
+        # sin llegar a ejecutar el apagado de la aplicación
+        CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "timeout_graceful_shutdown": plazo_conexiones(args)}
+
+    def child_exit(server, worker):
+        # Retirar los gauges "live" del worker que termina y archivar sus contadores
+        from app.core.metrics import MULTIPROCESS_DIR, retire_worker
+        if MULTIPROCESS_DIR:
+            retire_worker(worker.pid)
+
+    opciones = {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": Worker,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests_jitter,
+        "keepalive": args.keep_alive,
+        "backlog": args.backlog,
+        "graceful_timeout": args.graceful_timeout,
+        "timeout": args.timeout,
+        "preload_app": args.preload,
+        "proc_name": "ravencode-api",
+        "child_exit": child_exit,
+    }
+
+    class Servidor(BaseApplication):
+        def load_config(self):
+            for clave, valor in opciones.items():
+                self.cfg.set(clave, valor)
+
+        def load(self):
+            from app.main import app
+            return app
+
+    logger.info(f"🔁 Graceful reload: kill -HUP {os.getpid()}")
+    Servidor().run()
+
+
+def ejecutar_uvicorn(args):
+    import uvicorn
+
+    if args.reload or args.workers > 1:
+        # Recarga y varios workers necesitan la aplicación como cadena de importación
+        if args.workers > 1 and args.max_requests:
+            logger.warning("⚠️  --max-requests requires gunicorn; workers will not be recycled")
+        uvicorn.run(
+            APP,
+            host=args.host,
+            port=args.port,
+            workers=None if args.reload else args.workers,
+            reload=args.reload,
+            backlog=args.backlog,
+            timeout_keep_alive=args.keep_alive,
+            timeout_graceful_shutdown=plazo_conexiones(args),
+            log_level="info"
+        )
+        return
+
+    from app.main import app
+    uvicorn.run(
+        app,
+        host=args.host,
+        port=args.port,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=plazo_conexiones(args),
+        log_level="info"
+    )
+
+
+def main(argv=None):
+    """Main startup function"""
+    args = parse_args(argv)
+    logger.info("🚀 Starting RavenCode Achievements API v2.0.0")
+
+    # Los workers lo heredan para repartir los núcleos (pool de certificados)
+    os.environ["API_WORKERS"] = str(args.workers)
+
+    preparar_metricas(args.workers)
+    if not args.skip_init:
+        inicializar_base_datos()
+
     # Start the API server
-    logger.info("🌟 Starting API server on http://localhost:8003")
-    logger.info("📚 API Documentation available at: http://localhost:8003/docs")
-    logger.info("🔧 Alternative docs at: http://localhost:8003/redoc")
-    logger.info("❤️  Health check at: http://localhost:8003/health")
+    logger.info(f"🌟 Starting API server on http://localhost:{args.port} ({args.workers} worker(s))")
+    logger.info(f"📚 API Documentation available at: http://localhost:{args.port}/docs")
+    logger.info(f"🔧 Alternative docs at: http://localhost:{args.port}/redoc")
+    logger.info(f"❤️  Health check at: http://localhost:{args.port}/health")
     logger.info("🧪 Run tests with: python test_api.py")
-    
+
     try:
-        # Start uvicorn server
-        from app.main import app
-        import uvicorn
-        uvicorn.run(
-            app, 
-            host="0.0.0.0", 
-            port=8003,
-            log_level="info",
-            reload=False  # Set to True for development
-        )
+        if args.workers > 1 and not args.reload:
+            try:
+                from gunicorn.app.base import BaseApplication  # noqa: F401
+            except ImportError:
+                logger.warning("⚠️  gunicorn not installed; falling back to uvicorn --workers")
+                ejecutar_uvicorn(args)
+            else:
+                ejecutar_gunicorn(args)
+        else:
+            ejecutar_uvicorn(args)
     except KeyboardInterrupt:
         logger.info("\n🛑 Shutting down gracefully...")
     except Exception as e:
@@ -64,4 +212,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
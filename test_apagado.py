@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Prueba de apagado ordenado bajo carga
+RavenCode Achievements & Diplomas API v2.1.0
+
+Arranca la API con `startup.py`, la carga con actualizaciones masivas
+(`POST /achievements/bulk-update`) desde varios clientes y le envía SIGTERM
+en plena carga. Comprueba que:
+
+1. Ninguna solicitud aceptada se corta a medias: cada una termina con su
+   respuesta, o con 503 si llegó durante el drenaje; tras cerrar el socket
+   las conexiones se rechazan, que el cliente puede reintentar.
+2. Todas las actualizaciones confirmadas con 200 están en MongoDB.
+3. El servidor termina con código 0 dentro de --graceful-timeout y el
+   apagado de la aplicación (lifespan) se completa sin cancelar solicitudes.
+
+Usa la configuración de MongoDB del entorno (.env) y borra los estudiantes
+que crea.
+
+Uso: python test_apagado.py [--clientes 8] [--lote 100] [--carga 3]
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+PUERTO = 8033
+BASE_URL = f"http://127.0.0.1:{PUERTO}"
+GRACEFUL_TIMEOUT = 30
+
+load_dotenv()
+
+
+def comprobar(condicion, mensaje):
+    print(f"   {'✅' if condicion else '❌'} {mensaje}")
+    return condicion
+
+
+def arrancar_servidor(log):
+    servidor = subprocess.Popen(
+        [sys.executable, "startup.py", "--host", "127.0.0.1", "--port", str(PUERTO),
+         "--graceful-timeout", str(GRACEFUL_TIMEOUT), "--skip-init"],
+        stdout=log, stderr=subprocess.STDOUT
+    )
+    limite = time.time() + 120
+    while time.time() < limite:
+        try:
+            if requests.get(f"{BASE_URL}/health/ready", timeout=1).status_code == 200:
+                return servidor
+        except requests.exceptions.RequestException:
+            pass
+        if servidor.poll() is not None:
+            break
+        time.sleep(0.5)
+    servidor.kill()
+    raise RuntimeError("El servidor no arrancó o no llegó a estar listo")
+
+
+class Carga:
+    """Clientes que envían lotes hasta que el servidor deja de aceptar conexiones"""
+
+    def __init__(self, prefijo, lote):
+        self.prefijo = prefijo
+        self.lote = lote
+        self.confirmados = []
+        self.resultados = {"ok": 0, "rechazadas": 0, "sin_conexion": 0, "cortadas": 0, "otros": 0}
+        self.en_curso = 0
+        self._lock = threading.Lock()
+
+    def _cuerpo(self, cliente, n):
+        return {"updates": [
+            {
+                "email": f"{self.prefijo}.{cliente}.{n}.{i}@example.com",
+                "achievement": {
+                    "achievement_name": "shutdown_test",
+                    "course_id": "apagado",
+                    "title": "Shutdown test",
+                },
+                "score": 80.0,
+                "total_points": 100.0,
+            }
+            for i in range(self.lote)
+        ]}
+
+    def _anotar(self, clave, emails=None):
+        with self._lock:
+            self.resultados[clave] += 1
+            if emails:
+                self.confirmados.extend(emails)
+
+    def cliente(self, cliente):
+        # Una conexión por solicitud: con keep-alive, una solicitud enviada justo
+        # cuando el servidor cierra la conexión inactiva se pierde sin llegar a
+        # procesarse y no distinguiríamos ese caso de un corte real
+        n = 0
+        while True:
+            cuerpo = self._cuerpo(cliente, n)
+            n += 1
+            with self._lock:
+                self.en_curso += 1
+            try:
+                respuesta = requests.post(
+                    f"{BASE_URL}/achievements/bulk-update", json=cuerpo,
+                    headers={"Connection": "close"}, timeout=GRACEFUL_TIMEOUT * 2
+                )
+            except requests.exceptions.ConnectionError as e:
+                # Rechazada al conectar (socket cerrado) o cortada con la solicitud ya enviada
+                texto = str(e)
+                if "refused" in texto or "Errno 111" in texto:
+                    self._anotar("sin_conexion")
+                    return
+                self._anotar("cortadas")
+                continue
+            finally:
+                with self._lock:
+                    self.en_curso -= 1
+
+            if respuesta.status_code == 200:
+                self._anotar("ok", [u["email"] for u in cuerpo["updates"]])
+            elif respuesta.status_code == 503:
+                self._anotar("rechazadas")
+            else:
+                self._anotar("otros")
+
+
+def test_apagado(clientes=8, lote=100, carga=3.0):
+    prefijo = f"apagado.{uuid.uuid4().hex[:8]}"
+    log = tempfile.NamedTemporaryFile(prefix="apagado_", suffix=".log", delete=False)
+    servidor = arrancar_servidor(log)
+    resultados = []
+    try:
+        prueba = Carga(prefijo, lote)
+        print(f"🏋️  {clientes} clientes enviando lotes de {lote} actualizaciones durante {carga}s")
+        with ThreadPoolExecutor(max_workers=clientes) as executor:
+            for cliente in range(clientes):
+                executor.submit(prueba.cliente, cliente)
+            time.sleep(carga)
+
+            en_curso = prueba.en_curso
+            print(f"🛑 SIGTERM con {en_curso} solicitudes en curso")
+            inicio = time.time()
+            servidor.send_signal(signal.SIGTERM)
+            try:
+                codigo = servidor.wait(timeout=GRACEFUL_TIMEOUT + 10)
+            except subprocess.TimeoutExpired:
+                servidor.kill()
+                codigo = None
+            duracion = time.time() - inicio
+
+        r = prueba.resultados
+        print(f"   Respuestas 200: {r['ok']} | 503 durante el drenaje: {r['rechazadas']} | "
+              f"rechazadas al conectar: {r['sin_conexion']} | cortadas: {r['cortadas']} | otros: {r['otros']}")
+        resultados.append(comprobar(en_curso > 0, "había solicitudes en curso al recibir SIGTERM"))
+        resultados.append(comprobar(r["cortadas"] == 0 and r["otros"] == 0, "ninguna solicitud cortada a medias"))
+        resultados.append(comprobar(
+            codigo == 0 and duracion <= GRACEFUL_TIMEOUT,
+            f"el servidor termina con código {codigo} en {duracion:.1f}s"
+        ))
+
+        log.seek(0)
+        salida = log.read().decode("utf-8", "replace")
+        apagado = [linea for linea in salida.splitlines() if "Shutdown complete" in linea]
+        print(f"   {apagado[-1].strip() if apagado else 'Sin registro de apagado de la aplicación'}")
+        resultados.append(comprobar(
+            bool(apagado) and "cancelled requests: 0" in apagado[-1], "el lifespan completa el apagado sin cancelar"
+        ))
+
+        cliente_db = MongoClient(os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+        try:
+            students = cliente_db[os.getenv("DATABASE_NAME", "ravencode_achievements_db")]["students"]
+            guardados = students.count_documents({"email": {"$in": prueba.confirmados}})
+            resultados.append(comprobar(
+                guardados == len(prueba.confirmados),
+                f"{guardados}/{len(prueba.confirmados)} actualizaciones confirmadas están en MongoDB"
+            ))
+            students.delete_many({"email": {"$regex": f"^{prefijo}\\."}})
+        finally:
+            cliente_db.close()
+    finally:
+        if servidor.poll() is None:
+            servidor.kill()
+        log.close()
+        os.unlink(log.name)
+
+    ok = all(resultados)
+    print("✅ Apagado ordenado sin perder solicitudes" if ok else "❌ El apagado perdió o cortó solicitudes")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de apagado ordenado con SIGTERM bajo carga")
+    parser.add_argument("--clientes", type=int, default=8)
+    parser.add_argument("--lote", type=int, default=100, help="Actualizaciones por solicitud bulk-update")
+    parser.add_argument("--carga", type=float, default=3.0, help="Segundos de carga antes de SIGTERM")
+    args = parser.parse_args()
+
+    sys.exit(0 if test_apagado(args.clientes, args.lote, args.carga) else 1)
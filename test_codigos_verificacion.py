@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Prueba de los códigos de verificación firmados
+RavenCode Achievements & Diplomas API v2.1.0
+
+Prueba `app/core/verification_codes.py` sin base de datos ni servidor:
+
+1. Un código emitido con HMAC-SHA256 o Ed25519 se verifica y devuelve el id,
+   el kid y el vencimiento firmados; con Ed25519 basta la clave pública.
+2. Los códigos alterados, truncados, firmados con otra clave o con un kid
+   desconocido no se verifican.
+3. Los códigos antiguos (`RC-XXXXXXXX`) no se tratan como firmados.
+4. El vencimiento firmado decide `esta_vencido`; las fechas posteriores a
+   2106 se emiten con el máximo del campo y las anteriores a 1970 se rechazan.
+5. Las claves de rotación de DIPLOMA_VERIFICATION_KEYS verifican los códigos
+   que firmaron.
+
+Uso: python test_codigos_verificacion.py
+"""
+
+import base64
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app.core import verification_codes as vc
+
+SECRETO = "secreto-de-prueba"
+
+
+def comprobar(condicion, mensaje):
+    print(f"   {'✅' if condicion else '❌'} {mensaje}")
+    return condicion
+
+
+def clave_ed25519(kid=2):
+    semilla = base64.b64encode(os.urandom(32)).decode("ascii")
+    return vc.ClaveFirma.ed25519_privada(kid, semilla)
+
+
+def alterar(codigo, posicion):
+    """Cambiar un carácter Base32 del cuerpo del código"""
+    caracter = codigo[posicion]
+    return codigo[:posicion] + ("A" if caracter != "A" else "B") + codigo[posicion + 1:]
+
+
+def test_ida_y_vuelta():
+    print("\n🔏 Emisión y verificación")
+    resultados = []
+    diploma_id = str(uuid.uuid4())
+    vencimiento = datetime.now().replace(microsecond=0) + timedelta(days=365)
+
+    hmac_clave = vc.ClaveFirma.hmac(1, SECRETO)
+    codigo = vc.emitir_codigo(diploma_id, vencimiento, hmac_clave)
+    verificado = vc.verificar_codigo(codigo, {1: hmac_clave})
+    resultados.append(comprobar(
+        codigo.startswith(vc.PREFIJO) and vc.es_codigo_firmado(codigo)
+        and verificado == vc.CodigoVerificado(diploma_id, 1, int(vencimiento.timestamp())),
+        f"HMAC: {codigo}"
+    ))
+    resultados.append(comprobar(verificado.fecha_vencimiento == vencimiento, "HMAC: el vencimiento firmado se recupera"))
+    resultados.append(comprobar(
+        vc.verificar_codigo(vc.PREFIJO + codigo[len(vc.PREFIJO):].lower(), {1: hmac_clave}) == verificado,
+        "HMAC: el cuerpo del código no distingue mayúsculas"
+    ))
+
+    ed_clave = clave_ed25519()
+    codigo = vc.emitir_codigo(diploma_id, None, ed_clave)
+    publica = vc.ClaveFirma.ed25519_publica(2, ed_clave.publica_base64())
+    verificado = vc.verificar_codigo(codigo, {2: publica})
+    resultados.append(comprobar(
+        verificado == vc.CodigoVerificado(diploma_id, 2, 0) and not publica.puede_firmar,
+        f"Ed25519 verificado solo con la clave pública ({len(codigo)} caracteres)"
+    ))
+    resultados.append(comprobar(vc.ClaveFirma.hmac(1, SECRETO).publica_base64() is None, "el secreto HMAC no se publica"))
+    assert all(resultados), "emisión y verificación"
+
+
+def test_codigos_invalidos():
+    print("\n🚫 Códigos alterados, truncados y con otra clave")
+    resultados = []
+    hmac_clave = vc.ClaveFirma.hmac(1, SECRETO)
+    ed_clave = clave_ed25519()
+    claves = {1: hmac_clave, 2: ed_clave}
+    diploma_id = str(uuid.uuid4())
+    codigos = {
+        "HMAC": vc.emitir_codigo(diploma_id, datetime.now() + timedelta(days=30), hmac_clave),
+        "Ed25519": vc.emitir_codigo(diploma_id, datetime.now() + timedelta(days=30), ed_clave),
+    }
+
+    for nombre, codigo in codigos.items():
+        cuerpo = len(vc.PREFIJO)
+        alterados = [alterar(codigo, p) for p in (cuerpo, cuerpo + 5, cuerpo + 30, len(codigo) - 2)]
+        resultados.append(comprobar(
+            all(vc.verificar_codigo(a, claves) is None for a in alterados), f"{nombre}: alterado en kid, id, vencimiento o firma"
+        ))
+        truncados = [codigo[:-1], codigo[:-8], codigo[:len(vc.PREFIJO) + 34], vc.PREFIJO]
+        resultados.append(comprobar(all(vc.verificar_codigo(t, claves) is None for t in truncados), f"{nombre}: truncado"))
+
+    otra = vc.ClaveFirma.hmac(1, "otro-secreto")
+    resultados.append(comprobar(vc.verificar_codigo(codigos["HMAC"], {1: otra}) is None, "HMAC con otro secreto"))
+    resultados.append(comprobar(vc.verificar_codigo(codigos["HMAC"], {2: ed_clave}) is None, "kid desconocido"))
+    resultados.append(comprobar(
+        vc.verificar_codigo(codigos["HMAC"], {1: clave_ed25519(kid=1)}) is None, "firma HMAC contra una clave Ed25519 del mismo kid"
+    ))
+    resultados.append(comprobar(
+        all(vc.verificar_codigo(c, claves) is None for c in ("RC2-!!!!", "RC2-" + "A" * 200, "RC2-0189")),
+        "Base32 inválido o demasiado largo"
+    ))
+
+    legado = "RC-1A2B3C4D"
+    resultados.append(comprobar(
+        not vc.es_codigo_firmado(legado) and vc.verificar_codigo(legado, claves) is None,
+        "código antiguo RC-XXXXXXXX: sin firma, se verifica contra la base de datos"
+    ))
+    assert all(resultados), "códigos inválidos"
+
+
+def test_vencimiento():
+    print("\n⏳ Vencimiento firmado")
+    resultados = []
+    clave = vc.ClaveFirma.hmac(1, SECRETO)
+    claves = {1: clave}
+    diploma_id = str(uuid.uuid4())
+
+    def verificar(fecha):
+        return vc.verificar_codigo(vc.emitir_codigo(diploma_id, fecha, clave), claves)
+
+    resultados.append(comprobar(verificar(datetime.now() - timedelta(days=1)).esta_vencido, "vencido ayer"))
+    resultados.append(comprobar(not verificar(datetime.now() + timedelta(days=1)).esta_vencido, "vigente hasta mañana"))
+    sin_vencimiento = verificar(None)
+    resultados.append(comprobar(
+        not sin_vencimiento.esta_vencido and sin_vencimiento.fecha_vencimiento is None, "sin fecha de vencimiento no vence"
+    ))
+
+    lejano = verificar(datetime(2200, 1, 1))
+    resultados.append(comprobar(
+        lejano.vencimiento_epoch == vc.VENCIMIENTO_MAXIMO_EPOCH and not lejano.esta_vencido,
+        f"2200 se emite como el máximo del campo ({lejano.fecha_vencimiento:%Y-%m-%d})"
+    ))
+    try:
+        vc.emitir_codigo(diploma_id, datetime(1960, 1, 1), clave)
+        rechazada = False
+    except ValueError:
+        rechazada = True
+    resultados.append(comprobar(rechazada, "una fecha anterior a 1970 se rechaza con ValueError"))
+    assert all(resultados), "vencimiento firmado"
+
+
+def test_claves_desde_entorno():
+    print("\n🔑 Rotación de claves desde el entorno")
+    resultados = []
+    diploma_id = str(uuid.uuid4())
+    anterior = clave_ed25519(kid=3)
+    codigo_anterior = vc.emitir_codigo(diploma_id, None, anterior)
+    entorno = {
+        "DIPLOMA_SIGNING_KEY": SECRETO,
+        "DIPLOMA_SIGNING_KEY_ID": "4",
+        "DIPLOMA_SIGNING_ALGORITHM": "hmac",
+        "DIPLOMA_VERIFICATION_KEYS": f"3:ed25519:{anterior.publica_base64()}",
+    }
+    with mock.patch.dict(os.environ, entorno):
+        activa, claves = vc.cargar_claves_desde_entorno()
+    resultados.append(comprobar(activa.kid == 4 and activa.puede_firmar and sorted(claves) == [3, 4], "clave activa 4 y anterior 3"))
+    resultados.append(comprobar(
+        vc.verificar_codigo(codigo_anterior, claves) is not None
+        and vc.verificar_codigo(vc.emitir_codigo(diploma_id, None, activa), claves) is not None,
+        "verifica los códigos de la clave anterior y de la activa"
+    ))
+    with mock.patch.dict(os.environ, {"DIPLOMA_SIGNING_KEY": ""}):
+        activa, _ = vc.cargar_claves_desde_entorno()
+    resultados.append(comprobar(activa is None, "sin DIPLOMA_SIGNING_KEY no hay clave activa"))
+    assert all(resultados), "claves desde el entorno"
+
+
+if __name__ == "__main__":
+    pruebas = [test_ida_y_vuelta, test_codigos_invalidos, test_vencimiento, test_claves_desde_entorno]
+    fallidas = 0
+    for prueba in pruebas:
+        try:
+            prueba()
+        except AssertionError:
+            fallidas += 1
+    print("\n✅ Códigos de verificación correctos" if not fallidas else f"\n❌ {fallidas} pruebas fallidas")
+    sys.exit(1 if fallidas else 0)
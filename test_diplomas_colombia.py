@@ -39,6 +39,18 @@ def test_convertir_notas():
         response = requests.get(f"{BASE_URL}/diplomas/convertir-nota?porcentaje={porcentaje}")
         imprimir_respuesta(f"📊 Conversión {porcentaje}% a Nota Colombiana", response)
 
+def test_convertir_notas_lote():
+    """Probar conversión por lote y que coincida con la conversión individual"""
+    porcentajes = [100, 95, 85, 75, 65, 55, 40, 86.25, 73.75, 94.5]
+    response = requests.post(f"{BASE_URL}/diplomas/convertir-notas", json={"porcentajes": porcentajes})
+    imprimir_respuesta("📊 Conversión por Lote a Notas Colombianas", response)
+    
+    resultados = response.json()["data"]["resultados"]
+    for porcentaje, resultado in zip(porcentajes, resultados):
+        individual = requests.get(f"{BASE_URL}/diplomas/convertir-nota?porcentaje={porcentaje}").json()["data"]
+        if individual != resultado:
+            print(f"❌ Diferencia en {porcentaje}%: lote={resultado} individual={individual}")
+
 def test_crear_plantilla_diploma():
     """Crear una plantilla de diploma colombiano"""
     plantilla = {
@@ -226,6 +238,7 @@ def ejecutar_todas_las_pruebas():
         test_endpoints_principales,
         test_configuracion_colombia,
         test_convertir_notas,
+        test_convertir_notas_lote,
         test_crear_plantilla_diploma,
         test_crear_logros_estudiante,
         test_verificar_elegibilidad,
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga: generación concurrente de diplomas
+RavenCode Achievements & Diplomas API v2.1.0
+
+Lanza muchas solicitudes simultáneas de `POST /diplomas/generar` para el mismo
+estudiante y curso y comprueba que solo una tenga éxito y que quede un único
+diploma en la base de datos. Para ejercitar la carrera real entre procesos,
+ejecuta el servidor con varios workers (uvicorn app.main:app --port 8003
+--workers 4) y con los índices creados (python -m app.DB.initialize).
+
+Uso: python test_diplomas_concurrencia.py [--solicitudes 50] [--hilos 25]
+"""
+
+import argparse
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# URL base de la API
+BASE_URL = "http://localhost:8003"
+
+
+def preparar_estudiante_elegible():
+    """Crear una plantilla y los logros necesarios en un curso exclusivo de esta ejecución"""
+    id_curso = f"concurrencia_{uuid.uuid4().hex[:8]}"
+    email = f"concurrencia.{uuid.uuid4().hex[:8]}@example.com"
+
+    plantilla = {
+        "tipo_diploma": "curso",
+        "id_curso": id_curso,
+        "nombre_diploma": "Diploma Prueba de Concurrencia",
+        "titulo_diploma": "Certificado de Concurrencia",
+        "requisitos": [
+            {"nombre_logro": "modulo_1", "id_curso": id_curso, "nota_minima": 3.0, "es_obligatorio": True},
+            {"nombre_logro": "modulo_2", "id_curso": id_curso, "nota_minima": 3.0, "es_obligatorio": True}
+        ]
+    }
+    response = requests.post(f"{BASE_URL}/diplomas/plantillas", json=plantilla)
+    response.raise_for_status()
+
+    for nombre_logro in ("modulo_1", "modulo_2"):
+        response = requests.post(f"{BASE_URL}/achievements/update", json={
+            "email": email,
+            "achievement": {"achievement_name": nombre_logro, "course_id": id_curso, "title": nombre_logro},
+            "score": 95.0,
+            "total_points": 100.0
+        })
+        response.raise_for_status()
+
+    return email, id_curso
+
+
+def generar(email, id_curso):
+    response = requests.post(f"{BASE_URL}/diplomas/generar", json={
+        "email": email,
+        "id_curso": id_curso,
+        "tipo_diploma": "curso"
+    })
+    return response.status_code, response.json()
+
+
+def test_generacion_concurrente(solicitudes=50, hilos=25):
+    """Solo una de las solicitudes concurrentes debe crear el diploma"""
+    email, id_curso = preparar_estudiante_elegible()
+    print(f"🎓 {solicitudes} solicitudes concurrentes para {email} en {id_curso} ({hilos} hilos)")
+
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        resultados = list(executor.map(lambda _: generar(email, id_curso), range(solicitudes)))
+
+    errores = [r for status, r in resultados if status != 200]
+    exitosas = [r for status, r in resultados if status == 200 and r["data"] and r["data"].get("exito")]
+    duplicadas = [
+        r for status, r in resultados
+        if status == 200 and r["data"] and r["data"].get("mensaje") == "Ya existe un diploma para este estudiante y curso"
+    ]
+
+    response = requests.get(f"{BASE_URL}/diplomas/estudiante/{email}")
+    diplomas = [d for d in response.json()["data"]["diplomas"] if d["id_curso"] == id_curso]
+
+    print(f"   Exitosas: {len(exitosas)} | Ya existía: {len(duplicadas)} | Errores: {len(errores)}")
+    print(f"   Diplomas almacenados: {len(diplomas)}")
+
+    ok = len(exitosas) == 1 and len(diplomas) == 1 and not errores
+    print("✅ Sin diplomas duplicados bajo concurrencia" if ok else "❌ Se generaron diplomas duplicados o hubo errores")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga de generación concurrente de diplomas")
+    parser.add_argument("--solicitudes", type=int, default=50)
+    parser.add_argument("--hilos", type=int, default=25)
+    args = parser.parse_args()
+
+    try:
+        sys.exit(0 if test_generacion_concurrente(args.solicitudes, args.hilos) else 1)
+    except requests.exceptions.ConnectionError:
+        print(f"\n❌ No se pudo conectar a la API en {BASE_URL}")
+        print("Asegúrate de que el servidor esté ejecutándose con: python startup.py")
+        sys.exit(1)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Prueba de las sondas de liveness y readiness
+RavenCode Achievements & Diplomas API v2.1.0
+
+Comprueba que:
+
+1. `/health/live` responde 200 con el pid y el uptime del worker.
+2. `/health/ready` responde 200 con MongoDB disponible e informa de cada
+   comprobación (ping, servicios, pool de conexiones, event loop).
+3. Consultar las sondas no genera carga en MongoDB: tras cientos de
+   consultas, los `ping` registrados en `mongodb_command_duration_seconds`
+   son solo los de la tarea periódica (HEALTH_CHECK_INTERVAL_SECONDS).
+
+Uso: python test_health.py [--sondas 500] [--intervalo 5]
+"""
+
+import argparse
+import sys
+import time
+
+import requests
+from prometheus_client.parser import text_string_to_metric_families
+
+# URL base de la API
+BASE_URL = "http://localhost:8003"
+
+
+def comprobar(condicion, mensaje):
+    print(f"   {'✅' if condicion else '❌'} {mensaje}")
+    return condicion
+
+
+def pings_registrados():
+    """Número de comandos `ping` medidos por la API (suma de todos los workers)"""
+    texto = requests.get(f"{BASE_URL}/metrics").text
+    total = 0
+    for familia in text_string_to_metric_families(texto):
+        if familia.name != "mongodb_command_duration_seconds":
+            continue
+        for muestra in familia.samples:
+            if muestra.name.endswith("_count") and muestra.labels.get("command") == "ping":
+                total += muestra.value
+    return total
+
+
+def test_sondas(sondas=500, intervalo=5.0):
+    resultados = []
+    print("💓 Liveness")
+    respuesta = requests.get(f"{BASE_URL}/health/live")
+    datos = respuesta.json().get("data") or {}
+    resultados.append(comprobar(
+        respuesta.status_code == 200 and "pid" in datos and "uptime_segundos" in datos,
+        f"/health/live -> {respuesta.status_code} (pid {datos.get('pid')})"
+    ))
+
+    print("🚦 Readiness")
+    respuesta = requests.get(f"{BASE_URL}/health/ready")
+    datos = respuesta.json().get("data") or {}
+    resultados.append(comprobar(respuesta.status_code == 200, f"/health/ready -> {respuesta.status_code}"))
+    for nombre, resultado in (datos.get("checks") or {}).items():
+        print(f"      {nombre}: {resultado}")
+    resultados.append(comprobar(
+        {"base_datos", "pool_conexiones", "event_loop"} <= set(datos.get("checks") or {}),
+        "informa del ping, el pool y el event loop"
+    ))
+
+    print(f"🔁 {sondas} consultas a las sondas")
+    antes = pings_registrados()
+    inicio = time.time()
+    sesion = requests.Session()
+    for _ in range(sondas):
+        sesion.get(f"{BASE_URL}/health/ready")
+        sesion.get(f"{BASE_URL}/health/live")
+    transcurrido = time.time() - inicio
+    pings = pings_registrados() - antes
+    # La tarea periódica hace un ping por intervalo y por worker; con margen
+    # para varios workers, nunca debería acercarse a una por sonda
+    esperados = (transcurrido / intervalo + 1) * 8
+    resultados.append(comprobar(
+        pings <= esperados,
+        f"{pings:.0f} pings a MongoDB en {transcurrido:.1f}s para {sondas * 2} sondas"
+    ))
+
+    ok = all(resultados)
+    print("✅ Sondas de salud correctas" if ok else "❌ Las sondas de salud fallaron")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de las sondas de liveness y readiness")
+    parser.add_argument("--sondas", type=int, default=500)
+    parser.add_argument("--intervalo", type=float, default=5.0, help="HEALTH_CHECK_INTERVAL_SECONDS del servidor")
+    args = parser.parse_args()
+
+    try:
+        sys.exit(0 if test_sondas(args.sondas, args.intervalo) else 1)
+    except requests.exceptions.ConnectionError:
+        print(f"\n❌ No se pudo conectar a la API en {BASE_URL}")
+        print("Asegúrate de que el servidor esté ejecutándose con: python startup.py")
+        sys.exit(1)
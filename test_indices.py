@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Prueba del gestor de índices contra un mongod real
+RavenCode Achievements & Diplomas API v2.1.0
+
+Usa una base de datos temporal en el servidor de MONGODB_URL (la borra al
+terminar) y comprueba que:
+
+1. `aplicar` crea todos los índices declarados y después no hay diferencias.
+2. Un índice no declarado aparece como sobrante y uno con otras opciones
+   como distinto; `aplicar(recrear, eliminar_sobrantes)` los corrige.
+3. La búsqueda de plantillas de un curso (`course_id` + `active: true`) usa
+   el índice parcial en lugar de recorrer la colección; la carga del catálogo
+   completo (`active: true` sin curso) lo recorre, como se espera.
+4. `$indexStats` cuenta los accesos y marca como sin uso los demás.
+
+Es la prueba que corre en CI (.github/workflows/indexes.yml).
+
+Uso: MONGODB_URL=mongodb://localhost:27017 python test_indices.py
+"""
+
+import argparse
+import os
+import sys
+import uuid
+
+from pymongo import MongoClient
+
+from app.DB import indexes
+from app.DB.slow_operations import resumir_explain
+
+
+def comprobar(condicion, mensaje):
+    print(f"   {'✅' if condicion else '❌'} {mensaje}")
+    return condicion
+
+
+def test_indices(url=os.getenv("MONGODB_URL", "mongodb://localhost:27017")):
+    cliente = MongoClient(url, serverSelectionTimeoutMS=5000)
+    nombre_db = f"ravencode_test_indices_{uuid.uuid4().hex[:8]}"
+    db = cliente[nombre_db]
+    resultados = []
+    try:
+        print(f"🗄️  Base de datos temporal {nombre_db}")
+
+        informe = indexes.aplicar(db)
+        resultados.append(comprobar(not indexes.hay_diferencias(informe), "aplicar crea todos los índices declarados"))
+        resultados.append(comprobar(
+            not any(r.get("errores") for r in informe.values()), "sin errores de creación"
+        ))
+
+        # Deriva: un índice extra y uno declarado con otras opciones
+        db["students"].create_index([("email", 1), ("achievements.achievement_name", 1)], name="email_achievement_name")
+        db["diplomas"].drop_index("diploma_type")
+        db["diplomas"].create_index([("tipo_diploma", 1)], name="diploma_type", sparse=True)
+        informe = indexes.comparar(db)
+        resultados.append(comprobar(informe["students"]["sobrantes"] == ["email_achievement_name"], "detecta el índice sobrante"))
+        resultados.append(comprobar(
+            [d["nombre"] for d in informe["diplomas"]["distintos"]] == ["diploma_type"], "detecta el índice con otras opciones"
+        ))
+        informe = indexes.aplicar(db, recrear=True, eliminar_sobrantes=True)
+        resultados.append(comprobar(not indexes.hay_diferencias(informe), "recrear y eliminar sobrantes corrige la deriva"))
+
+        # Índice parcial en las consultas del catálogo
+        maestros = db["achievements_master"]
+        maestros.insert_many([
+            {"achievement_name": f"logro_{i}", "course_id": f"curso_{i % 50}", "title": f"Logro {i}", "active": i % 4 != 0}
+            for i in range(2000)
+        ])
+        busqueda = {"active": True, "course_id": "curso_7", "$or": [{"title": {"$regex": "logro", "$options": "i"}}]}
+        resumen = resumir_explain(maestros.find(busqueda).explain())
+        resultados.append(comprobar(
+            resumen["plan"] == "IXSCAN" and "master_activos_por_curso" in resumen["indices"],
+            f"la búsqueda por curso usa el índice parcial ({resumen['plan']}, {resumen['indices']})"
+        ))
+        resumen = resumir_explain(maestros.find({"active": True}, {"_id": 0}).explain())
+        resultados.append(comprobar(
+            resumen["plan"] == "COLLSCAN", f"la carga del catálogo completo recorre la colección ({resumen['plan']})"
+        ))
+
+        uso = indexes.uso(db)
+        accesos = {i["nombre"]: i["accesos"] for i in uso["achievements_master"]}
+        maestros.find_one({"course_id": "curso_7", "active": True})
+        uso = indexes.uso(db)
+        despues = {i["nombre"]: i["accesos"] for i in uso["achievements_master"]}
+        resultados.append(comprobar(
+            despues["master_activos_por_curso"] > accesos["master_activos_por_curso"], "$indexStats cuenta los accesos"
+        ))
+        resultados.append(comprobar(
+            "diploma_nota_final" in indexes.sin_uso(uso).get("diplomas", []), "los índices sin accesos aparecen sin uso"
+        ))
+    finally:
+        cliente.drop_database(nombre_db)
+        cliente.close()
+
+    ok = all(resultados)
+    print("✅ Gestor de índices correcto" if ok else "❌ El gestor de índices falló")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba del gestor de índices contra mongod")
+    parser.add_argument("--url", default=os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    args = parser.parse_args()
+
+    sys.exit(0 if test_indices(args.url) else 1)
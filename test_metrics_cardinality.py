@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Prueba de cardinalidad de métricas HTTP
+RavenCode Achievements & Diplomas API v2.1.0
+
+Recorre endpoints con parámetros de ruta usando emails, nombres de logro y
+códigos aleatorios, y comprueba en `/metrics` que las series de
+`http_requests_total`, `http_request_duration_seconds` y `http_errors_total`
+no crecen con los valores: las etiquetas deben ser plantillas de ruta
+(`/achievements/{email}/stats`) y la clase de estado (`2xx`, `4xx`).
+
+Uso: python test_metrics_cardinality.py [--solicitudes 200]
+"""
+
+import argparse
+import sys
+import uuid
+
+import requests
+from prometheus_client.parser import text_string_to_metric_families
+
+# URL base de la API
+BASE_URL = "http://localhost:8003"
+
+METRICAS_HTTP = ("http_requests", "http_request_duration_seconds", "http_errors")
+
+
+def rutas_aleatorias():
+    """Una solicitud por endpoint parametrizado, con valores que nunca se repiten"""
+    email = f"cardinalidad.{uuid.uuid4().hex[:12]}@example.com"
+    logro = f"logro_{uuid.uuid4().hex[:8]}"
+    curso = f"curso_{uuid.uuid4().hex[:8]}"
+    codigo = f"RC-{uuid.uuid4().hex[:8].upper()}"
+    inexistente = uuid.uuid4().hex
+    rutas = [
+        ("GET", f"/achievements/{email}"),
+        ("GET", f"/achievements/{email}/stats"),
+        ("GET", f"/achievements/course/{curso}/available"),
+        ("DELETE", f"/achievements/{email}/{logro}"),
+        ("GET", f"/diplomas/estudiante/{email}"),
+        ("GET", f"/diplomas/verificar/{codigo}"),
+        ("GET", f"/ruta-inexistente/{inexistente}"),
+    ]
+    return rutas, [email, logro, curso, codigo, inexistente]
+
+
+def series_http():
+    """Conjunto de series (nombre + etiquetas) de las métricas HTTP expuestas"""
+    texto = requests.get(f"{BASE_URL}/metrics").text
+    series = set()
+    for familia in text_string_to_metric_families(texto):
+        if familia.name not in METRICAS_HTTP:
+            continue
+        for muestra in familia.samples:
+            etiquetas = tuple(sorted((k, v) for k, v in muestra.labels.items() if k != "le"))
+            series.add((familia.name, etiquetas))
+    return series
+
+
+def recorrer(solicitudes):
+    valores = []
+    for _ in range(solicitudes):
+        rutas, aleatorios = rutas_aleatorias()
+        for metodo, ruta in rutas:
+            requests.request(metodo, f"{BASE_URL}{ruta}")
+        valores.extend(aleatorios)
+    return valores
+
+
+def test_cardinalidad_acotada(solicitudes=200):
+    """Las series no deben crecer al repetir los mismos endpoints con valores nuevos"""
+    print(f"📈 {solicitudes} rondas de endpoints parametrizados con valores aleatorios")
+
+    # Primera ronda: crea las series de cada plantilla y clase de estado
+    # (incluida la del propio /metrics, que se registra tras responder)
+    recorrer(5)
+    series_http()
+    antes = series_http()
+
+    valores = recorrer(solicitudes)
+    despues = series_http()
+
+    nuevas = despues - antes
+    filtradas = [
+        serie for serie in despues
+        if any(valor in v for _, v in serie[1] for valor in valores)
+    ]
+
+    print(f"   Series HTTP: {len(antes)} -> {len(despues)} (nuevas: {len(nuevas)})")
+    for serie in sorted(nuevas)[:10]:
+        print(f"   + {serie}")
+    print(f"   Series con valores de la URL en sus etiquetas: {len(filtradas)}")
+
+    ok = not nuevas and not filtradas
+    print("✅ Cardinalidad acotada por plantillas de ruta" if ok else "❌ Las métricas crean series por valor de la URL")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de cardinalidad de métricas HTTP")
+    parser.add_argument("--solicitudes", type=int, default=200)
+    args = parser.parse_args()
+
+    try:
+        sys.exit(0 if test_cardinalidad_acotada(args.solicitudes) else 1)
+    except requests.exceptions.ConnectionError:
+        print(f"\n❌ No se pudo conectar a la API en {BASE_URL}")
+        print("Asegúrate de que el servidor esté ejecutándose con: python startup.py")
+        sys.exit(1)
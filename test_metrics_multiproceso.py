@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Prueba de métricas con varios workers
+RavenCode Achievements & Diplomas API v2.1.0
+
+Arranca la API con `uvicorn --workers N` y un PROMETHEUS_MULTIPROC_DIR
+temporal, reparte tráfico entre los workers y comprueba que:
+
+1. Cada scrape de `/metrics` (lo atienda el worker que lo atienda) devuelve
+   el total de solicitudes de todos los workers, no el de uno solo.
+2. Al matar un worker, sus gauges "live" se retiran y sus contadores siguen
+   sumando en el total.
+3. Sin servidor: los contadores e histogramas de procesos terminados se suman
+   en un archivo por tipo (`counter_archive.db`, ...) y sus archivos por pid se
+   borran, sin contar dos veces en los scrapes siguientes.
+
+Usa la configuración de MongoDB del entorno (.env); los endpoints que recorre
+no necesitan base de datos.
+
+Uso: python test_metrics_multiproceso.py [--workers 3] [--solicitudes 300] [--solo-archivo]
+"""
+
+import argparse
+import glob
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from prometheus_client.parser import text_string_to_metric_families
+
+PUERTO = 8013
+BASE_URL = f"http://127.0.0.1:{PUERTO}"
+ENDPOINT = "/diplomas/convertir-nota"
+
+
+def arrancar_servidor(workers, directorio):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directorio)
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(PUERTO), "--workers", str(workers), "--log-level", "warning"],
+        env=env
+    )
+    limite = time.time() + 120
+    while time.time() < limite:
+        try:
+            if requests.get(f"{BASE_URL}/health", timeout=1).status_code == 200:
+                return servidor
+        except requests.exceptions.RequestException:
+            pass
+        if servidor.poll() is not None:
+            break
+        time.sleep(0.5)
+    servidor.terminate()
+    raise RuntimeError("El servidor no arrancó")
+
+
+def total_solicitudes():
+    """Suma de http_requests_total del endpoint de prueba en un scrape"""
+    texto = requests.get(f"{BASE_URL}/metrics", headers={"Connection": "close"}).text
+    total = 0.0
+    for familia in text_string_to_metric_families(texto):
+        if familia.name == "http_requests":
+            for muestra in familia.samples:
+                if muestra.name == "http_requests_total" and muestra.labels.get("endpoint") == ENDPOINT:
+                    total += muestra.value
+    return total
+
+
+def pids_con_metricas(directorio, patron="counter_*.db"):
+    pids = set()
+    for ruta in glob.glob(os.path.join(directorio, patron)):
+        match = re.search(r"_(\d+)\.db$", ruta)
+        if match:
+            pids.add(int(match.group(1)))
+    return pids
+
+
+def enviar(i):
+    # Una conexión nueva por solicitud para que el kernel reparta entre workers
+    respuesta = requests.get(f"{BASE_URL}{ENDPOINT}", params={"porcentaje": i % 101}, headers={"Connection": "close"})
+    return respuesta.status_code
+
+
+def test_metricas_multiproceso(workers=3, solicitudes=300):
+    directorio = tempfile.mkdtemp(prefix="prometheus_multiproc_")
+    servidor = arrancar_servidor(workers, directorio)
+    try:
+        print(f"📊 {solicitudes} solicitudes repartidas entre {workers} workers (métricas en {directorio})")
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            estados = list(executor.map(enviar, range(solicitudes)))
+        errores = sum(1 for estado in estados if estado != 200)
+
+        pids = pids_con_metricas(directorio)
+        print(f"   Workers con métricas: {len(pids)} | Errores HTTP: {errores}")
+
+        totales = [total_solicitudes() for _ in range(workers * 4)]
+        print(f"   Totales por scrape: {sorted(set(totales))}")
+        agregados = all(total == solicitudes for total in totales)
+
+        # Matar un worker: su tráfico debe seguir contando y sus gauges live desaparecer
+        victima = min(pids)
+        os.kill(victima, signal.SIGKILL)
+        time.sleep(1)
+        tras_caida = [total_solicitudes() for _ in range(workers * 2)]
+        restos = pids_con_metricas(directorio, "gauge_live*.db") & {victima}
+        print(f"   Worker {victima} terminado: totales {sorted(set(tras_caida))}, gauges live restantes: {len(restos)}")
+        conserva = all(total == solicitudes for total in tras_caida) and not restos
+
+        ok = not errores and len(pids) > 1 and agregados and conserva
+        if len(pids) <= 1:
+            print("   ⚠️  Todo el tráfico lo atendió un único worker; aumenta --solicitudes")
+        print("✅ Métricas agregadas entre workers" if ok else "❌ Las métricas no se agregan entre workers")
+        return ok
+    finally:
+        servidor.send_signal(signal.SIGINT)
+        try:
+            servidor.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            servidor.kill()
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+# Proceso que registra métricas y termina, como un worker reciclado
+WORKER_EFIMERO = """
+from app.core.metrics import REQUEST_COUNT, RESPONSE_TIME, THREADPOOL_SIZE
+REQUEST_COUNT.labels("GET", "/prueba", "2xx").inc({incremento})
+RESPONSE_TIME.labels("GET", "/prueba", "2xx").observe(0.01)
+THREADPOOL_SIZE.set(40)
+"""
+
+SCRAPE = """
+from app.core.metrics import render_latest
+print(render_latest().decode())
+"""
+
+
+def ejecutar_proceso(codigo, directorio):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directorio)
+    return subprocess.run([sys.executable, "-c", codigo], env=env, check=True, capture_output=True, text=True).stdout
+
+
+def muestras(texto):
+    """Valores de las muestras de la ruta de prueba en un scrape"""
+    valores = {}
+    for familia in text_string_to_metric_families(texto):
+        for muestra in familia.samples:
+            if muestra.labels.get("endpoint") == "/prueba" and "le" not in muestra.labels:
+                valores[muestra.name] = muestra.value
+    return valores
+
+
+def test_archivo_workers_terminados(procesos=4):
+    directorio = tempfile.mkdtemp(prefix="prometheus_multiproc_")
+    try:
+        print(f"🗄️  {procesos} procesos terminados con métricas en {directorio}")
+        for i in range(procesos):
+            ejecutar_proceso(WORKER_EFIMERO.format(incremento=i + 1), directorio)
+        antes = len(glob.glob(os.path.join(directorio, "*.db")))
+
+        esperado = sum(range(1, procesos + 1))
+        primero = muestras(ejecutar_proceso(SCRAPE, directorio))
+        segundo = muestras(ejecutar_proceso(SCRAPE, directorio))
+        archivos = sorted(os.path.basename(r) for r in glob.glob(os.path.join(directorio, "*_archive.db")))
+        # Solo quedan los archivos por pid del último scrape, que seguía vivo
+        restantes = pids_con_metricas(directorio, "*.db")
+        print(f"   Archivos: {antes} antes del scrape, después {archivos} y los de {len(restantes)} proceso(s)")
+        print(f"   Scrapes: {primero.get('http_requests_total')} y {segundo.get('http_requests_total')} (esperado {esperado})")
+
+        # Un proceso más tras el archivado: se suma a las series ya archivadas
+        ejecutar_proceso(WORKER_EFIMERO.format(incremento=10), directorio)
+        tercero = muestras(ejecutar_proceso(SCRAPE, directorio))
+
+        ok = (
+            archivos == ["counter_archive.db", "histogram_archive.db"]
+            and len(restantes) == 1
+            and primero == segundo
+            and primero.get("http_requests_total") == esperado
+            and primero.get("http_request_duration_seconds_count") == procesos
+            and tercero.get("http_requests_total") == esperado + 10
+            and tercero.get("http_request_duration_seconds_count") == procesos + 1
+        )
+        print("✅ Workers terminados archivados" if ok else "❌ El archivo de workers terminados no cuadra")
+        assert ok, "archivo de workers terminados"
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de métricas Prometheus con varios workers")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--solicitudes", type=int, default=300)
+    parser.add_argument("--solo-archivo", action="store_true", help="Solo la prueba sin servidor")
+    args = parser.parse_args()
+
+    try:
+        test_archivo_workers_terminados()
+        archivo = True
+    except AssertionError:
+        archivo = False
+    if args.solo_archivo:
+        sys.exit(0 if archivo else 1)
+    sys.exit(0 if test_metricas_multiproceso(args.workers, args.solicitudes) and archivo else 1)
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""
+Pruebas en proceso de los servicios de diplomas
+RavenCode Achievements & Diplomas API v2.1.0
+
+Llama directamente a los servicios sobre una base de datos temporal (se borra
+al terminar), sin levantar el servidor. Comprueba que:
+
+1. Las estadísticas de la agregación `$facet` coinciden con los conteos por
+   consulta de la implementación anterior.
+2. La verificación pública sirve desde la LRU los diplomas ya verificados,
+   rechaza con el filtro de Bloom los códigos desconocidos sin consultar la
+   base de datos y deja de verificar un diploma eliminado, también cuando lo
+   elimina otro proceso (tras DIPLOMAS_VERIFICATION_SYNC_SECONDS).
+3. Con códigos firmados, el vencimiento es el firmado en el código (no el del
+   documento), un código alterado se rechaza sin consultar la base de datos y
+   uno auténtico sin diploma cuenta como revocado.
+4. La elegibilidad guardada en cada escritura de logros coincide con el cálculo
+   completo; un cálculo con una revisión anterior del estudiante no pisa uno
+   más reciente, tampoco con escrituras concurrentes; y una plantilla creada
+   por otro proceso se tiene en cuenta en la siguiente escritura.
+5. Los diplomas guardan sus campos derivados al emitirse; el barrido marca los
+   vencidos (todo el histórico en el primero, el intervalo transcurrido en los
+   siguientes) sin completar campos, y la migración única los completa en los
+   diplomas antiguos una sola vez.
+6. El catálogo de logros disponibles en memoria refleja al momento las
+   plantillas creadas, modificadas o desactivadas por otro proceso, y cada
+   llamada recibe su propia copia.
+
+Backends (como benchmarks/bench_servicios.py):
+- `mongomock` (por defecto): MongoDB simulado en el proceso (`pip install mongomock`).
+- `mongod`: el servidor de MONGODB_URL, con los índices declarados.
+
+El backend también se puede elegir con TEST_BACKEND al ejecutar con pytest.
+
+Uso: python test_servicios_diplomas.py [--backend mongomock|mongod]
+"""
+
+import argparse
+import atexit
+import os
+import sys
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from unittest import mock
+
+BACKEND = os.getenv("TEST_BACKEND", "mongomock")
+
+_db = None
+
+
+def comprobar(condicion, mensaje):
+    print(f"   {'✅' if condicion else '❌'} {mensaje}")
+    return condicion
+
+
+def base_datos(backend=BACKEND):
+    """Base de datos temporal de los servicios, una por proceso"""
+    global _db
+    if _db is None:
+        from benchmarks.bench_servicios import preparar_backend
+        nombre = f"ravencode_test_servicios_{uuid.uuid4().hex[:8]}"
+        db = preparar_backend(backend, nombre, tempfile.mkdtemp(prefix="certificados_"))
+        if db.name != nombre:
+            # Los servicios ya estaban importados con la base de datos del entorno
+            raise RuntimeError(f"Los servicios usan la base de datos {db.name}, no la temporal {nombre}")
+        atexit.register(db.client.drop_database, nombre)
+        _db = db
+        print(f"🗄️  Backend {backend}, base de datos temporal {nombre}")
+    return _db
+
+
+def ejecutar(prueba, backend):
+    """Ejecutar una prueba como script: las comprobaciones fallidas ya se imprimieron"""
+    try:
+        prueba(backend)
+        return True
+    except AssertionError:
+        return False
+
+
+def documento_diploma(i, ahora):
+    from app.models.diploma import Diploma
+    from app.services.diploma_service import _documento_diploma
+    vencimientos = [None, ahora - timedelta(days=10), ahora + timedelta(days=365)]
+    notas = [None, 3.0, 3.7, 4.2, 4.9]
+    return _documento_diploma(Diploma(
+        id=f"diploma-{i}",
+        email=f"estudiante{i % 7}@ejemplo.com",
+        tipo_diploma=["curso", "certificacion", "diplomado"][i % 3],
+        id_curso=f"curso_{i % 4}",
+        nombre_diploma="Diploma de prueba",
+        titulo_diploma="Certificado de prueba",
+        fecha_obtencion=ahora - timedelta(days=(i * 11) % 120),
+        fecha_vencimiento=vencimientos[i % len(vencimientos)],
+        codigo_verificacion=f"RC-{i:08X}",
+        nota_final=notas[i % len(notas)],
+    ))
+
+
+def test_estadisticas_facet(backend=BACKEND):
+    """La agregación `$facet` reproduce los conteos por consulta anteriores"""
+    print("\n📊 Estadísticas de diplomas ($facet)")
+    db = base_datos(backend)
+    from app.services import diploma_service
+    diplomas = db["diplomas"]
+    diplomas.delete_many({})
+    ahora = datetime.now()
+    diplomas.insert_many([documento_diploma(i, ahora) for i in range(60)])
+
+    estadisticas = diploma_service.obtener_estadisticas_diplomas(refrescar=True)
+    resultados = []
+
+    # Conteos de la implementación anterior: una consulta por cifra
+    total = diplomas.count_documents({})
+    vigentes = diplomas.count_documents({
+        "$or": [{"fecha_vencimiento": None}, {"fecha_vencimiento": {"$gt": datetime.now()}}]
+    })
+    resultados.append(comprobar(
+        (estadisticas["total_diplomas"], estadisticas["diplomas_vigentes"], estadisticas["diplomas_vencidos"])
+        == (total, vigentes, total - vigentes),
+        f"total {total}, vigentes {vigentes} y vencidos {total - vigentes}"
+    ))
+
+    hace_30_dias = ahora - timedelta(days=30)
+    por_tipo_esperado = {}
+    for tipo in diplomas.distinct("tipo_diploma"):
+        notas = [d["nota_final"] for d in diplomas.find({"tipo_diploma": tipo}) if d.get("nota_final") is not None]
+        por_tipo_esperado[tipo] = (
+            diplomas.count_documents({"tipo_diploma": tipo}),
+            round(sum(notas) / len(notas), 6) if notas else None,
+            diplomas.count_documents({"tipo_diploma": tipo, "fecha_obtencion": {"$gte": hace_30_dias}}),
+        )
+    por_tipo = {
+        t["_id"]: (
+            t["total"],
+            round(t["promedio_notas"], 6) if t["promedio_notas"] is not None else None,
+            t["diplomas_recientes"],
+        )
+        for t in estadisticas["estadisticas_por_tipo"]
+    }
+    resultados.append(comprobar(por_tipo == por_tipo_esperado, f"por tipo: {por_tipo}"))
+
+    por_curso_esperado = {c: diplomas.count_documents({"id_curso": c}) for c in diplomas.distinct("id_curso")}
+    por_curso = {c["_id"]: c["total"] for c in estadisticas["estadisticas_por_curso"]}
+    totales_curso = [c["total"] for c in estadisticas["estadisticas_por_curso"]]
+    resultados.append(comprobar(
+        por_curso == por_curso_esperado and totales_curso == sorted(totales_curso, reverse=True),
+        f"por curso, de mayor a menor: {por_curso}"
+    ))
+
+    por_mes_esperado = {}
+    for d in diplomas.find({}, {"fecha_obtencion": 1}):
+        mes = d["fecha_obtencion"].strftime("%Y-%m")
+        por_mes_esperado[mes] = por_mes_esperado.get(mes, 0) + 1
+    por_mes = [(m["_id"], m["total"]) for m in estadisticas["estadisticas_por_mes"]]
+    resultados.append(comprobar(por_mes == sorted(por_mes_esperado.items()), f"por mes: {por_mes}"))
+
+    # La instantánea se sirve desde memoria hasta que se fuerza el recálculo
+    diplomas.insert_one(documento_diploma(60, ahora))
+    resultados.append(comprobar(
+        diploma_service.obtener_estadisticas_diplomas()["total_diplomas"] == total
+        and diploma_service.obtener_estadisticas_diplomas(refrescar=True)["total_diplomas"] == total + 1,
+        "la instantánea no cambia hasta refrescarla"
+    ))
+    assert all(resultados), "estadísticas de diplomas"
+
+
+def verificaciones(resultado):
+    from app.core.metrics import DIPLOMA_VERIFICATIONS
+    return DIPLOMA_VERIFICATIONS.labels(resultado=resultado)._value.get()
+
+
+def test_cache_verificacion(backend=BACKEND):
+    """LRU de verificados, filtro de códigos conocidos y revocaciones entre procesos"""
+    print("\n🔐 Caché de verificación de diplomas")
+    db = base_datos(backend)
+    from app.services import diploma_service
+    diplomas, revocados = db["diplomas"], db["diplomas_revocados"]
+    diplomas.delete_many({})
+    revocados.delete_many({})
+    diploma_service._diplomas_verificados.clear()
+    ahora = datetime.now()
+    documentos = [documento_diploma(i, ahora) for i in range(1000, 1010)]
+    diplomas.insert_many([dict(d) for d in documentos])
+    diploma_service.reconstruir_cache_verificacion()
+    resultados = []
+
+    def verificar(codigo):
+        antes = {r: verificaciones(r) for r in ("cache", "bd", "rechazo_bloom", "no_encontrado")}
+        resultado = diploma_service.verificar_diploma(codigo)
+        origen = [r for r in antes if verificaciones(r) > antes[r]]
+        return resultado, origen[0] if origen else None
+
+    codigo = documentos[0]["codigo_verificacion"]
+    resultado, origen = verificar(codigo)
+    resultados.append(comprobar(resultado and resultado["valido"] and origen == "bd", f"primera verificación desde la BD ({origen})"))
+    resultado, origen = verificar(codigo)
+    resultados.append(comprobar(resultado and resultado["valido"] and origen == "cache", f"segunda verificación desde la LRU ({origen})"))
+
+    resultado, origen = verificar("RC-FFFFFFFF")
+    resultados.append(comprobar(resultado is None and origen == "rechazo_bloom", f"código inventado rechazado por el filtro ({origen})"))
+
+    # Emitido por otro proceso después de la reconstrucción: se recoge al sincronizar
+    nuevo = documento_diploma(1010, ahora)
+    nuevo["fecha_obtencion"] = datetime.now()
+    diplomas.insert_one(dict(nuevo))
+    diploma_service._proxima_sincronizacion_codigos = 0.0
+    resultado, origen = verificar(nuevo["codigo_verificacion"])
+    resultados.append(comprobar(resultado and resultado["valido"] and origen == "bd", f"código emitido por otro proceso ({origen})"))
+
+    # Eliminado en este proceso: deja de verificarse de inmediato
+    eliminado = documentos[0]
+    diploma_service.eliminar_diploma(eliminado["email"], eliminado["id"])
+    resultado, origen = verificar(eliminado["codigo_verificacion"])
+    resultados.append(comprobar(resultado is None and origen == "no_encontrado", f"diploma eliminado en este proceso ({origen})"))
+    resultados.append(comprobar(
+        revocados.count_documents({"codigo_verificacion": eliminado["codigo_verificacion"]}) == 1,
+        "la eliminación deja la revocación para los demás procesos"
+    ))
+
+    # Eliminado por otro proceso: la LRU lo sirve hasta la siguiente sincronización de revocaciones
+    otro = documentos[1]
+    verificar(otro["codigo_verificacion"])
+    diplomas.delete_one({"codigo_verificacion": otro["codigo_verificacion"]})
+    revocados.insert_one({"codigo_verificacion": otro["codigo_verificacion"], "id": otro["id"], "fecha_revocacion": datetime.now()})
+    resultado, origen = verificar(otro["codigo_verificacion"])
+    resultados.append(comprobar(origen == "cache", f"dentro del intervalo de sincronización sigue en la LRU ({origen})"))
+    diploma_service._proxima_sincronizacion_revocaciones = 0.0
+    resultado, origen = verificar(otro["codigo_verificacion"])
+    resultados.append(comprobar(resultado is None and origen == "no_encontrado", f"eliminado por otro proceso, tras sincronizar ({origen})"))
+
+    resultado, origen = verificar(documentos[2]["codigo_verificacion"])
+    resultados.append(comprobar(resultado and resultado["valido"], "los demás diplomas siguen verificándose"))
+    assert all(resultados), "caché de verificación"
+
+
+def test_codigos_firmados(backend=BACKEND):
+    """Vigencia desde la firma; la base de datos solo para la revocación"""
+    print("\n🔏 Verificación de códigos firmados")
+    db = base_datos(backend)
+    from app.core import verification_codes
+    from app.services import diploma_service
+    diplomas = db["diplomas"]
+    diplomas.delete_many({})
+    diploma_service._diplomas_verificados.clear()
+    clave = verification_codes.ClaveFirma.hmac(7, "secreto-de-prueba")
+    resultados = []
+
+    with mock.patch.multiple(diploma_service, _clave_firma=clave, _claves_verificacion={7: clave}):
+        ahora = datetime.now()
+        documentos = []
+        for i, vencimiento_firmado in enumerate([ahora - timedelta(days=1), ahora + timedelta(days=30), None]):
+            documento = documento_diploma(2000 + i, ahora)
+            documento["id"] = str(uuid.uuid4())
+            documento["codigo_verificacion"] = diploma_service._generar_codigo_verificacion(documento["id"], vencimiento_firmado)
+            # El documento dice lo contrario que la firma: manda la firma
+            documento["fecha_vencimiento"] = None if vencimiento_firmado and vencimiento_firmado < ahora else ahora - timedelta(days=1)
+            documento["esta_vencido"] = documento["fecha_vencimiento"] is not None
+            documentos.append(documento)
+        diplomas.insert_many([dict(d) for d in documentos])
+
+        for documento, esperado, descripcion in zip(documentos, [True, False, False], ["vencido", "vigente", "sin vencimiento"]):
+            for intento in ("BD", "LRU"):
+                resultado = diploma_service.verificar_diploma(documento["codigo_verificacion"])
+                resultados.append(comprobar(
+                    resultado is not None and resultado["esta_vencido"] is esperado,
+                    f"firmado {descripcion} ({intento}): esta_vencido={resultado and resultado['esta_vencido']}"
+                ))
+
+        codigo = documentos[1]["codigo_verificacion"]
+        antes = verificaciones("firma_invalida")
+        alterado = codigo[:-3] + ("A" if codigo[-3] != "A" else "B") + codigo[-2:]
+        resultados.append(comprobar(
+            diploma_service.verificar_diploma(alterado) is None and verificaciones("firma_invalida") == antes + 1,
+            "código alterado rechazado por la firma"
+        ))
+
+        antes = verificaciones("revocado")
+        diploma_service.eliminar_diploma(documentos[1]["email"], documentos[1]["id"])
+        resultados.append(comprobar(
+            diploma_service.verificar_diploma(codigo) is None and verificaciones("revocado") == antes + 1,
+            "código auténtico de un diploma eliminado: revocado"
+        ))
+    assert all(resultados), "códigos firmados"
+
+
+def plantilla_diploma(id_curso, logros, tipo="curso"):
+    return {
+        "tipo_diploma": tipo,
+        "id_curso": id_curso,
+        "nombre_diploma": f"Diploma {id_curso}",
+        "titulo_diploma": f"Certificado {id_curso}",
+        "requisitos": [{"nombre_logro": l, "id_curso": id_curso, "nota_minima": 3.0} for l in logros],
+        "horas_academicas": 40,
+    }
+
+
+def test_elegibilidad_incremental(backend=BACKEND):
+    """Estado de elegibilidad recalculado en cada escritura, ordenado por revisión"""
+    print("\n🎓 Elegibilidad incremental")
+    db = base_datos(backend)
+    from app.services import achievement_service, diploma_service, eligibility_service
+    curso = f"curso_elegibilidad_{uuid.uuid4().hex[:6]}"
+    requisitos = [f"logro_{i}" for i in range(4)]
+    diploma_service.crear_plantilla_diploma(plantilla_diploma(curso, requisitos))
+    resultados = []
+
+    def escribir(email, logro, puntaje, curso_logro=curso):
+        achievement_service.update_achievement(
+            email, {"achievement_name": logro, "course_id": curso_logro, "title": logro}, score=puntaje, total_points=100.0
+        )
+
+    def coincide(email):
+        """Estado guardado igual al cálculo completo, guardado con la revisión actual"""
+        guardado = eligibility_service.obtener_elegibilidad_guardada(email, curso, "curso")
+        completo = diploma_service._calcular_elegibilidad(email, curso, "curso")
+        estado = db["elegibilidad_diplomas"].find_one({"email": email, "id_curso": curso})
+        revision = db["students"].find_one({"email": email})["revision"]
+        return (
+            guardado is not None and guardado.model_dump() == completo.model_dump()
+            and estado["version"] == revision, guardado
+        )
+
+    email = f"incremental.{uuid.uuid4().hex[:6]}@ejemplo.com"
+    pasos = [
+        ("primer requisito", lambda: escribir(email, "logro_0", 90.0)),
+        ("todos los requisitos", lambda: [escribir(email, l, 95.0) for l in requisitos[1:]]),
+        ("un requisito baja de 80%", lambda: escribir(email, "logro_2", 50.0)),
+        ("vuelve a aprobar", lambda: escribir(email, "logro_2", 85.0)),
+        ("se elimina un requisito", lambda: achievement_service.delete_achievement(email, "logro_3")),
+    ]
+    for descripcion, paso in pasos:
+        paso()
+        ok, guardado = coincide(email)
+        resultados.append(comprobar(ok, f"{descripcion}: elegible={guardado and guardado.elegible}"))
+
+    # Un cálculo con un documento anterior (una escritura más lenta) no pisa el estado
+    anterior = db["students"].find_one({"email": email})
+    escribir(email, "logro_3", 92.0)
+    eligibility_service.recalcular_elegibilidad_por_logro(anterior, curso, "logro_3")
+    ok, guardado = coincide(email)
+    resultados.append(comprobar(ok and guardado.elegible, "un cálculo con una revisión anterior no pisa el estado"))
+
+    # Escrituras concurrentes del mismo estudiante: el último estado es el de todos los logros
+    email = f"concurrente.{uuid.uuid4().hex[:6]}@ejemplo.com"
+    escribir(email, "logro_0", 10.0)
+    escrituras = [(l, 60.0 + 10 * (n % 4)) for n in range(5) for l in requisitos]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda e: escribir(email, *e), escrituras))
+    ok, guardado = coincide(email)
+    resultados.append(comprobar(
+        ok and db["students"].find_one({"email": email})["revision"] == len(escrituras) + 1,
+        f"{len(escrituras)} escrituras concurrentes: revisión y estado finales coherentes"
+    ))
+
+    # Plantilla creada por otro proceso: documento nuevo y versión incrementada, sin invalidar aquí
+    eligibility_service.precargar_plantillas()
+    nuevo_curso = f"{curso}_nuevo"
+    db["plantillas_diplomas"].insert_one({**plantilla_diploma(nuevo_curso, ["logro_x"]), "id": str(uuid.uuid4())})
+    db["versiones"].update_one({"_id": eligibility_service.VERSION_PLANTILLAS}, {"$inc": {"version": 1}}, upsert=True)
+    escribir(email, "logro_x", 90.0, curso_logro=nuevo_curso)
+    estado = db["elegibilidad_diplomas"].find_one({"email": email, "id_curso": nuevo_curso})
+    resultados.append(comprobar(
+        estado is not None and estado["resultado"]["elegible"], "la escritura usa la plantilla creada en otro proceso"
+    ))
+    assert all(resultados), "elegibilidad incremental"
+
+
+def test_barrido_vencimientos(backend=BACKEND):
+    """Barrido de vencimientos incremental y migración única de los campos derivados"""
+    print("\n⏳ Barrido de vencimientos y campos derivados")
+    db = base_datos(backend)
+    from app.core import grading
+    from app.services import diploma_service
+    diplomas = db["diplomas"]
+    diplomas.delete_many({})
+    db["versiones"].delete_one({"_id": diploma_service.MIGRACION_CAMPOS_DERIVADOS})
+    ahora = datetime.now()
+    resultados = []
+
+    # Base de datos sin diplomas: nada que migrar, sin aviso y con la marca puesta
+    diploma_service._ultimo_barrido_vencimientos = None
+    with mock.patch.object(diploma_service.logger, "warning") as aviso:
+        diploma_service.barrer_vencimientos()
+    resultados.append(comprobar(
+        not aviso.called and diploma_service.migracion_campos_derivados_aplicada(),
+        "colección vacía: sin aviso de migración y con la marca guardada"
+    ))
+    db["versiones"].delete_one({"_id": diploma_service.MIGRACION_CAMPOS_DERIVADOS})
+
+    def derivados_correctos(documento, momento):
+        vencimiento = documento.get("fecha_vencimiento")
+        return (
+            documento.get("esta_vencido") == (vencimiento is not None and vencimiento <= momento)
+            and documento.get("equivalencia_internacional") == grading.equivalencia_internacional(documento.get("nota_final"))
+        )
+
+    nuevos = [documento_diploma(i, ahora) for i in range(15)]
+    resultados.append(comprobar(
+        all(derivados_correctos(d, ahora) for d in nuevos), "los diplomas nuevos guardan esta_vencido y equivalencia_internacional"
+    ))
+    # Vencidos después de emitirse: el documento aún dice que están vigentes
+    vencen_despues = [d for d in nuevos if d["fecha_vencimiento"] and d["fecha_vencimiento"] > ahora][:3]
+    for documento in vencen_despues:
+        documento["fecha_vencimiento"] = ahora - timedelta(minutes=1)
+    # Emitidos antes de guardar los campos derivados
+    antiguos = [documento_diploma(i, ahora) for i in range(100, 110)]
+    for documento in antiguos:
+        del documento["esta_vencido"], documento["equivalencia_internacional"]
+    diplomas.insert_many(nuevos + antiguos)
+
+    vencidos_antiguos = sum(1 for d in antiguos if d["fecha_vencimiento"] and d["fecha_vencimiento"] <= ahora)
+    diploma_service._ultimo_barrido_vencimientos = None
+    with mock.patch.object(diploma_service.logger, "warning") as aviso:
+        marcados = diploma_service.barrer_vencimientos()
+    resultados.append(comprobar(aviso.called, "con diplomas antiguos sin migrar, el primer barrido avisa"))
+    resultados.append(comprobar(
+        marcados == len(vencen_despues) + vencidos_antiguos,
+        f"primer barrido: {marcados} vencidos (todo el histórico de fechas de vencimiento)"
+    ))
+    resultados.append(comprobar(
+        diplomas.count_documents({"equivalencia_internacional": {"$exists": False}}) == len(antiguos),
+        "el barrido no completa los campos derivados de los diplomas antiguos"
+    ))
+
+    vigente = next(d for d in nuevos if d["fecha_vencimiento"] and d["fecha_vencimiento"] > ahora)
+    diplomas.update_one({"id": vigente["id"]}, {"$set": {"fecha_vencimiento": datetime.now() - timedelta(seconds=1)}})
+    marcados = diploma_service.barrer_vencimientos()
+    resultados.append(comprobar(
+        marcados == 1 and diplomas.find_one({"id": vigente["id"]})["esta_vencido"],
+        "el siguiente barrido marca el diploma vencido desde el anterior"
+    ))
+
+    aplicada_antes = diploma_service.migracion_campos_derivados_aplicada()
+    completados = diploma_service.migrar_campos_derivados()
+    momento = datetime.now()
+    resultados.append(comprobar(
+        not aplicada_antes and completados == len(antiguos)
+        and all(derivados_correctos(d, momento) for d in diplomas.find({}, {"_id": 0})),
+        f"la migración completa {completados} diplomas antiguos con los mismos valores que el modelo"
+    ))
+    resultados.append(comprobar(
+        diploma_service.migracion_campos_derivados_aplicada()
+        and diploma_service.migrar_campos_derivados() is None
+        and diploma_service.migrar_campos_derivados(forzar=True) == 0,
+        "la migración queda marcada y no se repite salvo que se fuerce"
+    ))
+
+    antiguo = antiguos[0]
+    listado = {d["id"]: d for d in diploma_service.obtener_diplomas_estudiante(antiguo["email"])}
+    resultados.append(comprobar(
+        derivados_correctos(listado[antiguo["id"]], momento), "obtener_diplomas_estudiante devuelve los campos guardados"
+    ))
+    assert all(resultados), "barrido de vencimientos"
+
+
+def test_catalogo_logros(backend=BACKEND):
+    """Catálogo de logros por curso: versión compartida entre procesos y copias por llamada"""
+    print("\n📚 Catálogo de logros disponibles")
+    db = base_datos(backend)
+    from app.services import achievement_master_service as maestro
+    curso = f"curso_catalogo_{uuid.uuid4().hex[:6]}"
+    resultados = []
+
+    def nombres():
+        return sorted(a["achievement_name"] for a in maestro.get_available_achievements_for_course(curso))
+
+    def otro_proceso(operacion):
+        """Escritura de otro worker: cambia la colección e incrementa la versión, sin invalidar aquí"""
+        operacion(db["achievements_master"])
+        db["versiones"].update_one({"_id": maestro.CATALOG_VERSION}, {"$inc": {"version": 1}}, upsert=True)
+
+    maestro.create_achievement_template("logro_a", curso, "Logro A", "Primero")
+    maestro.preload_catalog()
+    resultados.append(comprobar(nombres() == ["logro_a"], "la plantilla creada en este proceso está en el catálogo"))
+
+    otro_proceso(lambda c: c.insert_one({
+        "id": str(uuid.uuid4()), "achievement_name": "logro_b", "course_id": curso, "title": "Logro B",
+        "max_points": 100.0, "requirements": [], "active": True
+    }))
+    resultados.append(comprobar(nombres() == ["logro_a", "logro_b"], "una plantilla creada por otro proceso aparece al momento"))
+
+    otro_proceso(lambda c: c.update_one({"course_id": curso, "achievement_name": "logro_a"}, {"$set": {"active": False}}))
+    resultados.append(comprobar(nombres() == ["logro_b"], "una plantilla desactivada por otro proceso desaparece al momento"))
+
+    maestro.update_achievement_template("logro_b", curso, {"title": "Logro B2"})
+    logros = maestro.get_available_achievements_for_course(curso)
+    resultados.append(comprobar(logros[0]["title"] == "Logro B2", "los cambios de este proceso también se sirven"))
+
+    logros[0]["title"] = "modificado"
+    logros[0]["requirements"].append("modificado")
+    logros.clear()
+    vuelta = maestro.get_available_achievements_for_course(curso)
+    resultados.append(comprobar(
+        len(vuelta) == 1 and vuelta[0]["title"] == "Logro B2" and vuelta[0]["requirements"] == [],
+        "modificar la lista devuelta no cambia el catálogo"
+    ))
+    assert all(resultados), "catálogo de logros"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pruebas en proceso de los servicios de diplomas")
+    parser.add_argument("--backend", choices=["mongomock", "mongod"], default=BACKEND)
+    args = parser.parse_args()
+
+    pruebas = [
+        test_estadisticas_facet, test_cache_verificacion, test_codigos_firmados, test_elegibilidad_incremental,
+        test_barrido_vencimientos, test_catalogo_logros
+    ]
+    ok = all([ejecutar(prueba, args.backend) for prueba in pruebas])
+    print("\n✅ Servicios de diplomas correctos" if ok else "\n❌ Hay pruebas fallidas")
+    sys.exit(0 if ok else 1)